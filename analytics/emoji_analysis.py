@@ -76,35 +76,27 @@ def extract_emojis_from_messages(csv_path="~/Projects/henze-trivia/output/chat_e
     Returns:
         DataFrame with emoji usage data
     """
+    from utils.features import EMOJI_CHARS, add_features, feature_path
+
     csv_path = os.path.expanduser(csv_path)
-    df = pd.read_csv(csv_path)
-    
-    # Regex pattern for emojis
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "\U0001F900-\U0001F9FF"  # supplemental symbols
-        "\U0001FA00-\U0001FAFF"  # extended-A
-        "]+", flags=re.UNICODE
-    )
+    df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
+    
+    # Runs of emoji characters
+    emoji_pattern = re.compile(EMOJI_CHARS + "+", flags=re.UNICODE)
     
     emoji_usage = []
     
-    for _, row in df.iterrows():
-        text = str(row['text'])
-        emojis = emoji_pattern.findall(text)
-        
-        for emoji in emojis:
+    # Only messages the feature store saw emojis in need scanning
+    with_emojis = df[df['emoji_count'] > 0]
+    timestamps = with_emojis['timestamp'] if 'timestamp' in with_emojis else [''] * len(with_emojis)
+    
+    for text, sender, timestamp in zip(with_emojis['text'].astype(str), with_emojis['sender'], timestamps):
+        for emoji in emoji_pattern.findall(text):
             emoji_usage.append({
-                'sender': row['sender'],
+                'sender': sender,
                 'emoji': emoji,
                 'message': text[:100],  # First 100 chars for context
-                'timestamp': row.get('timestamp', '')
+                'timestamp': timestamp
             })
     
     emoji_df = pd.DataFrame(emoji_usage)
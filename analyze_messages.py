@@ -4,11 +4,36 @@ Message Analysis Script for Trivia Question Generation
 Analyzes exported iMessage CSVs to find patterns, jokes, and memorable moments
 """
 
-import csv
-import os
 from collections import defaultdict, Counter
 from datetime import datetime
-import re
+
+from utils.corpus import load_message_rows
+from utils.distinctiveness import DistinctivenessIndex, distinctiveness_path, round_robin
+from utils.features import feature_path, message_features
+from utils.lazy import lazy_import
+from utils.stat_templates import StatQuestionEngine, StatTemplate
+from utils.topics import TopicIndex, topic_path
+
+pd = lazy_import("pandas")
+
+ANALYZER_TEMPLATES = [
+    StatTemplate(
+        "most_active", "Who sent the most messages overall in these conversations?",
+        "{sender} sent {value} messages!",
+        metrics=["messages"], per_group=False, category="Statistics"),
+    StatTemplate(
+        "emoji_king", "Who uses the most emojis in their messages?",
+        "{sender} used {value} emojis!",
+        metrics=["emojis"], per_group=False, category="Emojis"),
+    StatTemplate(
+        "night_owl", "Who's most likely to send messages {window}?",
+        "{sender} sent {value} late-night messages!",
+        metrics=["messages"], windows=["chaos"], per_group=False, category="Habits"),
+    StatTemplate(
+        "laugh_champ", "Who laughs the most in texts (lmao, haha, etc.)?",
+        "{sender} is always laughing: {value} messages with an lmao or haha!",
+        metrics=["laughs"], per_group=False, category="Personality"),
+]
 
 class MessageAnalyzer:
     def __init__(self, output_dir):
@@ -24,38 +49,52 @@ class MessageAnalyzer:
             '+14782784676': 'Jackson',
             'Lauren': 'Lauren'
         }
+        self._features = None
+        self._distinctiveness = None
+        self._topics = None
 
     def load_all_messages(self):
-        """Load all CSV files from output directory"""
-        csv_files = [f for f in os.listdir(self.output_dir) if f.endswith('.csv')]
-
-        for filename in csv_files:
-            filepath = os.path.join(self.output_dir, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        # Clean up sender name
-                        sender = row.get('sender', '')
-                        sender = self.name_map.get(sender, sender)
-
-                        message = row.get('message', '')
-                        if message and message != 'None':
-                            # Remove quotes
-                            message = message.strip('"')
-
-                            self.all_messages.append({
-                                'sender': sender,
-                                'message': message,
-                                'time': row.get('time', ''),
-                                'source': filename
-                            })
-
-                            # Track stats
-                            self.stats[sender]['total_messages'] += 1
-                            self.stats[sender]['total_chars'] += len(message)
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
+        """Load every message CSV in the output directory (see utils/corpus.py)"""
+        for filename, rows in load_message_rows(self.output_dir):
+            for sender, message, time in rows:
+                # Clean up sender name
+                sender = self.name_map.get(sender, sender)
+
+                if message and message != 'None':
+                    # Remove quotes
+                    message = message.strip('"')
+
+                    self.all_messages.append({
+                        'sender': sender,
+                        'message': message,
+                        'time': time,
+                        'source': filename
+                    })
+
+                    # Track stats
+                    self.stats[sender]['total_messages'] += 1
+                    self.stats[sender]['total_chars'] += len(message)
+
+    def message_features(self):
+        """Per-message features (utils/features.py), row i belonging to all_messages[i]"""
+        if self._features is None or len(self._features) != len(self.all_messages):
+            self._features = message_features(self.all_messages, feature_path(self.output_dir))
+        return self._features
+
+    def distinctiveness(self):
+        """BM25 distinctiveness of every message (utils/distinctiveness.py), cached with the corpus"""
+        if self._distinctiveness is None or len(self._distinctiveness.texts) != len(self.all_messages):
+            self._distinctiveness = DistinctivenessIndex(
+                [m['message'] for m in self.all_messages], [m['sender'] for m in self.all_messages],
+                cache_path=distinctiveness_path(self.output_dir))
+        return self._distinctiveness
+
+    def topic_index(self):
+        """Discovered topics (utils/topics.py), brought up to date with the loaded messages"""
+        if self._topics is None:
+            self._topics = TopicIndex(topic_path(self.output_dir))
+        self._topics.update(pd.DataFrame(self.all_messages), text_col='message', time_col='time')
+        return self._topics
 
     def analyze_patterns(self):
         """Analyze message patterns for trivia questions"""
@@ -66,100 +105,64 @@ class MessageAnalyzer:
             'time_patterns': defaultdict(int),
             'reactions': defaultdict(list),
             'inside_jokes': [],
-            'topics': defaultdict(list)
+            'topics': defaultdict(list),
+            'discovered_topics': []
         }
 
         # Most active users
         for sender, data in self.stats.items():
             results['most_active'][sender] = data['total_messages']
 
-        # Analyze each message
-        for msg in self.all_messages:
-            sender = msg['sender']
-            text = msg['message'].lower()
-
-            # Emoji detection
-            emoji_count = len(re.findall(r'[😀-🙏🌀-🗿🚀-🛿]', msg['message']))
-            if emoji_count > 0:
-                results['emoji_users'][sender] += emoji_count
-
-            # Reactions
-            if any(word in text for word in ['loved', 'laughed at', 'liked', 'emphasized', 'questioned', 'reacted']):
-                results['reactions'][sender].append(msg['message'])
-
-            # Time of day
-            try:
-                time_str = msg['time']
-                if 'AM' in time_str or 'PM' in time_str:
-                    hour = int(time_str.split()[1].split(':')[0])
-                    period = 'AM' if 'AM' in time_str else 'PM'
-
-                    if period == 'PM' and hour != 12:
-                        hour += 12
-                    elif period == 'AM' and hour == 12:
-                        hour = 0
-
-                    if hour >= 0 and hour < 6:
-                        results['time_patterns'][f'{sender}_late_night'] += 1
-                    elif hour >= 6 and hour < 12:
-                        results['time_patterns'][f'{sender}_morning'] += 1
-                    elif hour >= 12 and hour < 18:
-                        results['time_patterns'][f'{sender}_afternoon'] += 1
-                    else:
-                        results['time_patterns'][f'{sender}_evening'] += 1
-            except:
-                pass
-
-            # Common topics/phrases
-            if 'lmao' in text or 'lmfao' in text or 'haha' in text:
-                results['topics']['laughter'].append(sender)
-            if 'fuck' in text or 'shit' in text:
-                results['topics']['cursing'].append(sender)
-            if 'trivia' in text:
-                results['topics']['trivia'].append(sender)
-            if 'cranberry' in text or 'bentley' in text or 'cb' in text:
-                results['topics']['dogs'].append(sender)
-            if 'pool' in text or 'farkle' in text:
-                results['topics']['games'].append(sender)
-            if '1280' in text:
-                results['topics']['building'].append(sender)
-            if 'work' in text:
-                results['topics']['work'].append(sender)
-            if 'gay' in text or 'pride' in text:
-                results['topics']['pride'].append(sender)
+        # Per-message features are precomputed once (utils/features.py)
+        features = self.message_features()
+        senders = pd.Series([m['sender'] for m in self.all_messages], index=features.index)
+
+        # Emoji detection
+        emoji_counts = features['emoji_count'].groupby(senders, sort=False).sum()
+        results['emoji_users'].update({s: int(c) for s, c in emoji_counts.items() if c > 0})
+
+        # Reactions
+        for i in features.index[features['kw_reaction'] | features['kw_reacted']]:
+            msg = self.all_messages[i]
+            results['reactions'][msg['sender']].append(msg['message'])
+
+        # Time of day
+        hour = features['hour']
+        for period, mask in (('late_night', hour < 6), ('morning', (hour >= 6) & (hour < 12)),
+                             ('afternoon', (hour >= 12) & (hour < 18)), ('evening', hour >= 18)):
+            for sender, count in senders[mask.fillna(False)].value_counts(sort=False).items():
+                results['time_patterns'][f'{sender}_{period}'] += int(count)
+
+        # Habits
+        for topic in ('laughter', 'cursing'):
+            mentions = senders[features[f'kw_{topic}']].tolist()
+            if mentions:
+                results['topics'][topic].extend(mentions)
+
+        # Topics, discovered from the messages themselves
+        index = self.topic_index()
+        for topic, row in index.topics().iterrows():
+            results['topics'][row['label']].extend(index.senders[index.topic == topic].tolist())
+            results['discovered_topics'].append(row['label'])
 
         return results
 
-    def find_memorable_quotes(self, min_length=20, max_length=150):
-        """Find funny or memorable quotes"""
+    def find_memorable_quotes(self, min_length=20, max_length=150, per_sender=25):
+        """Find funny or memorable quotes: each person's most distinctive lines, best first"""
         memorable = []
 
-        keywords = [
-            'lmao', 'lmfao', 'haha', 'wtf', 'omg',
-            'fuck', 'shit', 'damn', 'hell',
-            'gay', 'pride', 'trivia', 'cranberry', 'bentley',
-            'savage', 'queen', 'iconic', 'loved', 'obsessed'
-        ]
-
-        for msg in self.all_messages:
-            text = msg['message']
-            text_lower = text.lower()
-
-            # Check if it contains interesting keywords
-            has_keyword = any(kw in text_lower for kw in keywords)
-
-            # Check length
-            good_length = min_length <= len(text) <= max_length
-
-            # Not a reaction
-            not_reaction = not any(word in text_lower for word in ['loved', 'laughed at', 'liked', 'emphasized', 'questioned'])
-
-            if has_keyword and good_length and not_reaction:
-                memorable.append({
-                    'sender': msg['sender'],
-                    'quote': text,
-                    'source': msg['source']
-                })
+        features = self.message_features()
+        # Good length, not a reaction
+        keep = features['length'].between(min_length, max_length) & ~features['kw_reaction']
+        best = self.distinctiveness().top_k(per_sender, eligible=keep.to_numpy())
+
+        for i in round_robin(best):
+            msg = self.all_messages[i]
+            memorable.append({
+                'sender': msg['sender'],
+                'quote': msg['message'],
+                'source': msg['source']
+            })
 
         return memorable
 
@@ -167,68 +170,30 @@ class MessageAnalyzer:
         """Generate trivia questions based on analysis"""
         questions = []
 
-        # Question 1: Most active texter
-        most_active_sender = max(results['most_active'], key=results['most_active'].get)
-        most_active_count = results['most_active'][most_active_sender]
-
-        questions.append({
-            'category': 'Statistics',
-            'question': f"Who sent the most messages overall in these conversations?",
-            'answer': most_active_sender,
-            'options': list(results['most_active'].keys())[:4],
-            'fun_fact': f"{most_active_sender} sent {most_active_count} messages!"
-        })
-
-        # Question 2: Emoji king/queen
-        if results['emoji_users']:
-            emoji_king = max(results['emoji_users'], key=results['emoji_users'].get)
-            emoji_count = results['emoji_users'][emoji_king]
-
-            questions.append({
-                'category': 'Emojis',
-                'question': f"Who uses the most emojis in their messages?",
-                'answer': emoji_king,
-                'options': list(results['emoji_users'].keys())[:4],
-                'fun_fact': f"{emoji_king} used {emoji_count} emojis!"
-            })
-
-        # Question 3: Night owl
-        late_night = {k.split('_')[0]: v for k, v in results['time_patterns'].items() if 'late_night' in k}
-        if late_night:
-            night_owl = max(late_night, key=late_night.get)
-
-            questions.append({
-                'category': 'Habits',
-                'question': f"Who's most likely to send messages between midnight and 6 AM?",
-                'answer': night_owl,
-                'options': list(late_night.keys())[:4],
-                'fun_fact': f"{night_owl} sent {late_night[night_owl]} late-night messages!"
-            })
-
-        # Question 4: Laughter champion
-        if 'laughter' in results['topics']:
-            laughter_counter = Counter(results['topics']['laughter'])
-            laugh_champ = laughter_counter.most_common(1)[0][0]
-
+        # Questions 1-4: most active, emojis, night owl, laughter (utils/stat_templates.py)
+        features = self.message_features()
+        messages_df = features.assign(sender=[m['sender'] for m in self.all_messages])
+        for row in StatQuestionEngine(messages_df).expand(ANALYZER_TEMPLATES):
             questions.append({
-                'category': 'Personality',
-                'question': f"Who laughs the most in texts (lmao, haha, etc.)?",
-                'answer': laugh_champ,
-                'options': list(set(results['topics']['laughter']))[:4],
-                'fun_fact': f"{laugh_champ} is always laughing!"
+                'category': row['category'],
+                'question': row['question'],
+                'answer': row[f"option_{row['correct_answer']}"],
+                'options': [row[f'option_{letter}'] for letter in 'ABCD'],
+                'fun_fact': row['explanation']
             })
 
-        # Question 5: Dog lover
-        if 'dogs' in results['topics']:
-            dog_lover_counter = Counter(results['topics']['dogs'])
-            dog_lover = dog_lover_counter.most_common(1)[0][0]
+        # Question 5: Biggest discovered topic
+        if results['discovered_topics']:
+            label = results['discovered_topics'][0]
+            topic_counter = Counter(results['topics'][label])
+            topic_fan, topic_count = topic_counter.most_common(1)[0]
 
             questions.append({
                 'category': 'Interests',
-                'question': f"Who talks about dogs (Cranberry/Bentley) the most?",
-                'answer': dog_lover,
-                'options': list(set(results['topics']['dogs']))[:4],
-                'fun_fact': f"{dog_lover} loves those pups!"
+                'question': f'Who talks about "{label}" the most?',
+                'answer': topic_fan,
+                'options': [s for s, _ in topic_counter.most_common(4)],
+                'fun_fact': f"{topic_fan} brought it up {topic_count} times!"
             })
 
         # Add memorable quote questions
@@ -1,15 +1,27 @@
 #!/usr/bin/env python3
 """
-Combine all trivia questions into one master CSV file
+Combine all trivia questions into question packs
 - Your savage group chat questions
-- General trivia from Open Trivia DB
-- Mix them together with configurable ratios
+- General trivia from the local trivia mirror (Open Trivia DB + pop culture)
+- Mix them with configurable ratios, category quotas and a difficulty curve
+  (see utils/pack_builder.py); --rooms builds many distinct packs per mode
+- Prefer fresh, well-calibrated questions using the web app's game history
+  (see utils/question_stats.py)
 """
 
+import argparse
 import csv
 import os
 import random
 
+from utils.pack_builder import PackBuilder, PackSpec, write_packs
+from utils.pack_writer import write_questions
+from utils.question_bank import DB_PATH
+from utils.question_stats import QuestionStats
+from utils.trivia_mirror import TriviaMirror
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+
 def load_csv(filepath):
     """Load questions from CSV"""
     questions = []
@@ -23,53 +35,70 @@ def load_csv(filepath):
         print(f"❌ Error loading {filepath}: {e}")
     return questions
 
-def combine_questions(group_chat_questions, general_questions, group_ratio=0.4):
+def load_general(mirror, seed=None):
     """
-    Combine questions with specified ratio
+    Load every general question from the local trivia mirror
 
-    Args:
-        group_chat_questions: Your friend group questions
-        general_questions: General/pop culture questions
-        group_ratio: Ratio of group chat questions (0.0 to 1.0)
+    Falls back to general_trivia_questions.csv while the mirror is empty.
     """
-    total = len(group_chat_questions) + len(general_questions)
-
-    # Calculate how many of each type
-    num_group = int(total * group_ratio)
-    num_general = total - num_group
+    if len(mirror) == 0:
+        return None
 
-    # Sample randomly
-    selected_group = random.sample(group_chat_questions, min(num_group, len(group_chat_questions)))
-    selected_general = random.sample(general_questions, min(num_general, len(general_questions)))
-
-    # Combine and shuffle
-    combined = selected_group + selected_general
-    random.shuffle(combined)
+    questions = mirror.sample(len(mirror), seed=seed)
+    print(f"✓ Loaded {len(questions)} questions from the trivia mirror")
+    return questions
 
-    return combined
+def load_usage(db_path):
+    """Play history from the web app's database, if it has one"""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with QuestionStats(db_path=db_path) as stats:
+            usage = stats.by_text()
+    except Exception as e:
+        print(f"⚠️  Could not read game history: {e}")
+        return None
+    print(f"✓ Loaded play history for {len(usage)} questions")
+    return usage
 
 def save_csv(questions, filepath):
-    """Save questions to CSV"""
+    """Save questions to CSV (plus its .pack.jsonl artifact)"""
     if not questions:
         print("❌ No questions to save")
         return
 
-    fieldnames = ['question', 'correct_answer', 'explanation', 'difficulty', 'category',
-                  'option_A', 'option_B', 'option_C', 'option_D']
-
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(questions)
-
-    print(f"💾 Saved {len(questions)} questions to {filepath}")
+    write_questions(questions, filepath)
+
+def pack_specs(size, rooms):
+    """The three themed mixes, `rooms` packs each"""
+    modes = [
+        ("pack_savage_mode", 0.6),   # max chaos
+        ("pack_balanced", 0.4),      # mixed fun
+        ("pack_mild_roast", 0.2),    # safe play
+    ]
+    specs = []
+    for name, ratio in modes:
+        for room in range(1, rooms + 1):
+            suffix = f"_{room:03d}" if rooms > 1 else ""
+            specs.append(PackSpec(f"{name}{suffix}", size=size, group_ratio=ratio))
+    return specs
 
 def main():
+    parser = argparse.ArgumentParser(description="Build question packs from group chat and general trivia")
+    parser.add_argument("--size", type=int, default=40, help="Questions per pack")
+    parser.add_argument("--rooms", type=int, default=1, help="Packs to build per mode")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Directory for the packs")
+    parser.add_argument("--db", default=str(DB_PATH), help="Web app database with game history")
+    parser.add_argument("--ignore-history", action="store_true",
+                        help="Don't rank questions by how they played")
+    args = parser.parse_args()
+
     print("="*70)
     print("COMBINE ALL TRIVIA QUESTIONS")
     print("="*70)
 
-    base_path = '/Users/laurenadmin/Projects/henze-trivia/output'
+    base_path = OUTPUT_DIR
 
     # Load all question sources
     print("\n📥 LOADING QUESTIONS")
@@ -78,47 +107,47 @@ def main():
     # Your savage group chat questions
     group_chat = load_csv(f'{base_path}/all_trivia_questions.csv')
 
-    # General trivia
-    general = load_csv(f'{base_path}/general_trivia_questions.csv')
+    # General trivia (local mirror, or the last fetch's CSV)
+    specs = pack_specs(args.size, args.rooms)
+    general = load_general(TriviaMirror(), seed=args.seed)
+    if general is None:
+        general = load_csv(f'{base_path}/general_trivia_questions.csv')
 
     print(f"\nTotal available:")
     print(f"  Group chat questions: {len(group_chat)}")
     print(f"  General trivia: {len(general)}")
 
-    # Create different mixes
+    # Build every pack from one indexed pool, writing each as it is built
     print("\n\n🎲 CREATING QUESTION PACKS")
     print("-"*70)
 
-    # Mix 1: 60% group chat, 40% general (savage mode)
-    print("\n📦 Pack 1: SAVAGE MODE (60% group, 40% general)")
-    savage_pack = combine_questions(group_chat, general, group_ratio=0.6)
-    save_csv(savage_pack, f'{base_path}/pack_savage_mode.csv')
-
-    # Mix 2: 40% group chat, 60% general (balanced)
-    print("\n📦 Pack 2: BALANCED (40% group, 60% general)")
-    balanced_pack = combine_questions(group_chat, general, group_ratio=0.4)
-    save_csv(balanced_pack, f'{base_path}/pack_balanced.csv')
-
-    # Mix 3: 20% group chat, 80% general (mild roast)
-    print("\n📦 Pack 3: MILD ROAST (20% group, 80% general)")
-    mild_pack = combine_questions(group_chat, general, group_ratio=0.2)
-    save_csv(mild_pack, f'{base_path}/pack_mild_roast.csv')
+    # The builder indexes the whole pool, so history tiers and buckets choose from all of it
+    usage = None if args.ignore_history else load_usage(args.db)
+    builder = PackBuilder(group_chat, general, seed=args.seed, usage=usage)
+    written = write_packs(builder.build_all(specs), args.output)
 
     # Mix 4: All questions shuffled together
-    print("\n📦 Pack 4: EVERYTHING (all questions)")
     all_pack = group_chat + general
-    random.shuffle(all_pack)
-    save_csv(all_pack, f'{base_path}/pack_everything.csv')
+    random.Random(args.seed).shuffle(all_pack)
+    save_csv(all_pack, f'{args.output}/pack_everything.csv')
 
     # Summary
     print("\n\n" + "="*70)
     print("SUMMARY")
     print("="*70)
-    print(f"\n✅ Created 4 question packs:")
-    print(f"   1. pack_savage_mode.csv ({len(savage_pack)} questions)")
-    print(f"   2. pack_balanced.csv ({len(balanced_pack)} questions)")
-    print(f"   3. pack_mild_roast.csv ({len(mild_pack)} questions)")
-    print(f"   4. pack_everything.csv ({len(all_pack)} questions)")
+    print(f"\n✅ Created {len(written) + 1} question packs:")
+    for path, count in written[:10]:
+        print(f"   - {os.path.basename(path)} ({count} questions)")
+    if len(written) > 10:
+        print(f"   ... and {len(written) - 10} more")
+    print(f"   - pack_everything.csv ({len(all_pack)} questions)")
+
+    stats = builder.stats
+    print(f"\n📊 {stats['questions']} questions placed, {stats['repeats']} reused from earlier packs, "
+          f"{stats['relaxed']} with relaxed constraints, {stats['short']} slots left empty")
+    if usage:
+        print(f"   {stats['recalibrated']} questions moved to the difficulty players found them, "
+              f"{stats['stale']} worn-out questions used as filler")
 
     print(f"\n💡 Use these packs in your trivia game!")
     print(f"   - For max chaos: pack_savage_mode.csv")
@@ -6,21 +6,34 @@ Sources:
 2. OpenAI for current pop culture questions
 """
 
-import requests
-import csv
+import argparse
 import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
 import random
-import time
 
-load_dotenv()
+from utils.openai_client import get_client
+from utils.opentdb import CATEGORIES, OpenTDBFetcher
+from utils.pack_writer import write_questions
+from utils.scheduler import create_completion
 
 class TriviaFetcher:
-    def __init__(self):
-        self.opentdb_base = "https://opentdb.com/api.php"
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, openai_client=None, opentdb=None):
+        self._openai_client = openai_client
+        self._opentdb = opentdb
+
+    @property
+    def openai_client(self):
+        """OpenAI client (injected, or the shared one created on first use)"""
+        if self._openai_client is None:
+            self._openai_client = get_client()
+        return self._openai_client
+
+    @property
+    def opentdb(self):
+        """Pooled OpenTDB client backed by the local trivia mirror"""
+        if self._opentdb is None:
+            self._opentdb = OpenTDBFetcher()
+        return self._opentdb
 
     def fetch_opentdb_questions(self, amount=20, category=None, difficulty=None):
         """
@@ -40,33 +53,38 @@ class TriviaFetcher:
         22: Geography
         23: History
         """
-        params = {
-            'amount': amount,
-            'type': 'multiple'  # Multiple choice
-        }
-
-        if category:
-            params['category'] = category
-        if difficulty:
-            params['difficulty'] = difficulty
-
         print(f"🌐 Fetching {amount} questions from Open Trivia DB...")
 
         try:
-            response = requests.get(self.opentdb_base, params=params)
-            data = response.json()
-
-            if data['response_code'] == 0:
-                questions = self._format_opentdb_questions(data['results'])
+            code, records = self.opentdb.fetch_page(category, difficulty, amount)
+            if code == 0:
+                self.opentdb.mirror.add(records)
+                questions = self._format_opentdb_questions(records)
                 print(f"✓ Fetched {len(questions)} questions")
                 return questions
             else:
-                print(f"❌ Error: Response code {data['response_code']}")
+                print(f"❌ Error: Response code {code}")
                 return []
         except Exception as e:
             print(f"❌ Error fetching from OpenTDB: {e}")
             return []
 
+    def fetch_opentdb_bulk(self, total, categories=None):
+        """
+        Fetch (or load from the local mirror) `total` OpenTDB questions
+
+        Questions are spread evenly over categories and difficulties; only
+        what the mirror is missing is downloaded.
+        """
+        try:
+            records = self.opentdb.fetch(total, categories=categories)
+        except Exception as e:
+            print(f"❌ Error fetching from OpenTDB: {e}")
+            records = self.opentdb.mirror.select(categories or CATEGORIES, sources=["opentdb"])
+
+        random.shuffle(records)
+        return self._format_opentdb_questions(records[:total])
+
     def _format_opentdb_questions(self, results):
         """Format OpenTDB questions to match our CSV format"""
         formatted = []
@@ -81,24 +99,19 @@ class TriviaFetcher:
             correct_letter = chr(65 + correct_index)  # A, B, C, D
 
             formatted.append({
-                'question': self._decode_html(q['question']),
+                'question': q['question'],
                 'correct_answer': correct_letter,
                 'explanation': f"Category: {q['category']}",
                 'difficulty': q['difficulty'],
-                'category': self._decode_html(q['category']),
-                'option_A': self._decode_html(all_answers[0]) if len(all_answers) > 0 else '',
-                'option_B': self._decode_html(all_answers[1]) if len(all_answers) > 1 else '',
-                'option_C': self._decode_html(all_answers[2]) if len(all_answers) > 2 else '',
-                'option_D': self._decode_html(all_answers[3]) if len(all_answers) > 3 else '',
+                'category': q['category'],
+                'option_A': all_answers[0] if len(all_answers) > 0 else '',
+                'option_B': all_answers[1] if len(all_answers) > 1 else '',
+                'option_C': all_answers[2] if len(all_answers) > 2 else '',
+                'option_D': all_answers[3] if len(all_answers) > 3 else '',
             })
 
         return formatted
 
-    def _decode_html(self, text):
-        """Decode HTML entities"""
-        import html
-        return html.unescape(text)
-
     def generate_pop_culture_questions(self, num_questions=10, year=2025):
         """Generate current pop culture questions using OpenAI"""
 
@@ -131,7 +144,8 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
         print(f"\n🤖 Generating {num_questions} pop culture questions for {year}...")
 
         try:
-            response = self.openai_client.chat.completions.create(
+            response = create_completion(
+                self.openai_client,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are a pop culture trivia expert who creates engaging, accurate questions about current events and trends."},
@@ -187,19 +201,24 @@ IMPORTANT: Return ONLY the JSON array, no other text."""
         return formatted
 
     def save_to_csv(self, questions, filename):
-        """Save questions to CSV"""
-        fieldnames = ['question', 'correct_answer', 'explanation', 'difficulty', 'category',
-                      'option_A', 'option_B', 'option_C', 'option_D']
-
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(questions)
-
-        print(f"💾 Saved {len(questions)} questions to {filename}")
+        """Save questions to CSV (plus its .pack.jsonl artifact)"""
+        write_questions(questions, filename, question_type="trivia")
 
 def main():
-    fetcher = TriviaFetcher()
+    parser = argparse.ArgumentParser(description="Fetch general and pop culture trivia")
+    parser.add_argument("--count", type=int, default=40,
+                        help="General questions from Open Trivia DB (mirrored locally)")
+    parser.add_argument("--pop-culture", type=int, default=20,
+                        help="Pop culture questions generated with OpenAI (0 to skip)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent OpenTDB shards")
+    parser.add_argument("--reset-token", action="store_true",
+                        help="Start a new OpenTDB session token")
+    args = parser.parse_args()
+
+    opentdb = OpenTDBFetcher(max_workers=args.workers)
+    if args.reset_token:
+        opentdb.reset()
+    fetcher = TriviaFetcher(opentdb=opentdb)
     all_questions = []
 
     print("="*70)
@@ -210,36 +229,27 @@ def main():
     print("\n📚 FETCHING GENERAL TRIVIA")
     print("-"*70)
 
-    categories = {
-        9: "General Knowledge",
-        11: "Film",
-        12: "Music",
-        14: "Television",
-        17: "Science & Nature",
-        21: "Sports",
-        22: "Geography",
-        23: "History"
-    }
-
-    for cat_id, cat_name in categories.items():
-        print(f"\n🎯 Category: {cat_name}")
-        questions = fetcher.fetch_opentdb_questions(amount=5, category=cat_id)
-        all_questions.extend(questions)
-        time.sleep(0.5)  # Be nice to the API
+    print(f"🎯 Categories: {', '.join(CATEGORIES.values())}")
+    all_questions.extend(fetcher.fetch_opentdb_bulk(args.count))
 
     # 2. Generate current pop culture questions
     print("\n\n🎬 GENERATING POP CULTURE QUESTIONS")
     print("-"*70)
 
-    pop_questions = fetcher.generate_pop_culture_questions(num_questions=20, year=2025)
-    all_questions.extend(pop_questions)
+    if args.pop_culture:
+        pop_questions = fetcher.generate_pop_culture_questions(num_questions=args.pop_culture, year=2025)
+        all_questions.extend(pop_questions)
+        added = opentdb.mirror.add_csv_rows(pop_questions, source="openai")
+        print(f"🗄️  Added {added} pop culture questions to the trivia mirror")
 
     # 3. Save to CSV
     print("\n\n💾 SAVING QUESTIONS")
     print("-"*70)
 
-    output_file = '/Users/laurenadmin/Projects/henze-trivia/output/general_trivia_questions.csv'
+    output_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output',
+                               'general_trivia_questions.csv')
     fetcher.save_to_csv(all_questions, output_file)
+    print(f"🗄️  Trivia mirror: {len(opentdb.mirror)} questions in {opentdb.mirror.path}")
 
     # Summary
     print("\n\n" + "="*70)
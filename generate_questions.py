@@ -103,6 +103,30 @@ def generate_roast_mode(args):
     return result.returncode == 0
 
 
+def generate_stats_questions(args):
+    """Expand the stat question templates (no API calls; every valid question is kept)."""
+    from utils.features import add_features, feature_path
+    from utils.lazy import lazy_import
+    from utils.pack_writer import write_questions
+    from utils.stat_templates import StatQuestionEngine
+    
+    pd = lazy_import("pandas")
+    
+    print("\n📊 Generating stat questions from templates...")
+    csv_path = os.path.expanduser("~/Projects/henze-trivia/output/chat_export.csv")
+    
+    messages_df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
+    questions = StatQuestionEngine(messages_df).expand()
+    
+    if not questions:
+        print("❌ No stat questions had a clear answer")
+        return False
+    
+    write_questions(questions, "~/Projects/henze-trivia/output/stats_questions.csv")
+    print(f"✅ Generated {len(questions)} stat questions!")
+    return True
+
+
 def analyze_emojis(args):
     """Run emoji and reaction analysis."""
     import subprocess
@@ -155,6 +179,7 @@ def generate_all(args):
         ("Who Said It", generate_who_said_it),
         ("Chaos Questions", generate_chaos_questions),
         ("Roast Mode", generate_roast_mode),
+        ("Stat Questions", generate_stats_questions),
     ]
     
     for name, generator in generators:
@@ -275,13 +300,16 @@ Examples:
   # Interactive mode
   python generate_questions.py --interactive
 
+  # Template stat questions (no API calls)
+  python generate_questions.py --mode stats
+
   # Emoji analysis only
   python generate_questions.py --mode emoji --display
         """
     )
     
     parser.add_argument("--mode", 
-                       choices=["trivia", "who-said-it", "chaos", "roast", "emoji", "export"],
+                       choices=["trivia", "who-said-it", "chaos", "roast", "stats", "emoji", "export"],
                        help="Question generation mode")
     
     parser.add_argument("--all", action="store_true",
@@ -335,6 +363,8 @@ Examples:
             success = generate_chaos_questions(args)
         elif args.mode == "roast":
             success = generate_roast_mode(args)
+        elif args.mode == "stats":
+            success = generate_stats_questions(args)
         elif args.mode == "emoji":
             success = analyze_emojis(args)
         elif args.mode == "export":
@@ -4,10 +4,40 @@ Generate SAVAGE and RUDE trivia questions from message analysis
 For when you want the tea to be PIPING HOT ☕
 """
 
-import csv
-import os
 import random
-from collections import defaultdict, Counter
+from collections import Counter
+
+from utils.corpus import load_message_rows
+from utils.features import feature_path, message_features
+from utils.lazy import lazy_import
+from utils.pack_writer import write_questions
+from utils.stat_templates import StatQuestionEngine, StatTemplate
+from utils.stylometry import SenderProfiles
+
+pd = lazy_import("pandas")
+
+SAVAGE_TEMPLATES = [
+    StatTemplate(
+        "potty_mouth", "Who has the filthiest mouth and curses the most?",
+        "{sender} dropped {value} curse words! Wash that mouth out!",
+        metrics=["curses"], per_group=False, category="Savage Stats"),
+    StatTemplate(
+        "fuck_king", 'Who says "fuck" the most in the group chat?',
+        '{sender} said "fuck" in {value} messages! That\'s a lot of fucks given!',
+        metrics=["f_bombs"], per_group=False, category="Savage Stats"),
+    StatTemplate(
+        "night_owl", "Who's the biggest insomniac, texting at ungodly hours?",
+        "{sender} sent {value} messages {window}. Sleep is for the weak!",
+        metrics=["messages"], windows=["chaos"], per_group=False, category="Savage Stats"),
+    StatTemplate(
+        "kroger_hater", "Who has beef with Kroger and won't shut up about it?",
+        "{sender} has a toxic relationship with Kroger!",
+        metrics=["kroger"], per_group=False, category="Savage Stats"),
+    StatTemplate(
+        "party_animal", "Who mentions being drunk, wasted, or fucked up the most?",
+        "{sender} knows how to party! Mentioned it {value} times.",
+        metrics=["drunk"], per_group=False, category="Savage Stats"),
+]
 
 class SavageTriviaGenerator:
     def __init__(self, output_dir):
@@ -22,48 +52,37 @@ class SavageTriviaGenerator:
             '+14782784676': 'Jackson',
             'Lauren': 'Lauren'
         }
+        self._features = None
 
     def load_messages(self):
-        """Load all messages"""
-        csv_files = [f for f in os.listdir(self.output_dir) if f.endswith('.csv')]
-
-        for filename in csv_files:
-            filepath = os.path.join(self.output_dir, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        sender = self.name_map.get(row.get('sender', ''), row.get('sender', ''))
-                        message = row.get('message', '').strip('"')
-
-                        if message and message != 'None':
-                            self.all_messages.append({
-                                'sender': sender,
-                                'message': message,
-                                'time': row.get('time', ''),
-                                'source': filename
-                            })
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
+        """Load every message CSV in the output directory (see utils/corpus.py)"""
+        for filename, rows in load_message_rows(self.output_dir):
+            for sender, message, time in rows:
+                sender = self.name_map.get(sender, sender)
+                message = message.strip('"')
+
+                if message and message != 'None':
+                    self.all_messages.append({
+                        'sender': sender,
+                        'message': message,
+                        'time': time,
+                        'source': filename
+                    })
+
+    def message_features(self):
+        """Per-message features (utils/features.py), row i belonging to all_messages[i]"""
+        if self._features is None or len(self._features) != len(self.all_messages):
+            self._features = message_features(self.all_messages, feature_path(self.output_dir))
+        return self._features
 
     def generate_savage_questions(self):
         """Generate savage AF questions"""
         questions = []
 
-        # Find savage quotes
-        savage_keywords = ['fuck', 'shit', 'ass', 'bitch', 'damn', 'hell', 'wtf', 'gay']
-        savage_quotes = []
-
-        for msg in self.all_messages:
-            text_lower = msg['message'].lower()
-
-            # Must contain savage word
-            if any(word in text_lower for word in savage_keywords):
-                # Not just a reaction
-                if not any(r in text_lower for r in ['loved', 'laughed at', 'liked', 'emphasized', 'questioned']):
-                    # Good length
-                    if 20 <= len(msg['message']) <= 150:
-                        savage_quotes.append(msg)
+        # Find savage quotes: a savage word, not just a reaction, good length
+        features = self.message_features()
+        savage = features['kw_savage'] & ~features['kw_reaction'] & features['length'].between(20, 150)
+        savage_quotes = [self.all_messages[i] for i in features.index[savage]]
 
         # Limit to 2 per person for diversity
         quote_counts = Counter()
@@ -77,11 +96,17 @@ class SavageTriviaGenerator:
         # Generate "Who Said It" questions
         all_senders = list(set([m['sender'] for m in self.all_messages if m['sender'] in self.name_map.values()]))
 
-        for quote_data in selected_quotes[:25]:
+        # Wrong answers are the people each quote sounds most like (utils/stylometry.py)
+        profiles = SenderProfiles(pd.DataFrame(self.all_messages), text_col='message',
+                                  senders=sorted(all_senders))
+        selected_quotes = selected_quotes[:25]
+        style_scores = profiles.rank_quotes([q['message'] for q in selected_quotes],
+                                            [q['sender'] for q in selected_quotes])
+
+        for i, quote_data in enumerate(selected_quotes):
             options = [quote_data['sender']]
-            other_senders = [s for s in all_senders if s != quote_data['sender']]
-            random.shuffle(other_senders)
-            options.extend(other_senders[:3])
+            options.extend(profiles.distractors(quote_data['sender'], scores=style_scores.iloc[i],
+                                                pool=all_senders))
             random.shuffle(options)
 
             quote_text = quote_data['message'][:120]
@@ -92,7 +117,7 @@ class SavageTriviaGenerator:
                 'question': f'Who said: "{quote_text}"?',
                 'correct_answer': chr(65 + options.index(quote_data['sender'])),
                 'explanation': f'{quote_data["sender"]} said this savage line!',
-                'difficulty': 'hard',
+                'difficulty': profiles.difficulty(quote_data['sender'], style_scores.iloc[i]),
                 'category': 'Savage Quotes',
                 'option_A': options[0],
                 'option_B': options[1],
@@ -106,165 +131,18 @@ class SavageTriviaGenerator:
         return questions
 
     def _generate_behavior_questions(self):
-        """Generate savage behavior-based questions"""
-        questions = []
-
-        # Track behaviors
-        behaviors = {
-            'curse_words': defaultdict(int),
-            'late_night': defaultdict(int),
-            'fuck_mentions': defaultdict(int),
-            'gay_mentions': defaultdict(int),
-            'complaining': defaultdict(int),
-            'kroger_hate': defaultdict(int),
-            'drunk_texts': defaultdict(int)
-        }
-
-        for msg in self.all_messages:
-            sender = msg['sender']
-            text = msg['message'].lower()
-
-            # Count curse words
-            curse_count = sum([
-                text.count('fuck'), text.count('shit'),
-                text.count('ass'), text.count('bitch'),
-                text.count('damn')
-            ])
-            behaviors['curse_words'][sender] += curse_count
-
-            # Specific tracking
-            if 'fuck' in text:
-                behaviors['fuck_mentions'][sender] += 1
-            if 'gay' in text:
-                behaviors['gay_mentions'][sender] += 1
-            if 'kroger' in text:
-                behaviors['kroger_hate'][sender] += 1
-            if any(w in text for w in ['passed out', 'drunk', 'wasted', 'fucked up']):
-                behaviors['drunk_texts'][sender] += 1
-
-            # Late night messages (12am-6am)
-            try:
-                time_str = msg['time']
-                if 'AM' in time_str:
-                    hour = int(time_str.split()[1].split(':')[0])
-                    if hour <= 6 or hour == 12:
-                        behaviors['late_night'][sender] += 1
-            except:
-                pass
-
-        # Generate questions from behaviors
-        all_senders = list(set([m['sender'] for m in self.all_messages if m['sender'] in self.name_map.values()]))
-
-        # Biggest potty mouth
-        if behaviors['curse_words']:
-            potty_mouth = max(behaviors['curse_words'], key=behaviors['curse_words'].get)
-            count = behaviors['curse_words'][potty_mouth]
-
-            options = list(all_senders[:4])
-            random.shuffle(options)
-
-            questions.append({
-                'question': 'Who has the filthiest mouth and curses the most?',
-                'correct_answer': chr(65 + options.index(potty_mouth)),
-                'explanation': f'{potty_mouth} dropped {count} curse words! Wash that mouth out!',
-                'difficulty': 'easy',
-                'category': 'Savage Stats',
-                'option_A': options[0],
-                'option_B': options[1],
-                'option_C': options[2],
-                'option_D': options[3],
-            })
-
-        # Most "fuck" drops
-        if behaviors['fuck_mentions']:
-            fuck_king = max(behaviors['fuck_mentions'], key=behaviors['fuck_mentions'].get)
-            count = behaviors['fuck_mentions'][fuck_king]
-
-            options = list(all_senders[:4])
-            random.shuffle(options)
-
-            questions.append({
-                'question': 'Who says "fuck" the most in the group chat?',
-                'correct_answer': chr(65 + options.index(fuck_king)),
-                'explanation': f'{fuck_king} said "fuck" {count} times! That\'s a lot of fucks given!',
-                'difficulty': 'medium',
-                'category': 'Savage Stats',
-                'option_A': options[0],
-                'option_B': options[1],
-                'option_C': options[2],
-                'option_D': options[3],
-            })
-
-        # Night owl
-        if behaviors['late_night']:
-            night_owl = max(behaviors['late_night'], key=behaviors['late_night'].get)
-            count = behaviors['late_night'][night_owl]
+        """Generate savage behavior-based questions (utils/stat_templates.py)"""
+        # Every template is one column of the precomputed features (utils/features.py)
+        features = self.message_features()
+        messages_df = features.assign(sender=[m['sender'] for m in self.all_messages])
+        all_senders = list(set(self.name_map.values()))
 
-            options = list(all_senders[:4])
-            random.shuffle(options)
-
-            questions.append({
-                'question': 'Who\'s the biggest insomniac, texting at ungodly hours?',
-                'correct_answer': chr(65 + options.index(night_owl)),
-                'explanation': f'{night_owl} sent {count} messages between midnight and 6 AM. Sleep is for the weak!',
-                'difficulty': 'medium',
-                'category': 'Savage Stats',
-                'option_A': options[0],
-                'option_B': options[1],
-                'option_C': options[2],
-                'option_D': options[3],
-            })
-
-        # Kroger hater
-        if behaviors['kroger_hate']:
-            kroger_hater = max(behaviors['kroger_hate'], key=behaviors['kroger_hate'].get)
-
-            options = list(all_senders[:4])
-            random.shuffle(options)
-
-            questions.append({
-                'question': 'Who has beef with Kroger and won\'t shut up about it?',
-                'correct_answer': chr(65 + options.index(kroger_hater)),
-                'explanation': f'{kroger_hater} has a toxic relationship with Kroger!',
-                'difficulty': 'easy',
-                'category': 'Savage Stats',
-                'option_A': options[0],
-                'option_B': options[1],
-                'option_C': options[2],
-                'option_D': options[3],
-            })
-
-        # Drunk texts
-        if behaviors['drunk_texts']:
-            party_animal = max(behaviors['drunk_texts'], key=behaviors['drunk_texts'].get)
-            count = behaviors['drunk_texts'][party_animal]
-
-            options = list(all_senders[:4])
-            random.shuffle(options)
-
-            questions.append({
-                'question': 'Who mentions being drunk, wasted, or fucked up the most?',
-                'correct_answer': chr(65 + options.index(party_animal)),
-                'explanation': f'{party_animal} knows how to party! Mentioned it {count} times.',
-                'difficulty': 'medium',
-                'category': 'Savage Stats',
-                'option_A': options[0],
-                'option_B': options[1],
-                'option_C': options[2],
-                'option_D': options[3],
-            })
-
-        return questions
+        engine = StatQuestionEngine(messages_df, participants=all_senders)
+        return engine.expand(SAVAGE_TEMPLATES)
 
     def save_to_csv(self, questions, filename):
-        """Save to CSV"""
-        fieldnames = ['question', 'correct_answer', 'explanation', 'difficulty', 'category',
-                      'option_A', 'option_B', 'option_C', 'option_D']
-
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(questions)
+        """Save to CSV (plus its .pack.jsonl artifact)"""
+        write_questions(questions, filename, question_type="savage", quiet=True)
 
 def main():
     output_dir = '/Users/laurenadmin/Projects/henze-trivia/imessage-analyze-and-export/output'
@@ -4,10 +4,16 @@ Generate trivia questions in CSV format from message analysis
 Creates questions matching the sample format with accurate, funny content
 """
 
-import csv
-import os
 import random
-from collections import defaultdict, Counter
+from collections import defaultdict
+
+from utils.corpus import load_message_rows
+from utils.distinctiveness import DistinctivenessIndex, distinctiveness_path, round_robin
+from utils.lazy import lazy_import
+from utils.pack_writer import write_questions
+from utils.topics import TopicIndex, topic_path
+
+pd = lazy_import("pandas")
 
 class TriviaGenerator:
     def __init__(self, output_dir):
@@ -25,32 +31,22 @@ class TriviaGenerator:
         self.stats = defaultdict(lambda: defaultdict(int))
 
     def load_messages(self):
-        """Load all CSV messages"""
-        csv_files = [f for f in os.listdir(self.output_dir) if f.endswith('.csv')]
-
-        for filename in csv_files:
-            filepath = os.path.join(self.output_dir, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        sender = row.get('sender', '')
-                        sender = self.name_map.get(sender, sender)
-
-                        message = row.get('message', '')
-                        if message and message != 'None':
-                            message = message.strip('"')
-
-                            self.all_messages.append({
-                                'sender': sender,
-                                'message': message,
-                                'time': row.get('time', ''),
-                                'source': filename
-                            })
-
-                            self.stats[sender]['total_messages'] += 1
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
+        """Load every message CSV in the output directory (see utils/corpus.py)"""
+        for filename, rows in load_message_rows(self.output_dir):
+            for sender, message, time in rows:
+                sender = self.name_map.get(sender, sender)
+
+                if message and message != 'None':
+                    message = message.strip('"')
+
+                    self.all_messages.append({
+                        'sender': sender,
+                        'message': message,
+                        'time': time,
+                        'source': filename
+                    })
+
+                    self.stats[sender]['total_messages'] += 1
 
     def generate_questions(self):
         """Generate trivia questions"""
@@ -95,26 +91,17 @@ class TriviaGenerator:
         """Generate 'who said it' questions"""
         questions = []
 
-        # Find interesting quotes
-        interesting_quotes = []
-
-        for msg in self.all_messages:
-            text = msg['message'].lower()
-
-            # Look for funny/memorable quotes
-            if any(word in text for word in ['lmao', 'fuck', 'shit', 'wtf', 'omg', 'gay', 'cranberry', 'bentley']):
-                if len(msg['message']) > 30 and len(msg['message']) < 120:
-                    if not any(reaction in text for reaction in ['loved', 'laughed at', 'liked', 'emphasized']):
-                        interesting_quotes.append(msg)
+        # Find interesting quotes: the most distinctive lines of good length, not reactions
+        texts = pd.Series([m['message'] for m in self.all_messages], dtype=object)
+        lengths = texts.str.len()
+        eligible = (lengths > 30) & (lengths < 120) & \
+            ~texts.str.lower().str.contains('loved|laughed at|liked|emphasized')
+        index = DistinctivenessIndex(texts, [m['sender'] for m in self.all_messages],
+                                     cache_path=distinctiveness_path(self.output_dir))
 
         # Select diverse quotes (max 2 per person)
-        quote_counts = Counter()
-        selected_quotes = []
-
-        for quote in interesting_quotes:
-            if quote_counts[quote['sender']] < 2 and len(selected_quotes) < 15:
-                selected_quotes.append(quote)
-                quote_counts[quote['sender']] += 1
+        best = index.top_k(2, eligible=eligible.to_numpy())
+        selected_quotes = [self.all_messages[i] for i in round_robin(best)][:15]
 
         # Create questions from quotes
         for quote_data in selected_quotes[:10]:
@@ -148,92 +135,62 @@ class TriviaGenerator:
 
         return questions
 
-    def _generate_topic_questions(self):
-        """Generate topic-based questions"""
+    def _generate_topic_questions(self, max_topics=4, max_bursts=2):
+        """Generate topic-based questions from discovered topics and term bursts (utils/topics.py)"""
         questions = []
 
-        # Analyze topics
-        topics = {
-            'dogs': [],
-            'trivia': [],
-            'pride': [],
-            'food': [],
-            'work': [],
-            'birthday': [],
-            'kroger': [],
-            'pool': []
-        }
-
-        for msg in self.all_messages:
-            text = msg['message'].lower()
-
-            if 'cranberry' in text or 'bentley' in text:
-                topics['dogs'].append(msg)
-            if 'trivia' in text:
-                topics['trivia'].append(msg)
-            if 'pride' in text or 'gay' in text:
-                topics['pride'].append(msg)
-            if 'taco' in text or 'pizza' in text or 'food' in text or 'eat' in text:
-                topics['food'].append(msg)
-            if 'work' in text or 'boss' in text or 'meeting' in text:
-                topics['work'].append(msg)
-            if 'birthday' in text:
-                topics['birthday'].append(msg)
-            if 'kroger' in text:
-                topics['kroger'].append(msg)
-            if 'pool' in text or 'farkle' in text:
-                topics['pool'].append(msg)
-
-        # Dog question
-        if topics['dogs']:
-            dog_mentions = Counter([m['sender'] for m in topics['dogs']])
-            dog_lover = dog_mentions.most_common(1)[0][0]
-
-            all_senders = list(self.stats.keys())[:4]
-            random.shuffle(all_senders)
+        # Topics are discovered from the messages, not hand-written keyword buckets
+        index = TopicIndex(topic_path(self.output_dir))
+        index.update(pd.DataFrame(self.all_messages), text_col='message', time_col='time')
+
+        # Who talks about it most, for topics with a clear leader
+        topics = index.topics()
+        for topic, row in topics[topics['top_share'] >= 0.3].head(max_topics).iterrows():
+            leader = row['top_sender']
+            others = [s for s in self.stats if s != leader]
+            random.shuffle(others)
+            options = [leader] + others[:3]
+            random.shuffle(options)
 
             questions.append({
-                'question': 'Who talks about dogs (Cranberry/Bentley) the most?',
-                'correct_answer': chr(65 + all_senders.index(dog_lover)),
-                'explanation': f'{dog_lover} mentioned the dogs {dog_mentions[dog_lover]} times!',
-                'difficulty': 'easy',
+                'question': f'Who talks about "{row["label"]}" the most?',
+                'correct_answer': chr(65 + options.index(leader)),
+                'explanation': f'{leader} brought it up {row["top_count"]} times!',
+                'difficulty': 'easy' if row['top_share'] >= 0.5 else 'medium',
                 'category': 'Interests',
-                'option_A': all_senders[0],
-                'option_B': all_senders[1],
-                'option_C': all_senders[2],
-                'option_D': all_senders[3],
+                'option_A': options[0] if len(options) > 0 else '',
+                'option_B': options[1] if len(options) > 1 else '',
+                'option_C': options[2] if len(options) > 2 else '',
+                'option_D': options[3] if len(options) > 3 else '',
             })
 
-        # Kroger rants
-        if topics['kroger']:
-            kroger_ranter = Counter([m['sender'] for m in topics['kroger']]).most_common(1)[0][0]
-
-            all_senders = list(self.stats.keys())[:4]
-            random.shuffle(all_senders)
+        # Running jokes: words that suddenly took over the chat for a day or two
+        bursts = index.bursts('terms').drop_duplicates('start')
+        for _, burst in bursts.head(max_bursts).iterrows():
+            decoys = [t for t in bursts['term'] if t != burst['term']]
+            random.shuffle(decoys)
+            options = [burst['term']] + decoys[:3]
+            if len(options) < 4:
+                continue
+            random.shuffle(options)
 
             questions.append({
-                'question': 'Who complains about Kroger the most?',
-                'correct_answer': chr(65 + all_senders.index(kroger_ranter)),
-                'explanation': f'{kroger_ranter} has strong feelings about Kroger!',
-                'difficulty': 'medium',
-                'category': 'Personality',
-                'option_A': all_senders[0],
-                'option_B': all_senders[1],
-                'option_C': all_senders[2],
-                'option_D': all_senders[3],
+                'question': f'Which word took over the chat on {burst["start"]:%B %d, %Y}?',
+                'correct_answer': chr(65 + options.index(burst['term'])),
+                'explanation': f'"{burst["term"]}" came up in {burst["messages"]} messages!',
+                'difficulty': 'hard',
+                'category': 'Running Jokes',
+                'option_A': options[0],
+                'option_B': options[1],
+                'option_C': options[2],
+                'option_D': options[3],
             })
 
         return questions
 
     def save_to_csv(self, questions, filename):
-        """Save questions to CSV file"""
-        fieldnames = ['question', 'correct_answer', 'explanation', 'difficulty', 'category',
-                      'option_A', 'option_B', 'option_C', 'option_D']
-
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(questions)
+        """Save questions to CSV file (plus its .pack.jsonl artifact)"""
+        write_questions(questions, filename, question_type="who-said-it", quiet=True)
 
 def main():
     output_dir = '/Users/laurenadmin/Projects/henze-trivia/imessage-analyze-and-export/output'
@@ -3,119 +3,165 @@ Time-Based Chaos Question Generator
 Generates trivia about late-night messages, weekend patterns, and timing behaviors.
 """
 
+import calendar
 import os
-import pandas as pd
+import sys
 import random
 from datetime import datetime, time
-from openai import OpenAI
-from dotenv import load_dotenv
 import json
 
-# Load environment variables
-load_dotenv()
+# Allow running as a script from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from utils.features import add_features, feature_path
+from utils.lazy import lazy_import
+from utils.openai_client import get_client
+from utils.pack_writer import write_questions
+from utils.question import Question
+from utils.sampler import MessageSampler
+from utils.stat_templates import StatQuestionEngine, StatTemplate
+from utils.streaming import collect, model_validator, stream_json_items
+from utils.time_index import CHAOS_HOURS, WEEKDAYS, WEEKEND, TimeIndex
+
+pd = lazy_import("pandas")
 
 # Known participants
 PARTICIPANTS = ["Lauren", "Benny Harris", "Ian O'Malley", "Gina Ortiz", "Jackson"]
 
+CHAOS_TEMPLATES = [
+    StatTemplate(
+        "chaos_champion", "Who has sent the most late-night messages (11pm-5am)?",
+        "{sender} is the undisputed chaos champion with {value} late-night messages!",
+        metrics=["messages"], windows=["chaos"], per_group=False, category="Chaos Hours"),
+]
+
 
 def load_chat_data(csv_path="~/Projects/henze-trivia/output/chat_export.csv"):
-    """Load chat messages from CSV file."""
+    """Load chat messages from CSV file, with per-message features (utils/features.py)."""
     csv_path = os.path.expanduser(csv_path)
     df = pd.read_csv(csv_path)
     
     # Parse timestamps
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     
-    # Extract time components
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.day_name()
-    df['is_weekend'] = df['timestamp'].dt.dayofweek.isin([5, 6])  # Saturday=5, Sunday=6
+    # Timestamps are UTC; hour/weekday/is_weekend are bucketed in each sender's
+    # home time zone (utils/timezones.py) and kept in the feature store
+    df = add_features(df, store_path=feature_path(csv_path), home_zones=True)
+    df['day_of_week'] = df['weekday'].map(dict(enumerate(calendar.day_name)))
+    df['is_weekend'] = df['is_weekend'].fillna(False).astype(bool)  # Saturday=5, Sunday=6
     
     print(f"📥 Loaded {len(df)} messages with timestamp data")
     return df
 
 
-def analyze_chaos_hours(messages_df):
+def analyze_chaos_hours(messages_df, index=None, start=None, end=None):
     """
     Identify late-night (11pm-5am) messaging patterns.
     
+    Counts come from a prefix-sum TimeIndex (utils/time_index.py), so any
+    [start, end) range costs a few binary searches instead of a re-filter.
+    
+    Args:
+        messages_df: DataFrame with all messages
+        index: TimeIndex over messages_df (built if not given)
+        start, end: Optional time range, e.g. last month or a trip
+    
     Returns:
         Dict with chaos hour statistics
     """
-    # Define chaos hours: 11pm (23:00) to 5am (5:00)
-    chaos_messages = messages_df[
-        (messages_df['hour'] >= 23) | (messages_df['hour'] < 5)
-    ].copy()
+    index = index or TimeIndex(messages_df)
     
-    total_messages = len(messages_df)
-    chaos_count = len(chaos_messages)
+    # Chaos hours: 11pm (23:00) to 5am (5:00)
+    total_messages = index.total(start, end)
+    chaos_count = index.total(start, end, hours=CHAOS_HOURS)
     chaos_percentage = (chaos_count / total_messages * 100) if total_messages > 0 else 0
     
     # Chaos by person
-    chaos_by_person = chaos_messages.groupby('sender').size().sort_values(ascending=False)
+    chaos_by_person = dict(index.leaderboard(start, end, hours=CHAOS_HOURS))
     
     # Most chaotic hour
-    hourly_counts = chaos_messages.groupby('hour').size()
-    most_chaotic_hour = hourly_counts.idxmax() if not hourly_counts.empty else None
+    hourly_counts = index.hour_histogram(start, end)
+    chaos_hours = sorted(CHAOS_HOURS)
+    most_chaotic_hour = max(chaos_hours, key=lambda h: hourly_counts[h]) if chaos_count else None
     
     # Weekend vs weekday chaos
-    weekend_chaos = chaos_messages[chaos_messages['is_weekend']].shape[0]
-    weekday_chaos = chaos_messages[~chaos_messages['is_weekend']].shape[0]
+    weekend_chaos = index.total(start, end, hours=CHAOS_HOURS, weekdays=WEEKEND)
+    weekday_chaos = index.total(start, end, hours=CHAOS_HOURS, weekdays=WEEKDAYS)
     
     stats = {
         'total_chaos_messages': chaos_count,
         'chaos_percentage': chaos_percentage,
-        'chaos_by_person': chaos_by_person.to_dict(),
+        'chaos_by_person': chaos_by_person,
         'most_chaotic_hour': most_chaotic_hour,
         'weekend_chaos': weekend_chaos,
         'weekday_chaos': weekday_chaos
     }
     
+    chaos_messages = messages_df[
+        _in_range(messages_df, start, end) & messages_df['hour'].isin(CHAOS_HOURS).fillna(False)
+    ].copy()
+    
     print(f"\n📊 Chaos Hour Analysis:")
     print(f"  • Total late-night messages: {chaos_count} ({chaos_percentage:.1f}%)")
     print(f"  • Most active chaos hour: {most_chaotic_hour}:00")
     print(f"  • Weekend chaos: {weekend_chaos} | Weekday chaos: {weekday_chaos}")
-    print(f"  • Chaos champion: {chaos_by_person.index[0]} ({chaos_by_person.iloc[0]} messages)")
+    if chaos_by_person:
+        champion, champion_count = next(iter(chaos_by_person.items()))
+        print(f"  • Chaos champion: {champion} ({champion_count} messages)")
     
     return stats, chaos_messages
 
 
-def analyze_weekend_patterns(messages_df):
+def analyze_weekend_patterns(messages_df, index=None, start=None, end=None):
     """
     Analyze weekend vs weekday messaging patterns.
     
+    Args:
+        messages_df: DataFrame with all messages
+        index: TimeIndex over messages_df (built if not given)
+        start, end: Optional time range
+    
     Returns:
         Dict with weekend statistics
     """
-    weekend_messages = messages_df[messages_df['is_weekend']]
-    weekday_messages = messages_df[~messages_df['is_weekend']]
+    index = index or TimeIndex(messages_df)
     
     # Messages by day of week
-    day_counts = messages_df.groupby('day_of_week').size()
+    day_counts = {calendar.day_name[d]: n
+                  for d, n in enumerate(index.weekday_histogram(start, end)) if n}
     
     # Weekend warriors (most active on weekends)
-    weekend_by_person = weekend_messages.groupby('sender').size().sort_values(ascending=False)
+    weekend_by_person = dict(index.leaderboard(start, end, weekdays=WEEKEND))
     
     stats = {
-        'weekend_total': len(weekend_messages),
-        'weekday_total': len(weekday_messages),
-        'day_counts': day_counts.to_dict(),
-        'weekend_by_person': weekend_by_person.to_dict(),
-        'most_active_day': day_counts.idxmax() if not day_counts.empty else None
+        'weekend_total': index.total(start, end, weekdays=WEEKEND),
+        'weekday_total': index.total(start, end, weekdays=WEEKDAYS),
+        'day_counts': day_counts,
+        'weekend_by_person': weekend_by_person,
+        'most_active_day': max(day_counts, key=day_counts.get) if day_counts else None
     }
     
+    weekend_messages = messages_df[_in_range(messages_df, start, end) & messages_df['is_weekend']]
+    
     print(f"\n📅 Weekend Pattern Analysis:")
-    print(f"  • Weekend messages: {len(weekend_messages)}")
-    print(f"  • Weekday messages: {len(weekday_messages)}")
+    print(f"  • Weekend messages: {stats['weekend_total']}")
+    print(f"  • Weekday messages: {stats['weekday_total']}")
     print(f"  • Most active day: {stats['most_active_day']}")
     
     return stats, weekend_messages
 
 
-def generate_chaos_questions(messages_df, chaos_stats, num_questions=10):
+def _in_range(messages_df, start=None, end=None):
+    """Boolean mask of messages in [start, end)."""
+    mask = pd.Series(True, index=messages_df.index)
+    if start is not None:
+        mask &= messages_df['timestamp'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= messages_df['timestamp'] < pd.Timestamp(end)
+    return mask
+
+
+def generate_chaos_questions(messages_df, chaos_stats, num_questions=10, start=None, end=None):
     """
     Generate trivia questions about timing patterns.
     
@@ -123,35 +169,17 @@ def generate_chaos_questions(messages_df, chaos_stats, num_questions=10):
         messages_df: DataFrame with all messages
         chaos_stats: Statistics about chaos hours
         num_questions: Number of questions to generate
+        start, end: The time range chaos_stats covers
     
     Returns:
         List of trivia questions
     """
     questions = []
     
-    # Question 1: Who sends the most late-night messages?
-    chaos_leader = list(chaos_stats['chaos_by_person'].keys())[0]
-    chaos_count = chaos_stats['chaos_by_person'][chaos_leader]
-    
-    # Ensure correct answer is in options
-    options = PARTICIPANTS.copy()
-    if chaos_leader not in options:
-        options.append(chaos_leader)
-    random.shuffle(options)
-    # Make sure correct answer is definitely included
-    if chaos_leader not in options[:4]:
-        options[3] = chaos_leader
-    options_dict = {chr(65+i): p for i, p in enumerate(options[:4])}
-    correct = [k for k, v in options_dict.items() if v == chaos_leader][0]
-    
-    questions.append({
-        "question": f"Who has sent the most late-night messages (11pm-5am) with {chaos_count} chaos messages?",
-        "options": options_dict,
-        "correct_answer": correct,
-        "explanation": f"{chaos_leader} is the undisputed chaos champion with {chaos_count} late-night messages!",
-        "difficulty": "medium",
-        "category": "Chaos Hours"
-    })
+    # Question 1: Who sends the most late-night messages? (utils/stat_templates.py)
+    in_range = messages_df[_in_range(messages_df, start, end)]
+    engine = StatQuestionEngine(in_range, participants=PARTICIPANTS)
+    questions.extend(Question.from_row(row).to_dict() for row in engine.expand(CHAOS_TEMPLATES))
     
     # Question 2: What percentage of messages are sent during chaos hours?
     correct_pct = round(chaos_stats['chaos_percentage'])
@@ -237,8 +265,8 @@ def generate_chaos_questions(messages_df, chaos_stats, num_questions=10):
     if num_questions > 4:
         chaos_messages = messages_df[(messages_df['hour'] >= 23) | (messages_df['hour'] < 5)]
         
-        # Sample some chaos messages
-        sample = chaos_messages.sample(n=min(20, len(chaos_messages)))
+        # Weighted sample of chaos messages, no more than 6 from one person
+        sample = MessageSampler(chaos_messages).sample(20, per_sender=6)
         context = "\n".join([
             f"{row['sender']} at {row['hour']}:00 on {row['day_of_week']}: {row['text']}"
             for _, row in sample.iterrows()
@@ -286,10 +314,12 @@ Return a JSON array with this format:
 
 Return ONLY the JSON array, no other text."""
 
-        try:
-            print(f"\n🤖 Generating {num_questions - 4} savage timing questions...")
-            
-            response = client.chat.completions.create(
+        print(f"\n🤖 Generating {num_questions - 4} savage timing questions...")
+        
+        ai_questions = collect(
+            stream_json_items(
+                get_client(),
+                validate=model_validator("ChaosQuestion"),
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are a SAVAGE roaster who drags people for their terrible sleep schedules and 3AM texting habits. Use cuss words. Get unhinged. Make it absolutely chaotic."},
@@ -297,48 +327,19 @@ Return ONLY the JSON array, no other text."""
                 ],
                 temperature=0.9,
                 max_tokens=2000
-            )
-            
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("No content in response")
-            content = content.strip()
-            
-            # Remove markdown if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            ai_questions = json.loads(content)
-            questions.extend(ai_questions)
-            print(f"✅ Generated {len(ai_questions)} AI questions!")
-            
-        except Exception as e:
-            print(f"⚠️  Error generating AI questions: {e}")
+            ),
+            "AI questions"
+        )
+        questions.extend(ai_questions)
+        print(f"✅ Generated {len(ai_questions)} AI questions!")
     
     print(f"\n✅ Generated {len(questions)} total chaos questions")
     return questions[:num_questions]
 
 
 def save_questions(questions, output_path="~/Projects/henze-trivia/output/chaos_questions.csv"):
-    """Save generated questions to CSV file."""
-    output_path = os.path.expanduser(output_path)
-    
-    # Convert to DataFrame
-    questions_df = pd.DataFrame(questions)
-    
-    # Flatten the options dict
-    if not questions_df.empty:
-        for opt in ['A', 'B', 'C', 'D']:
-            questions_df[f'option_{opt}'] = questions_df['options'].apply(
-                lambda x: x.get(opt, '') if isinstance(x, dict) else ''
-            )
-        questions_df = questions_df.drop('options', axis=1)
-    
-    questions_df.to_csv(output_path, index=False)
-    print(f"💾 Saved questions to: {output_path}")
-    return output_path
+    """Save generated questions to CSV file (plus its .pack.jsonl artifact)."""
+    return str(write_questions(questions, output_path, question_type="chaos"))
 
 
 if __name__ == "__main__":
@@ -347,6 +348,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate time-based chaos trivia questions")
     parser.add_argument("--num", type=int, default=10, help="Number of questions to generate")
     parser.add_argument("--display", action="store_true", help="Display generated questions")
+    parser.add_argument("--since", help="Only count messages from this date (e.g. 2025-06-01)")
+    parser.add_argument("--until", help="Only count messages before this date")
     
     args = parser.parse_args()
     
@@ -357,11 +360,13 @@ if __name__ == "__main__":
     messages_df = load_chat_data()
     
     # Analyze chaos patterns
-    chaos_stats, chaos_messages = analyze_chaos_hours(messages_df)
-    weekend_stats, weekend_messages = analyze_weekend_patterns(messages_df)
+    index = TimeIndex(messages_df)
+    chaos_stats, chaos_messages = analyze_chaos_hours(messages_df, index, args.since, args.until)
+    weekend_stats, weekend_messages = analyze_weekend_patterns(messages_df, index, args.since, args.until)
     
     # Generate questions
-    questions = generate_chaos_questions(messages_df, chaos_stats, num_questions=args.num)
+    questions = generate_chaos_questions(messages_df, chaos_stats, num_questions=args.num,
+                                         start=args.since, end=args.until)
     
     if not questions:
         print("❌ No questions were generated.")
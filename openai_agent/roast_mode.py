@@ -4,48 +4,90 @@ Identifies savage/roast messages and generates trivia about the group's roast cu
 """
 
 import os
-import pandas as pd
+import sys
 import random
-from openai import OpenAI
-from dotenv import load_dotenv
 import json
 
-# Load environment variables
-load_dotenv()
+# Allow running as a script from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from utils.features import add_features, feature_path
+from utils.lazy import lazy_import
+from utils.openai_client import get_client
+from utils.pack_writer import write_questions
+from utils.prefilter import PrefilterCascade
+from utils.question import Question
+from utils.scheduler import PRIORITY_LOW
+from utils.stat_templates import Metric, StatQuestionEngine, StatTemplate
+from utils.streaming import collect, model_validator, required_keys, stream_json_items
+
+pd = lazy_import("pandas")
 
 # Known participants
 PARTICIPANTS = ["Lauren", "Benny Harris", "Ian O'Malley", "Gina Ortiz", "Jackson"]
 
+# Cached LLM roast scores, which train the local pre-filter (utils/prefilter.py)
+ROAST_LABELS = "~/Projects/henze-trivia/output/.labels/roast.jsonl"
+
+# Roast score that counts as a real burn
+ROAST_THRESHOLD = 6
+
+# Per-message LLM roast score, averaged by the "mean" stat template
+ROAST_SCORE = Metric("roast_score", "roast score", lambda f: f["roast_score"])
+
+ROAST_TEMPLATES = [
+    StatTemplate(
+        "top_roaster", "Who has the highest average roast/savage score?",
+        "{sender} brings the heat with an average roast level of {value}/10!",
+        metrics=["roast_score"], kind="mean", per_group=False, category="Roast Mode",
+        min_messages=3),
+]
+
 
 def load_chat_data(csv_path="~/Projects/henze-trivia/output/chat_export.csv"):
-    """Load chat messages from CSV file."""
+    """Load chat messages from CSV file, with per-message features (utils/features.py)."""
     csv_path = os.path.expanduser(csv_path)
-    df = pd.read_csv(csv_path)
+    df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
     print(f"📥 Loaded {len(df)} messages from chat history")
     return df
 
 
-def score_roast_level(messages_df, sample_size=100):
+def score_roast_level(messages_df, sample_size=100, labels_path=ROAST_LABELS):
     """
     Use OpenAI to score messages for their 'savage' or roast level.
     
+    Every candidate is ranked by the local pre-filter cascade; only the top
+    and most uncertain ones go to the LLM, and messages scored on earlier
+    runs come straight from the label cache.
+    
     Args:
         messages_df: DataFrame with chat messages
-        sample_size: Number of messages to analyze
+        sample_size: Most messages to send to the LLM
+        labels_path: Label cache of earlier LLM roast scores
     
     Returns:
         DataFrame with roast scores added
     """
-    # Sample messages (avoid very short ones)
-    sample = messages_df[
-        (messages_df['text'].str.len() > 15) & 
-        (messages_df['text'].str.len() < 300)
-    ].sample(n=min(sample_size, len(messages_df)))
-    
-    scored_messages = []
+    # Rank all candidates locally (avoid very short ones)
+    candidates = messages_df[
+        (messages_df['length'] > 15) &
+        (messages_df['length'] < 300)
+    ]
+    cascade = PrefilterCascade(labels_path, threshold=ROAST_THRESHOLD)
+    sample, known = cascade.select(candidates, sample_size)
+    print(cascade.summary())
+    
+    scored_messages = [
+        {
+            'sender': row['sender'],
+            'text': row['text'],
+            'roast_score': row['llm_score'],
+            'reason': row['llm_reason'],
+            'timestamp': row.get('timestamp', '')
+        }
+        for _, row in known.iterrows()
+    ]
+    fresh_labels = []
     
     print(f"\n🔥 Analyzing {len(sample)} messages for roast intensity...")
     
@@ -87,8 +129,11 @@ Consider:
 
 Return ONLY the JSON array, no other text."""
 
-        try:
-            response = client.chat.completions.create(
+        scores = collect(
+            stream_json_items(
+                get_client(),
+                validate=required_keys("message_number", "roast_score"),
+                priority=PRIORITY_LOW,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are an ABSOLUTELY SAVAGE roast detector who recognizes brutal burns, unhinged comebacks, and maximum chaos energy. You appreciate when friends drag each other with no mercy. Rate accordingly - don't be soft."},
@@ -96,39 +141,36 @@ Return ONLY the JSON array, no other text."""
                 ],
                 temperature=0.4,
                 max_tokens=1500
-            )
-            
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("No content in response")
-            content = content.strip()
-            
-            # Remove markdown if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            scores = json.loads(content)
-            
-            # Match scores back to messages
-            for score_data in scores:
-                msg_idx = score_data['message_number'] - 1
-                if i + msg_idx < len(sample):
-                    original_msg = sample.iloc[i + msg_idx]
-                    scored_messages.append({
-                        'sender': original_msg['sender'],
-                        'text': original_msg['text'],
-                        'roast_score': score_data['roast_score'],
-                        'reason': score_data['reason'],
-                        'timestamp': original_msg.get('timestamp', '')
-                    })
-            
-            print(f"  ✓ Scored batch {i//batch_size + 1}/{(len(sample)-1)//batch_size + 1}")
-            
-        except Exception as e:
-            print(f"  ⚠️  Error scoring batch {i//batch_size + 1}: {e}")
-            continue
+            ),
+            f"roast scores for batch {i//batch_size + 1}"
+        )
+        
+        # Match scores back to messages (numbering is global across batches)
+        for score_data in scores:
+            try:
+                msg_idx = int(score_data['message_number']) - 1 - i
+            except (TypeError, ValueError):
+                continue
+            if 0 <= msg_idx < len(batch):
+                original_msg = batch.iloc[msg_idx]
+                scored_messages.append({
+                    'sender': original_msg['sender'],
+                    'text': original_msg['text'],
+                    'roast_score': score_data['roast_score'],
+                    'reason': score_data.get('reason', ''),
+                    'timestamp': original_msg.get('timestamp', '')
+                })
+                try:
+                    fresh_labels.append((original_msg['text'], float(score_data['roast_score']),
+                                         score_data.get('reason', '')))
+                except (TypeError, ValueError):
+                    pass
+        
+        print(f"  ✓ Scored batch {i//batch_size + 1}/{(len(sample)-1)//batch_size + 1} ({len(scores)} scores)")
+    
+    # LLM verdicts train the pre-filter for next time
+    if fresh_labels:
+        cascade.record(*zip(*fresh_labels))
     
     roast_df = pd.DataFrame(scored_messages)
     
@@ -145,6 +187,13 @@ Return ONLY the JSON array, no other text."""
     return roast_df
 
 
+def _roasted_person(question):
+    """The person being roasted is the correct answer of a roast question."""
+    options = question.get('options') or {}
+    correct = question.get('correct_answer', '')
+    return {"roasted_person": options.get(correct, '') if isinstance(options, dict) else ''}
+
+
 def generate_roast_mode_questions(roast_df, num_questions=10):
     """
     Generate trivia questions about roasts and savage moments.
@@ -162,28 +211,9 @@ def generate_roast_mode_questions(roast_df, num_questions=10):
     
     questions = []
     
-    # Question 1: Who has the highest average roast score?
-    roaster_avg = roast_df.groupby('sender')['roast_score'].mean().sort_values(ascending=False)
-    top_roaster = roaster_avg.index[0]
-    avg_score = roaster_avg.iloc[0]
-    
-    options = PARTICIPANTS.copy()
-    if top_roaster not in options:
-        options.append(top_roaster)
-    random.shuffle(options)
-    if top_roaster not in options[:4]:
-        options[3] = top_roaster
-    options_dict = {chr(65+i): p for i, p in enumerate(options[:4])}
-    correct = [k for k, v in options_dict.items() if v == top_roaster][0]
-    
-    questions.append({
-        "question": f"Who has the highest average roast/savage score with {avg_score:.1f}/10?",
-        "options": options_dict,
-        "correct_answer": correct,
-        "explanation": f"{top_roaster} brings the heat with an average roast level of {avg_score:.1f}/10!",
-        "difficulty": "medium",
-        "category": "Roast Mode"
-    })
+    # Question 1: Who has the highest average roast score? (utils/stat_templates.py)
+    engine = StatQuestionEngine(roast_df, participants=PARTICIPANTS, metrics=[ROAST_SCORE])
+    questions.extend(Question.from_row(row).to_dict() for row in engine.expand(ROAST_TEMPLATES))
     
     # Question 2: Most savage message
     top_roasts = roast_df.nlargest(3, 'roast_score')
@@ -286,10 +316,12 @@ Return a JSON array with this format:
 
 Return ONLY the JSON array, no other text."""
 
-        try:
-            print(f"\n🤖 Generating {num_questions - 3} AI-powered roast questions...")
-            
-            response = client.chat.completions.create(
+        print(f"\n🤖 Generating {num_questions - 3} AI-powered roast questions...")
+        
+        ai_questions = collect(
+            stream_json_items(
+                get_client(),
+                validate=model_validator("RoastQuestion", _roasted_person),
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are an ABSOLUTELY SAVAGE roast analyst who creates brutal trivia about friend group dragging culture. Use cuss words. Drag people for their savage messages. Get as unhinged as possible without being truly cruel. Maximum chaos energy - no holding back."},
@@ -297,48 +329,19 @@ Return ONLY the JSON array, no other text."""
                 ],
                 temperature=0.9,
                 max_tokens=2000
-            )
-            
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("No content in response")
-            content = content.strip()
-            
-            # Remove markdown if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            ai_questions = json.loads(content)
-            questions.extend(ai_questions)
-            print(f"✅ Generated {len(ai_questions)} AI roast questions!")
-            
-        except Exception as e:
-            print(f"⚠️  Error generating AI questions: {e}")
+            ),
+            "AI questions"
+        )
+        questions.extend(ai_questions)
+        print(f"✅ Generated {len(ai_questions)} AI roast questions!")
     
     print(f"\n✅ Generated {len(questions)} total roast mode questions")
     return questions[:num_questions]
 
 
 def save_questions(questions, output_path="~/Projects/henze-trivia/output/roast_mode_questions.csv"):
-    """Save generated questions to CSV file."""
-    output_path = os.path.expanduser(output_path)
-    
-    # Convert to DataFrame
-    questions_df = pd.DataFrame(questions)
-    
-    # Flatten the options dict
-    if not questions_df.empty:
-        for opt in ['A', 'B', 'C', 'D']:
-            questions_df[f'option_{opt}'] = questions_df['options'].apply(
-                lambda x: x.get(opt, '') if isinstance(x, dict) else ''
-            )
-        questions_df = questions_df.drop('options', axis=1)
-    
-    questions_df.to_csv(output_path, index=False)
-    print(f"💾 Saved questions to: {output_path}")
-    return output_path
+    """Save generated questions to CSV file (plus its .pack.jsonl artifact)."""
+    return str(write_questions(questions, output_path, question_type="roast"))
 
 
 def save_roast_scores(roast_df, output_path="~/Projects/henze-trivia/output/roast_scores.csv"):
@@ -353,7 +356,7 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Analyze roast/savage messages and generate trivia")
     parser.add_argument("--num", type=int, default=10, help="Number of questions to generate")
-    parser.add_argument("--sample", type=int, default=100, help="Number of messages to analyze for roast scores")
+    parser.add_argument("--sample", type=int, default=100, help="Most messages to send to the LLM for roast scores")
     parser.add_argument("--display", action="store_true", help="Display generated questions")
     
     args = parser.parse_args()
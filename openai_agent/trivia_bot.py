@@ -4,17 +4,20 @@ Generates trivia questions based on group chat messages.
 """
 
 import os
-import pandas as pd
-from openai import OpenAI
-from dotenv import load_dotenv
+import sys
 from datetime import datetime
 import json
 
-# Load environment variables
-load_dotenv()
+# Allow running as a script from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from utils.context_builder import build_context
+from utils.lazy import lazy_import
+from utils.openai_client import get_client
+from utils.pack_writer import write_questions
+from utils.streaming import collect, model_validator, stream_json_items
+
+pd = lazy_import("pandas")
 
 def load_chat_data(csv_path="~/Projects/henze-trivia/output/chat_export.csv"):
     """Load chat messages from CSV file."""
@@ -24,28 +27,26 @@ def load_chat_data(csv_path="~/Projects/henze-trivia/output/chat_export.csv"):
     return df
 
 
-def generate_trivia_questions(messages_df, num_questions=10, difficulty="medium"):
+def stream_trivia_questions(messages_df, num_questions=10, difficulty="medium",
+                            token_budget=None):
     """
-    Generate trivia questions based on chat messages using OpenAI.
+    Stream trivia questions based on chat messages using OpenAI.
+    
+    Each question is parsed and validated against ``TriviaQuestion`` as soon
+    as it has fully arrived, so callers can use it right away.
     
     Args:
         messages_df: DataFrame with chat messages
         num_questions: Number of questions to generate
         difficulty: 'easy', 'medium', or 'hard'
+        token_budget: Maximum prompt tokens spent on chat context
+            (default: CONTEXT_TOKEN_BUDGET or 6000)
     
-    Returns:
-        List of trivia questions with answers
+    Yields:
+        Trivia question dicts
     """
-    # Sample recent messages to use as context
-    sample_size = min(200, len(messages_df))
-    recent_messages = messages_df.head(sample_size)
-    
-    # Create context from messages
-    context = "\n".join([
-        f"{row['sender']}: {row['text'][:200]}" 
-        for _, row in recent_messages.iterrows() 
-        if pd.notna(row['text'])
-    ])
+    # Pack the most useful messages into the prompt's token budget
+    context, _ = build_context(messages_df, token_budget=token_budget)
     
     # Create prompt for OpenAI
     prompt = f"""You are an ABSOLUTELY SAVAGE trivia game master creating brutal, hilarious questions based on a friend group's chat history.
@@ -89,57 +90,49 @@ Format each question as JSON with this structure:
 
 Return ONLY a JSON array of questions, no other text."""
 
+    yield from stream_json_items(
+        get_client(),
+        validate=model_validator("TriviaQuestion"),
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are an ABSOLUTELY SAVAGE trivia game master who creates brutal, hilarious questions that drag people for their chat behavior. Use cuss words. Get unhinged. Make it absolutely chaotic without being genuinely cruel. Maximum chaos energy - no holding back."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.9,
+        max_tokens=4000
+    )
+
+
+def generate_trivia_questions(messages_df, num_questions=10, difficulty="medium",
+                              token_budget=None):
+    """
+    Generate trivia questions based on chat messages using OpenAI.
+    
+    Args:
+        messages_df: DataFrame with chat messages
+        num_questions: Number of questions to generate
+        difficulty: 'easy', 'medium', or 'hard'
+        token_budget: Maximum prompt tokens spent on chat context
+            (default: CONTEXT_TOKEN_BUDGET or 6000)
+    
+    Returns:
+        List of trivia questions with answers
+    """
     print(f"\n🤖 Generating {num_questions} {difficulty} trivia questions...")
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an ABSOLUTELY SAVAGE trivia game master who creates brutal, hilarious questions that drag people for their chat behavior. Use cuss words. Get unhinged. Make it absolutely chaotic without being genuinely cruel. Maximum chaos energy - no holding back."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.9,
-            max_tokens=4000
-        )
-        
-        # Parse the response
-        content = response.choices[0].message.content
-        if content is None:
-            raise ValueError("No content in response")
-        content = content.strip()
-        
-        # Remove markdown code blocks if present
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        
-        questions = json.loads(content)
-        
+    questions = collect(
+        stream_trivia_questions(messages_df, num_questions, difficulty, token_budget),
+        "questions"
+    )
+    
+    if questions:
         print(f"✅ Successfully generated {len(questions)} questions!")
-        return questions
-        
-    except Exception as e:
-        print(f"❌ Error generating questions: {e}")
-        return []
+    return questions
 
 
 def save_questions(questions, output_path="~/Projects/henze-trivia/output/sample_questions.csv"):
-    """Save generated questions to CSV file."""
-    output_path = os.path.expanduser(output_path)
-    
-    # Convert to DataFrame
-    questions_df = pd.DataFrame(questions)
-    
-    # Flatten the options dict
-    if not questions_df.empty:
-        for opt in ['A', 'B', 'C', 'D']:
-            questions_df[f'option_{opt}'] = questions_df['options'].apply(lambda x: x.get(opt, ''))
-        questions_df = questions_df.drop('options', axis=1)
-    
-    questions_df.to_csv(output_path, index=False)
-    print(f"💾 Saved questions to: {output_path}")
-    return output_path
+    """Save generated questions to CSV file (plus its .pack.jsonl artifact)."""
+    return str(write_questions(questions, output_path, question_type="trivia"))
 
 
 def display_question(question, index=1):
@@ -198,6 +191,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate trivia questions from group chat")
     parser.add_argument("--num", type=int, default=10, help="Number of questions to generate")
     parser.add_argument("--difficulty", choices=["easy", "medium", "hard"], default="medium", help="Question difficulty")
+    parser.add_argument("--context-tokens", type=int, help="Token budget for chat context (default: CONTEXT_TOKEN_BUDGET or 6000)")
     parser.add_argument("--play", action="store_true", help="Play interactive trivia game")
     parser.add_argument("--display", action="store_true", help="Display generated questions")
     
@@ -212,7 +206,8 @@ if __name__ == "__main__":
     questions = generate_trivia_questions(
         messages_df, 
         num_questions=args.num,
-        difficulty=args.difficulty
+        difficulty=args.difficulty,
+        token_budget=args.context_tokens
     )
     
     if not questions:
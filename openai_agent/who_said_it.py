@@ -4,47 +4,75 @@ Generates quote attribution trivia questions from chat messages.
 """
 
 import os
-import pandas as pd
+import sys
 import random
-from openai import OpenAI
-from dotenv import load_dotenv
 import json
 
-# Load environment variables
-load_dotenv()
+# Allow running as a script from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from utils.context_builder import normalize_text
+from utils.features import add_features, feature_path
+from utils.lazy import lazy_import
+from utils.openai_client import get_client
+from utils.pack_writer import write_questions
+from utils.prefilter import PrefilterCascade
+from utils.streaming import collect, required_keys, stream_json_items
+from utils.stylometry import SenderProfiles
+
+pd = lazy_import("pandas")
 
 # Known participants for multiple choice
 PARTICIPANTS = ["Lauren", "Benny Harris", "Ian O'Malley", "Gina Ortiz", "Jackson"]
 
+# Which candidates the LLM picked (1) or passed over (0) on earlier runs;
+# trains the local pre-filter (utils/prefilter.py)
+QUOTE_LABELS = "~/Projects/henze-trivia/output/.labels/quotes.jsonl"
+
 
 def load_chat_data(csv_path="~/Projects/henze-trivia/output/chat_export.csv"):
-    """Load chat messages from CSV file."""
+    """Load chat messages from CSV file, with per-message features (utils/features.py)."""
     csv_path = os.path.expanduser(csv_path)
-    df = pd.read_csv(csv_path)
+    df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
     print(f"📥 Loaded {len(df)} messages from chat history")
     return df
 
 
-def select_memorable_quotes(messages_df, num_quotes=20):
+def select_memorable_quotes(messages_df, num_quotes=20, labels_path=QUOTE_LABELS):
     """
     Use OpenAI to identify memorable/funny/interesting quotes from chat.
     
+    The local pre-filter cascade ranks every candidate; the LLM sees the
+    best-ranked ones plus a few uncertain ones, and its picks are fed back
+    as labels. Quotes it picked on earlier runs come straight from the label
+    cache and compete with the new picks.
+    
     Args:
         messages_df: DataFrame with chat messages
         num_quotes: Number of quotes to select
+        labels_path: Label cache of earlier LLM picks
     
     Returns:
         List of selected quotes with metadata
     """
-    # Sample messages (avoid super short ones)
-    interesting_messages = messages_df[
-        (messages_df['text'].str.len() > 20) & 
-        (messages_df['text'].str.len() < 200) &
+    # Rank all candidates locally (avoid super short ones), at most 25 per person
+    candidates = messages_df[
+        (messages_df['length'] > 20) &
+        (messages_df['length'] < 200) &
         (messages_df['sender'].isin(PARTICIPANTS))
-    ].sample(n=min(100, len(messages_df)))
+    ]
+    cascade = PrefilterCascade(labels_path, threshold=0.5)
+    interesting_messages, known = cascade.select(candidates, 100, per_sender=25)
+    print(cascade.summary())
+    
+    earlier = [
+        {
+            "quote": row['text'],
+            "speaker": row['sender'],
+            "reason": row['llm_reason'] or "picked on an earlier run"
+        }
+        for _, row in known[known['llm_score'] >= cascade.threshold].iterrows()
+    ]
     
     # Create context for OpenAI
     context = "\n".join([
@@ -77,76 +105,94 @@ Return a JSON array with this format:
 
 Return ONLY the JSON array, no other text."""
 
-    print(f"\n🤖 Selecting {num_quotes} savage quotes...")
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a SAVAGE quote curator. Find the most unhinged, chaotic, and funny messages. Prioritize chaos energy and drunk text vibes. No boring shit allowed."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.85,
-            max_tokens=2000
-        )
-        
-        content = response.choices[0].message.content
-        if content is None:
-            raise ValueError("No content in response")
-        content = content.strip()
+    quotes = []
+    if not interesting_messages.empty:
+        print(f"\n🤖 Selecting {num_quotes} savage quotes...")
         
-        # Remove markdown if present
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        
-        quotes = json.loads(content)
+        quotes = collect(
+            stream_json_items(
+                get_client(),
+                validate=required_keys("quote", "speaker"),
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a SAVAGE quote curator. Find the most unhinged, chaotic, and funny messages. Prioritize chaos energy and drunk text vibes. No boring shit allowed."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.85,
+                max_tokens=2000
+            ),
+            "quotes"
+        )
+    
+    if quotes:
+        # Every message shown is a label: picked (1) or passed over (0)
+        picked = {normalize_text(str(q['quote'])) for q in quotes}
+        shown = interesting_messages['text'].dropna().astype(str).tolist()
+        cascade.record(shown, [float(normalize_text(t) in picked) for t in shown])
         print(f"✅ Selected {len(quotes)} memorable quotes!")
-        return quotes
         
-    except Exception as e:
-        print(f"❌ Error selecting quotes: {e}")
-        # Fallback: random selection
-        print("Using fallback random selection...")
-        return [
-            {
-                "quote": row['text'],
-                "speaker": row['sender'],
-                "reason": "randomly selected"
-            }
-            for _, row in interesting_messages.head(num_quotes).iterrows()
-        ]
-
-
-def generate_who_said_it_questions(quotes, num_questions=10):
+        # New and earlier picks compete for the slots
+        pool = quotes + [q for q in earlier if normalize_text(str(q['quote'])) not in picked]
+        random.shuffle(pool)
+        if earlier:
+            print(f"  • {len(earlier)} more from earlier runs")
+        return pool[:num_quotes]
+    
+    # Fallback: earlier picks, then the best-ranked candidates
+    print("Using fallback selection...")
+    random.shuffle(earlier)
+    return (earlier + [
+        {
+            "quote": row['text'],
+            "speaker": row['sender'],
+            "reason": "randomly selected"
+        }
+        for _, row in interesting_messages.head(num_quotes).iterrows()
+    ])[:num_quotes]
+
+
+def generate_who_said_it_questions(quotes, num_questions=10, profiles=None):
     """
     Generate "Who Said It?" questions from selected quotes.
     
     Args:
         quotes: List of quote dictionaries
         num_questions: Number of questions to generate
+        profiles: SenderProfiles (utils/stylometry.py); wrong answers are then
+            the participants whose writing the quote most resembles, and the
+            difficulty follows from how recognizable the speaker's style is
     
     Returns:
         List of trivia questions
     """
     questions = []
+    quotes = quotes[:num_questions]
     
-    for i, quote_data in enumerate(quotes[:num_questions], 1):
+    # Score every quote against every participant's style in one batch
+    style_scores = profiles.rank_quotes([q['quote'] for q in quotes],
+                                         [q['speaker'] for q in quotes]) if profiles else None
+    
+    for i, quote_data in enumerate(quotes, 1):
         correct_answer = quote_data['speaker']
         quote = quote_data['quote']
+        difficulty = "medium"
         
-        # Generate 4 options: correct answer + 3 random other participants
+        # Generate 4 options: correct answer + 3 other participants
         options_pool = PARTICIPANTS.copy()
         
         # Make sure correct answer is in the pool
         if correct_answer not in options_pool:
             options_pool.append(correct_answer)
         
-        # Select 3 wrong answers
-        wrong_answers = [p for p in options_pool if p != correct_answer]
-        random.shuffle(wrong_answers)
-        wrong_answers = wrong_answers[:3]
+        # Select 3 wrong answers: similar-sounding people, or random ones without profiles
+        if style_scores is not None:
+            scores = style_scores.iloc[i - 1]
+            wrong_answers = profiles.distractors(correct_answer, scores=scores, pool=options_pool)
+            difficulty = profiles.difficulty(correct_answer, scores)
+        else:
+            wrong_answers = [p for p in options_pool if p != correct_answer]
+            random.shuffle(wrong_answers)
+            wrong_answers = wrong_answers[:3]
         
         # Combine and shuffle all options
         all_options = [correct_answer] + wrong_answers
@@ -166,7 +212,7 @@ def generate_who_said_it_questions(quotes, num_questions=10):
             "options": options_dict,
             "correct_answer": correct_letter,
             "explanation": f"{correct_answer} said this. {quote_data.get('reason', '')}",
-            "difficulty": "medium",
+            "difficulty": difficulty,
             "category": "Who Said It?"
         }
         
@@ -177,23 +223,8 @@ def generate_who_said_it_questions(quotes, num_questions=10):
 
 
 def save_questions(questions, output_path="~/Projects/henze-trivia/output/who_said_it_questions.csv"):
-    """Save generated questions to CSV file."""
-    output_path = os.path.expanduser(output_path)
-    
-    # Convert to DataFrame
-    questions_df = pd.DataFrame(questions)
-    
-    # Flatten the options dict
-    if not questions_df.empty:
-        for opt in ['A', 'B', 'C', 'D']:
-            questions_df[f'option_{opt}'] = questions_df['options'].apply(
-                lambda x: x.get(opt, '') if isinstance(x, dict) else ''
-            )
-        questions_df = questions_df.drop('options', axis=1)
-    
-    questions_df.to_csv(output_path, index=False)
-    print(f"💾 Saved questions to: {output_path}")
-    return output_path
+    """Save generated questions to CSV file (plus its .pack.jsonl artifact)."""
+    return str(write_questions(questions, output_path, question_type="who-said-it"))
 
 
 if __name__ == "__main__":
@@ -214,8 +245,9 @@ if __name__ == "__main__":
     # Select memorable quotes
     quotes = select_memorable_quotes(messages_df, num_quotes=args.num * 2)  # Get extra
     
-    # Generate questions
-    questions = generate_who_said_it_questions(quotes, num_questions=args.num)
+    # Generate questions, with distractors who write like the speaker
+    profiles = SenderProfiles(messages_df, senders=PARTICIPANTS)
+    questions = generate_who_said_it_questions(quotes, num_questions=args.num, profiles=profiles)
     
     if not questions:
         print("❌ No questions were generated.")
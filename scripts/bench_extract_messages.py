@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Message Extraction Benchmark
+Times extract_distinctive_messages against the original query on a
+synthetic chat.db (see synthetic_chat_db.py).
+
+Usage:
+    python scripts/bench_extract_messages.py
+    python scripts/bench_extract_messages.py --messages 1000000 --runs 5
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.generate_questions import extract_distinctive_messages
+from scripts.synthetic_chat_db import build_chat_db
+
+# The query extract_distinctive_messages used before the rewrite
+LEGACY_SQL = """
+    SELECT
+        m.text,
+        m.date,
+        h.id as handle_id,
+        c.display_name as chat_name
+    FROM message m
+    LEFT JOIN handle h ON m.handle_id = h.id
+    LEFT JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
+    LEFT JOIN chat c ON cmj.chat_id = c.ROWID
+    WHERE m.text IS NOT NULL
+        AND LENGTH(m.text) >= ?
+        AND m.text NOT LIKE '%Liked%'
+        AND m.text NOT LIKE '%Loved%'
+        AND m.text NOT LIKE '%Laughed%'
+        AND m.text NOT LIKE '%Emphasized%'
+    ORDER BY m.date DESC
+    LIMIT ?
+"""
+
+
+def legacy_extract(db_path, limit, min_length=10):
+    conn = sqlite3.connect(str(db_path))
+    rows = conn.execute(LEGACY_SQL, (min_length, limit * 2)).fetchall()
+    conn.close()
+
+    seen_texts = set()
+    messages = []
+    for text, date, handle_id, chat_name in rows:
+        normalized = text.lower().strip()
+        if normalized in seen_texts:
+            continue
+        seen_texts.add(normalized)
+        messages.append({"text": text, "date": date, "handle_id": handle_id,
+                         "chat_name": chat_name or "Unknown"})
+        if len(messages) >= limit:
+            break
+    return messages
+
+
+def best_of(fn, runs):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat.db message extraction")
+    parser.add_argument("--messages", type=int, default=200_000, help="Synthetic message rows")
+    parser.add_argument("--limit", type=int, default=1500, help="Messages to extract")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per variant (best is kept)")
+    parser.add_argument("--db", help="Existing chat.db to use instead of a synthetic one")
+    args = parser.parse_args()
+
+    print("⏱️  Message Extraction Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db_path = Path(args.db).expanduser()
+        else:
+            db_path = Path(tmp) / "chat.db"
+            start = time.perf_counter()
+            build_chat_db(db_path, num_messages=args.messages)
+            print(f"📦 Built synthetic chat.db with {args.messages:,} messages "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+        legacy_time, legacy = best_of(lambda: legacy_extract(db_path, args.limit), args.runs)
+        new_time, current = best_of(
+            lambda: extract_distinctive_messages(limit=args.limit, db_path=db_path), args.runs)
+
+        tapbacks = sum(m["text"].startswith(("Disliked", "Questioned")) for m in legacy)
+        senders = sum(m["handle_id"] is not None for m in legacy)
+
+        print(f"\n  legacy query      {legacy_time * 1000:8.1f} ms  {len(legacy):5} messages "
+              f"({tapbacks} tapbacks kept, {senders} with a sender)")
+        print(f"  extraction engine {new_time * 1000:8.1f} ms  {len(current):5} messages "
+              f"({sum(m['handle_id'] is not None for m in current)} with a sender)")
+        print(f"\n  speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark Suite
+Times each stage of the question pipeline on synthetic chat.db fixtures
+(see synthetic_chat_db.py) at several sizes, recording wall time, throughput
+and peak RSS so runs can be compared across commits.
+
+Stages:
+    extract_messages   chat_extractor/extract_messages.py against the fixture chat.db
+    emoji_analysis     analytics/emoji_analysis.py reactions + emoji usage
+    analyzer           analyze_messages.MessageAnalyzer over an export CSV
+    question_generator utils/question_generator.py on the chat export
+    packs              utils/pack_builder.py pack combination + pack writing
+
+Each stage runs in a fresh interpreter, so peak RSS belongs to that stage
+alone. Results are appended to a JSON Lines file tagged with the git commit;
+the summary compares each stage with the most recent run from another commit.
+
+Usage:
+    python scripts/bench_pipeline.py
+    python scripts/bench_pipeline.py --sizes 10000 100000 1000000 --stages analyzer packs
+    python scripts/bench_pipeline.py --sizes 10000000 --keep output/bench/fixtures
+"""
+
+import argparse
+import ast
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.synthetic_chat_db import APPLE_EPOCH_OFFSET, build_chat_db
+from utils.timezones import home_timezone
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_RESULTS = PROJECT_ROOT / "output" / "bench" / "pipeline.jsonl"
+
+STAGES = ["extract_messages", "emoji_analysis", "analyzer", "question_generator", "packs"]
+
+# Questions drawn by the question_generator stage and packs built by the packs stage
+GENERATED_QUESTIONS = 1000
+PACKS = 20
+PACK_SIZE = 40
+
+# Export CSV names inside a fixture directory
+CHAT_EXPORT = "chat_export.csv"
+ANALYZER_DIR = "analyzer"
+
+
+def target_group_chats():
+    """The chat identifiers extract_messages.py filters on, read from its source."""
+    source = (PROJECT_ROOT / "chat_extractor" / "extract_messages.py").read_text(encoding="utf-8")
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Assign) and any(
+                getattr(t, "id", None) == "TARGET_GROUP_CHATS" for t in node.targets):
+            return ast.literal_eval(node.value)
+    return None
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip()
+        return out + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+def build_fixture(fixture_dir, size, seed):
+    """
+    chat.db plus the CSV exports later stages read.
+
+    Returns:
+        Path to the fixture directory
+    """
+    fixture_dir = Path(fixture_dir)
+    db_path = fixture_dir / "chat.db"
+    if db_path.exists() and (fixture_dir / CHAT_EXPORT).exists():
+        return fixture_dir
+
+    start = time.perf_counter()
+    # Recent history, so extract_messages' six-month window sees real volume
+    build_chat_db(db_path, num_messages=size, days=365, seed=seed,
+                  chat_identifiers=target_group_chats())
+
+    conn = sqlite3.connect(str(db_path))
+    rows = conn.execute("""
+        SELECT m.date, COALESCE(h.id, 'Me'), m.text, c.display_name
+        FROM message m
+        JOIN chat_message_join cmj ON cmj.message_id = m.ROWID
+        JOIN chat c ON c.ROWID = cmj.chat_id
+        LEFT JOIN handle h ON h.ROWID = m.handle_id
+        WHERE m.associated_message_type = 0
+        ORDER BY m.date
+    """)
+
+    (fixture_dir / ANALYZER_DIR).mkdir(exist_ok=True)
+    with open(fixture_dir / CHAT_EXPORT, "w", newline="", encoding="utf-8") as export, \
+            open(fixture_dir / ANALYZER_DIR / "messages.csv", "w", newline="", encoding="utf-8") as analyzer:
+        export_writer = csv.writer(export)
+        analyzer_writer = csv.writer(analyzer)
+        export_writer.writerow(["timestamp", "sender", "text", "group_name"])
+        analyzer_writer.writerow(["sender", "message", "time"])
+        # Like the real exports: naive UTC in the chat export, home-zone clock time for the analyzers
+        home = ZoneInfo(home_timezone())
+        for date, sender, text, group_name in rows:
+            when = datetime.fromtimestamp(date / 1_000_000_000 + APPLE_EPOCH_OFFSET, tz=timezone.utc)
+            export_writer.writerow([when.replace(tzinfo=None).isoformat(sep=" "), sender, text, group_name])
+            analyzer_writer.writerow([sender, text, when.astimezone(home).strftime("%b %d, %Y %I:%M %p")])
+    conn.close()
+
+    print(f"📦 Built {size:,}-row fixture in {time.perf_counter() - start:.1f}s")
+    return fixture_dir
+
+
+# ------------------------------------------------------------------------------
+# Stages (run inside the worker process)
+# ------------------------------------------------------------------------------
+
+def stage_extract_messages(fixture_dir):
+    """Run the extractor as its own process with HOME pointed at the fixture."""
+    home = fixture_dir / "home"
+    (home / "Projects" / "henze-trivia" / "output").mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, HOME=str(home), CHAT_DB_PATH=str(fixture_dir / "chat.db"),
+               PYTHONPATH=str(PROJECT_ROOT))
+    subprocess.run([sys.executable, str(PROJECT_ROOT / "chat_extractor" / "extract_messages.py")],
+                   env=env, cwd=str(home), check=True, stdout=subprocess.DEVNULL)
+    with open(home / "Projects" / "henze-trivia" / "output" / CHAT_EXPORT, encoding="utf-8") as f:
+        exported = sum(1 for _ in csv.reader(f)) - 1
+    return {"output": exported, "rss_from_children": True}
+
+
+def stage_emoji_analysis(fixture_dir):
+    os.environ["CHAT_DB_PATH"] = str(fixture_dir / "chat.db")
+    from analytics import emoji_analysis
+
+    reactions = emoji_analysis.extract_emoji_reactions()
+    emojis = emoji_analysis.extract_emojis_from_messages(str(fixture_dir / CHAT_EXPORT))
+    if not reactions.empty:
+        emoji_analysis.analyze_reaction_patterns(reactions)
+    if not emojis.empty:
+        emoji_analysis.analyze_emoji_usage(emojis)
+    emoji_analysis.generate_leaderboard(reactions, emojis)
+    return {"output": len(emojis)}
+
+
+def stage_analyzer(fixture_dir):
+    from analyze_messages import MessageAnalyzer
+
+    analyzer = MessageAnalyzer(str(fixture_dir / ANALYZER_DIR))
+    analyzer.load_all_messages()
+    results = analyzer.analyze_patterns()
+    quotes = analyzer.find_memorable_quotes()
+    questions = analyzer.generate_trivia_questions(results, quotes)
+    return {"output": len(questions)}
+
+
+def stage_question_generator(fixture_dir):
+    from utils import question_generator
+
+    random.seed(0)
+    df = question_generator.load_chat_data(str(fixture_dir / CHAT_EXPORT))
+    questions = [question_generator.generate_random_question(df)
+                 for _ in range(GENERATED_QUESTIONS)]
+    return {"output": len(questions)}
+
+
+def stage_packs(fixture_dir):
+    from utils.pack_builder import PackBuilder, PackSpec, write_packs
+
+    # Who-said-it style rows built straight from the export
+    rng = random.Random(0)
+    group = []
+    with open(fixture_dir / CHAT_EXPORT, newline="", encoding="utf-8") as f:
+        messages = [(row["sender"], row["text"]) for row in csv.DictReader(f)]
+    senders = sorted({sender for sender, _ in messages})
+    for i, (sender, text) in enumerate(messages):
+        options = [sender] + rng.sample([s for s in senders if s != sender], min(3, len(senders) - 1))
+        rng.shuffle(options)
+        row = {"question": f"Who said: '{text}' (#{i})?",
+               "correct_answer": "ABCD"[options.index(sender)],
+               "difficulty": ("easy", "medium", "hard")[i % 3],
+               "category": f"Group Chat {i % 7}"}
+        row.update({f"option_{letter}": option for letter, option in zip("ABCD", options)})
+        group.append(row)
+    general = [{"question": f"General question {i}?", "correct_answer": "A",
+                "difficulty": ("easy", "medium", "hard")[i % 3], "category": f"General {i % 9}",
+                "option_A": "a", "option_B": "b", "option_C": "c", "option_D": "d"}
+               for i in range(max(len(group) // 2, 1))]
+
+    builder = PackBuilder(group, general, seed=0)
+    specs = [PackSpec(f"pack_{i:02d}", size=PACK_SIZE, group_ratio=0.5) for i in range(PACKS)]
+    with tempfile.TemporaryDirectory() as out_dir:
+        written = write_packs(builder.build_all(specs), out_dir)
+    return {"output": sum(count for _, count in written)}
+
+
+STAGE_FUNCS = {
+    "extract_messages": stage_extract_messages,
+    "emoji_analysis": stage_emoji_analysis,
+    "analyzer": stage_analyzer,
+    "question_generator": stage_question_generator,
+    "packs": stage_packs,
+}
+
+
+def run_worker(stage, fixture_dir):
+    """Time one stage in this process and print its measurements as JSON."""
+    fixture_dir = Path(fixture_dir)
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        result = STAGE_FUNCS[stage](fixture_dir)
+    seconds = time.perf_counter() - start
+    who = resource.RUSAGE_CHILDREN if result.pop("rss_from_children", False) else resource.RUSAGE_SELF
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": round(peak_rss_mb(who), 1), **result}))
+
+
+# ------------------------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------------------------
+
+def run_stage(stage, fixture_dir):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", stage, "--fixture", str(fixture_dir)],
+        cwd=str(PROJECT_ROOT), capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def load_results(path):
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline_for(history, record):
+    """Most recent earlier result for the same stage and size from a different commit."""
+    for previous in reversed(history):
+        if (previous["stage"], previous["rows"]) == (record["stage"], record["rows"]) \
+                and previous["commit"] != record["commit"] and "seconds" in previous:
+            return previous
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the question pipeline stage by stage")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Synthetic chat.db sizes in message rows (10k to 10M)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run")
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS, help="Results JSONL file")
+    parser.add_argument("--keep", type=Path, help="Keep (and reuse) fixtures in this directory")
+    parser.add_argument("--seed", type=int, default=42, help="Fixture random seed")
+    parser.add_argument("--worker", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--fixture", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.fixture)
+        return
+
+    print("⏱️  Pipeline Benchmark")
+    print("=" * 72)
+
+    history = load_results(args.results)
+    commit = git_commit()
+    meta = {"commit": commit, "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform()}
+
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.keep or Path(tmp)
+        for size in args.sizes:
+            fixture_dir = build_fixture(root / f"chat_{size}", size, args.seed)
+            print(f"\n  {size:,} rows @ {commit}")
+            print(f"  {'stage':<20}{'seconds':>10}{'rows/s':>14}{'peak RSS':>12}{'vs baseline':>16}")
+
+            for stage in args.stages:
+                record = {"stage": stage, "rows": size, **meta, **run_stage(stage, fixture_dir)}
+                if "seconds" in record:
+                    record["rows_per_sec"] = round(size / record["seconds"]) if record["seconds"] else 0
+                with open(args.results, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+                if "error" in record:
+                    print(f"  {stage:<20}{'failed':>10}  {record['error']}")
+                    continue
+                baseline = baseline_for(history, record)
+                delta = f"{(record['seconds'] / baseline['seconds'] - 1) * 100:+.0f}% ({baseline['commit']})" \
+                    if baseline and baseline["seconds"] else "-"
+                print(f"  {stage:<20}{record['seconds']:>10.2f}{record['rows_per_sec']:>14,.0f}"
+                      f"{record['peak_rss_mb']:>10.0f}MB{delta:>16}")
+
+    print(f"\n📝 Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Import-Time Budget Check
+Measures cold import time of the generator modules and CLI startup, each in a
+fresh interpreter, and fails if any exceeds its budget.
+
+Usage:
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget 0.2 --runs 5
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules that must stay cheap to import (no pandas/openai/requests at import time)
+MODULES = [
+    "openai_agent.trivia_bot",
+    "openai_agent.who_said_it",
+    "openai_agent.roast_mode",
+    "openai_agent.chaos_questions",
+    "fetch_general_trivia",
+    "utils.streaming",
+    "utils.scheduler",
+    "utils.context_builder",
+]
+
+# Heavy dependencies that must not be executed by the imports above
+HEAVY_MODULES = ["pandas", "openai", "requests", "dotenv"]
+
+# CLI invocations that never call the API
+CLI_COMMANDS = [
+    ["generate_questions.py", "--help"],
+    ["openai_agent/trivia_bot.py", "--help"],
+]
+
+_IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules and type(sys.modules[m]).__name__ != '_LazyModule']
+print(elapsed, ','.join(loaded))
+"""
+
+
+def measure_import(module, runs):
+    """Best-of-N cold import time and any heavy modules it executed."""
+    best = float("inf")
+    loaded = ""
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        parts = result.stdout.split()
+        best = min(best, float(parts[0]))
+        loaded = parts[1] if len(parts) > 1 else ""
+    return best, loaded
+
+
+def measure_command(command, runs):
+    """Best-of-N wall time for a CLI command, interpreter startup included."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, cwd=PROJECT_ROOT, capture_output=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import-time budgets")
+    parser.add_argument("--budget", type=float, default=0.15, help="Seconds allowed per module import")
+    parser.add_argument("--cli-budget", type=float, default=0.5, help="Seconds allowed per CLI command")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    print("⏱️  Import-Time Budget Check")
+    print("=" * 60)
+
+    failures = 0
+
+    for module in MODULES:
+        try:
+            elapsed, loaded = measure_import(module, args.runs)
+        except RuntimeError as e:
+            print(f"  ❌ {module:32} import failed: {e}")
+            failures += 1
+            continue
+
+        ok = elapsed <= args.budget and not loaded
+        failures += not ok
+        note = f" (loaded {loaded})" if loaded else ""
+        print(f"  {'✅' if ok else '❌'} {module:32} {elapsed * 1000:7.1f} ms{note}")
+
+    print()
+    for command in CLI_COMMANDS:
+        elapsed = measure_command(command, args.runs)
+        ok = elapsed <= args.cli_budget
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} {' '.join(command):32} {elapsed * 1000:7.1f} ms")
+
+    print("\n" + "=" * 60)
+    if failures:
+        print(f"❌ {failures} measurement(s) over budget "
+              f"(import {args.budget * 1000:.0f} ms, CLI {args.cli_budget * 1000:.0f} ms)")
+        sys.exit(1)
+    print("✅ All imports within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,91 +8,35 @@ import os
 import json
 import sqlite3
 import sys
+from importlib.util import find_spec
 from typing import List, Dict, Optional, Literal
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
-try:
-    from openai import OpenAI
-    from pydantic import BaseModel, Field, validator
-except ImportError:
+# openai is imported lazily by utils.openai_client, pydantic by utils.question_models
+if find_spec("pydantic") is None or find_spec("openai") is None:
     print("❌ Missing dependencies. Install with:")
-    print("   pip install openai pydantic")
+    print("   pip install -r requirements.txt")
     sys.exit(1)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent
-DB_PATH = PROJECT_ROOT / "data" / "henze_trivia.db"
-MESSAGES_DB_PATH = Path(os.getenv("CHAT_DB_PATH", "~/Library/Messages/chat.db")).expanduser()
+sys.path.insert(0, str(PROJECT_ROOT))
 
+from utils.openai_client import get_client, has_credentials
+from utils.question import QuestionBatch
+from utils.question_bank import QuestionBank, connect
+from utils.question_models import (ChaosQuestion, QuestionOption, RoastQuestion,  # noqa: F401
+                                   TriviaQuestion, WhoSaidItQuestion)
+from utils.question_stats import QuestionStats
+from utils.scheduler import parse_completion
 
-# ==============================================================================
-# PYDANTIC SCHEMAS (for strict JSON validation)
-# ==============================================================================
+DB_PATH = PROJECT_ROOT / "data" / "henze_trivia.db"
+MESSAGES_DB_PATH = Path(os.getenv("CHAT_DB_PATH", "~/Library/Messages/chat.db")).expanduser()
 
-class QuestionOption(BaseModel):
-    """Single answer option"""
-    text: str = Field(..., min_length=1, max_length=200)
-
-
-class TriviaQuestion(BaseModel):
-    """General trivia question"""
-    type: Literal["trivia"] = "trivia"
-    text: str = Field(..., min_length=10, max_length=500, description="The question text")
-    options: List[str] = Field(..., min_items=4, max_items=4, description="Exactly 4 answer options")
-    answer_index: int = Field(..., ge=0, le=3, description="Index of correct answer (0-3)")
-    explanation: str = Field(..., min_length=10, max_length=500, description="Why this answer is correct")
-    category: str = Field(..., min_length=2, max_length=50, description="Topic category")
-    difficulty: Literal["easy", "medium", "hard"] = Field(default="medium")
-
-    @validator("options")
-    def validate_options(cls, v):
-        if len(v) != 4:
-            raise ValueError("Must have exactly 4 options")
-        if len(set(v)) != 4:
-            raise ValueError("All options must be unique")
-        return v
-
-
-class WhoSaidItQuestion(BaseModel):
-    """Quote attribution question"""
-    type: Literal["who-said-it"] = "who-said-it"
-    text: str = Field(..., description="Format: 'Who said: \"[quote]\"?'")
-    options: List[str] = Field(..., min_items=4, max_items=4, description="4 person names from chat")
-    answer_index: int = Field(..., ge=0, le=3)
-    explanation: str = Field(..., description="Context about when/why they said it")
-    category: str = Field(default="quotes")
-    speaker_names: List[str] = Field(..., description="Must match names in chat roster")
-
-    @validator("text")
-    def validate_quote_format(cls, v):
-        if not v.startswith("Who said:"):
-            raise ValueError("Must start with 'Who said:'")
-        return v
-
-
-class ChaosQuestion(BaseModel):
-    """Message timing/pattern question"""
-    type: Literal["chaos"] = "chaos"
-    text: str = Field(..., description="Question about message patterns or timing")
-    options: List[str] = Field(..., min_items=4, max_items=4)
-    answer_index: int = Field(..., ge=0, le=3)
-    explanation: str = Field(..., description="Data source or explanation")
-    category: str = Field(default="chaos")
-
-
-class RoastQuestion(BaseModel):
-    """Personality roast question"""
-    type: Literal["roast"] = "roast"
-    text: str = Field(..., min_length=10, max_length=300, description="Punchy, 1-line roast setup")
-    options: List[str] = Field(..., min_items=4, max_items=4, description="4 person names")
-    answer_index: int = Field(..., ge=0, le=3)
-    explanation: str = Field(..., description="Why this roast fits")
-    category: str = Field(default="roast")
-    roasted_person: str = Field(..., description="Name of person being roasted")
+# Fresh (unplayed or not yet worn out) questions per type worth keeping in stock;
+# types at or above this are not topped up (see utils/question_stats.py)
+FRESH_STOCK = {"trivia": 200, "who-said-it": 60, "roast": 60}
 
 
 # ==============================================================================
@@ -100,94 +44,121 @@ class RoastQuestion(BaseModel):
 # ==============================================================================
 
 def get_db_connection():
-    """Get connection to trivia database"""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    return sqlite3.connect(str(DB_PATH))
+    """Get connection to trivia database (WAL, tuned for bulk writes)"""
+    return connect(DB_PATH)
+
+
+def insert_questions(conn, questions: List[Dict], source: Optional[str] = None,
+                     on_conflict: Literal["update", "ignore"] = "update") -> Dict[str, int]:
+    """
+    Insert a batch of questions in a single transaction.
+
+    Re-running a generator refreshes existing rows (matched on type and
+    normalized text, see utils/question_bank.py) instead of duplicating them.
+
+    Returns:
+        {"inserted": n, "existing": n} counts
+    """
+    return QuestionBank(conn).add_many(questions, source=source, on_conflict=on_conflict)
 
 
 def insert_question(conn, question: Dict):
-    """Insert question into database"""
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO questions (type, text, options, answer_index, explanation, category, topic, difficulty, source)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        question["type"],
-        question["text"],
-        json.dumps(question["options"]),
-        question["answer_index"],
-        question.get("explanation", ""),
-        question.get("category", ""),
-        question.get("category", ""),  # Use category as topic for now
-        question.get("difficulty", "medium"),
-        question.get("source", "ai-generated")
-    ))
-    conn.commit()
-    return cursor.lastrowid
+    """Insert (or refresh) a single question; returns its row id"""
+    bank = QuestionBank(conn)
+    bank.add_many([question])
+    return bank.find_id(question)
 
 
 # ==============================================================================
 # MESSAGE EXTRACTION
 # ==============================================================================
 
-def extract_distinctive_messages(limit=1500, min_length=10):
+# iMessage stores tapback reactions ("Loved “...”") as messages whose
+# associated_message_type is 2000-2005 (added) or 3000-3005 (removed)
+TAPBACK_TYPE_RANGE = (2000, 3999)
+
+# Seconds between the Unix epoch and Apple's 2001-01-01 epoch
+APPLE_EPOCH_OFFSET = 978307200
+
+DISTINCTIVE_MESSAGES_SQL = """
+    SELECT
+        m.text,
+        m.date,
+        h.id AS handle_id,
+        c.display_name AS chat_name
+    FROM message m
+    LEFT JOIN handle h ON h.ROWID = m.handle_id
+    LEFT JOIN chat_message_join cmj ON cmj.message_id = m.ROWID
+    LEFT JOIN chat c ON c.ROWID = cmj.chat_id
+    WHERE m.text IS NOT NULL
+        AND COALESCE(m.associated_message_type, 0) NOT BETWEEN ? AND ?
+        AND LENGTH(m.text) BETWEEN ? AND ?
+        AND m.date >= ?
+    ORDER BY m.date DESC
+"""
+
+
+def to_apple_time(when: datetime) -> int:
+    """
+    Convert a datetime to chat.db's nanoseconds since 2001-01-01
+
+    A naive datetime is UTC, like the extracted message times
+    (chat_extractor/extract_messages.py), not the machine's local time.
+    """
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return int((when.timestamp() - APPLE_EPOCH_OFFSET) * 1_000_000_000)
+
+
+def extract_distinctive_messages(limit=1500, min_length=10, max_length=1000,
+                                 since: Optional[datetime] = None, db_path=None):
     """
     Extract distinctive messages from iMessage database
     Filters out reactions, short messages, and duplicates
+
+    Filtering happens in SQL (integer-key joins, tapbacks by
+    associated_message_type, length and date bounds); rows are then streamed
+    newest first and deduplicated until `limit` unique messages are found.
+
+    Args:
+        limit: Number of unique messages to return
+        min_length: Minimum message length in characters
+        max_length: Maximum message length in characters
+        since: Only messages sent at or after this time
+        db_path: chat.db path (defaults to CHAT_DB_PATH)
     """
-    if not MESSAGES_DB_PATH.exists():
-        print(f"⚠️  iMessage database not found at: {MESSAGES_DB_PATH}")
+    db_path = Path(db_path) if db_path else MESSAGES_DB_PATH
+    if not db_path.exists():
+        print(f"⚠️  iMessage database not found at: {db_path}")
         return []
 
     try:
-        conn = sqlite3.connect(str(MESSAGES_DB_PATH))
-        cursor = conn.cursor()
+        # Read-only, so Messages.app can keep writing to the live database
+        conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+        params = (*TAPBACK_TYPE_RANGE, min_length, max_length,
+                  to_apple_time(since) if since else 0)
 
-        # Query for distinctive messages
-        query = """
-            SELECT
-                m.text,
-                m.date,
-                h.id as handle_id,
-                c.display_name as chat_name
-            FROM message m
-            LEFT JOIN handle h ON m.handle_id = h.id
-            LEFT JOIN chat_message_join cmj ON m.ROWID = cmj.message_id
-            LEFT JOIN chat c ON cmj.chat_id = c.ROWID
-            WHERE m.text IS NOT NULL
-                AND LENGTH(m.text) >= ?
-                AND m.text NOT LIKE '%Liked%'
-                AND m.text NOT LIKE '%Loved%'
-                AND m.text NOT LIKE '%Laughed%'
-                AND m.text NOT LIKE '%Emphasized%'
-            ORDER BY m.date DESC
-            LIMIT ?
-        """
-
-        cursor.execute(query, (min_length, limit * 2))  # Fetch 2x for filtering
-        rows = cursor.fetchall()
-        conn.close()
-
-        # Deduplicate and score by distinctiveness
-        seen_texts = set()
+        seen = set()
         messages = []
-
-        for text, date, handle_id, chat_name in rows:
-            # Normalize for dedup
-            normalized = text.lower().strip()
-            if normalized in seen_texts:
-                continue
-            seen_texts.add(normalized)
-
-            messages.append({
-                "text": text,
-                "date": date,
-                "handle_id": handle_id,
-                "chat_name": chat_name or "Unknown"
-            })
-
-            if len(messages) >= limit:
-                break
+        try:
+            for text, date, handle_id, chat_name in conn.execute(DISTINCTIVE_MESSAGES_SQL, params):
+                # Normalize for dedup; only the hash is kept
+                key = hash(" ".join(text.lower().split()))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                messages.append({
+                    "text": text,
+                    "date": date,
+                    "handle_id": handle_id,
+                    "chat_name": chat_name or "Unknown"
+                })
+
+                if len(messages) >= limit:
+                    break
+        finally:
+            conn.close()
 
         print(f"📱 Extracted {len(messages)} distinctive messages from iMessage")
         return messages
@@ -232,7 +203,8 @@ Rules:
 Return exactly {count} questions."""
 
     try:
-        response = client.beta.chat.completions.parse(
+        response = parse_completion(
+            get_client(),
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a trivia question generator. Create engaging, well-balanced questions with plausible distractors."},
@@ -281,8 +253,22 @@ Return exactly {count} questions."""
         return []
 
 
-def generate_who_said_it_questions(messages: List[Dict], count=5) -> List[WhoSaidItQuestion]:
-    """Generate 'Who Said It?' questions from chat messages"""
+def generate_who_said_it_questions(messages: List[Dict], count=5,
+                                   bank: Optional[QuestionBank] = None) -> List[WhoSaidItQuestion]:
+    """
+    Generate 'Who Said It?' questions from chat messages
+
+    With a question bank, quotes that already have a question are dropped
+    before the prompt is built, so no tokens go to regenerating them.
+    """
+
+    if bank is not None:
+        asked = bank.exists_many([f'Who said: "{m["text"]}"' for m in messages],
+                                 question_type="who-said-it")
+        fresh = [m for m, seen in zip(messages, asked) if not seen]
+        if len(fresh) < len(messages):
+            print(f"  ⏭️  Skipping {len(messages) - len(fresh)} quotes already in the question bank")
+        messages = fresh
 
     if len(messages) < 20:
         print("⚠️  Not enough messages for Who Said It questions")
@@ -314,7 +300,8 @@ Rules:
 Return exactly {count} questions."""
 
     try:
-        response = client.beta.chat.completions.parse(
+        response = parse_completion(
+            get_client(),
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": f"You are creating quote attribution questions from a group chat. Available speakers: {speaker_list}"},
@@ -399,7 +386,8 @@ Examples:
 Return exactly {count} questions."""
 
     try:
-        response = client.beta.chat.completions.parse(
+        response = parse_completion(
+            get_client(),
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are creating humorous personality questions based on chat patterns. Keep it light and fun."},
@@ -456,8 +444,8 @@ def main():
     print("🎮 Henze Trivia Question Generator")
     print("=" * 60)
 
-    if not os.getenv("OPENAI_API_KEY"):
-        print("❌ OPENAI_API_KEY environment variable not set")
+    if not has_credentials():
+        print("❌ OPENAI_API_KEY environment variable not set (or OPENAI_BASE_URL for the mock server)")
         sys.exit(1)
 
     # Get database connection
@@ -466,41 +454,47 @@ def main():
     # Extract chat messages (if available)
     messages = extract_distinctive_messages()
 
-    total_generated = 0
+    bank = QuestionBank(conn)
+    totals = {"inserted": 0, "existing": 0}
+
+    # Only pay for types whose fresh stock is running low
+    force = "--force" in sys.argv[1:]
+    fresh = QuestionStats(conn).fresh_counts()
+
+    def wanted(q_type):
+        if force or fresh.get(q_type, 0) < FRESH_STOCK[q_type]:
+            return True
+        print(f"   ⏭️  {fresh[q_type]} fresh {q_type} questions in stock, skipping (--force to generate)")
+        return False
+
+    def save(questions, source):
+        counts = bank.add_many(QuestionBatch.from_models(questions), source=source)
+        for key in totals:
+            totals[key] += counts[key]
 
     # Generate trivia questions
     print("\n📚 Generating trivia questions...")
-    trivia = generate_trivia_questions(count=15, category="pop culture, sports, history")
-    for q in trivia:
-        q_dict = q.dict()
-        q_dict["source"] = "ai-generated"
-        insert_question(conn, q_dict)
-        total_generated += 1
+    if wanted("trivia"):
+        trivia = generate_trivia_questions(count=15, category="pop culture, sports, history")
+        save(trivia, "ai-generated")
 
     # Generate chat-based questions (if we have messages)
     if messages:
         print("\n💬 Generating Who Said It questions...")
-        who_said_it = generate_who_said_it_questions(messages, count=5)
-        for q in who_said_it:
-            q_dict = q.dict()
-            q_dict["source"] = "chat"
-            insert_question(conn, q_dict)
-            total_generated += 1
+        if wanted("who-said-it"):
+            save(generate_who_said_it_questions(messages, count=5, bank=bank), "chat")
 
         print("\n🔥 Generating roast questions...")
-        roasts = generate_roast_questions(messages, count=5)
-        for q in roasts:
-            q_dict = q.dict()
-            q_dict["source"] = "chat"
-            insert_question(conn, q_dict)
-            total_generated += 1
+        if wanted("roast"):
+            save(generate_roast_questions(messages, count=5), "chat")
     else:
         print("\n⚠️  Skipping chat-based questions (no messages available)")
 
     conn.close()
 
     print("\n" + "=" * 60)
-    print(f"✅ Generation complete! Added {total_generated} questions to database")
+    print(f"✅ Generation complete! Added {totals['inserted']} questions to database "
+          f"({totals['existing']} already present, refreshed)")
     print(f"   Database: {DB_PATH}")
     print("=" * 60)
 
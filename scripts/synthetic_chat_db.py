@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Synthetic iMessage Database
+Builds a chat.db with the macOS Messages schema (message, handle, chat,
+chat_message_join) filled with fake group-chat traffic, for benchmarks and
+offline runs without access to a real Mac.
+
+Usage:
+    python scripts/synthetic_chat_db.py output/synthetic_chat.db --messages 100000
+    python scripts/synthetic_chat_db.py output/synthetic_chat.db --messages 10000000 --skew 1.3
+    CHAT_DB_PATH=output/synthetic_chat.db python scripts/generate_questions.py
+"""
+
+import argparse
+import collections
+import itertools
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Seconds between the Unix epoch and Apple's 2001-01-01 epoch
+APPLE_EPOCH_OFFSET = 978307200
+
+TAPBACK_VERBS = ["Loved", "Liked", "Disliked", "Laughed at", "Emphasized", "Questioned"]
+CUSTOM_TAPBACK_TYPE = 2006          # emoji tapback; the emoji is in associated_message_emoji
+CUSTOM_TAPBACK_SHARE = 0.2
+
+WORDS = (
+    "bro dude literally lmao lol honestly wait what why who tonight tomorrow game "
+    "pizza beer gym work boss traffic dog cat party drunk hungover crazy insane "
+    "never always again seriously dead crying vibes rent landlord roommate ex "
+    "text call bar club brunch wings tacos fantasy football draft trade refs "
+    "chaos legend goat savage cursed vibe check sus wild banger mid based"
+).split()
+
+EMOJIS = ["😂", "💀", "🔥", "😭", "🙄", "👀", "🍺", "🤡"]
+
+SCHEMA = """
+CREATE TABLE handle (
+    ROWID INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE,
+    id TEXT NOT NULL,
+    country TEXT,
+    service TEXT NOT NULL,
+    uncanonicalized_id TEXT,
+    person_centric_id TEXT,
+    UNIQUE (id, service)
+);
+CREATE TABLE chat (
+    ROWID INTEGER PRIMARY KEY AUTOINCREMENT,
+    guid TEXT UNIQUE NOT NULL,
+    style INTEGER,
+    chat_identifier TEXT,
+    service_name TEXT,
+    display_name TEXT
+);
+CREATE TABLE message (
+    ROWID INTEGER PRIMARY KEY AUTOINCREMENT,
+    guid TEXT UNIQUE NOT NULL,
+    text TEXT,
+    handle_id INTEGER DEFAULT 0,
+    service TEXT,
+    date INTEGER,
+    is_from_me INTEGER DEFAULT 0,
+    associated_message_guid TEXT DEFAULT NULL,
+    associated_message_type INTEGER DEFAULT 0,
+    associated_message_emoji TEXT DEFAULT NULL,
+    cache_has_attachments INTEGER DEFAULT 0
+);
+CREATE TABLE chat_message_join (
+    chat_id INTEGER REFERENCES chat (ROWID) ON DELETE CASCADE,
+    message_id INTEGER REFERENCES message (ROWID) ON DELETE CASCADE,
+    message_date INTEGER DEFAULT 0,
+    PRIMARY KEY (chat_id, message_id)
+);
+"""
+
+# Created after the bulk load, which is much faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX message_idx_handle ON message(handle_id, date);
+CREATE INDEX chat_message_join_idx_message_date_id_chat_id
+    ON chat_message_join(chat_id, message_date, message_id);
+CREATE INDEX chat_message_join_idx_message_id_only ON chat_message_join(message_id);
+"""
+
+
+def zipf_weights(n, skew=1.1):
+    """Sender weights where a few people send most of the messages"""
+    return [1 / (rank ** skew) for rank in range(1, n + 1)]
+
+
+def random_text(rng):
+    """A short chat message, occasionally long, with the odd emoji"""
+    length = min(int(rng.expovariate(1 / 8)) + 1, 80)
+    words = rng.choices(WORDS, k=length)
+    if rng.random() < 0.25:
+        words.append(rng.choice(EMOJIS))
+    return " ".join(words)
+
+
+def build_chat_db(path, num_messages=100_000, num_handles=12, num_chats=5,
+                  tapback_rate=0.15, repeat_rate=0.05, from_me_rate=0.1,
+                  days=730, sender_skew=1.1, seed=42, batch_size=50_000,
+                  chat_identifiers=None):
+    """
+    Write a synthetic chat.db.
+
+    Scales linearly; 10M rows take a few minutes and about 2.5 GB.
+
+    Args:
+        path: Output file (overwritten)
+        num_messages: Total message rows, tapbacks included
+        num_handles: Distinct senders
+        num_chats: Group chats the messages are spread over
+        tapback_rate: Share of rows that are tapback reactions
+        repeat_rate: Share of rows repeating an earlier message ("lol", copy-paste)
+        from_me_rate: Share of rows sent by the device owner (handle_id 0)
+        days: Time span covered, ending now
+        sender_skew: Zipf exponent for sender activity
+        seed: Random seed
+        batch_size: Rows per executemany call
+        chat_identifiers: chat_identifier values to use (e.g. the ones an
+            extractor filters on); defaults to chat000000000000000001, ...
+
+    Returns:
+        Path to the database
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    identifiers = list(chat_identifiers or [f"chat{i:018d}" for i in range(1, num_chats + 1)])
+    num_chats = len(identifiers)
+
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    conn.executescript(SCHEMA)
+
+    conn.executemany(
+        "INSERT INTO handle (ROWID, id, service) VALUES (?, ?, 'iMessage')",
+        [(i, f"+1555{i:07d}") for i in range(1, num_handles + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO chat (ROWID, guid, style, chat_identifier, service_name, display_name) "
+        "VALUES (?, ?, 43, ?, 'iMessage', ?)",
+        [(i, f"iMessage;+;{ident}", ident, f"Group Chat {i}")
+         for i, ident in enumerate(identifiers, start=1)]
+    )
+
+    handles = list(range(1, num_handles + 1))
+    cum_weights = list(itertools.accumulate(zipf_weights(num_handles, sender_skew)))
+    now_apple = time.time() - APPLE_EPOCH_OFFSET
+    max_step = 2 * days * 86400 * 1_000_000_000 // max(num_messages, 1)
+    date = int((now_apple - days * 86400) * 1_000_000_000)
+    random_ = rng.random
+
+    recent = collections.deque(maxlen=200)
+    messages, joins = [], []
+    for batch_start in range(1, num_messages + 1, batch_size):
+        batch_end = min(batch_start + batch_size, num_messages + 1)
+        # Draw the skewed senders for the whole batch at once
+        senders = rng.choices(handles, cum_weights=cum_weights, k=batch_end - batch_start)
+
+        for rowid, handle_id in zip(range(batch_start, batch_end), senders):
+            date += int(random_() * max_step) + 1
+            if random_() < from_me_rate:
+                handle_id = 0
+            assoc_guid, assoc_type, assoc_emoji = None, 0, None
+
+            roll = random_()
+            if roll < tapback_rate and recent:
+                target_guid, target_text = recent[int(random_() * len(recent))]
+                if random_() < CUSTOM_TAPBACK_SHARE:
+                    assoc_emoji = EMOJIS[int(random_() * len(EMOJIS))]
+                    text = f"Reacted {assoc_emoji} to “{target_text}”"
+                    assoc_type = CUSTOM_TAPBACK_TYPE
+                else:
+                    verb_index = int(random_() * len(TAPBACK_VERBS))
+                    text = f"{TAPBACK_VERBS[verb_index]} “{target_text}”"
+                    assoc_type = 2000 + verb_index
+                assoc_guid = f"p:0/{target_guid}"
+            elif roll < tapback_rate + repeat_rate and recent:
+                text = recent[int(random_() * len(recent))][1]
+            else:
+                text = random_text(rng)
+
+            guid = f"SYN-{rowid:010d}"
+            messages.append((rowid, guid, text, handle_id, date, int(handle_id == 0),
+                             assoc_guid, assoc_type, assoc_emoji))
+            joins.append((int(random_() * num_chats) + 1, rowid, date))
+            if assoc_type == 0:
+                recent.append((guid, text))
+
+        _flush(conn, messages, joins)
+
+    conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _flush(conn, messages, joins):
+    conn.executemany(
+        "INSERT INTO message (ROWID, guid, text, handle_id, date, is_from_me, "
+        "associated_message_guid, associated_message_type, associated_message_emoji, service) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'iMessage')", messages)
+    conn.executemany(
+        "INSERT INTO chat_message_join (chat_id, message_id, message_date) VALUES (?, ?, ?)", joins)
+    messages.clear()
+    joins.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic iMessage chat.db")
+    parser.add_argument("path", help="Output database file")
+    parser.add_argument("--messages", type=int, default=100_000, help="Message rows")
+    parser.add_argument("--handles", type=int, default=12, help="Distinct senders")
+    parser.add_argument("--chats", type=int, default=5, help="Group chats")
+    parser.add_argument("--tapback-rate", type=float, default=0.15, help="Share of tapback rows")
+    parser.add_argument("--days", type=int, default=730, help="Days of history")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for sender activity")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = build_chat_db(args.path, num_messages=args.messages, num_handles=args.handles,
+                         num_chats=args.chats, tapback_rate=args.tapback_rate,
+                         days=args.days, sender_skew=args.skew, seed=args.seed)
+    size_mb = path.stat().st_size / 1_000_000
+    print(f"✅ Wrote {args.messages:,} messages to {path} "
+          f"({size_mb:.1f} MB in {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
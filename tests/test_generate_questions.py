@@ -0,0 +1,16 @@
+from datetime import datetime, timedelta, timezone
+
+from scripts.generate_questions import APPLE_EPOCH_OFFSET, to_apple_time
+
+
+def test_naive_datetimes_are_utc():
+    # chat_extractor writes mac_epoch + date, a naive UTC time
+    mac_epoch = datetime(2001, 1, 1)
+    date = 750_000_000 * 1_000_000_000
+    assert to_apple_time(mac_epoch + timedelta(seconds=date / 1_000_000_000)) == date
+
+
+def test_aware_datetimes_keep_their_zone():
+    when = datetime(2024, 10, 3, 12, tzinfo=timezone(timedelta(hours=-4)))
+    assert to_apple_time(when) == (int(when.timestamp()) - APPLE_EPOCH_OFFSET) * 1_000_000_000
+    assert to_apple_time(when) == to_apple_time(datetime(2024, 10, 3, 16))
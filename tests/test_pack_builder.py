@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from combine_all_questions import pack_specs
+from utils.pack_builder import GROUP, PackBuilder
+
+SENDERS = ["Benny", "Gina", "Ian", "Shan", "Lauren"]
+CATEGORIES = ["Roasts", "Quotes", "Chaos", "Habits"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def _group_rows(per_sender=40):
+    rows = []
+    for sender in SENDERS:
+        for i in range(per_sender):
+            options = [sender] + [s for s in SENDERS if s != sender][:3]
+            rows.append({
+                "question": f"Who is behind chat moment {sender} {i}?",
+                "correct_answer": "A",
+                "option_A": options[0], "option_B": options[1],
+                "option_C": options[2], "option_D": options[3],
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "difficulty": DIFFICULTIES[i % len(DIFFICULTIES)],
+            })
+    return rows
+
+
+def _general_rows(n=400):
+    rng = random.Random(1)
+    return [{
+        "question": f"General knowledge question number {i}?",
+        "correct_answer": "B",
+        "option_A": "w", "option_B": "x", "option_C": "y", "option_D": "z",
+        "category": rng.choice(["Science", "History", "Geography", "Music", "Film"]),
+        "difficulty": DIFFICULTIES[i % len(DIFFICULTIES)],
+    } for i in range(n)]
+
+
+@pytest.mark.parametrize("spec", pack_specs(40, 1), ids=lambda spec: spec.name)
+def test_pack_keeps_group_ratio(spec):
+    group = _group_rows()
+    builder = PackBuilder(group, _general_rows(), seed=3)
+    group_questions = {row["question"] for row in group}
+
+    pack = builder.build(spec)
+
+    wanted = sum(pool == GROUP for pool, _ in spec.slots())
+    got = sum(row["question"] in group_questions for row in pack)
+    assert len(pack) == spec.size
+    assert got == wanted
+    assert wanted == int(spec.size * spec.group_ratio)
+
+
+def test_modes_differ_in_group_share():
+    group = _group_rows()
+    builder = PackBuilder(group, _general_rows(), seed=3)
+    group_questions = {row["question"] for row in group}
+
+    shares = [sum(row["question"] in group_questions for row in rows)
+              for _, rows in builder.build_all(pack_specs(40, 1))]
+
+    assert shares == [24, 16, 8]
+
+
+def test_sender_cap_scales_with_group_slots():
+    group = _group_rows()
+    builder = PackBuilder(group, _general_rows(), seed=3)
+    spec = pack_specs(40, 1)[0]
+    cap = spec.sender_cap(len(SENDERS))
+
+    pack = builder.build(spec)
+
+    per_sender = {}
+    for row in pack:
+        if row["question"].startswith("Who is behind"):
+            per_sender[row["option_A"]] = per_sender.get(row["option_A"], 0) + 1
+    assert cap == 5
+    assert max(per_sender.values()) <= cap
@@ -0,0 +1,28 @@
+import csv
+
+from utils.pack_writer import write_questions
+from utils.question import Question, QuestionBatch
+
+
+def _row(**options):
+    return {"question": "How many?", "correct_answer": "A", **options}
+
+
+def test_from_rows_str_converts_values():
+    batch = QuestionBatch.from_rows([_row(option_A=1, option_B=2, option_C=0, option_D=3.5)])
+    assert [column[0] for column in batch.options] == ["1", "2", "0", "3.5"]
+    assert batch.playable() == [True]
+
+
+def test_missing_cells_become_empty():
+    row = _row(option_A=1, option_B=None, option_C=float("nan"), option_D="d")
+    assert QuestionBatch.from_rows([row])[0].options == ("1", "", "", "d")
+    assert Question.from_row(row).options == ("1", "", "", "d")
+
+
+def test_write_questions_with_numeric_options(tmp_path):
+    rows = [_row(option_A=1, option_B=2, option_C=3, option_D=4),
+            _row(option_A=1, option_B=2, option_C=3, option_D=float("nan"))]
+    path = write_questions(rows, tmp_path / "numbers.csv", quiet=True)
+    with open(path, newline="") as f:
+        assert [r["option_A"] for r in csv.DictReader(f)] == ["1", "1"]
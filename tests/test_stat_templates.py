@@ -0,0 +1,38 @@
+import pandas as pd
+
+from generate_savage_trivia import SavageTriviaGenerator
+from openai_agent import roast_mode
+from utils.stat_templates import StatQuestionEngine
+
+
+def _answer(row):
+    return row[f"option_{row['correct_answer']}"]
+
+
+def test_savage_stats_offer_the_leader(tmp_path):
+    generator = SavageTriviaGenerator(str(tmp_path))
+    curses = {"Lauren": 1, "Benny": 2, "Gina": 3, "Ian": 4, "Jackson": 5, "Carrah": 6, "Shan": 9}
+    for sender, n in curses.items():
+        for i in range(n):
+            generator.all_messages.append({"sender": sender, "message": f"well shit number {i}",
+                                           "time": "Oct 03, 2024 03:45 PM", "source": "chat.csv"})
+
+    questions = {q["template"].split(":")[0]: q for q in generator._generate_behavior_questions()}
+
+    potty_mouth = questions["potty_mouth"]
+    assert _answer(potty_mouth) == "Shan"
+    assert potty_mouth["explanation"].startswith("Shan dropped 9 curse words")
+
+
+def test_roast_average_is_a_mean_template():
+    scores = {"Lauren": [9, 8, 9], "Benny Harris": [2, 3, 1], "Ian O'Malley": [5, 5, 6],
+              "Gina Ortiz": [7, 7, 6], "Jackson": [4, 4, 4]}
+    roast_df = pd.DataFrame([(sender, score) for sender, values in scores.items() for score in values],
+                            columns=["sender", "roast_score"])
+
+    engine = StatQuestionEngine(roast_df, participants=roast_mode.PARTICIPANTS,
+                                metrics=[roast_mode.ROAST_SCORE])
+    [question] = engine.expand(roast_mode.ROAST_TEMPLATES)
+
+    assert _answer(question) == "Lauren"
+    assert "8.7/10" in question["explanation"]
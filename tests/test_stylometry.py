@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from utils.stylometry import SenderProfiles
+
+MESSAGES = pd.DataFrame({
+    "sender": ["Gina"] * 3 + ["Ian"] * 3 + ["Shan"] * 2,
+    "text": ["lmao dead 💀💀", "bro what", "LMAO no way",
+             "Hello there, friend.", "Indeed, quite so.", "Good morning all!",
+             "ok", "sure thing"],
+})
+
+
+def test_quote_is_scored_without_itself():
+    quote = "Hello there, friend."
+    loo = SenderProfiles(MESSAGES).rank_quotes([quote], ["Ian"]).iloc[0]
+    # Same as profiling the chat without that message
+    without = SenderProfiles(MESSAGES[MESSAGES["text"] != quote]).rank_quotes([quote]).iloc[0]
+    assert loo.to_dict() == pytest.approx(without.to_dict())
+
+
+def test_difficulty_does_not_count_self_match():
+    profiles = SenderProfiles(MESSAGES)
+    quote = "Hello there, friend."
+    assert profiles.difficulty("Ian", profiles.rank_quotes([quote]).iloc[0]) == "easy"
+    assert profiles.difficulty("Ian", profiles.rank_quotes([quote], ["Ian"]).iloc[0]) != "easy"
+
+
+def test_quotes_outside_the_chat_are_unchanged():
+    profiles = SenderProfiles(MESSAGES)
+    quotes = ["not in the chat", "bro what"]
+    plain = profiles.rank_quotes(quotes)
+    loo = profiles.rank_quotes(quotes, ["Ian", "Ian"])
+    pd.testing.assert_frame_equal(plain, loo)
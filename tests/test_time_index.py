@@ -0,0 +1,36 @@
+import pandas as pd
+
+from utils.time_index import TimeIndex
+
+
+def _index():
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2024-06-01", periods=10, freq="D"),
+        "sender": ["Gina", "Ian"] * 5,
+        "hour": [12] * 10,
+        "weekday": [d.weekday() for d in pd.date_range("2024-06-01", periods=10, freq="D")],
+    })
+    return TimeIndex(df)
+
+
+def test_counts_in_range():
+    assert _index().counts("2024-06-01", "2024-06-05") == {"Gina": 2, "Ian": 2}
+
+
+def test_reversed_range_counts_zero():
+    index = _index()
+    assert index.counts("2024-06-08", "2024-06-03") == {"Gina": 0, "Ian": 0}
+    assert index.total("2024-06-08", "2024-06-03", hours=[12]) == 0
+    assert index.leaderboard("2024-06-08", "2024-06-03") == []
+
+
+def test_naive_bounds_are_in_the_home_zone(monkeypatch):
+    monkeypatch.setenv("CHAT_TIMEZONE", "America/New_York")
+    df = pd.DataFrame({
+        # UTC: 02:00 on June 3 is still June 2 in New York
+        "timestamp": pd.to_datetime(["2024-06-03 02:00", "2024-06-03 05:00"]),
+        "sender": ["Gina", "Ian"],
+    })
+    index = TimeIndex(df)
+    assert index.counts("2024-06-03", "2024-06-04") == {"Gina": 0, "Ian": 1}
+    assert index.counts("2024-06-03T00:00Z", "2024-06-04T00:00Z") == {"Gina": 1, "Ian": 1}
@@ -0,0 +1,55 @@
+import csv
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from generate_trivia_csv import TriviaGenerator
+from utils.topics import TopicIndex, topic_path
+
+SENDERS = ["Benny", "Gina", "Ian", "Shan", "Lauren"]
+RUNNING_JOKES = {3: "flamingo", 11: "pickleball", 19: "waffles", 27: "tornado"}
+
+
+@pytest.fixture
+def analyzer_dir(tmp_path):
+    """An output directory with one CSV in the analyzers' sender, message, time format."""
+    rng = random.Random(3)
+    vocab = [f"w{i}" for i in range(2000)]
+    start = datetime(2024, 6, 1, 9, 0)
+    with open(tmp_path / "messages.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sender", "message", "time"])
+        for day in range(40):
+            for i in range(50):
+                when = start + timedelta(days=day, minutes=15 * i)
+                words = rng.sample(vocab, 4)
+                if day in RUNNING_JOKES and i < 12:
+                    words.append(RUNNING_JOKES[day])
+                writer.writerow([rng.choice(SENDERS), " ".join(words),
+                                 when.strftime("%b %d, %Y %I:%M %p")])
+    return tmp_path
+
+
+def test_clock_strings_are_dated(analyzer_dir):
+    generator = TriviaGenerator(str(analyzer_dir))
+    generator.load_messages()
+    generator._generate_topic_questions()
+
+    bursts = TopicIndex(topic_path(analyzer_dir)).bursts("terms")
+    assert set(bursts["term"]) == set(RUNNING_JOKES.values())
+    flamingo = bursts.set_index("term").loc["flamingo"]
+    assert flamingo["start"] == flamingo["end"] == datetime(2024, 6, 4).date()
+
+
+def test_topic_questions_include_running_jokes(analyzer_dir):
+    generator = TriviaGenerator(str(analyzer_dir))
+    generator.load_messages()
+    questions = generator._generate_topic_questions(max_bursts=2)
+
+    jokes = [q for q in questions if q["category"] == "Running Jokes"]
+    assert len(jokes) == 2
+    for q in jokes:
+        answer = q[f"option_{q['correct_answer']}"]
+        assert answer in RUNNING_JOKES.values()
+        assert {q[f"option_{letter}"] for letter in "ABCD"} == set(RUNNING_JOKES.values())
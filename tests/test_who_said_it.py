@@ -0,0 +1,49 @@
+import json
+
+import pandas as pd
+
+from openai_agent import who_said_it
+
+QUOTES = {
+    "Lauren": "I am never going to that karaoke bar again, my ears bled",
+    "Gina Ortiz": "whoever ate my leftovers is getting haunted tonight",
+    "Jackson": "my landlord texted me a thumbs up and I feel threatened",
+}
+
+
+def _messages():
+    rows = [(sender, text) for sender, text in QUOTES.items()]
+    rows += [("Benny Harris", f"just a regular message about nothing much number {i}") for i in range(30)]
+    df = pd.DataFrame(rows, columns=["sender", "text"])
+    return df.assign(length=df["text"].str.len())
+
+
+def _labels(tmp_path, picked):
+    path = tmp_path / "quotes.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for text in picked:
+            f.write(json.dumps({"text": text, "score": 1.0, "reason": "earlier pick"}) + "\n")
+    return path
+
+
+def test_earlier_picks_are_selected_again(tmp_path, monkeypatch):
+    fresh = {"quote": QUOTES["Jackson"], "speaker": "Jackson", "reason": "new"}
+    monkeypatch.setattr(who_said_it, "get_client", lambda: None)
+    monkeypatch.setattr(who_said_it, "stream_json_items", lambda *args, **kwargs: None)
+    monkeypatch.setattr(who_said_it, "collect", lambda items, what: [fresh])
+
+    labels = _labels(tmp_path, [QUOTES["Lauren"], QUOTES["Gina Ortiz"]])
+    quotes = who_said_it.select_memorable_quotes(_messages(), num_quotes=10, labels_path=labels)
+
+    assert {q["quote"] for q in quotes} == set(QUOTES.values())
+    assert {q["speaker"] for q in quotes if q["reason"] == "earlier pick"} == {"Lauren", "Gina Ortiz"}
+
+
+def test_earlier_picks_without_the_llm(tmp_path, monkeypatch):
+    monkeypatch.setattr(who_said_it, "get_client", lambda: None)
+    monkeypatch.setattr(who_said_it, "stream_json_items", lambda *args, **kwargs: None)
+    monkeypatch.setattr(who_said_it, "collect", lambda items, what: [])
+
+    labels = _labels(tmp_path, list(QUOTES.values()))
+    quotes = who_said_it.select_memorable_quotes(_messages(), num_quotes=3, labels_path=labels)
+    assert {q["quote"] for q in quotes} == set(QUOTES.values())
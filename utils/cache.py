@@ -0,0 +1,70 @@
+"""
+Per-corpus pickle caches: where they live and how they are written.
+
+The feature store, topic index and distinctiveness scores each keep a
+pickle next to the corpus they were built from: ``<name><suffix>`` beside a
+CSV, or ``<name>`` inside the corpus cache (utils/corpus.py) when the corpus
+is a directory. Writes go to a temporary file that is then renamed over the
+cache, so a crash or a concurrent reader never sees half a pickle.
+
+Usage:
+    path = cache_path("output/chat_export.csv", ".topics.pkl", "topics.pkl")
+    data = load_pickle(path)              # None if missing or unreadable
+    if not save_pickle(data, path):       # False if the location isn't writable
+        ...
+"""
+
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from utils.corpus import CACHE_DIR_NAME
+
+PathLike = Union[str, Path]
+
+
+def cache_path(corpus_path: PathLike, suffix: str, name: str) -> Path:
+    """Cache location for a corpus: ``<stem><suffix>`` next to a file, or ``name`` in a directory's cache."""
+    path = Path(os.path.expanduser(str(corpus_path)))
+    if path.is_dir():
+        return path / CACHE_DIR_NAME / name
+    return path.with_name(path.stem + suffix)
+
+
+def load_pickle(path: Optional[PathLike]) -> Optional[Any]:
+    """The pickled object at path, or None if there is none or it can't be read."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def write_atomic(path: PathLike, write: Callable[[Path], None]) -> bool:
+    """
+    Write a file through ``write(tmp)`` and rename it into place.
+
+    Returns:
+        False if the file couldn't be written (e.g. a read-only export)
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write(tmp)
+        os.replace(tmp, path)
+    except OSError:
+        return False
+    return True
+
+
+def save_pickle(obj: Any, path: PathLike) -> bool:
+    """Pickle obj to path atomically; False if it couldn't be written."""
+    def dump(tmp: Path):
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return write_atomic(path, dump)
@@ -0,0 +1,217 @@
+"""
+Token-budgeted context packing for LLM prompts.
+
+Ranks chat messages by how useful they are as trivia material (length,
+keyword hits, sender diversity and recency), drops duplicates, and packs the
+best ones into a prompt until a token budget is reached.
+"""
+
+import os
+import re
+from typing import Iterable, Optional, Tuple
+
+from utils.lazy import lazy_import, load_env
+from utils.text import TAPBACK_RE
+
+pd = lazy_import("pandas")
+
+# Default prompt budget for message context (override with CONTEXT_TOKEN_BUDGET)
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Words that usually mark a message worth asking about
+DEFAULT_KEYWORDS = [
+    'lmao', 'lmfao', 'haha', 'wtf', 'omg',
+    'fuck', 'shit', 'damn', 'drunk', 'wasted',
+    'gay', 'pride', 'trivia', 'cranberry', 'bentley',
+    'kroger', 'pool', 'farkle', '1280', 'birthday'
+]
+
+# Relative weight of each ranking signal
+SCORE_WEIGHTS = {
+    'length': 1.0,
+    'keywords': 1.5,
+    'recency': 0.75,
+}
+
+# Each additional message from the same sender is worth 1 / (1 + penalty * n)
+SENDER_REPEAT_PENALTY = 0.15
+
+# Fallback estimate without tiktoken: BPE tokens average ~4 bytes of English
+# and fewer for emoji or other scripts, so 3 bytes per token errs high
+BYTES_PER_TOKEN = 3
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+_NORMALIZE_PATTERN = re.compile(r"[^\w\s]+")
+_encodings = {}
+_tiktoken = None
+
+
+def default_token_budget() -> int:
+    """Context token budget from CONTEXT_TOKEN_BUDGET, or DEFAULT_TOKEN_BUDGET."""
+    load_env()
+    return int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def _get_tiktoken():
+    """tiktoken if installed (optional; imported on first use), else False."""
+    global _tiktoken
+    if _tiktoken is None:
+        try:
+            import tiktoken
+            _tiktoken = tiktoken
+        except ImportError:  # Optional - fall back to a local approximation
+            _tiktoken = False
+    return _tiktoken
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count prompt tokens for text.
+
+    Uses tiktoken when installed. Otherwise it estimates conservatively:
+    the larger of the word/punctuation count and one token per
+    BYTES_PER_TOKEN bytes of UTF-8, so emoji and non-English text (several
+    bytes per character, often several tokens) aren't undercounted and the
+    budget isn't overrun.
+
+    Args:
+        text: Text to measure
+        model: Model whose tokenizer should be used
+
+    Returns:
+        Number of tokens
+    """
+    tiktoken = _get_tiktoken()
+    if tiktoken:
+        if model not in _encodings:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        return len(_encodings[model].encode(text))
+    return max(len(_WORD_PATTERN.findall(text)), -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN))
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a message for duplicate detection."""
+    return " ".join(_NORMALIZE_PATTERN.sub(" ", text.lower()).split())
+
+
+def score_messages(messages_df: "pd.DataFrame", keywords: Optional[Iterable[str]] = None,
+                   max_chars: int = 200) -> "pd.Series":
+    """
+    Score messages by their value as trivia context.
+
+    Args:
+        messages_df: DataFrame with 'sender' and 'text' columns (optionally 'timestamp')
+        keywords: Keywords that mark interesting messages
+        max_chars: Length beyond which messages score no higher
+
+    Returns:
+        Series of scores aligned with messages_df
+    """
+    text = messages_df['text'].fillna('').astype(str)
+    lowered = text.str.lower()
+
+    length_score = text.str.len().clip(upper=max_chars) / max_chars
+
+    keywords = list(keywords if keywords is not None else DEFAULT_KEYWORDS)
+    if keywords:
+        pattern = "|".join(re.escape(k.lower()) for k in keywords)
+        keyword_score = lowered.str.count(pattern).clip(upper=3) / 3
+    else:
+        keyword_score = pd.Series(0.0, index=messages_df.index)
+
+    # Newer is better; without timestamps, rows are assumed newest-first
+    if 'timestamp' in messages_df.columns:
+        times = pd.to_datetime(messages_df['timestamp'], errors='coerce')
+        recency_score = times.rank(pct=True).fillna(0.0)
+    else:
+        positions = pd.Series(range(len(messages_df)), index=messages_df.index)
+        recency_score = 1.0 - positions / max(len(messages_df), 1)
+
+    return (SCORE_WEIGHTS['length'] * length_score
+            + SCORE_WEIGHTS['keywords'] * keyword_score
+            + SCORE_WEIGHTS['recency'] * recency_score)
+
+
+def select_messages(messages_df: "pd.DataFrame", token_budget: Optional[int] = None,
+                    keywords: Optional[Iterable[str]] = None, max_chars: int = 200,
+                    model: str = "gpt-4o-mini") -> "pd.DataFrame":
+    """
+    Pick the highest-value unique messages that fit in a token budget.
+
+    Args:
+        messages_df: DataFrame with 'sender' and 'text' columns
+        token_budget: Maximum tokens for the formatted context lines
+            (default: default_token_budget())
+        keywords: Keywords that mark interesting messages
+        max_chars: Per-message truncation length
+        model: Model whose tokenizer is used for counting
+
+    Returns:
+        Selected rows in their original order, with a 'line' column holding
+        the formatted context line
+    """
+    if token_budget is None:
+        token_budget = default_token_budget()
+
+    df = messages_df[messages_df['text'].notna()].copy()
+    # Text-form tapbacks carry no trivia value of their own
+    df = df[~df['text'].astype(str).str.contains(TAPBACK_RE)]
+    if df.empty:
+        df['line'] = pd.Series(dtype=str)
+        return df
+
+    # Dedup pass: keep the first (newest) copy of each normalized message
+    df['_normalized'] = df['text'].astype(str).map(normalize_text)
+    df = df[df['_normalized'] != '']
+    df = df.drop_duplicates('_normalized')
+
+    df['_score'] = score_messages(df, keywords, max_chars)
+
+    # Sender diversity: discount each sender's messages by how many of theirs rank higher
+    df = df.sort_values('_score', ascending=False)
+    sender_rank = df.groupby('sender', sort=False).cumcount()
+    df['_score'] = df['_score'] / (1 + SENDER_REPEAT_PENALTY * sender_rank)
+    df = df.sort_values('_score', ascending=False)
+
+    df['line'] = df['sender'].astype(str) + ": " + df['text'].astype(str).str[:max_chars]
+    df['_tokens'] = df['line'].map(lambda line: count_tokens(line, model) + 1)  # +1 for newline
+
+    # Greedy fill; keeps scanning so smaller messages can use leftover budget
+    keep = []
+    used = 0
+    for index, tokens in df['_tokens'].items():
+        if used + tokens <= token_budget:
+            keep.append(index)
+            used += tokens
+
+    selected = df.loc[keep].sort_index()
+    return selected.drop(columns=['_normalized', '_score', '_tokens'])
+
+
+def build_context(messages_df: "pd.DataFrame", token_budget: Optional[int] = None,
+                  keywords: Optional[Iterable[str]] = None, max_chars: int = 200,
+                  model: str = "gpt-4o-mini") -> Tuple[str, int]:
+    """
+    Build a prompt context block from chat messages within a token budget.
+
+    Args:
+        messages_df: DataFrame with 'sender' and 'text' columns
+        token_budget: Maximum tokens for the context (default: default_token_budget())
+        keywords: Keywords that mark interesting messages
+        max_chars: Per-message truncation length
+        model: Model whose tokenizer is used for counting
+
+    Returns:
+        Tuple of (context text, number of messages included)
+    """
+    if token_budget is None:
+        token_budget = default_token_budget()
+
+    selected = select_messages(messages_df, token_budget, keywords, max_chars, model)
+    context = "\n".join(selected['line'])
+    print(f"📦 Packed {len(selected)} messages (~{count_tokens(context, model)} tokens, "
+          f"budget {token_budget})")
+    return context, len(selected)
@@ -0,0 +1,251 @@
+"""
+Manifest-driven discovery of message CSVs.
+
+Export directories such as ``output/`` hold chat exports next to a growing
+pile of question packs (``pack_*.csv``, ``*_questions.csv``). Instead of
+parsing every CSV and dropping the ones without a ``message`` column, the
+loaders go through a corpus manifest (``.corpus_manifest.json`` in the
+directory). It records each CSV's header, and for message-bearing files also
+the row count, mtime and SHA-256.
+
+On each load:
+- unchanged files (same size and mtime) are classified from the manifest
+  without being opened
+- new or changed files have only their header line sniffed
+- message files are parsed once; the (sender, message, time) rows are kept
+  in a parse cache (``.corpus_cache/``) keyed by content hash, so a
+  touched-but-identical or renamed file is not parsed again
+
+Usage:
+    for filename, rows in load_message_rows("output"):
+        for sender, message, time in rows:
+            ...
+
+    python -m utils.corpus output/            # list message files and skipped CSVs
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+MANIFEST_NAME = ".corpus_manifest.json"
+CACHE_DIR_NAME = ".corpus_cache"
+MANIFEST_VERSION = 1
+
+# Columns a CSV needs to count as a message export
+MESSAGE_COLUMNS = {"sender", "message"}
+
+MESSAGES, OTHER = "messages", "other"
+
+MessageRow = Tuple[str, str, str]
+PathLike = Union[str, Path]
+
+
+def sniff_columns(path: PathLike) -> List[str]:
+    """Header of a CSV, reading only its first line."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader([f.readline()]), [])
+
+
+def parse_message_rows(text: str) -> Tuple[List[str], List[MessageRow]]:
+    """
+    (sender, message, time) for every row with a message.
+
+    Returns:
+        (header, rows)
+    """
+    reader = csv.reader(io.StringIO(text, newline=""))
+    columns = next(reader, [])
+    sender_at, message_at = columns.index("sender"), columns.index("message")
+    time_at = columns.index("time") if "time" in columns else None
+
+    rows = []
+    for row in reader:
+        if len(row) <= message_at or not row[message_at]:
+            continue
+        sender = row[sender_at] if len(row) > sender_at else ""
+        time = row[time_at] if time_at is not None and len(row) > time_at else ""
+        rows.append((sender, row[message_at], time))
+    return columns, rows
+
+
+class CorpusManifest:
+    """
+    Manifest and parse cache for one export directory.
+
+    Args:
+        directory: Directory holding the CSVs
+        persist: Write the manifest and parse cache back to the directory
+            (falls back to in-memory only if the directory isn't writable)
+    """
+
+    def __init__(self, directory: PathLike, persist: bool = True):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / MANIFEST_NAME
+        self.cache_dir = self.directory / CACHE_DIR_NAME
+        self.persist = persist
+        self.files: Dict[str, Dict] = self._load()
+        self._rows: Dict[str, List[MessageRow]] = {}
+        self.stats = {"parsed": 0, "cached": 0, "sniffed": 0, "skipped": 0}
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if data.get("version") == MANIFEST_VERSION else {}
+
+    def save(self):
+        if not self.persist:
+            return
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=1)
+            os.replace(tmp, self.manifest_path)
+        except OSError:
+            self.persist = False
+
+    # --------------------------------------------------------------------------
+    # Parse cache
+    # --------------------------------------------------------------------------
+
+    def _cache_path(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256[:32]}.pickle"
+
+    def _read_cache(self, sha256: str) -> Optional[List[MessageRow]]:
+        try:
+            with open(self._cache_path(sha256), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_cache(self, sha256: str, rows: List[MessageRow]):
+        if not self.persist:
+            return
+        try:
+            self.cache_dir.mkdir(exist_ok=True)
+            with open(self._cache_path(sha256), "wb") as f:
+                pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+    def _prune_cache(self):
+        """Drop cached parses no manifest entry points at any more."""
+        if not self.persist or not self.cache_dir.is_dir():
+            return
+        live = {self._cache_path(e["sha256"]).name for e in self.files.values() if e.get("sha256")}
+        for path in self.cache_dir.glob("*.pickle"):
+            if path.name not in live:
+                path.unlink(missing_ok=True)
+
+    # --------------------------------------------------------------------------
+    # Discovery
+    # --------------------------------------------------------------------------
+
+    def refresh(self) -> List[str]:
+        """
+        Bring the manifest in line with the directory.
+
+        Returns:
+            Message CSV names, sorted
+        """
+        current = {}
+        changed = False
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if not entry.name.endswith(".csv") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            known = self.files.get(entry.name)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                current[entry.name] = known
+                continue
+
+            try:
+                record = self._examine(Path(entry.path), stat)
+            except (OSError, UnicodeDecodeError, csv.Error, ValueError) as e:
+                print(f"Error reading {entry.name}: {e}")
+                continue
+            current[entry.name] = record
+            changed = True
+
+        removed = self.files.keys() - current.keys()
+        self.files = current
+        if changed or removed:
+            self.save()
+            self._prune_cache()
+        self.stats["skipped"] = sum(e["kind"] == OTHER for e in current.values())
+        return [name for name, e in current.items() if e["kind"] == MESSAGES]
+
+    def _examine(self, path: Path, stat: os.stat_result) -> Dict:
+        """Manifest entry for a new or changed file; parses it if it holds messages."""
+        self.stats["sniffed"] += 1
+        columns = sniff_columns(path)
+        record = {"kind": OTHER, "columns": columns, "size": stat.st_size,
+                  "mtime_ns": stat.st_mtime_ns}
+        if not MESSAGE_COLUMNS.issubset(columns):
+            return record
+
+        data = path.read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        rows = self._read_cache(sha256)
+        if rows is None:
+            _, rows = parse_message_rows(data.decode("utf-8"))
+            self._write_cache(sha256, rows)
+            self.stats["parsed"] += 1
+        else:
+            self.stats["cached"] += 1
+        self._rows[path.name] = rows
+        record.update(kind=MESSAGES, rows=len(rows), sha256=sha256)
+        return record
+
+    def rows(self, name: str) -> List[MessageRow]:
+        """Message rows of one listed file, from memory, the parse cache, or the file."""
+        if name in self._rows:
+            return self._rows[name]
+        record = self.files[name]
+        rows = self._read_cache(record["sha256"])
+        if rows is None:
+            with open(self.directory / name, "r", encoding="utf-8", newline="") as f:
+                _, rows = parse_message_rows(f.read())
+            self._write_cache(record["sha256"], rows)
+            self.stats["parsed"] += 1
+        else:
+            self.stats["cached"] += 1
+        self._rows[name] = rows
+        return rows
+
+    def iter_messages(self) -> Iterator[Tuple[str, List[MessageRow]]]:
+        """(filename, rows) for every message CSV in the directory."""
+        for name in self.refresh():
+            yield name, self.rows(name)
+
+
+def load_message_rows(directory: PathLike) -> Iterator[Tuple[str, List[MessageRow]]]:
+    """(filename, [(sender, message, time), ...]) for each message CSV in a directory."""
+    return CorpusManifest(directory).iter_messages()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the message corpus manifest for a directory")
+    parser.add_argument("directory", nargs="?", default="output", help="Export directory")
+    args = parser.parse_args()
+
+    manifest = CorpusManifest(args.directory)
+    names = manifest.refresh()
+    print(f"📚 {len(names)} message files in {args.directory}")
+    for name in names:
+        entry = manifest.files[name]
+        print(f"  {name:40} {entry['rows']:>8} rows  {entry['sha256'][:12]}")
+    print(f"⏭️  {manifest.stats['skipped']} other CSVs skipped by header")
+
+
+if __name__ == "__main__":
+    main()
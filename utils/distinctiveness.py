@@ -0,0 +1,226 @@
+"""
+BM25 distinctiveness scores for quote mining.
+
+The quote finders used to keep a message only if it contained one of ~20
+hard-coded words. ``DistinctivenessIndex`` instead scores every message by
+how unusual its words are, in two baselines:
+
+- group: BM25 with IDF over the whole corpus (what nobody usually says)
+- sender: BM25 with IDF over the sender's own messages (what this person
+  doesn't usually say)
+
+Term statistics are built as sparse COO arrays (message, term, tf) with
+``np.unique``/``np.bincount``, so scoring is one vectorized pass. Words that
+occur only once in the corpus are treated as occurring MIN_DF times, so
+typos and pasted links don't dominate. Scores are cached next to the corpus
+and reused while its messages are unchanged.
+
+Usage:
+    index = DistinctivenessIndex(texts, senders, cache_path=distinctiveness_path("output"))
+    index.scores                               # group, sender, distinctiveness per message
+    best = index.top_k(5, eligible=mask)       # {sender: [positions, best first]}
+    quotes = round_robin(best)                 # best of everyone first
+
+    python -m utils.distinctiveness output/chat_export.csv
+"""
+
+import argparse
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from utils.cache import cache_path, load_pickle, save_pickle
+from utils.lazy import lazy_import
+from utils.text import URL_RE
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".distinct.pkl"
+DIRECTORY_CACHE = "distinctiveness.pkl"
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Floor on document frequency, so one-off words (typos, links) aren't the most distinctive
+MIN_DF = 2
+
+# Blend of the group and sender baselines
+GROUP_WEIGHT = 0.6
+SENDER_WEIGHT = 0.4
+
+# Messages need this many distinct words to be scored at all
+MIN_TERMS = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9']*|[\U0001F300-\U0001FAFF☀-➿]")
+
+PathLike = Union[str, Path]
+
+
+def distinctiveness_path(corpus_path: PathLike) -> Path:
+    """Cache location for a corpus: ``<name>.distinct.pkl`` next to a file, or in a directory's cache."""
+    return cache_path(corpus_path, CACHE_SUFFIX, DIRECTORY_CACHE)
+
+
+def _bm25_idf(df: "np.ndarray", n_docs: "np.ndarray") -> "np.ndarray":
+    df = np.maximum(df, MIN_DF)
+    return np.log1p(np.maximum(n_docs - df + 0.5, 0.5) / (df + 0.5))
+
+
+def _corpus_key(texts: "pd.Series", senders: "pd.Series") -> str:
+    hashed = pd.util.hash_pandas_object(pd.DataFrame({"t": texts, "s": senders}), index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()
+
+
+class DistinctivenessIndex:
+    """
+    Per-message BM25 distinctiveness against the group and sender baselines.
+
+    Args:
+        texts: Message texts
+        senders: Sender of each message
+        cache_path: Pickle cache (see distinctiveness_path()); None computes in memory
+    """
+
+    def __init__(self, texts: Sequence[str], senders: Sequence[str],
+                 cache_path: Optional[PathLike] = None):
+        self.texts = pd.Series(list(texts), dtype=object).fillna("").astype(str)
+        self.senders = pd.Series(list(senders), dtype=object).fillna("").astype(str)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cached = False
+
+        key = _corpus_key(self.texts, self.senders)
+        scores = self._load(key)
+        if scores is None:
+            scores = self._compute()
+            self._save(key, scores)
+        else:
+            self.cached = True
+        self.scores = scores
+
+    # --------------------------------------------------------------------------
+    # Cache
+    # --------------------------------------------------------------------------
+
+    def _load(self, key: str) -> Optional["pd.DataFrame"]:
+        data = load_pickle(self.cache_path)
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION and data.get("key") == key:
+            return data["scores"]
+        return None
+
+    def _save(self, key: str, scores: "pd.DataFrame"):
+        if not self.cache_path:
+            return
+        if not save_pickle({"version": CACHE_VERSION, "key": key, "scores": scores}, self.cache_path):
+            self.cache_path = None
+
+    # --------------------------------------------------------------------------
+    # Scoring
+    # --------------------------------------------------------------------------
+
+    def _terms(self):
+        """(doc, term) id per token occurrence."""
+        vocab: Dict[str, int] = {}
+        lookup = vocab.setdefault
+        docs, terms = [], []
+        findall, strip = _TOKEN_RE.findall, URL_RE.sub
+        for doc, text in enumerate(self.texts):
+            tokens = findall(strip(" ", text.lower()))
+            if tokens:
+                docs.extend([doc] * len(tokens))
+                terms.extend(lookup(t, len(vocab)) for t in tokens)
+        return np.asarray(docs, dtype=np.int64), np.asarray(terms, dtype=np.int64), len(vocab)
+
+    def _compute(self) -> "pd.DataFrame":
+        n = len(self.texts)
+        docs, terms, vocab_size = self._terms()
+        result = pd.DataFrame({"group": np.zeros(n), "sender": np.zeros(n),
+                               "distinctiveness": np.zeros(n)})
+        if not len(docs):
+            return result
+
+        # Term frequency per (doc, term)
+        pairs, tf = np.unique(docs * vocab_size + terms, return_counts=True)
+        doc, term = pairs // vocab_size, pairs % vocab_size
+        doc_len = np.bincount(doc, weights=tf, minlength=n)
+        n_terms = np.bincount(doc, minlength=n)
+        has_terms = n_terms > 0
+        avg_len = doc_len[has_terms].mean()
+        saturation = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len[doc] / avg_len))
+
+        # Group baseline: document frequency over the whole corpus
+        group_idf = _bm25_idf(np.bincount(term, minlength=vocab_size)[term], has_terms.sum())
+
+        # Sender baseline: document frequency within each sender's messages
+        sender_codes, sender_names = pd.factorize(self.senders)
+        pair_sender = sender_codes[doc]
+        sender_pairs, sender_df = np.unique(pair_sender * vocab_size + term, return_counts=True)
+        docs_per_sender = np.bincount(sender_codes[has_terms], minlength=len(sender_names))
+        pair_df = sender_df[np.searchsorted(sender_pairs, pair_sender * vocab_size + term)]
+        sender_idf = _bm25_idf(pair_df, docs_per_sender[pair_sender])
+
+        norm = np.sqrt(np.maximum(n_terms, 1))
+        group = np.bincount(doc, weights=saturation * group_idf, minlength=n) / norm
+        sender = np.bincount(doc, weights=saturation * sender_idf, minlength=n) / norm
+        enough = n_terms >= MIN_TERMS
+        result["group"] = np.where(enough, group, 0.0)
+        result["sender"] = np.where(enough, sender, 0.0)
+        result["distinctiveness"] = GROUP_WEIGHT * result["group"] + SENDER_WEIGHT * result["sender"]
+        return result
+
+    def top_k(self, k: int, eligible: Optional[Sequence[bool]] = None,
+              senders: Optional[Sequence[str]] = None) -> Dict[str, List[int]]:
+        """
+        The k most distinctive messages of every sender.
+
+        Args:
+            k: Messages per sender
+            eligible: Boolean mask of messages that may be picked
+            senders: Only these senders (default: all)
+
+        Returns:
+            {sender: [positions, most distinctive first]}, repeated texts
+            counted once
+        """
+        frame = self.scores.assign(who=self.senders.to_numpy())
+        keep = frame["distinctiveness"] > 0
+        if eligible is not None:
+            keep &= np.asarray(eligible, dtype=bool)
+        if senders is not None:
+            keep &= frame["who"].isin(senders)
+        ranked = frame[keep].sort_values("distinctiveness", ascending=False, kind="stable")
+        # The same line pasted or repeated counts once
+        ranked = ranked[~self.texts.loc[ranked.index].str.lower().str.strip().duplicated().to_numpy()]
+        best = ranked.groupby("who", sort=False).head(k)
+        return {sender: group.index.tolist() for sender, group in best.groupby("who", sort=False)}
+
+
+def round_robin(per_sender: Dict[str, List[int]]) -> List[int]:
+    """Interleave top_k() lists: everyone's best, then everyone's second best, ..."""
+    lists = list(per_sender.values())
+    return [lst[i] for i in range(max(map(len, lists), default=0)) for lst in lists if i < len(lst)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Most distinctive messages per sender in a chat export")
+    parser.add_argument("csv", nargs="?", default="output/chat_export.csv", help="Chat export CSV")
+    parser.add_argument("-k", type=int, default=5, help="Messages per sender")
+    args = parser.parse_args()
+
+    csv_path = os.path.expanduser(args.csv)
+    df = pd.read_csv(csv_path)
+    index = DistinctivenessIndex(df["text"], df["sender"], cache_path=distinctiveness_path(csv_path))
+    lengths = df["text"].fillna("").astype(str).str.len()
+    print(f"🔎 Scored {len(df)} messages{' (cached)' if index.cached else ''}")
+    for sender, positions in index.top_k(args.k, eligible=lengths.between(20, 150)).items():
+        print(f"\n{sender}:")
+        for pos in positions:
+            print(f"  {index.scores['distinctiveness'].iat[pos]:5.2f}  {df['text'].iat[pos]}")
+
+
+if __name__ == "__main__":
+    main()
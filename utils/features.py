@@ -0,0 +1,315 @@
+"""
+Persistent per-message feature store.
+
+The generators all derive the same things from each message: text length,
+hour and weekday, emoji count, curse counts, keyword hits and whether the
+message is a reaction. ``compute_features()`` derives all of them at once
+with vectorized string operations, and ``FeatureStore`` keeps the result
+next to the corpus, keyed by a hash of (sender, text, time). Later runs only
+compute features for rows the store hasn't seen.
+
+Columns:
+- ``length``, ``emoji_count``, ``curse_count``
+- ``hour`` (0-23), ``weekday`` (0 = Monday), ``is_weekend``; null when the
+  row has no usable time. With ``home_zones=True`` these are taken in each
+  sender's home time zone (utils/timezones.py) rather than read off the
+  UTC export timestamps.
+- ``kw_<group>`` flags for each group in ``KEYWORD_GROUPS`` (substring match
+  on the lowercased text, like the generators always did)
+
+Usage:
+    df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
+    late = df[df["hour"] < 5]
+
+    features = message_features(analyzer.all_messages, feature_path(output_dir))
+
+    python -m utils.features output/chat_export.csv     # build or update the store
+"""
+
+import argparse
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+
+from utils.cache import cache_path, load_pickle, write_atomic
+from utils.lazy import lazy_import
+from utils.timezones import local_time_parts, sender_zones
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+FEATURE_VERSION = 1
+FEATURE_SUFFIX = ".features.pkl"
+
+# Store for a directory corpus, inside the corpus cache (utils/corpus.py)
+DIRECTORY_STORE = "features.pkl"
+
+# Emoji code point ranges; each emoji character counts once
+EMOJI_CHARS = (
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "\U0001F900-\U0001F9FF"  # supplemental symbols
+    "\U0001FA00-\U0001FAFF"  # extended-A
+    "]"
+)
+
+# Counted per occurrence for curse_count (substrings, so "ass" also hits "class")
+CURSE_WORDS = ("fuck", "shit", "ass", "bitch", "damn")
+
+# kw_<group> is True when the lowercased text contains any of the group's phrases
+KEYWORD_GROUPS: Dict[str, Sequence[str]] = {
+    "laughter": ("lmao", "lmfao", "haha"),
+    "cursing": ("fuck", "shit"),
+    "fuck": ("fuck",),
+    "gay": ("gay",),
+    "pride": ("gay", "pride"),
+    "trivia": ("trivia",),
+    "dogs": ("cranberry", "bentley", "cb"),
+    "games": ("pool", "farkle"),
+    "building": ("1280",),
+    "work": ("work",),
+    "kroger": ("kroger",),
+    "drunk": ("passed out", "drunk", "wasted", "fucked up"),
+    "savage": ("fuck", "shit", "ass", "bitch", "damn", "hell", "wtf", "gay"),
+    "memorable": ("lmao", "lmfao", "haha", "wtf", "omg", "fuck", "shit", "damn", "hell",
+                  "gay", "pride", "trivia", "cranberry", "bentley",
+                  "savage", "queen", "iconic", "loved", "obsessed"),
+    # Text-form tapbacks ("Loved “...”") and the words that give them away
+    "reaction": ("loved", "laughed at", "liked", "emphasized", "questioned"),
+    "reacted": ("reacted",),
+}
+
+FEATURE_COLUMNS = (["length", "emoji_count", "curse_count", "hour", "weekday", "is_weekend"]
+                   + [f"kw_{group}" for group in KEYWORD_GROUPS])
+
+# "3:45 PM" anywhere in a free-form time string
+_CLOCK_PATTERN = r"(?P<hour>\d{1,2}):\d{2}\s*(?P<period>[AaPp][Mm])"
+
+_EMOJI_RE = re.compile(EMOJI_CHARS)
+
+# All keyword groups are matched in one scan: a lookahead finds every phrase
+# starting at each position (longest first), and each phrase maps to a bit
+# mask of the groups it satisfies, including groups of phrases it contains
+# ("fucked up" also counts as "fuck").
+_PHRASES = sorted({p for phrases in KEYWORD_GROUPS.values() for p in phrases}, key=len, reverse=True)
+_PHRASE_RE = re.compile("(?=(" + "|".join(re.escape(p) for p in _PHRASES) + "))")
+_ANY_PHRASE_RE = re.compile("|".join(re.escape(p) for p in _PHRASES))
+_PHRASE_BITS = {
+    phrase: sum(1 << i for i, phrases in enumerate(KEYWORD_GROUPS.values())
+                if any(p in phrase for p in phrases))
+    for phrase in _PHRASES
+}
+
+PathLike = Union[str, Path]
+
+
+def feature_path(corpus_path: PathLike) -> Path:
+    """Store location for a corpus: ``<name>.features.pkl`` next to a file, or in a directory's cache."""
+    return cache_path(corpus_path, FEATURE_SUFFIX, DIRECTORY_STORE)
+
+
+def _local_times(times: "pd.Series", zones: Optional["pd.Series"] = None) -> "pd.DataFrame":
+    """
+    hour, weekday and is_weekend from timestamps, ISO strings or "... 3:45 PM" strings.
+
+    With zones, timestamps are UTC and converted to each row's zone; without,
+    they are taken as already local.
+    """
+    if zones is not None:
+        local = local_time_parts(times, zones)
+        hour, weekday = local["hour"], local["weekday"]
+    else:
+        if pd.api.types.is_datetime64_any_dtype(times):
+            parsed = times
+        else:
+            # Exports write ISO timestamps; anything else falls through to the clock pattern
+            parsed = pd.to_datetime(times, format="ISO8601", errors="coerce")
+        hour = parsed.dt.hour.astype("Int8")
+        weekday = parsed.dt.dayofweek.astype("Int8")
+
+    # Clock-only strings ("Oct 3 3:45 PM"): hour from the clock, no weekday
+    missing = hour.isna() & times.notna()
+    if missing.any():
+        clock = times[missing].astype(str).str.extract(_CLOCK_PATTERN)
+        twelve = pd.to_numeric(clock["hour"], errors="coerce") % 12
+        is_pm = clock["period"].str.upper() == "PM"
+        hour[missing] = (twelve + is_pm.astype(int) * 12).astype("Int8")
+
+    return pd.DataFrame({"hour": hour, "weekday": weekday, "is_weekend": weekday >= 5},
+                        index=times.index)
+
+
+def compute_features(df: "pd.DataFrame", text_col: str = "text",
+                     time_col: Optional[str] = "timestamp",
+                     zone_col: Optional[str] = None) -> "pd.DataFrame":
+    """
+    Features for every row, in one pass per feature family.
+
+    Args:
+        df: Messages
+        text_col: Message text column
+        time_col: Timestamp or time-string column (None or missing: no time features)
+        zone_col: IANA zone per row; time_col is then UTC and converted to it
+
+    Returns:
+        DataFrame of FEATURE_COLUMNS aligned with df
+    """
+    text = df[text_col].fillna("").astype(str)
+    texts = text.tolist()
+    lowered = [t.lower() for t in texts]
+    n = len(texts)
+
+    def group_mask(t, findall=_PHRASE_RE.findall, any_phrase=_ANY_PHRASE_RE.search):
+        mask = 0
+        if any_phrase(t):
+            for phrase in findall(t):
+                mask |= _PHRASE_BITS[phrase]
+        return mask
+
+    features = pd.DataFrame({
+        "length": text.str.len().astype("int32"),
+        "emoji_count": np.fromiter((0 if t.isascii() else len(_EMOJI_RE.findall(t)) for t in texts),
+                                   np.int32, n),
+        "curse_count": sum(np.fromiter((t.count(w) for t in lowered), np.int32, n)
+                           for w in CURSE_WORDS),
+    }, index=df.index)
+
+    if time_col and time_col in df.columns:
+        zones = df[zone_col] if zone_col and zone_col in df.columns else None
+        features = features.join(_local_times(df[time_col], zones))
+    else:
+        features["hour"] = pd.Series(pd.NA, index=df.index, dtype="Int8")
+        features["weekday"] = pd.Series(pd.NA, index=df.index, dtype="Int8")
+        features["is_weekend"] = pd.Series(pd.NA, index=df.index, dtype="boolean")
+
+    masks = np.fromiter((group_mask(t) for t in lowered), np.int64, n)
+    for i, group in enumerate(KEYWORD_GROUPS):
+        features[f"kw_{group}"] = (masks >> i) & 1 == 1
+    return features[FEATURE_COLUMNS]
+
+
+def row_keys(df: "pd.DataFrame", columns: Sequence[str]) -> "pd.Series":
+    """Stable 64-bit key per row from the given columns."""
+    present = [c for c in columns if c in df.columns]
+    return pd.util.hash_pandas_object(df[present].astype(str), index=False)
+
+
+class FeatureStore:
+    """
+    Features for one corpus, persisted as a pickled DataFrame keyed by row hash.
+
+    Args:
+        path: Store file (see feature_path()); None keeps it in memory only
+    """
+
+    def __init__(self, path: Optional[PathLike] = None):
+        self.path = Path(path) if path else None
+        self.table = self._load()
+        self.stats = {"cached": 0, "computed": 0}
+
+    def _load(self) -> "pd.DataFrame":
+        table = load_pickle(self.path)
+        if isinstance(table, pd.DataFrame) and table.attrs.get("version") == FEATURE_VERSION:
+            return table
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    def save(self):
+        if not self.path:
+            return
+        self.table.attrs["version"] = FEATURE_VERSION
+        if not write_atomic(self.path, self.table.to_pickle):
+            self.path = None
+
+    def update(self, df: "pd.DataFrame", text_col: str = "text", sender_col: str = "sender",
+               time_col: Optional[str] = "timestamp", zone_col: Optional[str] = None) -> "pd.DataFrame":
+        """
+        Features for df, computing only rows the store hasn't seen.
+
+        The store is trimmed to the rows of df, so it tracks the current corpus.
+        The zone is part of the row key, so moving a sender to another zone
+        recomputes just their rows.
+
+        Returns:
+            DataFrame of FEATURE_COLUMNS aligned with df
+        """
+        keys = row_keys(df, [sender_col, text_col] + ([time_col] if time_col else [])
+                        + ([zone_col] if zone_col else []))
+        unique = pd.Index(keys.unique())
+        known = unique.isin(self.table.index)
+        stored = len(self.table)
+
+        if not known.all():
+            fresh_rows = df.loc[~keys.duplicated() & ~keys.isin(self.table.index)]
+            fresh = compute_features(fresh_rows, text_col=text_col, time_col=time_col,
+                                     zone_col=zone_col)
+            fresh.index = keys.loc[fresh_rows.index].values
+            self.table = pd.concat([self.table.loc[unique[known]], fresh]) if known.any() else fresh
+        else:
+            self.table = self.table.loc[unique]
+
+        self.stats["cached"] = int(known.sum())
+        self.stats["computed"] = int((~known).sum())
+        if self.stats["computed"] or stored != len(self.table):
+            self.save()
+
+        features = self.table.reindex(keys.values)
+        features.index = df.index
+        return features
+
+
+def add_features(df: "pd.DataFrame", store_path: Optional[PathLike] = None, text_col: str = "text",
+                 sender_col: str = "sender", time_col: Optional[str] = "timestamp",
+                 home_zones: bool = False) -> "pd.DataFrame":
+    """
+    df with the feature columns added (existing columns of the same name are replaced).
+
+    Args:
+        df: Messages
+        store_path: Persistent store (see feature_path()); None computes in memory
+        text_col, sender_col, time_col: Columns of df to use
+        home_zones: time_col holds UTC export timestamps; bucket hour/weekday
+            in each sender's home zone and add a 'timezone' column
+
+    Returns:
+        A new DataFrame
+    """
+    zone_col = None
+    if home_zones:
+        df = df.assign(timezone=sender_zones(df[sender_col]))
+        zone_col = "timezone"
+    features = FeatureStore(store_path).update(df, text_col=text_col, sender_col=sender_col,
+                                               time_col=time_col, zone_col=zone_col)
+    return df.drop(columns=[c for c in FEATURE_COLUMNS if c in df.columns]).join(features)
+
+
+def message_features(messages: Sequence[Dict], store_path: Optional[PathLike] = None) -> "pd.DataFrame":
+    """
+    Features for the CSV analyzers' message dicts ('sender', 'message', 'time').
+
+    Returns:
+        DataFrame of FEATURE_COLUMNS, row i belonging to messages[i]
+    """
+    df = pd.DataFrame(list(messages), columns=["sender", "message", "time"])
+    return FeatureStore(store_path).update(df, text_col="message", time_col="time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the feature store for a chat export")
+    parser.add_argument("csv", nargs="?", default="output/chat_export.csv", help="Chat export CSV")
+    args = parser.parse_args()
+
+    store = FeatureStore(feature_path(args.csv))
+    df = pd.read_csv(os.path.expanduser(args.csv))
+    features = store.update(df.assign(timezone=sender_zones(df["sender"])), zone_col="timezone")
+    print(f"🧮 {len(features)} messages: {store.stats['computed']} computed, "
+          f"{store.stats['cached']} from the store ({store.path})")
+
+
+if __name__ == "__main__":
+    main()
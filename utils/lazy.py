@@ -0,0 +1,52 @@
+"""
+Deferred imports and environment loading for fast CLI startup.
+
+pandas, requests and the OpenAI SDK take hundreds of milliseconds to import,
+and most CLI paths (--help, --mode emoji, ...) never touch them in-process.
+Modules bind them with lazy_import() and only pay on first attribute access.
+"""
+
+import importlib.util
+import sys
+
+_env_loaded = False
+
+
+def lazy_import(name: str):
+    """
+    Import a module lazily; it is executed on first attribute access.
+
+    Args:
+        name: Fully qualified module name (e.g. 'pandas')
+
+    Returns:
+        The module (already loaded, or a lazy placeholder in sys.modules)
+
+    Examples:
+        >>> pd = lazy_import("pandas")   # instant
+        >>> df = pd.DataFrame()          # pandas is imported here
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def load_env() -> None:
+    """Load .env into the environment once, on first need."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+
+    from dotenv import load_dotenv
+    load_dotenv()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the OpenAI chat completions API.
+
+Serves ``POST /v1/chat/completions`` (streaming and non-streaming) from one of:
+- synthetic: plausible, schema-valid completions generated locally
+- replay:    responses recorded earlier in a cassette file
+- record:    forwards to the real API once and appends responses to the cassette
+
+Latency, jitter and error rates (429 with Retry-After, or 500) are
+configurable and seeded, so concurrency, caching and retry paths can be
+exercised deterministically without network access.
+
+Usage:
+    python utils/mock_openai.py --mode synthetic --latency 0.2 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python generate_questions.py --mode trivia
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.context_builder import count_tokens
+
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+DEFAULT_CASSETTE = Path(__file__).parent.parent / "output" / "openai_cassette.jsonl"
+SYNTHETIC_NAMES = ["Lauren", "Benny Harris", "Ian O'Malley", "Gina Ortiz", "Jackson"]
+
+# Request fields that don't change what the model would answer
+_UNKEYED_FIELDS = {"stream", "stream_options", "user"}
+
+
+def request_key(body):
+    """Stable cassette key for a chat completion request."""
+    keyed = {k: v for k, v in body.items() if k not in _UNKEYED_FIELDS}
+    canonical = json.dumps(keyed, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Append-only JSON Lines store of recorded completions, keyed by request."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry["content"]
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, body, content):
+        with self._lock:
+            self.entries[key] = content
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "key": key,
+                    "model": body.get("model"),
+                    "recorded_at": int(time.time()),
+                    "content": content
+                }, ensure_ascii=False) + "\n")
+
+
+# ==============================================================================
+# SYNTHETIC COMPLETIONS
+# ==============================================================================
+
+class SyntheticResponder:
+    """Builds plausible completions for every prompt shape the generators send."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self._counter = 0
+
+    def _next(self):
+        self._counter += 1
+        return self._counter
+
+    def respond(self, body):
+        schema = (body.get("response_format") or {}).get("json_schema", {}).get("schema")
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        count = self._requested_count(prompt)
+
+        if schema:
+            return json.dumps(self._from_schema(schema, count))
+        if '"roast_score"' in prompt:
+            numbers = [int(n) for n in re.findall(r"^(\d+)\. ", prompt, re.MULTILINE)]
+            return json.dumps([self._roast_score(n) for n in numbers])
+        if '"speaker"' in prompt:
+            return json.dumps([self._quote() for _ in range(count)])
+        if '"options": [' in prompt:
+            return json.dumps([self._indexed_question() for _ in range(count)])
+        return json.dumps([self._lettered_question() for _ in range(count)], indent=2)
+
+    def _requested_count(self, prompt):
+        match = re.search(r"(?:generate|select the)\s+(\d+)", prompt, re.IGNORECASE)
+        return int(match.group(1)) if match else 5
+
+    def _roast_score(self, number):
+        return {"message_number": number, "roast_score": self.rng.randint(0, 10),
+                "reason": "synthetic score"}
+
+    def _quote(self):
+        n = self._next()
+        return {"quote": f"Synthetic unhinged quote number {n}",
+                "speaker": self.rng.choice(SYNTHETIC_NAMES), "reason": "synthetic"}
+
+    def _options(self):
+        n = self._next()
+        return [f"Option {letter}{n}" for letter in "ABCD"]
+
+    def _lettered_question(self):
+        n = self._next()
+        options = self._options()
+        return {
+            "question": f"Synthetic question number {n}?",
+            "options": dict(zip("ABCD", options)),
+            "correct_answer": self.rng.choice("ABCD"),
+            "explanation": f"Synthetic explanation for question {n}",
+            "difficulty": self.rng.choice(["easy", "medium", "hard"]),
+            "category": "Synthetic"
+        }
+
+    def _indexed_question(self):
+        question = self._lettered_question()
+        question["options"] = list(question["options"].values())
+        question["correct_answer"] = "ABCD".index(question["correct_answer"])
+        return question
+
+    def _from_schema(self, schema, count, name=""):
+        kind = schema.get("type")
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        if kind == "object":
+            props = schema.get("properties", {})
+            value = {key: self._from_schema(sub, count, key) for key, sub in props.items()}
+            if value.get("type") == "who-said-it" and "text" in value:
+                value["text"] = f'Who said: "Synthetic quote {self._next()}"?'
+            return value
+        if kind == "array":
+            if name == "options" or schema.get("minItems") == schema.get("maxItems") == 4:
+                return self._options()
+            size = count if name == "questions" else schema.get("minItems", 2)
+            return [self._from_schema(schema.get("items", {}), count, name) for _ in range(size)]
+        if kind == "integer":
+            return self.rng.randint(schema.get("minimum", 0), schema.get("maximum", 3))
+        if kind == "number":
+            return round(self.rng.uniform(schema.get("minimum", 0), schema.get("maximum", 1)), 3)
+        if kind == "boolean":
+            return self.rng.random() < 0.5
+        return f"Synthetic {name or 'value'} {self._next()}"
+
+
+# ==============================================================================
+# SERVER
+# ==============================================================================
+
+class MockOpenAIServer:
+    """
+    Local OpenAI-compatible server running in a background thread.
+
+    Args:
+        mode: 'synthetic', 'replay' or 'record'
+        cassette: Path of the JSON Lines cassette (replay/record)
+        host, port: Bind address (port 0 picks a free port)
+        latency: Base seconds before responding
+        jitter: Extra uniform random seconds on top of latency
+        error_rate: Fraction of requests that fail
+        rate_limit_ratio: Share of failures returned as 429 (rest are 500)
+        retry_after: Retry-After seconds sent with 429s
+        seed: Seed for latency, errors and synthetic content
+        fallback: In replay mode, synthesize on cassette misses instead of 404
+        upstream: Real API base URL used in record mode
+        chunk_size: Characters per streamed delta
+    """
+
+    def __init__(self, mode="synthetic", cassette=DEFAULT_CASSETTE, host="127.0.0.1", port=0,
+                 latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_ratio=0.7,
+                 retry_after=1, seed=None, fallback=False, upstream=DEFAULT_UPSTREAM,
+                 chunk_size=16):
+        if mode not in ("synthetic", "replay", "record"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.cassette = Cassette(cassette) if mode != "synthetic" else None
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.fallback = fallback
+        self.upstream = upstream.rstrip("/")
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.synthetic = SyntheticResponder(random.Random(seed))
+        self.stats = {"requests": 0, "errors": 0, "replayed": 0, "recorded": 0, "synthetic": 0}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Start serving in a daemon thread and return the base URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def client(self, **kwargs):
+        """OpenAI client pointed at this server."""
+        from openai import OpenAI
+        return OpenAI(api_key="offline", base_url=self.base_url, **kwargs)
+
+    # --------------------------------------------------------------------------
+
+    def _plan(self):
+        """Decide delay and injected failure for one request (seeded, thread-safe)."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            failure = None
+            if self.error_rate and self.rng.random() < self.error_rate:
+                failure = 429 if self.rng.random() < self.rate_limit_ratio else 500
+                self.stats["errors"] += 1
+        return delay, failure
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _content_for(self, body, auth_header):
+        """Return (status, content or error message)."""
+        if self.mode == "synthetic":
+            self._count("synthetic")
+            with self._lock:
+                return 200, self.synthetic.respond(body)
+
+        key = request_key(body)
+        content = self.cassette.get(key)
+        if content is not None:
+            self._count("replayed")
+            return 200, content
+
+        if self.mode == "replay":
+            if self.fallback:
+                self._count("synthetic")
+                with self._lock:
+                    return 200, self.synthetic.respond(body)
+            return 404, f"No recorded response for request {key[:12]}"
+
+        status, content = self._forward(body, auth_header)
+        if status == 200:
+            self.cassette.put(key, body, content)
+            self._count("recorded")
+        return status, content
+
+    def _forward(self, body, auth_header):
+        upstream_body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        headers = {"Content-Type": "application/json"}
+        api_key = os.getenv("OPENAI_API_KEY")
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        elif auth_header:
+            headers["Authorization"] = auth_header
+        request = urllib.request.Request(
+            f"{self.upstream}/chat/completions",
+            data=json.dumps(upstream_body).encode("utf-8"),
+            headers=headers,
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                payload = json.loads(response.read())
+            return 200, payload["choices"][0]["message"]["content"] or ""
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode("utf-8", errors="replace")
+        except urllib.error.URLError as e:
+            return 502, f"Upstream unreachable: {e.reason}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": "gpt-4o-mini", "object": "model", "owned_by": "mock"}
+                    ]})
+                else:
+                    self._send_error(404, "Not found", "not_found")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    return self._send_error(400, "Invalid JSON body", "invalid_request_error")
+
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send_error(404, f"Unknown endpoint {self.path}", "not_found")
+
+                delay, failure = server._plan()
+                if delay:
+                    time.sleep(delay)
+                if failure == 429:
+                    return self._send_error(429, "Rate limit reached (mock)", "rate_limit_error",
+                                            {"Retry-After": str(server.retry_after)})
+                if failure == 500:
+                    return self._send_error(500, "Internal server error (mock)", "server_error")
+
+                status, content = server._content_for(body, self.headers.get("Authorization"))
+                if status != 200:
+                    return self._send_error(status, content, "upstream_error")
+
+                model = body.get("model", "gpt-4o-mini")
+                prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+                usage = {"prompt_tokens": count_tokens(prompt),
+                         "completion_tokens": count_tokens(content)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+                if body.get("stream"):
+                    self._send_stream(model, content, usage)
+                else:
+                    self._send_json(200, {
+                        "id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": usage
+                    })
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self, status, message, error_type, headers=None):
+                self._send_json(status, {"error": {"message": message, "type": error_type,
+                                                   "code": error_type}}, headers)
+
+            def _send_stream(self, model, content, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                base = {"id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+                        "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model}
+                pieces = [content[i:i + server.chunk_size]
+                          for i in range(0, len(content), server.chunk_size)]
+                for i, piece in enumerate(pieces):
+                    delta = {"content": piece}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    self._event(dict(base, choices=[{"index": 0, "delta": delta,
+                                                     "finish_reason": None}]))
+                self._event(dict(base, choices=[{"index": 0, "delta": {},
+                                                 "finish_reason": "stop"}], usage=usage))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _event(self, payload):
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline OpenAI stand-in server")
+    parser.add_argument("--mode", choices=["synthetic", "replay", "record"], default="synthetic")
+    parser.add_argument("--cassette", default=str(DEFAULT_CASSETTE), help="Recorded responses (JSON Lines)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.7, help="Share of failures returned as 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--seed", type=int, help="Seed for deterministic runs")
+    parser.add_argument("--fallback", action="store_true", help="Synthesize on replay misses")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="Real API base URL for record mode")
+
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        mode=args.mode, cassette=args.cassette, host=args.host, port=args.port,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_ratio=args.rate_limit_ratio, retry_after=args.retry_after,
+        seed=args.seed, fallback=args.fallback, upstream=args.upstream
+    )
+
+    print("🧪 Mock OpenAI server")
+    print("=" * 60)
+    print(f"  Mode: {args.mode}")
+    print(f"  Listening on: {server.base_url}")
+    print(f"\n💡 export OPENAI_BASE_URL={server.base_url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats}")
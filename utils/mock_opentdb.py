@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Open Trivia Database API.
+
+Serves ``api.php``, ``api_token.php``, ``api_count.php`` and
+``api_category.php`` from a seeded synthetic question pool, with the real
+API's session-token semantics (no repeats per token, code 4 when a query is
+exhausted) and optional enforcement of its one-request-per-interval limit
+(code 5), so utils/opentdb.py can be exercised without network access.
+
+Usage:
+    python utils/mock_opentdb.py --per-shard 200 --min-interval 0
+    OPENTDB_BASE_URL=http://127.0.0.1:8766 OPENTDB_MIN_INTERVAL=0 python fetch_general_trivia.py
+"""
+
+import argparse
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.opentdb import (CATEGORIES, CODE_INVALID_PARAMETER, CODE_NO_RESULTS,
+                           CODE_RATE_LIMIT, CODE_SUCCESS, CODE_TOKEN_EMPTY,
+                           CODE_TOKEN_NOT_FOUND, DIFFICULTIES, MAX_PAGE_SIZE)
+
+
+class MockOpenTDBServer:
+    """
+    Local OpenTDB-compatible server running in a background thread.
+
+    Args:
+        host, port: Bind address (port 0 picks a free port)
+        per_shard: Questions per category × difficulty
+        min_interval: Seconds required between api.php calls per client (0 disables)
+        latency: Seconds before each response
+        seed: Seed for the synthetic pool
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, per_shard=100, min_interval=0.0,
+                 latency=0.0, seed=None):
+        self.min_interval = min_interval
+        self.latency = latency
+        self.pool = self._build_pool(per_shard, random.Random(seed))
+        self.tokens = {}
+        self.stats = {"requests": 0, "served": 0, "rate_limited": 0}
+        self._last_call = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving in a daemon thread and return the base URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _build_pool(per_shard, rng):
+        pool = []
+        for category_id, name in CATEGORIES.items():
+            for difficulty in DIFFICULTIES:
+                for n in range(per_shard):
+                    answers = [f"{name} answer {n}-{k} &amp; co" for k in range(4)]
+                    rng.shuffle(answers)
+                    pool.append({
+                        "category_id": category_id,
+                        "type": "multiple",
+                        "difficulty": difficulty,
+                        "category": name.replace("&", "&amp;"),
+                        "question": f"Which {name} fact #{n} is &quot;{difficulty}&quot;?",
+                        "correct_answer": answers[0],
+                        "incorrect_answers": answers[1:],
+                    })
+        return pool
+
+    def _matching(self, params):
+        category = params.get("category")
+        difficulty = params.get("difficulty")
+        return [i for i, q in enumerate(self.pool)
+                if (not category or q["category_id"] == int(category))
+                and (not difficulty or q["difficulty"] == difficulty)]
+
+    def _questions(self, params, client):
+        """Return the api.php payload for a query."""
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.min_interval and now - self._last_call.get(client, -1e9) < self.min_interval:
+                self.stats["rate_limited"] += 1
+                return {"response_code": CODE_RATE_LIMIT, "results": []}
+            self._last_call[client] = now
+
+            try:
+                amount = int(params.get("amount", 10))
+            except ValueError:
+                return {"response_code": CODE_INVALID_PARAMETER, "results": []}
+            if not 1 <= amount <= MAX_PAGE_SIZE:
+                return {"response_code": CODE_INVALID_PARAMETER, "results": []}
+
+            matching = self._matching(params)
+            token = params.get("token")
+            if token:
+                if token not in self.tokens:
+                    return {"response_code": CODE_TOKEN_NOT_FOUND, "results": []}
+                served = self.tokens[token]
+                matching = [i for i in matching if i not in served]
+                if not matching:
+                    return {"response_code": CODE_TOKEN_EMPTY, "results": []}
+
+            if len(matching) < amount:
+                return {"response_code": CODE_NO_RESULTS, "results": []}
+
+            picked = matching[:amount]
+            if token:
+                self.tokens[token].update(picked)
+            self.stats["served"] += len(picked)
+            results = [{k: v for k, v in self.pool[i].items() if k != "category_id"}
+                       for i in picked]
+            return {"response_code": CODE_SUCCESS, "results": results}
+
+    def _token(self, params):
+        with self._lock:
+            command = params.get("command")
+            if command == "request":
+                token = secrets.token_hex(32)
+                self.tokens[token] = set()
+                return {"response_code": 0, "response_message": "Token Generated Successfully!",
+                        "token": token}
+            if command == "reset" and params.get("token") in self.tokens:
+                self.tokens[params["token"]] = set()
+                return {"response_code": 0, "token": params["token"]}
+            return {"response_code": CODE_TOKEN_NOT_FOUND}
+
+    def _count(self, params):
+        category = int(params.get("category", 0))
+        counts = {f"total_{d}_question_count": len(self._matching({"category": category,
+                                                                   "difficulty": d}))
+                  for d in DIFFICULTIES}
+        counts["total_question_count"] = sum(counts.values())
+        return {"category_id": category, "category_question_count": counts}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if server.latency:
+                    time.sleep(server.latency)
+
+                endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+                if endpoint == "api.php":
+                    payload = server._questions(params, self.client_address[0])
+                elif endpoint == "api_token.php":
+                    payload = server._token(params)
+                elif endpoint == "api_count.php":
+                    payload = server._count(params)
+                elif endpoint == "api_category.php":
+                    payload = {"trivia_categories": [{"id": k, "name": v}
+                                                     for k, v in CATEGORIES.items()]}
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Open Trivia Database")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8766, help="Port")
+    parser.add_argument("--per-shard", type=int, default=100,
+                        help="Questions per category and difficulty")
+    parser.add_argument("--min-interval", type=float, default=0.0,
+                        help="Seconds required between api.php calls (real API: 5)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per response")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    server = MockOpenTDBServer(host=args.host, port=args.port, per_shard=args.per_shard,
+                               min_interval=args.min_interval, latency=args.latency,
+                               seed=args.seed)
+    print(f"🧪 Mock OpenTDB serving {len(server.pool)} questions at {server.base_url}")
+    print(f"   OPENTDB_BASE_URL={server.base_url} OPENTDB_MIN_INTERVAL={args.min_interval}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Shared OpenAI client for all generators.
+
+The client is built on first use, so the base URL can point at the local
+stand-in server (see utils/mock_openai.py) and tests or benchmarks can inject
+their own client with set_client().
+"""
+
+import os
+
+from utils.lazy import load_env
+
+_client = None
+
+
+def get_client():
+    """
+    Get the shared OpenAI client, creating it on first use.
+
+    Honors OPENAI_BASE_URL, e.g. ``http://127.0.0.1:8765/v1`` for the mock
+    server. A placeholder key is used when a base URL is set without one.
+    SDK retries are disabled; calls go through utils.scheduler instead.
+
+    Returns:
+        OpenAI client (or whatever was passed to set_client)
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+
+        load_env()
+        base_url = os.getenv("OPENAI_BASE_URL") or None
+        api_key = os.getenv("OPENAI_API_KEY") or ("offline" if base_url else None)
+        # Retries are handled by utils.scheduler, not the SDK
+        _client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    return _client
+
+
+def set_client(client) -> None:
+    """
+    Inject the client used by every generator (pass None to reset).
+
+    Args:
+        client: Object exposing the OpenAI client interface
+    """
+    global _client
+    _client = client
+
+
+def has_credentials() -> bool:
+    """Whether an API key or an alternate endpoint has been configured."""
+    load_env()
+    return bool(_client is not None or os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_BASE_URL"))
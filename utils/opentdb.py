@@ -0,0 +1,343 @@
+"""
+Bulk fetcher for the Open Trivia Database (https://opentdb.com).
+
+Questions are fetched in category × difficulty shards by a small thread pool
+sharing one pooled ``requests.Session``. Pages use the API maximum of 50
+questions, a session token keeps the API from repeating itself, and a shared
+limiter respects OpenTDB's one-request-per-5-seconds rule. Every page is
+written to the local trivia mirror (utils/trivia_mirror.py) as it arrives,
+so an interrupted run resumes where it stopped and questions fetched
+earlier are never re-added.
+
+Usage:
+    fetcher = OpenTDBFetcher()
+    questions = fetcher.fetch(5000)          # only the gap is downloaded
+
+    # Against the local stand-in (utils/mock_opentdb.py)
+    OPENTDB_BASE_URL=http://127.0.0.1:8766 python fetch_general_trivia.py --count 5000
+"""
+
+import html
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.lazy import lazy_import, load_env
+from utils.question_bank import question_hash
+from utils.trivia_mirror import TriviaMirror
+
+requests = lazy_import("requests")
+
+DEFAULT_BASE_URL = "https://opentdb.com"
+DEFAULT_STATE = Path(__file__).parent.parent / "output" / "opentdb_state.json"
+
+MAX_PAGE_SIZE = 50          # API maximum per request
+MIN_INTERVAL = 5.0          # OpenTDB allows one api.php call per 5 seconds per IP
+DIFFICULTIES = ("easy", "medium", "hard")
+
+CATEGORIES = {
+    9: "General Knowledge",
+    11: "Film",
+    12: "Music",
+    14: "Television",
+    17: "Science & Nature",
+    21: "Sports",
+    22: "Geography",
+    23: "History",
+}
+
+# api.php response codes
+CODE_SUCCESS = 0
+CODE_NO_RESULTS = 1         # fewer questions left than requested
+CODE_INVALID_PARAMETER = 2
+CODE_TOKEN_NOT_FOUND = 3    # expired (6 hours idle) or unknown
+CODE_TOKEN_EMPTY = 4        # token has seen every question for this query
+CODE_RATE_LIMIT = 5
+
+
+class OpenTDBError(RuntimeError):
+    """Raised for unrecoverable OpenTDB responses."""
+
+
+class RateLimiter:
+    """Spaces calls at least `min_interval` seconds apart across threads."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._widened_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def slow_down(self):
+        """Widen the interval and push pending calls back after a rate-limit reply."""
+        with self._lock:
+            now = time.monotonic()
+            # Calls already in flight get limited too; only widen once per window
+            if now >= self._widened_until:
+                self.min_interval = min(max(self.min_interval * 2, 0.5), 2 * MIN_INTERVAL)
+                self._widened_until = now + self.min_interval
+            self._next_slot = max(self._next_slot, now + self.min_interval)
+
+
+class OpenTDBFetcher:
+    """
+    Pooled, rate-limit-aware OpenTDB client.
+
+    Args:
+        base_url: API root (defaults to OPENTDB_BASE_URL or https://opentdb.com)
+        mirror: Local store of fetched questions (defaults to TriviaMirror())
+        state_path: JSON file holding the session token and exhausted shards
+        max_workers: Shards fetched concurrently
+        min_interval: Seconds between api.php calls (0 for local servers)
+        max_retries: Retries per page on network errors and rate limits
+        timeout: HTTP timeout in seconds
+    """
+
+    def __init__(self, base_url: Optional[str] = None, mirror: Optional[TriviaMirror] = None,
+                 state_path: Path = DEFAULT_STATE, max_workers: int = 4,
+                 min_interval: Optional[float] = None, max_retries: int = 5,
+                 timeout: float = 15.0):
+        load_env()
+        self.base_url = (base_url or os.getenv("OPENTDB_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        if min_interval is None:
+            min_interval = float(os.getenv("OPENTDB_MIN_INTERVAL", MIN_INTERVAL))
+        self.mirror = mirror if mirror is not None else TriviaMirror()
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter(min_interval)
+        self.stats = {"requests": 0, "fetched": 0, "duplicates": 0, "rate_limited": 0}
+
+        self._state = self._load_state()
+        self._state_lock = threading.Lock()
+        self._token_lock = threading.Lock()
+        self._session = None
+
+    # --------------------------------------------------------------------------
+    # HTTP
+    # --------------------------------------------------------------------------
+
+    @property
+    def session(self):
+        """Shared keep-alive session, sized for the worker pool."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                    pool_maxsize=max(self.max_workers, 1))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def _get(self, path: str, params: Dict) -> Dict:
+        response = self.session.get(f"{self.base_url}/{path}", params=params, timeout=self.timeout)
+        if response.status_code == 429:
+            return {"response_code": CODE_RATE_LIMIT}
+        response.raise_for_status()
+        return response.json()
+
+    # --------------------------------------------------------------------------
+    # Session token and resumable state
+    # --------------------------------------------------------------------------
+
+    def _load_state(self) -> Dict:
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"token": None, "exhausted": []}
+
+    def _save_state(self):
+        with self._state_lock:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, indent=2)
+            tmp.replace(self.state_path)
+
+    def token(self, refresh: bool = False) -> str:
+        """Session token, requesting a new one if missing or expired."""
+        with self._token_lock:
+            if refresh or not self._state.get("token"):
+                data = self._get("api_token.php", {"command": "request"})
+                if data.get("response_code") != CODE_SUCCESS:
+                    raise OpenTDBError(f"Could not get a session token: {data}")
+                self._state["token"] = data["token"]
+                # A new token may serve questions an exhausted shard held back
+                self._state["exhausted"] = []
+                self._save_state()
+            return self._state["token"]
+
+    def reset(self):
+        """Forget the token and exhausted shards (the mirror is kept)."""
+        self._state = {"token": None, "exhausted": []}
+        self._save_state()
+
+    # --------------------------------------------------------------------------
+    # Fetching
+    # --------------------------------------------------------------------------
+
+    def category_counts(self, category_id: int) -> Dict[str, int]:
+        """Questions available per difficulty in a category."""
+        data = self._get("api_count.php", {"category": category_id})
+        counts = data.get("category_question_count", {})
+        return {d: int(counts.get(f"total_{d}_question_count", 0)) for d in DIFFICULTIES}
+
+    def fetch_page(self, category_id: Optional[int], difficulty: Optional[str],
+                   amount: int) -> Tuple[int, List[Dict]]:
+        """
+        One api.php call with the session token, retrying rate limits.
+
+        Returns:
+            (response_code, normalized records)
+        """
+        params = {"amount": min(amount, MAX_PAGE_SIZE), "type": "multiple"}
+        if category_id:
+            params["category"] = category_id
+        if difficulty:
+            params["difficulty"] = difficulty
+
+        for attempt in range(self.max_retries + 1):
+            params["token"] = self.token()
+            self.limiter.wait()
+            try:
+                data = self._get("api.php", params)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise OpenTDBError(f"OpenTDB unreachable: {e}") from e
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            with self._state_lock:
+                self.stats["requests"] += 1
+            code = data.get("response_code")
+            if code == CODE_RATE_LIMIT:
+                with self._state_lock:
+                    self.stats["rate_limited"] += 1
+                self.limiter.slow_down()
+                continue
+            if code == CODE_TOKEN_NOT_FOUND:
+                self.token(refresh=True)
+                continue
+            if code == CODE_INVALID_PARAMETER:
+                raise OpenTDBError(f"Invalid OpenTDB parameters: {params}")
+            return code, [self._record(r, category_id) for r in data.get("results", [])]
+
+        raise OpenTDBError(f"Gave up after {self.max_retries} rate-limited attempts")
+
+    @staticmethod
+    def _record(result: Dict, category_id: Optional[int]) -> Dict:
+        question = html.unescape(result["question"])
+        return {
+            "id": question_hash({"type": "trivia", "text": question}),
+            "question": question,
+            "correct_answer": html.unescape(result["correct_answer"]),
+            "incorrect_answers": [html.unescape(a) for a in result["incorrect_answers"]],
+            "category": html.unescape(result["category"]),
+            "category_id": category_id,
+            "difficulty": result["difficulty"],
+            "source": "opentdb",
+            "fetched_at": int(time.time()),
+        }
+
+    def _fetch_shard(self, category_id: int, difficulty: str, need: int) -> int:
+        """Page through one shard until `need` new questions arrive or it runs dry."""
+        shard = f"{category_id}:{difficulty}"
+        added = 0
+        amount = MAX_PAGE_SIZE
+
+        while added < need:
+            code, records = self.fetch_page(category_id, difficulty, min(amount, need - added))
+            if code == CODE_SUCCESS:
+                new = self.mirror.add(records)
+                added += new
+                with self._state_lock:
+                    self.stats["fetched"] += new
+                    self.stats["duplicates"] += len(records) - new
+                continue
+            if code == CODE_NO_RESULTS and amount > 1:
+                amount = max(1, min(amount, need - added) // 2)   # fewer left than asked for
+                continue
+            with self._state_lock:
+                self._state["exhausted"].append(shard)
+            self._save_state()
+            break
+
+        return added
+
+    def _plan(self, target: int, category_ids: List[int],
+              difficulties: Iterable[str]) -> Dict[Tuple[int, str], int]:
+        """Spread the missing questions evenly over shards that still have stock."""
+        exhausted = set(self._state.get("exhausted", []))
+        shards = {}
+        for category_id in category_ids:
+            available = self.category_counts(category_id)
+            for difficulty in difficulties:
+                if f"{category_id}:{difficulty}" in exhausted:
+                    continue
+                cached = self.mirror.count(category_id, difficulty)
+                room = available.get(difficulty, 0) - cached
+                if room > 0:
+                    shards[(category_id, difficulty)] = room
+
+        missing = target - sum(self.mirror.count(c, d) for c in category_ids for d in difficulties)
+        plan = {key: 0 for key in shards}
+        while missing > 0 and shards:
+            share = max(1, missing // len(shards))
+            for key in list(shards):
+                take = min(share, shards[key], missing)
+                plan[key] += take
+                shards[key] -= take
+                missing -= take
+                if shards[key] == 0:
+                    del shards[key]
+                if missing == 0:
+                    break
+        return {key: need for key, need in plan.items() if need > 0}
+
+    def fetch(self, target: int, categories: Optional[Iterable[int]] = None,
+              difficulties: Iterable[str] = DIFFICULTIES) -> List[Dict]:
+        """
+        Make sure the mirror holds `target` questions for these categories.
+
+        Only the gap is downloaded; shards are fetched concurrently.
+
+        Args:
+            target: Questions wanted in total
+            categories: OpenTDB category ids (defaults to CATEGORIES)
+            difficulties: Difficulties to include
+
+        Returns:
+            Mirrored questions for the categories and difficulties (may exceed target)
+        """
+        category_ids = list(categories or CATEGORIES)
+        difficulties = list(difficulties)
+        plan = self._plan(target, category_ids, difficulties)
+
+        if plan:
+            print(f"🌐 Fetching {sum(plan.values())} questions from Open Trivia DB "
+                  f"across {len(plan)} shards ({len(self.mirror)} mirrored)...")
+            before = dict(self.stats)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._fetch_shard, cat, diff, need)
+                           for (cat, diff), need in plan.items()]
+                for future in futures:
+                    future.result()
+            # self.stats is cumulative over the fetcher's lifetime; report this call
+            delta = {key: self.stats[key] - before[key] for key in before}
+            print(f"✓ Fetched {delta['fetched']} new questions in {delta['requests']} "
+                  f"requests ({delta['duplicates']} duplicates skipped)")
+
+        return self.mirror.select(category_ids, difficulties)
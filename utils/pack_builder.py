@@ -0,0 +1,324 @@
+"""
+Constraint-based question pack builder.
+
+Packs are filled slot by slot in a single pass over precomputed buckets
+(pool × difficulty × category), honoring:
+- the group-chat / general ratio (interleaved evenly through the pack)
+- a difficulty curve (easy questions first, ramping up)
+- per-category quotas (max share of the pack per category)
+- at most N questions about the same person (at least an even share of the
+  group slots), and never the same quote twice
+- no repeats across packs until a bucket has been used up
+
+With game history (utils/question_stats.py), questions are bucketed by the
+difficulty players actually found them, and each bucket serves fresh,
+well-calibrated questions before worn-out ones.
+
+Usage:
+    builder = PackBuilder(group_rows, general_rows, seed=7)
+    builder = PackBuilder(group_rows, general_rows, usage=QuestionStats().by_text())
+    specs = [PackSpec("pack_savage_mode", size=40, group_ratio=0.6)]
+    for spec, rows in builder.build_all(specs):
+        ...
+"""
+
+import math
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.pack_writer import write_questions
+from utils.question_bank import normalize_question_text
+from utils.question_stats import QuestionUsage
+
+DIFFICULTIES = ("easy", "medium", "hard")
+GROUP, GENERAL = "group", "general"
+
+# Nearest difficulties to fall back to when a bucket runs dry
+_DIFFICULTY_FALLBACK = {
+    "easy": ("easy", "medium", "hard"),
+    "medium": ("medium", "easy", "hard"),
+    "hard": ("hard", "medium", "easy"),
+}
+
+# How far past the cursor a bucket looks for a question that fits the pack
+_SCAN_WINDOW = 32
+
+# Preference tiers within a bucket; questions in the same tier stay shuffled
+_PREFERENCE_TIERS = 4
+
+# Constraint levels, tightest first: everything, category caps only, nothing
+_STRICT, _NO_SENDER_CAP, _LOOSE = 0, 1, 2
+
+
+@dataclass
+class PackSpec:
+    """
+    What one pack should look like.
+
+    Args:
+        name: Output name (file stem)
+        size: Questions in the pack
+        group_ratio: Share of group chat questions (0.0 to 1.0)
+        difficulty_mix: Share of each difficulty; the pack ramps easy → hard
+        max_category_share: Default cap on any one category's share
+        category_quotas: Per-category caps overriding max_category_share
+        max_per_sender: Group chat questions about the same person; raised
+            to an even share of the group slots when there are too few
+            people to fill them otherwise
+    """
+    name: str
+    size: int = 40
+    group_ratio: float = 0.4
+    difficulty_mix: Dict[str, float] = field(
+        default_factory=lambda: {"easy": 0.3, "medium": 0.45, "hard": 0.25})
+    max_category_share: float = 0.35
+    category_quotas: Dict[str, float] = field(default_factory=dict)
+    max_per_sender: int = 3
+
+    def sender_cap(self, senders: int) -> int:
+        """Per-person cap for a chat with this many people."""
+        group_slots = sum(pool == GROUP for pool, _ in self.slots())
+        return max(self.max_per_sender, math.ceil(group_slots / max(senders, 1)))
+
+    def category_cap(self, category: str) -> int:
+        share = self.category_quotas.get(category, self.max_category_share)
+        return max(1, math.ceil(share * self.size))
+
+    def slots(self) -> List[Tuple[str, str]]:
+        """(pool, difficulty) wanted at each position."""
+        total = sum(self.difficulty_mix.values()) or 1.0
+        curve, cumulative = [], 0.0
+        for difficulty in DIFFICULTIES:
+            cumulative += self.difficulty_mix.get(difficulty, 0.0) / total
+            curve.append((cumulative, difficulty))
+
+        slots = []
+        for i in range(self.size):
+            position = (i + 0.5) / self.size
+            difficulty = next((d for edge, d in curve if position <= edge), DIFFICULTIES[-1])
+            # Spread group questions evenly instead of clumping them
+            is_group = math.floor((i + 1) * self.group_ratio) > math.floor(i * self.group_ratio)
+            slots.append((GROUP if is_group else GENERAL, difficulty))
+        return slots
+
+
+class _Bucket:
+    """
+    Shuffled question ids with a cursor; reshuffles (allowing repeats) when used up.
+
+    With `tiers` (a tier per question id, 0 = best), better tiers come first
+    and each tier is shuffled on its own.
+    """
+
+    __slots__ = ("ids", "cursor", "round", "rng", "tiers")
+
+    def __init__(self, ids, rng, tiers=None):
+        self.ids = list(ids)
+        self.rng = rng
+        self.tiers = tiers
+        self._order()
+        self.cursor = 0
+        self.round = 0
+
+    def _order(self):
+        self.rng.shuffle(self.ids)
+        if self.tiers is not None:
+            self.ids.sort(key=self.tiers.__getitem__)
+
+    @property
+    def fresh(self) -> int:
+        """Questions not yet used in this round."""
+        return len(self.ids) - self.cursor
+
+    def take(self, fits) -> Optional[int]:
+        if self.cursor >= len(self.ids):
+            self._order()
+            self.cursor = 0
+            self.round += 1
+
+        end = min(len(self.ids), self.cursor + _SCAN_WINDOW)
+        for j in range(self.cursor, end):
+            qid = self.ids[j]
+            if fits(qid):
+                self.ids[self.cursor], self.ids[j] = self.ids[j], self.ids[self.cursor]
+                self.cursor += 1
+                return qid
+        return None
+
+
+class PackBuilder:
+    """
+    Builds many packs from one indexed pool.
+
+    Args:
+        group_questions: Group chat questions (pack-format CSV rows)
+        general_questions: General trivia questions (pack-format CSV rows)
+        seed: Random seed
+        usage: Play history keyed by normalized question text
+            (QuestionStats.by_text()); unplayed questions count as fresh
+    """
+
+    def __init__(self, group_questions: Sequence[Dict], general_questions: Sequence[Dict],
+                 seed: Optional[int] = None, usage: Optional[Dict[str, QuestionUsage]] = None):
+        self.rng = random.Random(seed)
+        self.questions: List[Dict] = []
+        self.keys: List[str] = []
+        self.senders: List[Optional[str]] = []
+        self.categories: List[str] = []
+        self.tiers: Optional[List[int]] = [] if usage else None
+        self.buckets: Dict[Tuple[str, str], Dict[str, _Bucket]] = {}
+        self.stats = {"packs": 0, "questions": 0, "repeats": 0, "relaxed": 0, "short": 0,
+                      "recalibrated": 0, "stale": 0}
+
+        grouped: Dict[Tuple[str, str, str], List[int]] = {}
+        seen = set()
+        for pool, rows in ((GROUP, group_questions), (GENERAL, general_questions)):
+            for row in rows:
+                key = normalize_question_text(row.get("question", ""))
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                qid = len(self.questions)
+                difficulty = str(row.get("difficulty", "")).strip().lower()
+                if difficulty not in DIFFICULTIES:
+                    difficulty = "medium"
+                category = row.get("category") or "General"
+
+                if usage:
+                    difficulty = self._apply_usage(usage.get(key), difficulty)
+
+                self.questions.append(row)
+                self.keys.append(key)
+                self.categories.append(category)
+                self.senders.append(self._sender(row) if pool == GROUP else None)
+                grouped.setdefault((pool, difficulty, category), []).append(qid)
+
+        self.people = {s for s in self.senders if s is not None}
+
+        for (pool, difficulty, category), ids in grouped.items():
+            self.buckets.setdefault((pool, difficulty), {})[category] = _Bucket(
+                ids, self.rng, self.tiers)
+
+    def _apply_usage(self, usage: Optional[QuestionUsage], difficulty: str) -> str:
+        """Record the question's preference tier; return the difficulty players found it."""
+        if usage is None:
+            self.tiers.append(0)
+            return difficulty
+        observed = usage.empirical_difficulty
+        if observed and observed != difficulty:
+            self.stats["recalibrated"] += 1
+            difficulty = observed
+
+        preference = usage.preference(difficulty)
+        # Tier 0 is reserved for unplayed questions; stale ones go last
+        tier = _PREFERENCE_TIERS + 1 if preference <= 0 else \
+            1 + min(_PREFERENCE_TIERS - 1, int((1 - preference) * _PREFERENCE_TIERS))
+        self.tiers.append(tier)
+        return difficulty
+
+    @staticmethod
+    def _sender(row: Dict) -> Optional[str]:
+        """The person a group chat question is about: its correct option."""
+        letter = str(row.get("correct_answer", "")).strip().upper()
+        return row.get(f"option_{letter}") or None
+
+    def pool_size(self, pool: str) -> int:
+        return sum(len(b.ids) for (p, _), cats in self.buckets.items() if p == pool
+                   for b in cats.values())
+
+    # --------------------------------------------------------------------------
+
+    def build(self, spec: PackSpec) -> List[Dict]:
+        """Fill one pack; questions used here are avoided by later packs."""
+        picked: List[int] = []
+        in_pack = set()
+        per_category: Counter = Counter()
+        per_sender: Counter = Counter()
+        sender_cap = spec.sender_cap(len(self.people))
+
+        def fits(qid, level):
+            if self.keys[qid] in in_pack:
+                return False
+            sender = self.senders[qid]
+            if sender is not None and per_sender[sender] >= sender_cap and level == _STRICT:
+                return False
+            return True
+
+        for pool, difficulty in spec.slots():
+            qid = self._pick(spec, pool, difficulty, per_category, fits)
+            if qid is None:
+                self.stats["short"] += 1
+                continue
+            picked.append(qid)
+            in_pack.add(self.keys[qid])
+            per_category[self.categories[qid]] += 1
+            if self.senders[qid] is not None:
+                per_sender[self.senders[qid]] += 1
+
+        self.stats["packs"] += 1
+        self.stats["questions"] += len(picked)
+        return [self.questions[qid] for qid in picked]
+
+    def _pick(self, spec, pool, difficulty, per_category, fits) -> Optional[int]:
+        """
+        Best available question for a slot, relaxing constraints step by step.
+
+        The slot's own pool is exhausted first, lifting the per-person cap
+        before falling back to the other pool, so the pack keeps its group
+        ratio; only then are category caps dropped.
+        """
+        other = GENERAL if pool == GROUP else GROUP
+        fallback = _DIFFICULTY_FALLBACK[difficulty]
+        attempts = ([(pool, d, _STRICT) for d in fallback]
+                    + [(pool, d, _NO_SENDER_CAP) for d in fallback]
+                    + [(other, d, _STRICT) for d in fallback]
+                    + [(p, d, _LOOSE) for p in (pool, other) for d in fallback])
+
+        for step, (p, d, level) in enumerate(attempts):
+            categories = self.buckets.get((p, d))
+            if not categories:
+                continue
+            # Unused material first, then the category furthest below its cap
+            ranked = sorted(
+                categories.items(),
+                key=lambda item: (item[1].round, item[1].fresh == 0,
+                                  per_category[item[0]] / spec.category_cap(item[0]),
+                                  self.rng.random()))
+            for category, bucket in ranked:
+                if level != _LOOSE and per_category[category] >= spec.category_cap(category):
+                    continue
+                qid = bucket.take(lambda q: fits(q, level))
+                if qid is None:
+                    continue
+                if bucket.round > 0:
+                    self.stats["repeats"] += 1
+                if self.tiers is not None and self.tiers[qid] > _PREFERENCE_TIERS:
+                    self.stats["stale"] += 1
+                if step:
+                    self.stats["relaxed"] += 1
+                return qid
+        return None
+
+    def build_all(self, specs: Iterable[PackSpec]) -> Iterator[Tuple[PackSpec, List[Dict]]]:
+        """Build packs one after another, yielding each as soon as it's ready."""
+        for spec in specs:
+            yield spec, self.build(spec)
+
+
+def write_packs(packs: Iterable[Tuple[PackSpec, List[Dict]]], out_dir) -> List[Tuple[Path, int]]:
+    """
+    Stream built packs to CSV files (and .pack.jsonl artifacts), one per pack.
+
+    Returns:
+        (path, question count) per pack written
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for spec, rows in packs:
+        path = write_questions(rows, out_dir / f"{spec.name}.csv", quiet=True)
+        written.append((path, len(rows)))
+    return written
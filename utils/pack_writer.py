@@ -0,0 +1,222 @@
+"""
+The one place question packs are written.
+
+Every generator hands its questions to ``write_questions()``, which writes
+two files side by side:
+- ``<name>.csv``: the pack-format CSV other tools (and people) read
+- ``<name>.pack.jsonl``: a pre-validated artifact for the game server
+
+The artifact is JSON Lines. Line 1 is a header: format and version, question
+count, a SHA-256 of everything after the header, a SHA-256 of the CSV it was
+written with (so an edited or replaced CSV makes it stale), an index of question
+positions by type, difficulty and category, and a few pre-shuffled play
+orders. Every following line is one question already in the game's shape
+(``question``, four ``options``, ``correct`` index, ...). Rows that the game
+would reject (blank question, missing option, bad answer letter) are
+dropped here, once, so the server can load a pack with one JSON.parse per
+line and no per-row checks.
+
+Usage:
+    write_questions(questions, "output/chaos_questions.csv", question_type="chaos")
+
+    header, questions = read_pack("output/chaos_questions.pack.jsonl")
+
+    python -m utils.pack_writer output/*.csv       # build artifacts for existing CSVs
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from utils.question import QuestionBatch
+
+PACK_FORMAT = "henze-trivia-pack"
+PACK_VERSION = 2
+PACK_SUFFIX = ".pack.jsonl"
+
+FIELDNAMES = ['question', 'correct_answer', 'explanation', 'difficulty', 'category',
+              'option_A', 'option_B', 'option_C', 'option_D']
+
+# Pre-shuffled play orders stored in each artifact
+DEFAULT_ORDERS = 8
+
+PathLike = Union[str, Path]
+
+
+class PackFormatError(ValueError):
+    """Raised when an artifact has the wrong format, version or checksum, or is stale."""
+
+
+def pack_path(csv_path: PathLike) -> Path:
+    """Artifact path that goes with a CSV path."""
+    path = Path(csv_path)
+    return path.with_name(path.stem + PACK_SUFFIX)
+
+
+def file_sha256(path: PathLike) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _index(records: List[Dict]) -> Dict[str, Dict[str, List[int]]]:
+    index: Dict[str, Dict[str, List[int]]] = {"type": {}, "difficulty": {}, "category": {}}
+    for i, record in enumerate(records):
+        for key, positions in index.items():
+            positions.setdefault(record[key], []).append(i)
+    return index
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def write_pack(questions: Union[QuestionBatch, Iterable[Any]], path: PathLike,
+               question_type: str = "trivia",
+               name: Optional[str] = None, orders: int = DEFAULT_ORDERS,
+               seed: Optional[int] = None, source: Optional[PathLike] = None) -> Dict:
+    """
+    Write a validated ``.pack.jsonl`` artifact.
+
+    Args:
+        questions: A QuestionBatch, or anything QuestionBatch.from_dicts() takes
+        path: Artifact path
+        question_type: Type for rows without a ``type`` column
+        name: Pack name stored in the header (defaults to the file stem)
+        orders: Pre-shuffled play orders to store
+        seed: Random seed for the orders
+        source: The CSV these questions were written to; its hash is stored
+            so loaders can tell when the CSV has changed since
+
+    Returns:
+        The header that was written
+    """
+    path = Path(path)
+    batch = questions if isinstance(questions, QuestionBatch) else \
+        QuestionBatch.from_dicts(questions, question_type)
+    records = batch.filter(batch.playable()).to_games()
+
+    body = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+                   for r in records)
+    rng = random.Random(seed)
+    order_tables = []
+    for _ in range(orders if records else 0):
+        order = list(range(len(records)))
+        rng.shuffle(order)
+        order_tables.append(order)
+
+    header = {
+        "format": PACK_FORMAT,
+        "version": PACK_VERSION,
+        "name": name or path.name.replace(PACK_SUFFIX, "") or path.stem,
+        "created_at": int(time.time()),
+        "count": len(records),
+        "skipped": len(batch) - len(records),
+        "sha256": hashlib.sha256(body.encode("utf-8")).hexdigest(),
+        "source_sha256": file_sha256(source) if source else None,
+        "index": _index(records),
+        "orders": order_tables,
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, lambda f: f.write(
+        json.dumps(header, ensure_ascii=False, separators=(",", ":")) + "\n" + body))
+    return header
+
+
+def write_questions(questions: Iterable[Any], csv_path: PathLike, question_type: str = "trivia",
+                    artifact: bool = True, quiet: bool = False) -> Path:
+    """
+    Write a pack CSV and, next to it, its ``.pack.jsonl`` artifact.
+
+    Args:
+        questions: Pack rows, generator dicts, models or Questions (see utils/question.py)
+        csv_path: CSV path (``~`` is expanded)
+        question_type: Type recorded in the artifact for rows without one
+        artifact: Also write the artifact
+        quiet: Don't print a summary line
+
+    Returns:
+        The CSV path
+    """
+    csv_path = Path(os.path.expanduser(str(csv_path)))
+    batch = QuestionBatch.from_dicts(questions, question_type)
+    rows = batch.to_rows()
+
+    # Standard columns first, then anything extra a generator added
+    fieldnames = list(FIELDNAMES)
+    for row in rows:
+        fieldnames.extend(key for key in row if key not in fieldnames)
+
+    def write(f):
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(csv_path, write)
+
+    if artifact:
+        header = write_pack(batch, pack_path(csv_path), source=csv_path)
+        skipped = f", {header['skipped']} invalid rows left out of the pack" if header["skipped"] else ""
+    else:
+        skipped = ""
+    if not quiet:
+        print(f"💾 Saved {len(rows)} questions to {csv_path}{skipped}")
+    return csv_path
+
+
+def read_pack(path: PathLike, verify: bool = True,
+              csv_path: Optional[PathLike] = None) -> Tuple[Dict, List[Dict]]:
+    """
+    Load an artifact.
+
+    Args:
+        path: Artifact path
+        verify: Check the body checksum
+        csv_path: The artifact's CSV; if it exists and doesn't match the
+            hash recorded at write time, the artifact is stale
+
+    Returns:
+        (header, game-format questions)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        body = f.read()
+    if header.get("format") != PACK_FORMAT or header.get("version") != PACK_VERSION:
+        raise PackFormatError(f"{path}: not a version {PACK_VERSION} {PACK_FORMAT} file")
+    if verify and hashlib.sha256(body.encode("utf-8")).hexdigest() != header.get("sha256"):
+        raise PackFormatError(f"{path}: checksum mismatch")
+    if csv_path and os.path.exists(csv_path) and file_sha256(csv_path) != header.get("source_sha256"):
+        raise PackFormatError(f"{path}: stale, {csv_path} changed since it was written")
+    return header, [json.loads(line) for line in body.splitlines() if line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build .pack.jsonl artifacts for pack CSVs")
+    parser.add_argument("csv", nargs="+", help="Pack CSV files")
+    parser.add_argument("--type", default="trivia", help="Type for rows without a type column")
+    args = parser.parse_args()
+
+    for path in args.csv:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        header = write_pack(rows, pack_path(path), question_type=args.type, source=path)
+        print(f"📦 {pack_path(path).name}: {header['count']} questions"
+              + (f" ({header['skipped']} invalid skipped)" if header["skipped"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Local pre-filter cascade in front of LLM scoring.
+
+Roast scoring and quote selection used to send a random 100 messages to the
+LLM and hope some were good. The cascade ranks every candidate locally and
+only sends the ones worth paying for:
+
+1. Every LLM verdict is kept in a label cache (JSON lines, one record per
+   message text), so a message is never scored twice.
+2. A linear model over hashed character n-grams (2-4 chars) plus a few
+   lexicon features (insults, second person, caps, punctuation) is trained
+   on the cached labels with conjugate-gradient ridge regression. Until
+   there are MIN_LABELS labels, the lexicon score alone ranks messages.
+3. The LLM gets the top-ranked candidates plus a share of the most
+   uncertain ones (predictions closest to the threshold; before the model
+   exists, an interestingness-weighted draw from utils/sampler.py). Their
+   verdicts go back into the cache, so the model improves with every run.
+
+Featurization is vectorized: all texts are joined into one code point array
+and n-grams are hashed with array arithmetic, so a full corpus is ranked in
+seconds without scikit-learn.
+
+Usage:
+    cascade = PrefilterCascade("output/.labels/roast.jsonl", threshold=6)
+    to_llm, known = cascade.select(candidates, budget=100)
+    ...
+    cascade.record(texts, scores, reasons)
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from utils.lazy import lazy_import
+from utils.sampler import MessageSampler
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Hashed n-gram space (plus the lexicon features after it)
+HASH_DIMS = 1 << 18
+NGRAM_SIZES = (2, 3, 4)
+
+# Ridge penalty and conjugate-gradient limits
+L2_PENALTY = 1.0
+CG_ITERATIONS = 100
+CG_TOLERANCE = 1e-6
+
+# Labels needed before the n-gram model replaces the lexicon ranking
+MIN_LABELS = 50
+
+# Share of the LLM budget spent on uncertain candidates (active learning)
+EXPLORE_SHARE = 0.3
+
+# Texts are featurized in chunks of this many to bound memory
+CHUNK_SIZE = 20000
+
+# Words that tend to mark a burn
+ROAST_LEXICON = (
+    "stupid", "dumb", "ugly", "loser", "clown", "shut up", "bitch", "ass", "trash",
+    "delusional", "embarrassing", "pathetic", "idiot", "wtf", "fuck", "shit", "lmao",
+    "cry", "dead", "💀", "🤡", "😂",
+)
+
+_LEXICON_RE = "|".join(re.escape(w) for w in ROAST_LEXICON)
+_SECOND_PERSON_RE = r"\b(?:you|your|you're|youre|ur|u)\b"
+
+# Column order of lexicon_features(); each is a count scaled to [0, 1]
+LEXICON_FEATURES = ("lexicon", "second_person", "caps", "exclaim", "question", "length")
+
+PathLike = Union[str, Path]
+
+
+def lexicon_features(texts: "pd.Series") -> "np.ndarray":
+    """Dense lexicon features, shape (len(texts), len(LEXICON_FEATURES)), each in [0, 1]."""
+    text = texts.fillna("").astype(str)
+    lowered = text.str.lower()
+    letters = text.str.count(r"[A-Za-z]").clip(lower=1)
+    columns = [
+        lowered.str.count(_LEXICON_RE).clip(upper=3) / 3,
+        lowered.str.count(_SECOND_PERSON_RE).clip(upper=2) / 2,
+        text.str.count(r"[A-Z]") / letters,
+        text.str.count("!").clip(upper=3) / 3,
+        text.str.count(r"\?").clip(upper=2) / 2,
+        text.str.len().clip(upper=300) / 300,
+    ]
+    return np.column_stack([c.to_numpy(dtype=float) for c in columns])
+
+
+def lexicon_score(texts: "pd.Series") -> "np.ndarray":
+    """Cold-start ranking score: insults and second person weigh most."""
+    features = lexicon_features(texts)
+    return features @ np.array([3.0, 2.0, 0.5, 0.5, 0.25, 0.25])
+
+
+def hash_ngrams(texts: Sequence[str], dims: int = HASH_DIMS) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Hashed character n-grams (NGRAM_SIZES) of lowercased texts as COO arrays.
+
+    Returns:
+        (rows, cols, values), values L2-normalized per text
+    """
+    texts = ["" if t is None or t != t else str(t) for t in texts]
+    n = len(texts)
+    joined = "\x00".join(" " + t.lower() + " " for t in texts)
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    separators = np.cumsum(codes == 0)
+
+    rows, cols = [], []
+    for size in NGRAM_SIZES:
+        if len(codes) < size:
+            continue
+        windows = len(codes) - size + 1
+        h = np.full(windows, np.uint64(size), dtype=np.uint64)
+        for k in range(size):
+            h = h * np.uint64(1000003) + codes[k:k + windows]
+        # Drop n-grams that straddle two texts
+        straddle = separators[size - 1:] - separators[:windows] + (codes[:windows] == 0)
+        keep = straddle == 0
+        h = h[keep]
+        h ^= h >> np.uint64(29)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(32)
+        rows.append(separators[:windows][keep].astype(np.int64))
+        cols.append((h % np.uint64(dims)).astype(np.int64))
+
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+    counts = np.bincount(rows, minlength=n)
+    return rows, cols, 1.0 / np.sqrt(np.maximum(counts[rows], 1))
+
+
+def featurize(texts: Sequence[str]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Sparse features for texts as COO arrays.
+
+    Returns:
+        (rows, cols, values): hash_ngrams() columns, followed by the lexicon
+        features in columns HASH_DIMS onwards
+    """
+    texts = ["" if t is None or t != t else str(t) for t in texts]
+    n = len(texts)
+    rows, cols, values = hash_ngrams(texts)
+
+    lexicon = lexicon_features(pd.Series(texts))
+    lex_rows = np.repeat(np.arange(n), lexicon.shape[1])
+    lex_cols = np.tile(np.arange(HASH_DIMS, HASH_DIMS + lexicon.shape[1]), n)
+    return (np.concatenate([rows, lex_rows]), np.concatenate([cols, lex_cols]),
+            np.concatenate([values, lexicon.ravel()]))
+
+
+class LinearScorer:
+    """
+    Ridge regression over featurize() features.
+
+    Args:
+        l2: Ridge penalty
+    """
+
+    def __init__(self, l2: float = L2_PENALTY):
+        self.l2 = l2
+        self.dims = HASH_DIMS + len(LEXICON_FEATURES)
+        self.weights = None
+        self.intercept = 0.0
+
+    def fit(self, texts: Sequence[str], targets: Sequence[float]) -> "LinearScorer":
+        """Solve (XᵀX + l2·I) w = Xᵀ(y - ȳ) by conjugate gradient."""
+        rows, cols, values = featurize(texts)
+        y = np.asarray(targets, dtype=float)
+        n = len(y)
+        self.intercept = float(y.mean()) if n else 0.0
+
+        def X(w):
+            return np.bincount(rows, weights=values * w[cols], minlength=n)
+
+        def Xt(r):
+            return np.bincount(cols, weights=values * r[rows], minlength=self.dims)
+
+        def A(w):
+            return Xt(X(w)) + self.l2 * w
+
+        w = np.zeros(self.dims)
+        r = Xt(y - self.intercept)
+        p = r.copy()
+        rs = r @ r
+        start = rs
+        for _ in range(CG_ITERATIONS):
+            if rs <= CG_TOLERANCE * max(start, 1e-12):
+                break
+            Ap = A(p)
+            alpha = rs / (p @ Ap)
+            w += alpha * p
+            r -= alpha * Ap
+            rs_next = r @ r
+            p = r + (rs_next / rs) * p
+            rs = rs_next
+        self.weights = w
+        return self
+
+    def predict(self, texts: Sequence[str]) -> "np.ndarray":
+        """Predicted target for every text."""
+        texts = list(texts)
+        out = np.empty(len(texts))
+        for start in range(0, len(texts), CHUNK_SIZE):
+            chunk = texts[start:start + CHUNK_SIZE]
+            rows, cols, values = featurize(chunk)
+            out[start:start + len(chunk)] = self.intercept + np.bincount(
+                rows, weights=values * self.weights[cols], minlength=len(chunk))
+        return out
+
+
+class LabelCache:
+    """
+    LLM verdicts keyed by message text, as JSON lines ({"text", "score", ...}).
+
+    Args:
+        path: Cache file; None keeps labels in memory only
+    """
+
+    def __init__(self, path: Optional[PathLike] = None):
+        self.path = Path(os.path.expanduser(str(path))) if path else None
+        self.labels: Dict[str, Dict] = {}
+        if self.path and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and "text" in record and "score" in record:
+                        self.labels[record["text"]] = record
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def add(self, records: Sequence[Dict]):
+        """Store (and append to the file) new or changed labels."""
+        fresh = [r for r in records if self.labels.get(r["text"]) != r]
+        for record in fresh:
+            self.labels[record["text"]] = record
+        if not fresh or not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in fresh:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            self.path = None
+
+
+class PrefilterCascade:
+    """
+    Rank candidates locally, answer what the cache knows, and pick the rest for the LLM.
+
+    Args:
+        labels_path: LabelCache file
+        threshold: Score that counts as a hit (uncertainty is distance from it)
+        min_labels: Labels needed before the n-gram model is trained
+        explore_share: Share of the budget for uncertain candidates
+    """
+
+    def __init__(self, labels_path: Optional[PathLike], threshold: float,
+                 min_labels: int = MIN_LABELS, explore_share: float = EXPLORE_SHARE):
+        self.cache = LabelCache(labels_path)
+        self.threshold = threshold
+        self.min_labels = min_labels
+        self.explore_share = explore_share
+        self.model: Optional[LinearScorer] = None
+        self.stats = {"ranked": 0, "cached": 0, "top": 0, "uncertain": 0}
+
+    def train(self) -> Optional[LinearScorer]:
+        """Fit the n-gram model on the cached labels, if there are enough."""
+        if len(self.cache) < self.min_labels:
+            self.model = None
+            return None
+        texts = list(self.cache.labels)
+        scores = [float(self.cache.labels[t]["score"]) for t in texts]
+        self.model = LinearScorer().fit(texts, scores)
+        return self.model
+
+    def rank(self, texts: "pd.Series") -> "np.ndarray":
+        """Local score for every text (model prediction, or lexicon score before training)."""
+        if self.model is None:
+            self.train()
+        if self.model is None:
+            return lexicon_score(texts)
+        return self.model.predict(texts.tolist())
+
+    def select(self, candidates: "pd.DataFrame", budget: int, text_col: str = "text",
+               per_sender: Optional[int] = None,
+               sender_col: str = "sender") -> Tuple["pd.DataFrame", "pd.DataFrame"]:
+        """
+        Split candidates into what the LLM should see and what the cache already knows.
+
+        Args:
+            candidates: Messages to consider
+            budget: Most messages to send to the LLM
+            text_col: Message text column
+            per_sender: Most top-ranked messages to take from one sender
+            sender_col: Sender column (for per_sender)
+
+        Returns:
+            (to_llm, known): to_llm is up to budget rows, best first, then the
+            uncertain ones, with a 'local_score' column; known holds cached rows
+            with 'llm_score' and 'llm_reason' columns
+        """
+        text = candidates[text_col].fillna("").astype(str)
+        cached = text.isin(self.cache.labels.keys())
+        known = candidates[cached].copy()
+        known["llm_score"] = text[cached].map(lambda t: self.cache.labels[t]["score"])
+        known["llm_reason"] = text[cached].map(lambda t: self.cache.labels[t].get("reason", ""))
+
+        fresh = candidates[(~cached & (text != "") & ~text.duplicated()).to_numpy()]
+        scores = self.rank(fresh[text_col].astype(str)) if len(fresh) else np.zeros(0)
+        ranked = fresh.assign(local_score=scores).iloc[np.argsort(-scores, kind="stable")]
+
+        explore = int(budget * self.explore_share)
+        eligible = np.ones(len(ranked), dtype=bool)
+        if per_sender is not None and sender_col in ranked.columns:
+            eligible = (ranked.groupby(sender_col, sort=False).cumcount() < per_sender).to_numpy()
+        top_at = np.flatnonzero(eligible)[:budget - explore]
+        rest = ranked.iloc[np.setdiff1d(np.arange(len(ranked)), top_at)]
+        top = ranked.iloc[top_at]
+
+        if self.model is not None:
+            # Active learning: predictions closest to the threshold
+            margin = (rest["local_score"] - self.threshold).abs().to_numpy()
+            uncertain = rest.iloc[np.argsort(margin, kind="stable")[:explore]]
+        else:
+            # Cold start: the lexicon score isn't calibrated, so explore by interestingness
+            uncertain = rest.iloc[:0]
+            if explore and len(rest):
+                uncertain = MessageSampler(rest, sender_col=sender_col).sample(explore)
+
+        self.stats.update(ranked=len(fresh), cached=len(known), top=len(top),
+                          uncertain=len(uncertain))
+        return pd.concat([top, uncertain]), known
+
+    def record(self, texts: Sequence[str], scores: Sequence[float],
+               reasons: Optional[Sequence[str]] = None):
+        """Feed LLM verdicts back into the label cache."""
+        reasons = reasons or [""] * len(texts)
+        self.cache.add([{"text": str(t), "score": float(s), "reason": r or ""}
+                        for t, s, r in zip(texts, scores, reasons)])
+        self.model = None
+
+    def summary(self) -> str:
+        s = self.stats
+        mode = "n-gram model" if self.model is not None else "lexicon (cold start)"
+        picked = "uncertain" if self.model is not None else "exploratory"
+        return (f"🧮 Ranked {s['ranked']} messages locally with the {mode}; "
+                f"{s['cached']} already labeled, sending {s['top']} top + {s['uncertain']} {picked} to the LLM")
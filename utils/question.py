@@ -0,0 +1,498 @@
+"""
+One question record, and a columnar batch of them.
+
+Questions show up in four shapes across the pipeline:
+- pack CSV rows: ``question``, ``correct_answer`` letter, ``option_A``..``option_D``
+- generator dicts (trivia_bot, roast_mode, who_said_it, chaos_questions):
+  ``question``, ``options`` dict {"A": ..., "D": ...}, ``correct_answer`` letter
+- pydantic models / model dicts (scripts/generate_questions.py): ``text``,
+  ``options`` list, ``answer_index``
+- rows of the web app's ``questions`` table: options as JSON
+
+``Question`` is a slotted dataclass with a constructor and an exporter for
+each shape. ``QuestionBatch`` holds many questions as parallel column lists,
+so converting a whole batch is one list comprehension per column rather
+than per-row dict juggling or DataFrame ``.apply`` calls.
+
+Usage:
+    q = Question.from_row(csv_row)
+    q.to_dict()                          # generator shape
+    q.to_model_dict()                    # QuestionBank / pydantic shape
+
+    batch = QuestionBatch.from_dicts(generated)
+    batch.to_rows()                      # pack CSV rows
+    batch.to_dataframe()                 # pandas, built column by column
+    QuestionBatch.from_db(conn).to_games()
+"""
+
+import json
+import math
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+LETTERS = ("A", "B", "C", "D")
+OPTION_COLUMNS = tuple(f"option_{letter}" for letter in LETTERS)
+_LETTER_INDEX = {letter: i for i, letter in enumerate(LETTERS)}
+
+# Keys each shape uses for the question itself; anything else is kept in `extra`
+_ROW_KEYS = {"question", "correct_answer", "explanation", "difficulty", "category",
+             "type", "source", *OPTION_COLUMNS}
+_DICT_KEYS = {"question", "text", "options", "correct_answer", "answer_index", "explanation",
+              "difficulty", "category", "type", "source"}
+
+DB_COLUMNS = ("id", "type", "text", "options", "answer_index", "explanation", "category",
+              "difficulty", "source")
+
+
+def letter_index(letter: Any) -> int:
+    """Index of an answer letter, or -1 if it isn't A-D."""
+    return _LETTER_INDEX.get(str(letter or "").strip().upper(), -1)
+
+
+def _cell(value: Any, default: str = "") -> str:
+    """A CSV cell as text; None, NaN/NA and blanks become ``default``."""
+    if value is None or (isinstance(value, float) and math.isnan(value)) \
+            or type(value).__name__ == "NAType":
+        return default
+    return str(value) or default
+
+
+def _options_list(options: Any) -> Tuple[str, ...]:
+    if isinstance(options, str):
+        options = json.loads(options)
+    if isinstance(options, Mapping):
+        return tuple(_cell(options.get(letter)) for letter in LETTERS)
+    return tuple(_cell(o) for o in (options or ()))
+
+
+@dataclass(slots=True)
+class Question:
+    """
+    A multiple-choice question.
+
+    Args:
+        text: Question text
+        options: Answer options, in display order
+        answer_index: Index of the correct option (-1 if unknown)
+        type: "trivia", "who-said-it", "chaos" or "roast" (or a pack label)
+        explanation, category, difficulty, source: Metadata
+        extra: Any other fields the source carried (e.g. speaker_names)
+        id: Row id in the web app's database, if it came from there
+    """
+    text: str
+    options: Tuple[str, ...]
+    answer_index: int
+    type: str = "trivia"
+    explanation: str = ""
+    category: str = ""
+    difficulty: str = "medium"
+    source: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+    id: Optional[int] = field(default=None, compare=False)
+
+    @property
+    def correct_letter(self) -> str:
+        return LETTERS[self.answer_index] if 0 <= self.answer_index < len(LETTERS) else ""
+
+    @property
+    def correct_option(self) -> Optional[str]:
+        return self.options[self.answer_index] if 0 <= self.answer_index < len(self.options) else None
+
+    def is_playable(self) -> bool:
+        """What the game requires: text, four non-empty options and a valid answer."""
+        return (bool(self.text.strip()) and len(self.options) == 4
+                and all(o.strip() for o in self.options) and 0 <= self.answer_index < 4)
+
+    # --------------------------------------------------------------------------
+    # From each shape
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def from_row(cls, row: Mapping, question_type: str = "trivia") -> "Question":
+        """From a pack CSV row (option_A..D, correct_answer letter)."""
+        extra = {k: v for k, v in row.items() if k not in _ROW_KEYS}
+        return cls(
+            text=_cell(row.get("question")),
+            options=tuple(_cell(row.get(column)) for column in OPTION_COLUMNS),
+            answer_index=letter_index(row.get("correct_answer")),
+            type=_cell(row.get("type"), question_type),
+            explanation=_cell(row.get("explanation")),
+            category=_cell(row.get("category")),
+            difficulty=_cell(row.get("difficulty"), "medium"),
+            source=row.get("source"),
+            extra=extra or None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Mapping, question_type: str = "trivia") -> "Question":
+        """
+        From a generator dict (``options`` dict + ``correct_answer`` letter)
+        or a model dict (``text``, ``options`` list, ``answer_index``).
+        CSV-shaped dicts are handed to from_row().
+        """
+        if "options" not in data:
+            return cls.from_row(data, question_type)
+        if "answer_index" in data:
+            answer_index = int(data["answer_index"])
+        else:
+            answer_index = letter_index(data.get("correct_answer"))
+        extra = {k: v for k, v in data.items() if k not in _DICT_KEYS}
+        return cls(
+            text=data.get("text") or data.get("question") or "",
+            options=_options_list(data["options"]),
+            answer_index=answer_index,
+            type=data.get("type") or question_type,
+            explanation=data.get("explanation") or "",
+            category=data.get("category") or "",
+            difficulty=data.get("difficulty") or "medium",
+            source=data.get("source"),
+            extra=extra or None,
+        )
+
+    @classmethod
+    def from_model(cls, model) -> "Question":
+        """From a pydantic question model (v1 or v2)."""
+        data = model.model_dump() if hasattr(model, "model_dump") else model.dict()
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_db_row(cls, row: Union[sqlite3.Row, Mapping, Sequence]) -> "Question":
+        """From a ``questions`` row (mapping, or a tuple in DB_COLUMNS order)."""
+        if not isinstance(row, (Mapping, sqlite3.Row)):
+            row = dict(zip(DB_COLUMNS, row))
+        return cls(
+            text=row["text"],
+            options=_options_list(row["options"]),
+            answer_index=int(row["answer_index"]),
+            type=row["type"],
+            explanation=row["explanation"] or "",
+            category=row["category"] or "",
+            difficulty=row["difficulty"] or "medium",
+            source=row["source"],
+            id=row["id"],
+        )
+
+    @classmethod
+    def coerce(cls, item: Any, question_type: str = "trivia") -> "Question":
+        """Whatever shape `item` is in, as a Question."""
+        if isinstance(item, cls):
+            return item
+        if isinstance(item, Mapping):
+            return cls.from_dict(item, question_type)
+        if hasattr(item, "model_dump") or hasattr(item, "dict"):
+            return cls.from_model(item)
+        raise TypeError(f"Can't make a Question from {type(item).__name__}")
+
+    # --------------------------------------------------------------------------
+    # To each shape
+    # --------------------------------------------------------------------------
+
+    def to_row(self) -> Dict[str, Any]:
+        """Pack CSV row."""
+        row = {
+            "question": self.text,
+            "correct_answer": self.correct_letter,
+            "explanation": self.explanation,
+            "difficulty": self.difficulty,
+            "category": self.category,
+        }
+        row.update(zip(OPTION_COLUMNS, self.options))
+        if self.extra:
+            row.update(self.extra)
+        return row
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Generator dict (``options`` dict keyed by letter)."""
+        data = {
+            "question": self.text,
+            "options": dict(zip(LETTERS, self.options)),
+            "correct_answer": self.correct_letter,
+            "explanation": self.explanation,
+            "difficulty": self.difficulty,
+            "category": self.category,
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_model_dict(self) -> Dict[str, Any]:
+        """Model dict, as QuestionBank.add_many() and the pydantic models take it."""
+        data = {
+            "type": self.type,
+            "text": self.text,
+            "options": list(self.options),
+            "answer_index": self.answer_index,
+            "explanation": self.explanation,
+            "category": self.category,
+            "difficulty": self.difficulty,
+        }
+        if self.source:
+            data["source"] = self.source
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_game(self) -> Dict[str, Any]:
+        """The web app's in-game shape."""
+        return {
+            "question": self.text,
+            "options": list(self.options),
+            "correct": self.answer_index,
+            "explanation": self.explanation,
+            "category": self.category or "General",
+            "difficulty": self.difficulty or "medium",
+            "type": self.type,
+        }
+
+
+class QuestionBatch:
+    """
+    Many questions stored column by column.
+
+    Columns are plain lists of equal length; ``options`` is four columns, one
+    per letter. Indexing returns a Question, slicing returns a batch.
+
+    Args:
+        texts, options, answer_index, ...: Column lists (see Question fields)
+    """
+
+    __slots__ = ("texts", "options", "answer_index", "types", "explanations", "categories",
+                 "difficulties", "sources", "extras", "ids")
+
+    def __init__(self, texts: List[str], options: Sequence[List[str]], answer_index: List[int],
+                 types: List[str], explanations: List[str], categories: List[str],
+                 difficulties: List[str], sources: List[Optional[str]],
+                 extras: Optional[List[Optional[Dict]]] = None, ids: Optional[List[Optional[int]]] = None):
+        n = len(texts)
+        self.texts = texts
+        self.options = tuple(options)
+        self.answer_index = answer_index
+        self.types = types
+        self.explanations = explanations
+        self.categories = categories
+        self.difficulties = difficulties
+        self.sources = sources
+        self.extras = extras if extras is not None else [None] * n
+        self.ids = ids if ids is not None else [None] * n
+        if len(self.options) != len(LETTERS) or any(
+                len(column) != n for column in (*self.options, answer_index, types, explanations,
+                                                categories, difficulties, sources,
+                                                self.extras, self.ids)):
+            raise ValueError("QuestionBatch columns must all have the same length")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[Question]:
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(len(self))[index])
+        return Question(
+            text=self.texts[index],
+            options=tuple(column[index] for column in self.options),
+            answer_index=self.answer_index[index],
+            type=self.types[index],
+            explanation=self.explanations[index],
+            category=self.categories[index],
+            difficulty=self.difficulties[index],
+            source=self.sources[index],
+            extra=self.extras[index],
+            id=self.ids[index],
+        )
+
+    def _columns(self) -> Tuple[List, ...]:
+        return (self.texts, *self.options, self.answer_index, self.types, self.explanations,
+                self.categories, self.difficulties, self.sources, self.extras, self.ids)
+
+    @classmethod
+    def _from_columns(cls, columns: Sequence[List]) -> "QuestionBatch":
+        texts, a, b, c, d, answer_index, *rest = columns
+        return cls(texts, (a, b, c, d), answer_index, *rest)
+
+    def take(self, indices: Iterable[int]) -> "QuestionBatch":
+        """New batch with the questions at `indices`, in that order."""
+        indices = list(indices)
+        return self._from_columns([[column[i] for i in indices] for column in self._columns()])
+
+    def filter(self, mask: Sequence[bool]) -> "QuestionBatch":
+        return self.take(i for i, keep in enumerate(mask) if keep)
+
+    def extend(self, other: "QuestionBatch") -> "QuestionBatch":
+        """Append another batch's columns in place."""
+        for mine, theirs in zip(self._columns(), other._columns()):
+            mine.extend(theirs)
+        return self
+
+    def playable(self) -> List[bool]:
+        """Question.is_playable() for every row, column-wise."""
+        a, b, c, d = self.options
+        return [bool(t.strip()) and bool(oa.strip()) and bool(ob.strip()) and bool(oc.strip())
+                and bool(od.strip()) and 0 <= i < 4
+                for t, oa, ob, oc, od, i in zip(self.texts, a, b, c, d, self.answer_index)]
+
+    # --------------------------------------------------------------------------
+    # From each shape
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def from_questions(cls, questions: Iterable[Question]) -> "QuestionBatch":
+        questions = list(questions)
+        return cls(
+            texts=[q.text for q in questions],
+            options=[[q.options[i] if i < len(q.options) else "" for q in questions]
+                     for i in range(len(LETTERS))],
+            answer_index=[q.answer_index for q in questions],
+            types=[q.type for q in questions],
+            explanations=[q.explanation for q in questions],
+            categories=[q.category for q in questions],
+            difficulties=[q.difficulty for q in questions],
+            sources=[q.source for q in questions],
+            extras=[q.extra for q in questions],
+            ids=[q.id for q in questions],
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping], question_type: str = "trivia") -> "QuestionBatch":
+        """From pack CSV rows (e.g. a csv.DictReader)."""
+        rows = rows if isinstance(rows, list) else list(rows)
+        extra_keys = set().union(*rows) - _ROW_KEYS
+        extras = [{k: row[k] for k in extra_keys if k in row} or None for row in rows] \
+            if extra_keys else None
+        return cls(
+            texts=[_cell(row.get("question")) for row in rows],
+            options=[[_cell(row.get(column)) for row in rows] for column in OPTION_COLUMNS],
+            answer_index=[letter_index(row.get("correct_answer")) for row in rows],
+            types=[_cell(row.get("type"), question_type) for row in rows],
+            explanations=[_cell(row.get("explanation")) for row in rows],
+            categories=[_cell(row.get("category")) for row in rows],
+            difficulties=[_cell(row.get("difficulty"), "medium") for row in rows],
+            sources=[row.get("source") for row in rows],
+            extras=extras,
+        )
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[Any], question_type: str = "trivia") -> "QuestionBatch":
+        """From generator dicts, model dicts, models, CSV rows or Questions (mixed is fine)."""
+        items = items if isinstance(items, list) else list(items)
+        if all(isinstance(item, Mapping) and "options" not in item for item in items):
+            return cls.from_rows(items, question_type)
+        return cls.from_questions(Question.coerce(item, question_type) for item in items)
+
+    @classmethod
+    def from_models(cls, models: Iterable[Any]) -> "QuestionBatch":
+        """From pydantic question models."""
+        return cls.from_questions(Question.from_model(m) for m in models)
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection, where: str = "retired_at IS NULL",
+                params: Sequence = ()) -> "QuestionBatch":
+        """Load questions from the web app's ``questions`` table."""
+        rows = conn.execute(
+            f"SELECT {', '.join(DB_COLUMNS)} FROM questions WHERE {where} ORDER BY id",
+            params).fetchall()
+        return cls.from_db_rows(rows)
+
+    @classmethod
+    def from_db_rows(cls, rows: Sequence[Sequence]) -> "QuestionBatch":
+        """From ``questions`` rows as tuples in DB_COLUMNS order."""
+        if not rows:
+            return cls.from_questions([])
+        ids, types, texts, options, answer_index, explanations, categories, difficulties, \
+            sources = (list(column) for column in zip(*rows))
+        decoded = [_options_list(o) for o in options]
+        return cls(
+            texts=texts,
+            options=[[opts[i] if i < len(opts) else "" for opts in decoded]
+                     for i in range(len(LETTERS))],
+            answer_index=[int(i) for i in answer_index],
+            types=types,
+            explanations=[e or "" for e in explanations],
+            categories=[c or "" for c in categories],
+            difficulties=[d or "medium" for d in difficulties],
+            sources=sources,
+            ids=ids,
+        )
+
+    @classmethod
+    def from_dataframe(cls, df, question_type: str = "trivia") -> "QuestionBatch":
+        """From a DataFrame with pack CSV columns."""
+        df = df.fillna("")
+
+        def column(name, default=""):
+            return df[name].astype(str).tolist() if name in df.columns else [default] * len(df)
+
+        others = [c for c in df.columns if c not in _ROW_KEYS]
+        extras = df[others].to_dict("records") if others else None
+        return cls(
+            texts=column("question"),
+            options=[column(c) for c in OPTION_COLUMNS],
+            answer_index=[letter_index(letter) for letter in column("correct_answer")],
+            types=[t or question_type for t in column("type")],
+            explanations=column("explanation"),
+            categories=column("category"),
+            difficulties=[d or "medium" for d in column("difficulty")],
+            sources=[s or None for s in column("source")],
+            extras=extras,
+        )
+
+    # --------------------------------------------------------------------------
+    # To each shape
+    # --------------------------------------------------------------------------
+
+    def correct_letters(self) -> List[str]:
+        return [LETTERS[i] if 0 <= i < 4 else "" for i in self.answer_index]
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Pack CSV rows."""
+        a, b, c, d = self.options
+        rows = [
+            {"question": t, "correct_answer": letter, "explanation": e, "difficulty": diff,
+             "category": cat, "option_A": oa, "option_B": ob, "option_C": oc, "option_D": od}
+            for t, letter, e, diff, cat, oa, ob, oc, od in zip(
+                self.texts, self.correct_letters(), self.explanations, self.difficulties,
+                self.categories, a, b, c, d)
+        ]
+        for row, extra in zip(rows, self.extras):
+            if extra:
+                row.update(extra)
+        return rows
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Generator dicts (``options`` dict keyed by letter)."""
+        return [q.to_dict() for q in self]
+
+    def to_model_dicts(self) -> List[Dict[str, Any]]:
+        """Model dicts, as QuestionBank.add_many() takes them."""
+        return [q.to_model_dict() for q in self]
+
+    def to_games(self) -> List[Dict[str, Any]]:
+        """The web app's in-game shape."""
+        a, b, c, d = self.options
+        return [
+            {"question": t, "options": [oa, ob, oc, od], "correct": i, "explanation": e,
+             "category": cat or "General", "difficulty": diff or "medium", "type": q_type}
+            for t, oa, ob, oc, od, i, e, cat, diff, q_type in zip(
+                self.texts, a, b, c, d, self.answer_index, self.explanations, self.categories,
+                self.difficulties, self.types)
+        ]
+
+    def to_dataframe(self):
+        """pandas DataFrame with pack CSV columns (plus type and source)."""
+        data = {
+            "question": self.texts,
+            "correct_answer": self.correct_letters(),
+            "explanation": self.explanations,
+            "difficulty": self.difficulties,
+            "category": self.categories,
+            **dict(zip(OPTION_COLUMNS, self.options)),
+            "type": self.types,
+            "source": self.sources,
+        }
+        return pd.DataFrame(data)
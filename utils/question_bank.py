@@ -0,0 +1,357 @@
+"""
+Question bank manager for the web app's SQLite database.
+
+Every question is fingerprinted by its type plus normalized text
+(``question_hash``) and by its normalized, order-independent options
+(``options_hash``). Rows are keyed on ``question_hash``: re-adding a
+question refreshes its row (options included) instead of adding another,
+and ``exists_many()`` lets generators skip material the bank already covers
+before spending tokens on it.
+
+The columns and the unique index are part of the web app's schema
+(web-app/database.js); this module only fills in and uses the hashes.
+
+Usage:
+    bank = QuestionBank()
+    bank.exists_many([{"type": "trivia", "text": "What is 2+2?"}])   # [True]
+    bank.add_many(questions, source="ai-generated")
+
+    python -m utils.question_bank --stats
+    python -m utils.question_bank --retire-duplicates
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Literal, Optional, Sequence, Union
+
+from utils.question import Question
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DB_PATH = PROJECT_ROOT / "data" / "henze_trivia.db"
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_CHUNK_SIZE = 500
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+_UPSERT_SQL = """
+    INSERT INTO questions (type, text, options, answer_index, explanation, category, topic,
+                           difficulty, source, question_hash, options_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(question_hash) DO {action}
+"""
+
+_UPDATE_ON_CONFLICT = """UPDATE SET
+        options = excluded.options,
+        options_hash = excluded.options_hash,
+        answer_index = excluded.answer_index,
+        explanation = excluded.explanation,
+        category = excluded.category,
+        topic = excluded.topic,
+        difficulty = excluded.difficulty,
+        source = excluded.source"""
+
+QuestionLike = Union[str, Dict]
+
+
+def normalize_question_text(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace for dedup."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def question_hash(question: Dict) -> str:
+    """Fingerprint of the question type plus normalized question text."""
+    key = f"{question['type']}|{normalize_question_text(question['text'])}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def options_hash(options: Iterable[str]) -> str:
+    """Order-independent fingerprint of the normalized answer options."""
+    key = "|".join(sorted(normalize_question_text(str(o)) for o in options))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _load_options(value) -> List[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return [value]
+    return list(value or [])
+
+
+def connect(db_path: Union[str, Path] = DB_PATH) -> sqlite3.Connection:
+    """
+    Open the trivia database, tuned for bulk writes.
+
+    WAL lets the web app keep reading while we write, and synchronous=NORMAL
+    only fsyncs at checkpoints instead of on every commit.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class QuestionBank:
+    """
+    Fingerprinted access to the ``questions`` table.
+
+    Args:
+        conn: Existing connection (e.g. from connect()); opened from db_path if omitted
+        db_path: Database file used when no connection is given
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None,
+                 db_path: Union[str, Path] = DB_PATH):
+        self.conn = conn if conn is not None else connect(db_path)
+        self._schema_ready = False
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --------------------------------------------------------------------------
+    # Schema
+    # --------------------------------------------------------------------------
+
+    def ensure_schema(self):
+        """
+        Check the web app's schema and fingerprint new rows.
+
+        Rows written by the web app or the CSV migration have no fingerprints;
+        they are filled in here. A row repeating a question that is already
+        fingerprinted is left unfingerprinted (see retire_duplicates()).
+        """
+        if self._schema_ready:
+            return
+
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(questions)")}
+        if not columns:
+            raise sqlite3.OperationalError(
+                "questions table not found - start the web app once (or run "
+                "scripts/setup_new_architecture.sh) to create the schema")
+        if not {"question_hash", "options_hash"} <= columns:
+            raise sqlite3.OperationalError(
+                "questions table has no fingerprint columns - start the web app "
+                "once to migrate the schema (web-app/database.js)")
+
+        with self.conn:
+            self._backfill()
+
+        self._schema_ready = True
+
+    def _backfill(self):
+        pending = self.conn.execute(
+            "SELECT id, type, text, options FROM questions "
+            "WHERE question_hash IS NULL OR options_hash IS NULL ORDER BY id").fetchall()
+        if not pending:
+            return
+
+        seen = {row[0] for row in self.conn.execute(
+            "SELECT question_hash FROM questions "
+            "WHERE question_hash IS NOT NULL AND options_hash IS NOT NULL")}
+        updates = []
+        for row_id, q_type, text, options in pending:
+            text_key = question_hash({"type": q_type, "text": text})
+            if text_key in seen:
+                continue
+            seen.add(text_key)
+            updates.append((text_key, options_hash(_load_options(options)), row_id))
+
+        self.conn.execute("UPDATE questions SET question_hash = NULL, options_hash = NULL "
+                          "WHERE question_hash IS NULL OR options_hash IS NULL")
+        self.conn.executemany("UPDATE questions SET question_hash = ?, options_hash = ? "
+                              "WHERE id = ?", updates)
+
+    # --------------------------------------------------------------------------
+    # Lookups
+    # --------------------------------------------------------------------------
+
+    def exists_many(self, questions: Sequence[QuestionLike],
+                    question_type: Optional[str] = None) -> List[bool]:
+        """
+        Check which questions the bank already holds, in bulk.
+
+        Items are question dicts (``type`` and ``text``) or plain question
+        texts with ``question_type`` given. They match on type and text, the
+        bank's key; options don't matter, since adding the question again
+        would only refresh the existing row.
+
+        Args:
+            questions: Question dicts or texts
+            question_type: Type for plain-text items (and dicts without one)
+
+        Returns:
+            One bool per item, in order
+        """
+        self.ensure_schema()
+
+        keys = []
+        for item in questions:
+            if isinstance(item, str):
+                item = {"text": item}
+            q_type = item.get("type") or question_type
+            if q_type is None:
+                raise ValueError("question type required (pass question_type=...)")
+            keys.append(question_hash({"type": q_type, "text": item.get("text", "")}))
+
+        known = set()
+        text_keys = list(set(keys))
+        for start in range(0, len(text_keys), _CHUNK_SIZE):
+            chunk = text_keys[start:start + _CHUNK_SIZE]
+            known.update(row[0] for row in self.conn.execute(
+                f"SELECT question_hash FROM questions "
+                f"WHERE question_hash IN ({','.join('?' * len(chunk))})", chunk))
+
+        return [key in known for key in keys]
+
+    def filter_new(self, questions: Sequence[QuestionLike],
+                   question_type: Optional[str] = None) -> List[QuestionLike]:
+        """Drop questions already in the bank, and repeats within the batch."""
+        exists = self.exists_many(questions, question_type)
+        fresh, seen = [], set()
+        for item, known in zip(questions, exists):
+            if known:
+                continue
+            text = item if isinstance(item, str) else item.get("text", "")
+            key = normalize_question_text(text)
+            if key in seen:
+                continue
+            seen.add(key)
+            fresh.append(item)
+        return fresh
+
+    # --------------------------------------------------------------------------
+    # Writes
+    # --------------------------------------------------------------------------
+
+    def add_many(self, questions: Sequence[Union[Dict, Question]], source: Optional[str] = None,
+                 on_conflict: Literal["update", "ignore"] = "update") -> Dict[str, int]:
+        """
+        Insert a batch of questions in a single transaction.
+
+        A question whose text is already in the bank refreshes that row's
+        options, answer and metadata (keeping its id and usage stats), or is
+        skipped with on_conflict="ignore".
+
+        Args:
+            questions: Question dicts (model .dict() output), Question records
+                or a QuestionBatch (see utils/question.py)
+            source: Overrides each question's "source" field
+            on_conflict: "update" to refresh existing rows, "ignore" to keep them
+
+        Returns:
+            {"inserted": n, "existing": n} counts
+        """
+        if not questions:
+            return {"inserted": 0, "existing": 0}
+
+        self.ensure_schema()
+        rows = [self._row(q, source) for q in questions]
+        action = _UPDATE_ON_CONFLICT if on_conflict == "update" else "NOTHING"
+
+        with self.conn:
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM questions").fetchone()[0]
+            self.conn.executemany(_UPSERT_SQL.format(action=action), rows)
+            inserted = self.conn.execute("SELECT COUNT(*) FROM questions WHERE id > ?",
+                                         (last_id,)).fetchone()[0]
+
+        return {"inserted": inserted, "existing": len(rows) - inserted}
+
+    def find_id(self, question: Dict) -> Optional[int]:
+        """Row id of a question, matched on its type and text."""
+        self.ensure_schema()
+        row = self.conn.execute("SELECT id FROM questions WHERE question_hash = ?",
+                                (question_hash(question),)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _row(question: Union[Dict, Question], source: Optional[str]) -> tuple:
+        if isinstance(question, Question):
+            question = question.to_model_dict()
+        return (
+            question["type"],
+            question["text"],
+            json.dumps(question["options"]),
+            question["answer_index"],
+            question.get("explanation", ""),
+            question.get("category", ""),
+            question.get("category", ""),  # Use category as topic for now
+            question.get("difficulty", "medium"),
+            source or question.get("source", "ai-generated"),
+            question_hash(question),
+            options_hash(question["options"]),
+        )
+
+    def retire_duplicates(self) -> int:
+        """
+        Retire active rows that repeat a fingerprinted question.
+
+        The fingerprinted copy (the oldest, from the backfill) is kept.
+        Duplicates are retired rather than deleted so their game history stays.
+
+        Returns:
+            Number of rows retired
+        """
+        self.ensure_schema()
+        fingerprints = {row[0] for row in self.conn.execute(
+            "SELECT question_hash FROM questions WHERE question_hash IS NOT NULL")}
+
+        duplicates = []
+        for row_id, q_type, text in self.conn.execute(
+                "SELECT id, type, text FROM questions "
+                "WHERE question_hash IS NULL AND retired_at IS NULL"):
+            if question_hash({"type": q_type, "text": text}) in fingerprints:
+                duplicates.append((int(time.time()), row_id))
+
+        with self.conn:
+            self.conn.executemany("UPDATE questions SET retired_at = ? WHERE id = ?", duplicates)
+        return len(duplicates)
+
+    def stats(self) -> Dict[str, int]:
+        """Active, retired and unfingerprinted (duplicate) row counts."""
+        self.ensure_schema()
+        active, retired, duplicates = self.conn.execute("""
+            SELECT
+                SUM(retired_at IS NULL),
+                SUM(retired_at IS NOT NULL),
+                SUM(question_hash IS NULL AND retired_at IS NULL)
+            FROM questions
+        """).fetchone()
+        return {"active": active or 0, "retired": retired or 0, "duplicates": duplicates or 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and deduplicate the question bank")
+    parser.add_argument("--db", default=str(DB_PATH), help="Trivia database path")
+    parser.add_argument("--stats", action="store_true", help="Show bank counts")
+    parser.add_argument("--retire-duplicates", action="store_true",
+                        help="Retire active rows that duplicate another question")
+    args = parser.parse_args()
+
+    with QuestionBank(db_path=args.db) as bank:
+        if args.retire_duplicates:
+            print(f"🧹 Retired {bank.retire_duplicates()} duplicate questions")
+        stats = bank.stats()
+        print(f"📚 {stats['active']} active, {stats['retired']} retired, "
+              f"{stats['duplicates']} active duplicates")
+
+
+if __name__ == "__main__":
+    main()
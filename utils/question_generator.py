@@ -1,6 +1,8 @@
 import pandas as pd
 import random
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from utils.stylometry import SenderProfiles
 
 DATA_PATH = "../output/chat_export.csv"
 
@@ -12,14 +14,19 @@ def load_chat_data(path: str = DATA_PATH) -> pd.DataFrame:
 
 # Generate a "Who said it?" question
 
-def generate_who_said_it(df: pd.DataFrame) -> Dict[str, Any]:
+def generate_who_said_it(df: pd.DataFrame, profiles: Optional[SenderProfiles] = None) -> Dict[str, Any]:
     row = df.sample(1).iloc[0]
     text = row['text']
     correct = row['sender']
-    # Get 3 other random names
     all_names = df['sender'].unique().tolist()
-    distractors = [n for n in all_names if n != correct]
-    options = random.sample(distractors, min(3, len(distractors))) + [correct]
+    if profiles is not None:
+        # 3 names whose writing the quote most resembles
+        scores = profiles.rank_quotes([text], [correct]).iloc[0]
+        options = profiles.distractors(correct, scores=scores, pool=all_names) + [correct]
+    else:
+        # Get 3 other random names
+        distractors = [n for n in all_names if n != correct]
+        options = random.sample(distractors, min(3, len(distractors))) + [correct]
     random.shuffle(options)
     return {
         "type": "who_said_it",
@@ -49,14 +56,14 @@ def generate_which_group(df: pd.DataFrame) -> Dict[str, Any]:
 
 # Generate a random question
 
-def generate_random_question(df: pd.DataFrame) -> Dict[str, Any]:
+def generate_random_question(df: pd.DataFrame, profiles: Optional[SenderProfiles] = None) -> Dict[str, Any]:
     if random.random() < 0.5:
-        return generate_who_said_it(df)
+        return generate_who_said_it(df, profiles)
     else:
         return generate_which_group(df)
 
 # Example usage
 if __name__ == "__main__":
     df = load_chat_data()
-    q = generate_random_question(df)
+    q = generate_random_question(df, SenderProfiles(df))
     print(q)
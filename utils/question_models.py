@@ -0,0 +1,78 @@
+"""
+Pydantic schemas for generated questions.
+
+The generators' LLM output is checked against these models, both by
+scripts/generate_questions.py and, item by item while streaming, by
+``utils.streaming.model_validator``. They live here so validating a
+question never imports a generator script.
+
+Usage:
+    from utils.question_models import TriviaQuestion
+    TriviaQuestion(text=..., options=[...], answer_index=0, explanation=..., category=...)
+"""
+
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, validator
+
+
+class QuestionOption(BaseModel):
+    """Single answer option"""
+    text: str = Field(..., min_length=1, max_length=200)
+
+
+class TriviaQuestion(BaseModel):
+    """General trivia question"""
+    type: Literal["trivia"] = "trivia"
+    text: str = Field(..., min_length=10, max_length=500, description="The question text")
+    options: List[str] = Field(..., min_items=4, max_items=4, description="Exactly 4 answer options")
+    answer_index: int = Field(..., ge=0, le=3, description="Index of correct answer (0-3)")
+    explanation: str = Field(..., min_length=10, max_length=500, description="Why this answer is correct")
+    category: str = Field(..., min_length=2, max_length=50, description="Topic category")
+    difficulty: Literal["easy", "medium", "hard"] = Field(default="medium")
+
+    @validator("options")
+    def validate_options(cls, v):
+        if len(v) != 4:
+            raise ValueError("Must have exactly 4 options")
+        if len(set(v)) != 4:
+            raise ValueError("All options must be unique")
+        return v
+
+
+class WhoSaidItQuestion(BaseModel):
+    """Quote attribution question"""
+    type: Literal["who-said-it"] = "who-said-it"
+    text: str = Field(..., description="Format: 'Who said: \"[quote]\"?'")
+    options: List[str] = Field(..., min_items=4, max_items=4, description="4 person names from chat")
+    answer_index: int = Field(..., ge=0, le=3)
+    explanation: str = Field(..., description="Context about when/why they said it")
+    category: str = Field(default="quotes")
+    speaker_names: List[str] = Field(..., description="Must match names in chat roster")
+
+    @validator("text")
+    def validate_quote_format(cls, v):
+        if not v.startswith("Who said:"):
+            raise ValueError("Must start with 'Who said:'")
+        return v
+
+
+class ChaosQuestion(BaseModel):
+    """Message timing/pattern question"""
+    type: Literal["chaos"] = "chaos"
+    text: str = Field(..., description="Question about message patterns or timing")
+    options: List[str] = Field(..., min_items=4, max_items=4)
+    answer_index: int = Field(..., ge=0, le=3)
+    explanation: str = Field(..., description="Data source or explanation")
+    category: str = Field(default="chaos")
+
+
+class RoastQuestion(BaseModel):
+    """Personality roast question"""
+    type: Literal["roast"] = "roast"
+    text: str = Field(..., min_length=10, max_length=300, description="Punchy, 1-line roast setup")
+    options: List[str] = Field(..., min_items=4, max_items=4, description="4 person names")
+    answer_index: int = Field(..., ge=0, le=3)
+    explanation: str = Field(..., description="Why this roast fits")
+    category: str = Field(default="roast")
+    roasted_person: str = Field(..., description="Name of person being roasted")
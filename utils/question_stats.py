@@ -0,0 +1,350 @@
+"""
+Usage analytics for questions that have been played in the web app.
+
+Every round the web app plays is logged in ``game_results`` (per question)
+and ``player_answers`` (per player). This module folds both tables into
+per-question usage numbers with one grouped aggregate per table:
+- empirical difficulty (correct rate, smoothed toward a prior for
+  questions with few answers)
+- answer-time distribution (mean, spread, histogram, estimated median)
+- laugh votes per play
+- how often and how recently the question was played
+
+From those, each question gets a ``preference`` in [0, 1]: fresh questions
+whose observed difficulty matches their label score high; questions that
+everyone gets right instantly, or that have been played to death, are
+``stale``. The pack builder ranks its buckets with these, and the generator
+uses ``fresh_counts()`` to skip topping up types that are already stocked.
+
+Usage:
+    with QuestionStats() as stats:
+        usage = stats.by_text()            # {normalized text: QuestionUsage}
+        stats.fresh_counts()               # {"trivia": 412, "roast": 37, ...}
+
+    python -m utils.question_stats                 # summary
+    python -m utils.question_stats --stale 20      # worst offenders
+    python -m utils.question_stats --sync          # write stats back to questions
+"""
+
+import argparse
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from utils.question_bank import DB_PATH, connect, normalize_question_text
+
+# Upper edges (ms) of the answer-time histogram; the last bin is open-ended
+ANSWER_TIME_BINS = (2000, 5000, 10000, 20000)
+
+# Correct rate each labelled difficulty should land near
+TARGET_CORRECT_RATE = {"easy": 0.8, "medium": 0.55, "hard": 0.3}
+
+# Beta prior for the smoothed correct rate: PRIOR_RATE worth PRIOR_WEIGHT answers
+PRIOR_RATE = 0.55
+PRIOR_WEIGHT = 4
+
+MIN_ANSWERS = 5             # answers before the observed difficulty overrides the label
+INSTANT_MS = 3000           # "everyone knew it instantly"
+INSTANT_CORRECT = 0.9
+MAX_PLAYS = 8               # plays before a question counts as worn out
+COOLDOWN_DAYS = 14          # recently played questions rank lower for this long
+
+_HISTOGRAM = ",\n".join(
+    f"SUM(answer_time_ms >= {lo} AND answer_time_ms < {hi})"
+    for lo, hi in zip((0,) + ANSWER_TIME_BINS, ANSWER_TIME_BINS)
+) + f",\nSUM(answer_time_ms >= {ANSWER_TIME_BINS[-1]})"
+
+_USAGE_SQL = f"""
+    WITH rounds AS (
+        SELECT question_id,
+               COUNT(*) AS plays,
+               SUM(players_answered) AS answered,
+               SUM(players_correct) AS correct,
+               SUM(laugh_votes) AS laughs,
+               AVG(avg_answer_time_ms) AS avg_ms,
+               MAX(created_at) AS last_played
+        FROM game_results
+        GROUP BY question_id
+    ),
+    answers AS (
+        SELECT question_id,
+               COUNT(*) AS answered,
+               SUM(is_correct) AS correct,
+               SUM(voted_funny) AS funny,
+               AVG(answer_time_ms) AS avg_ms,
+               AVG(answer_time_ms * answer_time_ms) AS avg_sq_ms,
+               {_HISTOGRAM},
+               MAX(created_at) AS last_played
+        FROM player_answers
+        GROUP BY question_id
+    )
+    SELECT q.id, q.type, q.text, q.difficulty, q.times_used, q.last_used_at, q.retired_at,
+           r.plays, r.answered, r.correct, r.laughs, r.avg_ms, r.last_played,
+           a.*
+    FROM questions q
+    LEFT JOIN rounds r ON r.question_id = q.id
+    LEFT JOIN answers a ON a.question_id = q.id
+    WHERE r.question_id IS NOT NULL OR a.question_id IS NOT NULL
+"""
+
+_SYNC_SQL = """
+    UPDATE questions
+    SET avg_answer_time_ms = agg.avg_ms,
+        correct_rate = agg.correct_rate,
+        laugh_score = agg.laugh_score
+    FROM (
+        SELECT question_id,
+               CAST(AVG(avg_answer_time_ms) AS INTEGER) AS avg_ms,
+               CAST(SUM(players_correct) AS REAL) / NULLIF(SUM(players_answered), 0) AS correct_rate,
+               CAST(SUM(laugh_votes) AS REAL) / COUNT(*) AS laugh_score
+        FROM game_results
+        GROUP BY question_id
+    ) AS agg
+    WHERE questions.id = agg.question_id
+"""
+
+
+@dataclass
+class QuestionUsage:
+    """Aggregated play history of one question."""
+    question_id: int
+    type: str
+    text: str
+    difficulty: Optional[str]
+    plays: int
+    answered: int
+    correct: int
+    laughs: int
+    avg_answer_ms: Optional[float]
+    std_answer_ms: Optional[float]
+    time_histogram: Tuple[int, ...]
+    last_played: Optional[int]
+    retired: bool
+
+    @property
+    def correct_rate(self) -> Optional[float]:
+        return self.correct / self.answered if self.answered else None
+
+    @property
+    def smoothed_rate(self) -> float:
+        """Correct rate pulled toward PRIOR_RATE while there are few answers."""
+        return (self.correct + PRIOR_RATE * PRIOR_WEIGHT) / (self.answered + PRIOR_WEIGHT)
+
+    @property
+    def laugh_rate(self) -> float:
+        return self.laughs / self.plays if self.plays else 0.0
+
+    @property
+    def median_answer_ms(self) -> Optional[float]:
+        """Median answer time, interpolated within its histogram bin."""
+        total = sum(self.time_histogram)
+        if not total:
+            return self.avg_answer_ms
+        edges = (0,) + ANSWER_TIME_BINS
+        seen = 0
+        for i, count in enumerate(self.time_histogram):
+            if count and seen + count >= total / 2:
+                if i >= len(ANSWER_TIME_BINS):
+                    return float(edges[-1])
+                lo, hi = edges[i], ANSWER_TIME_BINS[i]
+                return lo + (hi - lo) * (total / 2 - seen) / count
+            seen += count
+        return float(edges[-1])
+
+    @property
+    def empirical_difficulty(self) -> Optional[str]:
+        """Difficulty the players' answers suggest, once there are enough of them."""
+        if self.answered < MIN_ANSWERS:
+            return None
+        rate = self.smoothed_rate
+        if rate >= (TARGET_CORRECT_RATE["easy"] + TARGET_CORRECT_RATE["medium"]) / 2:
+            return "easy"
+        if rate <= (TARGET_CORRECT_RATE["medium"] + TARGET_CORRECT_RATE["hard"]) / 2:
+            return "hard"
+        return "medium"
+
+    def calibration_error(self, difficulty: Optional[str] = None) -> float:
+        """Distance between the smoothed correct rate and the difficulty's target."""
+        difficulty = (difficulty or self.difficulty or "").lower()
+        return abs(self.smoothed_rate - TARGET_CORRECT_RATE.get(difficulty, PRIOR_RATE))
+
+    @property
+    def is_instant(self) -> bool:
+        """Everyone gets it right, and fast."""
+        median = self.median_answer_ms
+        return (self.answered >= MIN_ANSWERS and self.smoothed_rate >= INSTANT_CORRECT
+                and median is not None and median < INSTANT_MS)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.retired or self.is_instant or self.plays >= MAX_PLAYS
+
+    def preference(self, difficulty: Optional[str] = None, now: Optional[float] = None) -> float:
+        """
+        How much a pack should want this question (0 = avoid, 1 = ideal).
+
+        Combines freshness (fewer and older plays), calibration (observed
+        correct rate near the target for `difficulty`, by default its label)
+        and, for group chat questions, laughs.
+        """
+        if self.is_stale:
+            return 0.0
+        now = time.time() if now is None else now
+        freshness = 1.0 - self.plays / MAX_PLAYS
+        if self.last_played:
+            days = (now - self.last_played) / 86400
+            freshness *= min(1.0, 0.5 + 0.5 * days / COOLDOWN_DAYS)
+        calibration = 1.0 - min(1.0, 2 * self.calibration_error(difficulty))
+        score = freshness * (0.5 + 0.5 * calibration)
+        if self.type != "trivia":
+            score *= 0.75 + 0.25 * min(1.0, self.laugh_rate)
+        return score
+
+
+class QuestionStats:
+    """
+    Per-question usage computed from ``game_results`` and ``player_answers``.
+
+    Args:
+        conn: Existing connection; opened from db_path if omitted
+        db_path: Database file used when no connection is given
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None,
+                 db_path: Union[str, Path] = DB_PATH):
+        self.conn = conn if conn is not None else connect(db_path)
+        self._usage: Optional[List[QuestionUsage]] = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --------------------------------------------------------------------------
+    # Aggregates
+    # --------------------------------------------------------------------------
+
+    def usage(self, refresh: bool = False) -> List[QuestionUsage]:
+        """Usage of every question that has been played (one query, cached)."""
+        if self._usage is not None and not refresh:
+            return self._usage
+
+        bins = len(ANSWER_TIME_BINS) + 1
+        usage = []
+        for row in self.conn.execute(_USAGE_SQL):
+            (qid, q_type, text, difficulty, times_used, last_used_at, retired_at,
+             plays, r_answered, r_correct, laughs, r_avg_ms, r_last) = row[:13]
+            (_, a_answered, a_correct, funny, a_avg_ms, a_avg_sq_ms) = row[13:19]
+            histogram = tuple(int(n or 0) for n in row[19:19 + bins])
+            a_last = row[19 + bins]
+
+            # Per-player answers are exact; round summaries fill in when they're missing
+            if a_answered:
+                answered, correct, avg_ms = a_answered, a_correct or 0, a_avg_ms
+                variance = max(0.0, (a_avg_sq_ms or 0) - a_avg_ms ** 2)
+                std_ms = variance ** 0.5
+            else:
+                answered, correct, avg_ms, std_ms = r_answered or 0, r_correct or 0, r_avg_ms, None
+
+            usage.append(QuestionUsage(
+                question_id=qid,
+                type=q_type,
+                text=text,
+                difficulty=difficulty,
+                plays=max(plays or 0, times_used or 0),
+                answered=int(answered),
+                correct=int(correct),
+                laughs=int(max(laughs or 0, funny or 0)),
+                avg_answer_ms=avg_ms,
+                std_answer_ms=std_ms,
+                time_histogram=histogram,
+                last_played=max(filter(None, (r_last, a_last, last_used_at)), default=None),
+                retired=retired_at is not None,
+            ))
+
+        self._usage = usage
+        return usage
+
+    def by_text(self) -> Dict[str, QuestionUsage]:
+        """Usage keyed by normalized question text, for matching pack CSV rows."""
+        return {normalize_question_text(u.text): u for u in self.usage()}
+
+    def fresh_counts(self) -> Dict[str, int]:
+        """Active questions per type that are not stale (never-played ones included)."""
+        stale = {u.question_id for u in self.usage() if u.is_stale}
+        counts: Dict[str, int] = {}
+        for qid, q_type in self.conn.execute(
+                "SELECT id, type FROM questions WHERE retired_at IS NULL"):
+            if qid not in stale:
+                counts[q_type] = counts.get(q_type, 0) + 1
+        return counts
+
+    def stale(self, limit: Optional[int] = None) -> List[QuestionUsage]:
+        """Stale active questions, most played first."""
+        rows = sorted((u for u in self.usage() if u.is_stale and not u.retired),
+                      key=lambda u: (-u.plays, -u.smoothed_rate))
+        return rows[:limit] if limit else rows
+
+    def sync(self) -> int:
+        """
+        Write correct rate, answer time and laugh score back to ``questions``.
+
+        Same numbers as the web app's learning loop, in one UPDATE ... FROM.
+
+        Returns:
+            Number of questions updated
+        """
+        with self.conn:
+            updated = self.conn.execute(_SYNC_SQL).rowcount
+        self._usage = None
+        return updated
+
+    def summary(self) -> Dict[str, float]:
+        usage = self.usage()
+        answered = sum(u.answered for u in usage)
+        return {
+            "played": len(usage),
+            "answers": answered,
+            "correct_rate": sum(u.correct for u in usage) / answered if answered else 0.0,
+            "stale": sum(u.is_stale and not u.retired for u in usage),
+            "instant": sum(u.is_instant for u in usage),
+            "miscalibrated": sum(1 for u in usage if u.empirical_difficulty
+                                 and u.difficulty and u.empirical_difficulty != u.difficulty),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question usage analytics from game history")
+    parser.add_argument("--db", default=str(DB_PATH), help="Trivia database path")
+    parser.add_argument("--stale", type=int, metavar="N", help="List the N most worn-out questions")
+    parser.add_argument("--sync", action="store_true",
+                        help="Write correct rate, answer time and laugh score back to questions")
+    args = parser.parse_args()
+
+    with QuestionStats(db_path=args.db) as stats:
+        if args.sync:
+            print(f"🧠 Updated stats for {stats.sync()} questions")
+
+        summary = stats.summary()
+        print(f"📊 {summary['played']} questions played, {summary['answers']} answers, "
+              f"{summary['correct_rate']:.0%} correct")
+        print(f"   {summary['stale']} stale ({summary['instant']} answered instantly by everyone), "
+              f"{summary['miscalibrated']} with a wrong difficulty label")
+        print(f"   Fresh per type: {stats.fresh_counts()}")
+
+        if args.stale:
+            print(f"\n🗑️  Most worn-out questions:")
+            for u in stats.stale(args.stale):
+                median = u.median_answer_ms
+                print(f"   [{u.type}] {u.text[:60]} - played {u.plays}x, "
+                      f"{u.smoothed_rate:.0%} correct, median {median or 0:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
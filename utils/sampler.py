@@ -0,0 +1,237 @@
+"""
+Interestingness-weighted message sampling.
+
+The generators hand the LLM a random handful of chat messages. Instead of a
+uniform ``DataFrame.sample``, ``MessageSampler`` draws messages in proportion
+to how promising they look as trivia material:
+
+- length (up to 200 characters), keyword hits and emoji from the feature
+  store columns (utils/features.py)
+- laugh reactions: how many "Laughed at “...”" tapbacks quote the message
+- sender balance: each sender's weights are scaled down by their total, so
+  the chattiest person doesn't crowd everyone else out
+
+Draws use Vose's alias method: after an O(n) build, each draw is O(1) (one
+uniform index and one coin flip). Sampling without replacement rejects
+repeats and rebuilds the table over the remaining messages once rejections
+pile up, and per-sender quotas are enforced the same way.
+
+Usage:
+    sampler = MessageSampler(messages_df[messages_df["length"] > 20], seed=7)
+    rows = sampler.sample(100, per_sender=25)        # DataFrame rows, no repeats
+"""
+
+import random
+from typing import Dict, List, Optional, Sequence, Union
+
+from utils.features import compute_features
+from utils.lazy import lazy_import
+from utils.text import LAUGHED_AT_RE, TAPBACK_RE
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Relative weight of each interestingness signal
+INTEREST_WEIGHTS = {
+    "length": 1.0,
+    "keywords": 1.5,
+    "emoji": 0.5,
+    "laughs": 2.0,
+}
+
+# Every real message keeps at least this much weight, so nothing is unreachable
+BASE_WEIGHT = 0.1
+
+# 0 = no balancing, 1 = every sender gets the same total weight
+SENDER_BALANCE = 0.5
+
+# Keyword flags that count towards the keyword signal
+INTEREST_KEYWORDS = ("kw_memorable", "kw_savage", "kw_laughter", "kw_drunk")
+
+Quota = Union[int, Dict[str, int]]
+
+
+class AliasTable:
+    """
+    Vose alias table for O(1) weighted draws.
+
+    Args:
+        weights: Non-negative weights (at least one positive)
+    """
+
+    __slots__ = ("prob", "alias", "size")
+
+    def __init__(self, weights: Sequence[float]):
+        weights = np.asarray(weights, dtype=float)
+        n = len(weights)
+        total = weights.sum()
+        if n == 0 or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+
+        scaled = (weights * (n / total)).tolist()
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            s, l = small.pop(), large[-1]
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(large.pop())
+        # Leftovers are 1.0 up to rounding
+
+        self.prob = prob
+        self.alias = alias
+        self.size = n
+
+    def draw(self, rng: random.Random) -> int:
+        """Index drawn with probability proportional to its weight."""
+        i = int(rng.random() * self.size)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def laugh_counts(text: "pd.Series") -> "pd.Series":
+    """How many "Laughed at" tapbacks quote each message's text."""
+    quotes = text.str.extract(LAUGHED_AT_RE)["quote"].dropna()
+    if quotes.empty:
+        return pd.Series(0, index=text.index)
+    return text.map(quotes.value_counts()).fillna(0).astype(int)
+
+
+def interestingness(messages_df: "pd.DataFrame", text_col: str = "text",
+                    sender_col: str = "sender", balance: float = SENDER_BALANCE) -> "pd.Series":
+    """
+    Sampling weight for every message.
+
+    Args:
+        messages_df: Messages with the feature columns (computed if missing)
+        text_col: Message text column
+        sender_col: Sender column
+        balance: Sender balancing strength (see SENDER_BALANCE)
+
+    Returns:
+        Series of non-negative weights aligned with messages_df; tapbacks
+        and empty messages get 0
+    """
+    df = messages_df
+    missing = [c for c in ["length", "emoji_count", *INTEREST_KEYWORDS] if c not in df.columns]
+    if missing:
+        df = df.join(compute_features(df, text_col=text_col, time_col=None)[missing])
+    text = df[text_col].fillna("").astype(str)
+
+    keywords = df[list(INTEREST_KEYWORDS)].fillna(False).astype(int).sum(axis=1) / len(INTEREST_KEYWORDS)
+
+    weights = (BASE_WEIGHT
+               + INTEREST_WEIGHTS["length"] * df["length"].clip(upper=200) / 200
+               + INTEREST_WEIGHTS["keywords"] * keywords
+               + INTEREST_WEIGHTS["emoji"] * df["emoji_count"].clip(upper=3) / 3
+               + INTEREST_WEIGHTS["laughs"] * laugh_counts(text).clip(upper=3) / 3)
+    weights = weights.where(~text.str.contains(TAPBACK_RE) & (text.str.strip() != ""), 0.0)
+
+    if balance and sender_col in df.columns:
+        sender_totals = weights.groupby(df[sender_col]).transform("sum")
+        weights = weights / sender_totals.where(sender_totals > 0, 1.0) ** balance
+    return weights.astype(float)
+
+
+class MessageSampler:
+    """
+    Weighted sampler over one message corpus, built once and drawn from many times.
+
+    Args:
+        messages_df: Messages to draw from
+        weights: Per-row weights (default: interestingness())
+        sender_col: Sender column, for quotas and balancing
+        seed: Random seed for reproducible draws
+    """
+
+    # Rebuild the table once this many draws in a row were rejected
+    MAX_MISSES = 32
+
+    def __init__(self, messages_df: "pd.DataFrame", weights: Optional["pd.Series"] = None,
+                 sender_col: str = "sender", seed: Optional[int] = None):
+        self.messages_df = messages_df
+        if weights is None:
+            weights = interestingness(messages_df, sender_col=sender_col)
+        self.weights = np.asarray(weights, dtype=float)
+        self.senders = (messages_df[sender_col].astype(str).to_numpy()
+                        if sender_col in messages_df.columns else None)
+        self.rng = random.Random(seed)
+        self._positions = np.flatnonzero(self.weights > 0)
+        self._table = AliasTable(self.weights[self._positions]) if len(self._positions) else None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def sample_positions(self, n: int, per_sender: Optional[Quota] = None) -> List[int]:
+        """
+        Row positions of up to n distinct messages.
+
+        Args:
+            n: Number of messages wanted
+            per_sender: Most messages to take from one sender, either one
+                cap for everyone or {sender: cap} (senders not listed are
+                uncapped)
+
+        Returns:
+            Positions into messages_df, in draw order; fewer than n when the
+            corpus (or the quotas) run out
+        """
+        if self._table is None or n <= 0:
+            return []
+        positions, table = self._positions, self._table
+        taken, picked = set(), []
+        used: Dict[str, int] = {}
+        misses = 0
+
+        while len(picked) < n:
+            pos = int(positions[table.draw(self.rng)])
+            sender = self.senders[pos] if self.senders is not None else None
+            if pos in taken or self._full(sender, used, per_sender):
+                misses += 1
+                if misses >= self.MAX_MISSES:
+                    positions = self._remaining(taken, used, per_sender)
+                    if not len(positions):
+                        break
+                    table = AliasTable(self.weights[positions])
+                    misses = 0
+                continue
+            taken.add(pos)
+            picked.append(pos)
+            if sender is not None:
+                used[sender] = used.get(sender, 0) + 1
+            misses = 0
+        return picked
+
+    def sample(self, n: int, per_sender: Optional[Quota] = None) -> "pd.DataFrame":
+        """Up to n distinct rows of messages_df (see sample_positions())."""
+        return self.messages_df.iloc[self.sample_positions(n, per_sender)]
+
+    # --------------------------------------------------------------------------
+    # Quotas
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _cap(sender: Optional[str], per_sender: Optional[Quota]) -> Optional[int]:
+        if per_sender is None or sender is None:
+            return None
+        if isinstance(per_sender, dict):
+            return per_sender.get(sender)
+        return per_sender
+
+    def _full(self, sender: Optional[str], used: Dict[str, int], per_sender: Optional[Quota]) -> bool:
+        cap = self._cap(sender, per_sender)
+        return cap is not None and used.get(sender, 0) >= cap
+
+    def _remaining(self, taken: set, used: Dict[str, int], per_sender: Optional[Quota]) -> "np.ndarray":
+        """Positive-weight positions not yet taken and not from a sender at quota."""
+        keep = self.weights > 0
+        if taken:
+            keep[list(taken)] = False
+        if self.senders is not None:
+            full = [s for s in used if self._full(s, used, per_sender)]
+            if full:
+                keep &= ~np.isin(self.senders, full)
+        return np.flatnonzero(keep)
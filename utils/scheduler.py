@@ -0,0 +1,373 @@
+"""
+Shared request scheduler for OpenAI calls.
+
+Every generator submits its API calls here instead of calling the client
+directly. The scheduler provides:
+- a priority queue served by a fixed number of worker threads
+- requests-per-minute and tokens-per-minute limits (token buckets)
+- retries with exponential backoff and full jitter, honoring Retry-After
+- a circuit breaker that fails fast after repeated consecutive failures
+
+Usage:
+    scheduler = get_scheduler()
+    response = scheduler.call(lambda: client.chat.completions.create(...),
+                              estimated_tokens=2500)
+"""
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from utils.lazy import load_env
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Exception class names (from openai/httpx) that signal transient network issues
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "ConnectTimeout",
+                    "ReadTimeout", "ConnectError", "RemoteProtocolError"}
+
+# Priorities (lower runs first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker is open and requests fail fast."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an exception from the API client is worth retrying."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Extract the server's Retry-After hint from an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None
+    return None
+
+
+class TokenBucket:
+    """Continuously refilling bucket; capacity is the per-minute allowance."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Job:
+    __slots__ = ("fn", "priority", "tokens", "future", "attempt", "seq")
+
+    def __init__(self, fn, priority, tokens, seq):
+        self.fn = fn
+        self.priority = priority
+        self.tokens = tokens
+        self.future = Future()
+        self.attempt = 0
+        self.seq = seq
+
+
+class RequestScheduler:
+    """
+    Priority scheduler with rate limits, retries and a circuit breaker.
+
+    Args:
+        max_concurrency: Worker threads (concurrent in-flight requests)
+        requests_per_minute: RPM limit
+        tokens_per_minute: TPM limit (uses each job's estimated tokens)
+        max_retries: Retries per job after the first attempt
+        base_delay: Backoff base in seconds (doubles per attempt)
+        max_delay: Backoff ceiling in seconds
+        breaker_threshold: Consecutive failures that open the circuit
+        breaker_cooldown: Seconds the circuit stays open before a trial request
+    """
+
+    def __init__(self, max_concurrency=4, requests_per_minute=500, tokens_per_minute=200000,
+                 max_retries=5, base_delay=1.0, max_delay=60.0, breaker_threshold=8,
+                 breaker_cooldown=30.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._ready = []     # (priority, seq, job)
+        self._delayed = []   # (ready_at, seq, job)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._limit_lock = threading.Lock()
+        self._workers = []
+        self._paused_until = 0.0
+
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "retries": 0,
+                      "rate_limited": 0, "short_circuited": 0}
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+
+    def submit(self, fn: Callable[[], Any], priority: int = PRIORITY_NORMAL,
+               estimated_tokens: int = 0) -> Future:
+        """
+        Queue a call and return a Future for its result.
+
+        Args:
+            fn: Zero-argument callable performing one API request
+            priority: Lower values run first
+            estimated_tokens: Prompt plus completion tokens, for the TPM limit
+
+        Returns:
+            concurrent.futures.Future resolving to fn()'s return value
+        """
+        job = _Job(fn, priority, estimated_tokens, next(self._seq))
+        with self._cond:
+            self.stats["submitted"] += 1
+            heapq.heappush(self._ready, (job.priority, job.seq, job))
+            self._ensure_workers()
+            self._cond.notify()
+        return job.future
+
+    def call(self, fn: Callable[[], Any], priority: int = PRIORITY_NORMAL,
+             estimated_tokens: int = 0) -> Any:
+        """Submit a call and block until it finishes (re-raising its final error)."""
+        return self.submit(fn, priority, estimated_tokens).result()
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._opened_at is not None
+
+    # --------------------------------------------------------------------------
+    # Workers
+    # --------------------------------------------------------------------------
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(target=self._work, daemon=True,
+                                      name=f"openai-scheduler-{len(self._workers)}")
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, job = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (job.priority, job.seq, job))
+
+                if self._ready and now >= self._paused_until:
+                    return heapq.heappop(self._ready)[2]
+
+                timeouts = []
+                if self._delayed:
+                    timeouts.append(self._delayed[0][0] - now)
+                if self._ready:
+                    timeouts.append(self._paused_until - now)
+                self._cond.wait(timeout=max(0.01, min(timeouts)) if timeouts else None)
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job.future.cancelled():
+                continue
+
+            if not self._admit():
+                with self._cond:
+                    self.stats["short_circuited"] += 1
+                job.future.set_exception(CircuitOpenError(
+                    f"Circuit open after {self._failures} consecutive failures; "
+                    f"retrying in {self.breaker_cooldown:.0f}s"))
+                continue
+
+            self._wait_for_capacity(job.tokens)
+
+            try:
+                result = job.fn()
+            except Exception as e:
+                self._on_failure(job, e)
+            else:
+                self._on_success()
+                with self._cond:
+                    self.stats["succeeded"] += 1
+                job.future.set_result(result)
+
+    def _wait_for_capacity(self, tokens):
+        while True:
+            with self._limit_lock:
+                wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                if wait <= 0:
+                    self._requests.take(1)
+                    self._tokens.take(tokens)
+                    return
+            time.sleep(min(wait, 5.0))
+
+    # --------------------------------------------------------------------------
+    # Retries and circuit breaker
+    # --------------------------------------------------------------------------
+
+    def _admit(self) -> bool:
+        with self._cond:
+            if self._opened_at is None:
+                return True
+            if self._probe_in_flight:
+                return False
+            if time.monotonic() - self._opened_at >= self.breaker_cooldown:
+                self._probe_in_flight = True   # half-open: let one request through
+                return True
+            return False
+
+    def _on_success(self):
+        with self._cond:
+            if self._opened_at is not None:
+                print("  ✅ OpenAI circuit closed again")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def _on_failure(self, job, error):
+        retryable = is_retryable(error)
+        with self._cond:
+            if retryable:
+                self._failures += 1
+                if self._probe_in_flight or (self._opened_at is None
+                                             and self._failures >= self.breaker_threshold):
+                    self._opened_at = time.monotonic()
+                    print(f"  🔌 OpenAI circuit opened after {self._failures} consecutive failures")
+            self._probe_in_flight = False
+
+            if not retryable or job.attempt >= self.max_retries or self._opened_at is not None:
+                self.stats["failed"] += 1
+                job.future.set_exception(error)
+                return
+
+            job.attempt += 1
+            self.stats["retries"] += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** job.attempt))
+            hint = retry_after_seconds(error)
+            if hint is not None:
+                delay = max(delay, hint)
+            if getattr(error, "status_code", None) == 429:
+                # Rate limits are shared, so hold back every queued request
+                self.stats["rate_limited"] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+            print(f"  ↻ Retrying OpenAI request in {delay:.1f}s "
+                  f"(attempt {job.attempt}/{self.max_retries}): {type(error).__name__}")
+            heapq.heappush(self._delayed, (time.monotonic() + delay, job.seq, job))
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """
+    Get the shared scheduler, configured from the environment on first use.
+
+    Environment:
+        OPENAI_MAX_CONCURRENCY (default 4), OPENAI_RPM (500),
+        OPENAI_TPM (200000), OPENAI_MAX_RETRIES (5)
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            load_env()
+            _scheduler = RequestScheduler(
+                max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "4")),
+                requests_per_minute=int(os.getenv("OPENAI_RPM", "500")),
+                tokens_per_minute=int(os.getenv("OPENAI_TPM", "200000")),
+                max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "5")),
+            )
+        return _scheduler
+
+
+def set_scheduler(scheduler: Optional[RequestScheduler]) -> None:
+    """Replace the shared scheduler (pass None to rebuild from the environment)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Rough prompt plus completion token estimate for a chat completion request."""
+    from utils.context_builder import count_tokens
+
+    prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+    return count_tokens(prompt, request.get("model", "gpt-4o-mini")) + int(request.get("max_tokens") or 1000)
+
+
+def create_completion(client, priority: int = PRIORITY_NORMAL, **request):
+    """
+    Run ``client.chat.completions.create`` through the shared scheduler.
+
+    Args:
+        client: OpenAI client
+        priority: Scheduler priority (lower runs first)
+        **request: Arguments for ``chat.completions.create``
+
+    Returns:
+        The completion (or stream) returned by the client
+    """
+    return get_scheduler().call(
+        lambda: client.chat.completions.create(**request),
+        priority=priority,
+        estimated_tokens=estimate_request_tokens(request)
+    )
+
+
+def parse_completion(client, priority: int = PRIORITY_NORMAL, **request):
+    """Run ``client.beta.chat.completions.parse`` through the shared scheduler."""
+    return get_scheduler().call(
+        lambda: client.beta.chat.completions.parse(**request),
+        priority=priority,
+        estimated_tokens=estimate_request_tokens(request)
+    )
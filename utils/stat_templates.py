@@ -0,0 +1,339 @@
+"""
+Template-driven statistics questions.
+
+Stats questions ("who sends the most emojis?", "who texts most after 11pm?")
+are declared as templates over three axes:
+- a metric: what is counted per message (a feature column or a flag)
+- a window: which messages count (late night, weekends, ...)
+- a group: one group chat, or all of them
+
+The engine compiles every template into grouped aggregations over the
+feature store columns (utils/features.py): one ``groupby`` per window sums
+every metric for every (group, sender) at once. Each (template, metric,
+window, group) combination with a clear winner becomes a question, so a few
+templates expand into hundreds or thousands of questions with no LLM calls.
+
+Usage:
+    df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
+    questions = StatQuestionEngine(df).expand()
+
+    python -m utils.stat_templates output/chat_export.csv -o output/stats_questions.csv
+"""
+
+import argparse
+import os
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+LETTERS = "ABCD"
+
+# A leader needs at least this many and must beat the runner-up outright
+MIN_LEADER_VALUE = 3
+# Rate templates ignore senders with fewer messages in the window
+MIN_RATE_MESSAGES = 20
+
+# (leader - runner-up) / leader at or above which a question counts as easy / medium
+EASY_MARGIN = 0.5
+MEDIUM_MARGIN = 0.2
+
+
+@dataclass(frozen=True)
+class Metric:
+    """
+    Something counted per message.
+
+    Args:
+        name: Key used in template selections
+        label: Plural noun phrase for question text ("curse words")
+        value: Per-message value from the feature frame (defaults to 1 per message)
+    """
+    name: str
+    label: str
+    value: Optional[Callable[["pd.DataFrame"], "pd.Series"]] = None
+
+
+@dataclass(frozen=True)
+class Window:
+    """
+    Which messages count.
+
+    Args:
+        name: Key used in template selections
+        label: Phrase appended to the question ("after 11pm"); empty for all messages
+        mask: Boolean per message from the feature frame (None: every message)
+    """
+    name: str
+    label: str
+    mask: Optional[Callable[["pd.DataFrame"], "pd.Series"]] = None
+
+
+@dataclass(frozen=True)
+class StatTemplate:
+    """
+    A question pattern expanded over metrics × windows × groups.
+
+    Args:
+        name: Template id (stored with each question)
+        text: Question text with {metric}, {window} and {group} placeholders
+        explanation: Explanation text; also gets {sender} and {value}
+        metrics: Metric names to expand over
+        windows: Window names to expand over
+        kind: "most", "fewest", "rate" (highest share of the sender's messages)
+            or "mean" (highest average per message)
+        per_group: Also expand per group chat, not just across all of them
+        category: Question category
+        min_messages: Rate and mean templates ignore senders with fewer messages
+    """
+    name: str
+    text: str
+    explanation: str
+    metrics: Sequence[str]
+    windows: Sequence[str] = ("all",)
+    kind: str = "most"
+    per_group: bool = True
+    category: str = "Chat Stats"
+    min_messages: int = MIN_RATE_MESSAGES
+
+
+def _flag(column: str) -> Callable[["pd.DataFrame"], "pd.Series"]:
+    return lambda f: f[column]
+
+
+def _hours(start: int, end: int) -> Callable[["pd.DataFrame"], "pd.Series"]:
+    """Hours in [start, end), wrapping past midnight."""
+    if start < end:
+        return lambda f: (f["hour"] >= start) & (f["hour"] < end)
+    return lambda f: (f["hour"] >= start) | (f["hour"] < end)
+
+
+METRICS: Dict[str, Metric] = {m.name: m for m in [
+    Metric("messages", "messages"),
+    Metric("emojis", "emojis", lambda f: f["emoji_count"]),
+    Metric("curses", "curse words", lambda f: f["curse_count"]),
+    Metric("f_bombs", "messages with an f-bomb", _flag("kw_fuck")),
+    Metric("laughs", "lmaos and hahas", _flag("kw_laughter")),
+    Metric("drunk", "drunk texts", _flag("kw_drunk")),
+    Metric("work", "messages about work", _flag("kw_work")),
+    Metric("kroger", "Kroger complaints", _flag("kw_kroger")),
+    Metric("essays", "essays (150+ characters)", lambda f: f["length"] >= 150),
+    Metric("one_word", "one-word replies", lambda f: (f["length"] > 0) & (f["length"] < 8)),
+]}
+
+WINDOWS: Dict[str, Window] = {w.name: w for w in [
+    Window("all", ""),
+    Window("chaos", "between 11pm and 5am", _hours(23, 5)),
+    Window("morning", "before 9am", _hours(5, 9)),
+    Window("work_hours", "during work hours (9-5 on weekdays)",
+           lambda f: _hours(9, 17)(f) & ~f["is_weekend"]),
+    Window("evening", "between 6pm and 11pm", _hours(18, 23)),
+    Window("weekend", "on weekends", lambda f: f["is_weekend"]),
+    Window("weekday", "on weekdays", lambda f: ~f["is_weekend"]),
+]}
+
+DEFAULT_TEMPLATES: List[StatTemplate] = [
+    StatTemplate(
+        "most", "Who sent the most {metric} {window}{group}?",
+        "{sender} sent {value} {metric} {window}{group}.",
+        metrics=list(METRICS), windows=list(WINDOWS)),
+    StatTemplate(
+        "fewest", "Who sent the fewest messages {window}{group}?",
+        "{sender} only sent {value} messages {window}{group}.",
+        metrics=["messages"], windows=["all", "chaos", "weekend", "work_hours"], kind="fewest"),
+    StatTemplate(
+        "rate", "Whose messages {window}{group} are most often {metric}?",
+        "{value}% of {sender}'s messages {window}{group} are {metric}.",
+        metrics=["f_bombs", "laughs", "essays", "one_word"], windows=["all", "chaos", "weekend"],
+        kind="rate", per_group=False, category="Chat Habits"),
+]
+
+
+def _phrase(text: str) -> str:
+    """Collapse the gaps empty placeholders leave behind."""
+    return " ".join(text.split()).replace(" ?", "?").replace(" .", ".").replace(" ,", ",")
+
+
+class StatQuestionEngine:
+    """
+    Expands stat templates over one message corpus.
+
+    Args:
+        messages_df: Messages with 'sender', optionally 'group_name', and the
+            feature columns (utils.features.add_features)
+        participants: Only these senders are eligible (defaults to everyone)
+        seed: Random seed for option order
+        metrics: Extra metrics beyond METRICS, e.g. over columns only this frame has
+    """
+
+    def __init__(self, messages_df: "pd.DataFrame", participants: Optional[Sequence[str]] = None,
+                 seed: Optional[int] = None, metrics: Sequence[Metric] = ()):
+        df = messages_df[messages_df["sender"].notna()]
+        if participants:
+            df = df[df["sender"].isin(participants)]
+        self.df = df
+        self.groups = df["group_name"].fillna("") if "group_name" in df.columns else \
+            pd.Series("", index=df.index)
+        self.rng = random.Random(seed)
+        self.metrics = {**METRICS, **{m.name: m for m in metrics}}
+        self._tables: Dict[str, "pd.DataFrame"] = {}
+
+    # --------------------------------------------------------------------------
+    # Compilation: one grouped aggregation per window, all metrics at once
+    # --------------------------------------------------------------------------
+
+    def _metric_frame(self, metrics: Sequence[str]) -> "pd.DataFrame":
+        columns = {}
+        for name in metrics:
+            metric = self.metrics[name]
+            values = metric.value(self.df) if metric.value else 1
+            columns[name] = pd.Series(values, index=self.df.index).fillna(0).astype("float64")
+        return pd.DataFrame(columns, index=self.df.index)
+
+    def compile(self, templates: Sequence[StatTemplate]) -> Dict[str, "pd.DataFrame"]:
+        """
+        Aggregate every metric any template needs, per window.
+
+        Returns:
+            {window: DataFrame indexed by (group, sender), one column per metric};
+            group "" holds the all-groups totals
+        """
+        metrics = sorted({m for t in templates for m in t.metrics} | {"messages"})
+        windows = sorted({w for t in templates for w in t.windows})
+        values = self._metric_frame(metrics)
+
+        for name in windows:
+            window = WINDOWS[name]
+            if window.mask is None:
+                masked = values
+            else:
+                mask = pd.Series(window.mask(self.df), index=self.df.index).fillna(False).astype(bool)
+                masked = values.where(mask, 0)
+            per_group = masked.groupby([self.groups, self.df["sender"]]).sum()
+            per_group.index.names = ["group", "sender"]
+            overall = masked.groupby(self.df["sender"]).sum()
+            overall.index = pd.MultiIndex.from_product([[""], overall.index], names=["group", "sender"])
+            self._tables[name] = pd.concat([overall, per_group[per_group.index.get_level_values(0) != ""]])
+        return self._tables
+
+    # --------------------------------------------------------------------------
+    # Expansion
+    # --------------------------------------------------------------------------
+
+    def _ranking(self, table: "pd.DataFrame", group: str, template: StatTemplate,
+                 metric: str) -> Optional["pd.Series"]:
+        """Senders ordered best-first for one question, or None if there's no clear winner."""
+        try:
+            rows = table.xs(group, level="group")
+        except KeyError:
+            return None
+        if template.kind in ("rate", "mean"):
+            rows = rows[rows["messages"] >= template.min_messages]
+            if template.kind == "rate":
+                ranking = (rows[metric] / rows["messages"] * 100).round()
+            else:
+                ranking = (rows[metric] / rows["messages"]).round(1)
+            ranking = ranking.sort_values(ascending=False)
+            if ranking.empty or ranking.iloc[0] <= 0:
+                return None
+        elif template.kind == "fewest":
+            ranking = rows[metric][rows["messages"] > 0].sort_values()
+        else:
+            ranking = rows[metric].sort_values(ascending=False)
+            if ranking.empty or ranking.iloc[0] < MIN_LEADER_VALUE:
+                return None
+
+        if len(ranking) < len(LETTERS) or ranking.iloc[0] == ranking.iloc[1]:
+            return None
+        return ranking
+
+    @staticmethod
+    def _difficulty(ranking: "pd.Series") -> str:
+        top, second = abs(float(ranking.iloc[0])), abs(float(ranking.iloc[1]))
+        margin = abs(top - second) / max(top, second, 1)
+        if margin >= EASY_MARGIN:
+            return "easy"
+        return "medium" if margin >= MEDIUM_MARGIN else "hard"
+
+    def _question(self, template: StatTemplate, metric: str, window: str, group: str,
+                  ranking: "pd.Series") -> Dict:
+        leader = ranking.index[0]
+        # Closest competitors make the best distractors
+        options = [leader] + list(ranking.index[1:len(LETTERS)])
+        self.rng.shuffle(options)
+
+        value = float(ranking.iloc[0])
+        fields = {
+            "metric": self.metrics[metric].label,
+            "window": WINDOWS[window].label,
+            "group": f" in {group}" if group else "",
+            "sender": leader,
+            "value": value if template.kind == "mean" else int(value),
+        }
+        row = {
+            "question": _phrase(template.text.format(**fields)),
+            "correct_answer": LETTERS[options.index(leader)],
+            "explanation": _phrase(template.explanation.format(**fields)),
+            "difficulty": self._difficulty(ranking),
+            "category": template.category,
+            "template": f"{template.name}:{metric}:{window}",
+        }
+        row.update({f"option_{letter}": option for letter, option in zip(LETTERS, options)})
+        return row
+
+    def expand(self, templates: Optional[Sequence[StatTemplate]] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        """
+        Every valid question the templates produce over this corpus.
+
+        Args:
+            templates: Templates to expand (defaults to DEFAULT_TEMPLATES)
+            limit: Keep a random subset of this size
+
+        Returns:
+            Pack-format question rows (see utils/pack_writer.py)
+        """
+        templates = list(templates or DEFAULT_TEMPLATES)
+        tables = self.compile(templates)
+        group_names = [""] + sorted(g for g in self.groups.unique() if g)
+
+        questions = []
+        for template in templates:
+            for window in template.windows:
+                table = tables[window]
+                for group in (group_names if template.per_group else [""]):
+                    for metric in template.metrics:
+                        ranking = self._ranking(table, group, template, metric)
+                        if ranking is not None:
+                            questions.append(self._question(template, metric, window, group, ranking))
+
+        if limit is not None and len(questions) > limit:
+            questions = self.rng.sample(questions, limit)
+        return questions
+
+
+def main():
+    from utils.features import add_features, feature_path
+    from utils.pack_writer import write_questions
+
+    parser = argparse.ArgumentParser(description="Expand stat question templates over a chat export")
+    parser.add_argument("csv", nargs="?", default="~/Projects/henze-trivia/output/chat_export.csv",
+                        help="Chat export CSV")
+    parser.add_argument("-o", "--output", default="~/Projects/henze-trivia/output/stats_questions.csv",
+                        help="Output pack CSV")
+    parser.add_argument("--limit", type=int, help="Keep at most this many questions")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    args = parser.parse_args()
+
+    csv_path = os.path.expanduser(args.csv)
+    df = add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True)
+    questions = StatQuestionEngine(df, seed=args.seed).expand(limit=args.limit)
+    print(f"📊 Expanded {len(questions)} stat questions from {len(df)} messages")
+    write_questions(questions, args.output, question_type="trivia")
+
+
+if __name__ == "__main__":
+    main()
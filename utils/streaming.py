@@ -0,0 +1,233 @@
+"""
+Streaming structured-output helpers for the OpenAI generators.
+
+Instead of waiting for a whole completion and running ``json.loads`` on it,
+completions are requested with ``stream=True`` and every JSON object in the
+returned array is parsed (and validated) as soon as its closing brace arrives.
+A malformed or truncated item only costs that one item, not the whole batch.
+"""
+
+import json
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from utils.scheduler import PRIORITY_NORMAL, create_completion
+
+LETTERS = ["A", "B", "C", "D"]
+
+
+class JSONArrayStream:
+    """
+    Incrementally extract the objects of a streamed JSON array.
+
+    Text is fed in arbitrary chunks. Any object whose direct parent is an
+    array is emitted once complete, so all of these work unchanged:
+
+        [{...}, {...}]
+        ```json\\n[{...}, {...}]\\n```
+        {"questions": [{...}, {...}]}
+
+    Examples:
+        >>> stream = JSONArrayStream()
+        >>> stream.feed('[{"a": 1}, {"a"')
+        [{'a': 1}]
+        >>> stream.feed(': 2}]')
+        [{'a': 2}]
+    """
+
+    def __init__(self):
+        self.errors = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._capture = None
+        self._capture_depth = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return any objects it completed."""
+        completed = []
+
+        for ch in chunk:
+            if self._capture is not None:
+                self._capture.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._capture is None and self._stack and self._stack[-1] == "[":
+                    self._capture = [ch]
+                    self._capture_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch == "[":
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if (ch == "}" and self._capture is not None
+                        and len(self._stack) == self._capture_depth):
+                    item = self._decode("".join(self._capture))
+                    self._capture = None
+                    if item is not None:
+                        completed.append(item)
+
+        return completed
+
+    def _decode(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        return item if isinstance(item, dict) else None
+
+
+def iter_completion_text(stream) -> Iterator[str]:
+    """Yield the content deltas of a streamed chat completion."""
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+def stream_json_items(client, validate: Optional[Callable[[Dict], Optional[Dict]]] = None,
+                      priority: int = PRIORITY_NORMAL, **request) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a chat completion and yield each JSON array item as it arrives.
+
+    The request is submitted through the shared scheduler, so rate limits
+    and transient errors are retried before the stream starts.
+
+    Args:
+        client: OpenAI client
+        validate: Optional callable returning the item (possibly normalized)
+            or None to drop it
+        priority: Scheduler priority (lower runs first)
+        **request: Arguments for ``client.chat.completions.create``
+
+    Yields:
+        Parsed (and validated) items, one at a time
+    """
+    parser = JSONArrayStream()
+    dropped = 0
+
+    response = create_completion(client, priority=priority, stream=True, **request)
+    for text in iter_completion_text(response):
+        for item in parser.feed(text):
+            if validate is not None:
+                item = validate(item)
+                if item is None:
+                    dropped += 1
+                    continue
+            yield item
+
+    if parser.errors or dropped:
+        reasons = getattr(validate, "rejected", None)
+        detail = f" ({', '.join(f'{k}: {n}' for k, n in reasons.most_common())})" if reasons else ""
+        print(f"  ⚠️  Skipped {parser.errors} malformed and {dropped} invalid items{detail}")
+
+
+# ==============================================================================
+# VALIDATION (pydantic models from utils/question_models.py)
+# ==============================================================================
+
+def legacy_to_model_fields(question: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a legacy generator question into pydantic model fields.
+
+    The openai_agent generators use ``{"question", "options": {"A": ...},
+    "correct_answer": "A"}`` while the models use ``text``, an options list
+    and ``answer_index``.
+    """
+    options = question.get("options") or {}
+    if isinstance(options, dict):
+        options = [options.get(letter, "") for letter in LETTERS]
+
+    correct = str(question.get("correct_answer", "")).strip().upper()
+    fields = {
+        "text": question.get("question", ""),
+        "options": list(options),
+        "answer_index": LETTERS.index(correct) if correct in LETTERS else -1,
+        "explanation": question.get("explanation", ""),
+        "category": question.get("category", ""),
+    }
+    if question.get("difficulty") in ("easy", "medium", "hard"):
+        fields["difficulty"] = question["difficulty"]
+    return fields
+
+
+def model_validator(model_name: str, extra_fields: Optional[Callable[[Dict], Dict]] = None):
+    """
+    Build a validator that checks legacy question dicts against a model.
+
+    Args:
+        model_name: Name of a model in utils/question_models.py
+            ('TriviaQuestion', 'ChaosQuestion', 'RoastQuestion', ...)
+        extra_fields: Optional callable adding model-specific fields
+
+    Returns:
+        Callable returning the original question if valid, otherwise None.
+        Its ``rejected`` Counter tallies rejections by failing field.
+    """
+    from utils import question_models
+    model = getattr(question_models, model_name)
+
+    def validate(question: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        fields = legacy_to_model_fields(question)
+        if extra_fields is not None:
+            fields.update(extra_fields(question))
+        try:
+            model(**fields)
+        except (ValueError, TypeError) as e:
+            errors = e.errors() if hasattr(e, "errors") else []
+            failed = sorted({str(err["loc"][0]) for err in errors if err.get("loc")}) or ["other"]
+            validate.rejected.update(failed)
+            detail = errors[0].get("msg", "") if errors else str(e).splitlines()[0]
+            print(f"  ⚠️  Dropping invalid question ({', '.join(failed)}): {detail}")
+            return None
+        return question
+
+    validate.rejected = Counter()
+    return validate
+
+
+def required_keys(*keys: str):
+    """Build a validator that only checks the given keys are present and non-empty."""
+    def validate(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if all(item.get(key) not in (None, "") for key in keys):
+            return item
+        return None
+
+    return validate
+
+
+def collect(items: Iterable[Dict[str, Any]], label: str) -> List[Dict[str, Any]]:
+    """
+    Drain a streaming generator, keeping everything received before any error.
+
+    Args:
+        items: Iterator of streamed items
+        label: Description used in log lines
+
+    Returns:
+        List of items received
+    """
+    received = []
+    try:
+        for item in items:
+            received.append(item)
+    except Exception as e:
+        print(f"❌ Error generating {label}: {e}")
+        if received:
+            print(f"  ↪ Keeping {len(received)} {label} received before the error")
+    return received
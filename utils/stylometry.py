@@ -0,0 +1,223 @@
+"""
+Stylometric sender profiles for "Who said it?" distractors.
+
+Random wrong answers make quote questions wildly uneven: a quote full of 💀
+with three people who never use emoji as the other options is free points.
+``SenderProfiles`` describes how each person writes and picks wrong answers
+that write the same way.
+
+Each profile has two parts:
+- character n-gram frequencies (hashed 2-4-grams, see utils/prefilter.py),
+  summed over the sender's messages in one bincount per chunk
+- style habits: message length, emoji rate, caps share, all-lowercase
+  share, ! and ? rates, laughter rate, z-scored across senders
+
+``similarity`` is the sender × sender matrix (n-gram cosine blended with
+style closeness), computed once, and ``neighbors`` is every sender's
+ranking by it, so a speaker's look-alikes are a dict lookup.
+``rank_quotes()`` scores a batch of quotes against every profile at once;
+``distractors()`` then prefers the senders the quote itself sounds most
+like, and ``difficulty()`` calibrates the question from where the real
+speaker ranks. A quote taken from the chat is part of its speaker's
+profile, so given the speakers, ``rank_quotes()`` scores each quote against
+its speaker's profile without it (leave-one-out); otherwise the quote would
+always look most like whoever said it.
+
+Usage:
+    profiles = SenderProfiles(messages_df, senders=PARTICIPANTS)
+    scores = profiles.rank_quotes(quotes, speakers)             # quote × sender
+    wrong = profiles.distractors("Lauren", scores=scores.iloc[0])
+    level = profiles.difficulty("Lauren", scores.iloc[0])      # easy / medium / hard
+"""
+
+import random
+from typing import Dict, List, Optional, Sequence
+
+from utils.features import EMOJI_CHARS
+from utils.lazy import lazy_import
+from utils.prefilter import CHUNK_SIZE, hash_ngrams
+from utils.text import LAUGH_RE
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Hashed n-gram space for profiles (smaller than the pre-filter's; profiles are dense)
+PROFILE_DIMS = 1 << 16
+
+# Blend of n-gram cosine and style closeness in the similarity matrix
+NGRAM_WEIGHT = 0.7
+STYLE_WEIGHT = 0.3
+
+STYLE_FEATURES = ("log_length", "emoji_rate", "caps_share", "lowercase_share",
+                  "exclaim_rate", "question_rate", "laugh_rate")
+
+
+def style_table(texts: "pd.Series", senders: "pd.Series") -> "pd.DataFrame":
+    """Per-sender style habits (STYLE_FEATURES columns), one vectorized pass per feature."""
+    text = texts.fillna("").astype(str)
+    letters = text.str.count(r"[A-Za-z]")
+    upper = text.str.count(r"[A-Z]")
+    per_message = pd.DataFrame({
+        "log_length": np.log1p(text.str.len()),
+        "emoji_rate": text.str.count(EMOJI_CHARS).clip(upper=5),
+        "caps_share": upper / letters.clip(lower=1),
+        "lowercase_share": ((letters > 0) & (upper == 0)).astype(float),
+        "exclaim_rate": text.str.count("!").clip(upper=5),
+        "question_rate": text.str.count(r"\?").clip(upper=5),
+        "laugh_rate": text.str.lower().str.contains(LAUGH_RE).astype(float),
+    })
+    return per_message.groupby(senders.to_numpy()).mean()[list(STYLE_FEATURES)]
+
+
+class SenderProfiles:
+    """
+    N-gram and style profiles for every sender, with their similarity matrix.
+
+    Args:
+        messages_df: Messages
+        text_col: Message text column
+        sender_col: Sender column
+        senders: Senders to profile (default: everyone in messages_df)
+        seed: Random seed for tie-breaking and padding distractors
+    """
+
+    def __init__(self, messages_df: "pd.DataFrame", text_col: str = "text",
+                 sender_col: str = "sender", senders: Optional[Sequence[str]] = None,
+                 seed: Optional[int] = None):
+        df = messages_df[messages_df[text_col].notna() & messages_df[sender_col].notna()]
+        if senders is not None:
+            df = df[df[sender_col].isin(senders)]
+        self.senders: List[str] = [str(s) for s in (senders if senders is not None
+                                                    else sorted(df[sender_col].unique()))]
+        self._codes = {s: i for i, s in enumerate(self.senders)}
+        self.rng = random.Random(seed)
+        self.message_counts = df[sender_col].value_counts().reindex(self.senders, fill_value=0)
+
+        texts = df[text_col].astype(str).tolist()
+        codes = df[sender_col].map(self._codes).to_numpy()
+        # (sender code, text) of every profiled message, for leave-one-out scoring
+        self._messages = set(zip(codes.tolist(), texts))
+        self.ngrams = self._ngram_profiles(texts, codes)
+        self.style = style_table(df[text_col], df[sender_col]).reindex(self.senders)
+        self.similarity = self._similarity()
+        self.neighbors: Dict[str, List[str]] = {
+            s: [o for o in self.similarity.loc[s].sort_values(ascending=False).index if o != s]
+            for s in self.senders
+        }
+
+    def _ngram_profiles(self, texts: List[str], codes: "np.ndarray") -> "np.ndarray":
+        """Unit-length n-gram frequency vector per sender, shape (senders, PROFILE_DIMS)."""
+        size = len(self.senders) * PROFILE_DIMS
+        totals = np.zeros(size)
+        for start in range(0, len(texts), CHUNK_SIZE):
+            rows, cols, values = hash_ngrams(texts[start:start + CHUNK_SIZE], PROFILE_DIMS)
+            totals += np.bincount(codes[start + rows] * PROFILE_DIMS + cols, weights=values,
+                                  minlength=size)
+        profiles = totals.reshape(len(self.senders), PROFILE_DIMS)
+        # Unnormalized lengths, so a quote can be taken back out of its speaker's profile
+        self._norms = np.linalg.norm(profiles, axis=1)
+        return profiles / np.where(self._norms > 0, self._norms, 1.0)[:, None]
+
+    def _similarity(self) -> "pd.DataFrame":
+        """Sender × sender similarity in [0, 1]."""
+        ngram = self.ngrams @ self.ngrams.T
+        style = self.style.fillna(self.style.mean()).fillna(0.0)
+        z = ((style - style.mean()) / style.std(ddof=0).replace(0, 1.0)).to_numpy()
+        distance = np.sqrt(((z[:, None, :] - z[None, :, :]) ** 2).mean(axis=2))
+        combined = NGRAM_WEIGHT * ngram + STYLE_WEIGHT / (1.0 + distance)
+        return pd.DataFrame(combined, index=self.senders, columns=self.senders)
+
+    # --------------------------------------------------------------------------
+    # Quotes
+    # --------------------------------------------------------------------------
+
+    def rank_quotes(self, quotes: Sequence[str],
+                    speakers: Optional[Sequence[str]] = None) -> "pd.DataFrame":
+        """
+        How much each quote sounds like each sender (n-gram cosine), in one batch.
+
+        Args:
+            quotes: Quote texts
+            speakers: Each quote's real speaker; a quote that is one of its
+                speaker's profiled messages is then scored against that
+                profile with the quote taken out
+
+        Returns:
+            DataFrame, one row per quote, one column per sender
+        """
+        quotes = list(quotes)
+        speakers = list(speakers) if speakers is not None else [None] * len(quotes)
+        scores = np.zeros((len(quotes), len(self.senders)))
+        for start in range(0, len(quotes), CHUNK_SIZE):
+            chunk = quotes[start:start + CHUNK_SIZE]
+            rows, cols, values = hash_ngrams(chunk, PROFILE_DIMS)
+            # (senders, entries) gathered once, summed per quote
+            gathered = self.ngrams[:, cols] * values
+            for j in range(len(self.senders)):
+                scores[start:start + len(chunk), j] = np.bincount(rows, weights=gathered[j],
+                                                                  minlength=len(chunk))
+            self._leave_one_out(scores[start:start + len(chunk)], chunk,
+                                speakers[start:start + len(chunk)], rows, cols, values)
+        return pd.DataFrame(scores, columns=self.senders)
+
+    def _leave_one_out(self, scores: "np.ndarray", quotes: List[str], speakers: List[Optional[str]],
+                       rows: "np.ndarray", cols: "np.ndarray", values: "np.ndarray") -> None:
+        """
+        Rescore in place each quote against its speaker's profile minus the quote.
+
+        With v the quote's vector and t the speaker's unnormalized profile,
+        the cosine of v and t - v is (v·t - v·v) / |t - v|, and
+        |t - v|² = |t|² - 2 v·t + v·v, so only v·v is new work.
+        """
+        own = [(i, self._codes[s]) for i, (q, s) in enumerate(zip(quotes, speakers))
+               if s in self._codes and (self._codes[s], str(q)) in self._messages]
+        if not own:
+            return
+        # v·v per quote, with repeated n-grams summed first
+        keys, inverse = np.unique(rows * PROFILE_DIMS + cols, return_inverse=True)
+        summed = np.bincount(inverse, weights=values)
+        self_dot = np.bincount(keys // PROFILE_DIMS, weights=summed ** 2, minlength=len(quotes))
+        for i, j in own:
+            norm = self._norms[j]
+            dot = scores[i, j] * norm
+            rest = norm ** 2 - 2 * dot + self_dot[i]
+            scores[i, j] = (dot - self_dot[i]) / np.sqrt(rest) if rest > 1e-12 else 0.0
+
+    def distractors(self, speaker: str, k: int = 3, scores: Optional["pd.Series"] = None,
+                    pool: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        k wrong answers for a quote by speaker.
+
+        Args:
+            speaker: The real speaker
+            k: Number of distractors
+            scores: The quote's rank_quotes() row; without it, the speaker's
+                nearest neighbors are used
+            pool: Allowed answers (default: every profiled sender)
+
+        Returns:
+            Up to k senders, most plausible first, padded with random pool
+            members when there are too few profiled ones
+        """
+        allowed = [s for s in (pool if pool is not None else self.senders) if s != speaker]
+        if scores is not None:
+            ranked = [s for s in scores.sort_values(ascending=False).index if s in allowed]
+        else:
+            ranked = [s for s in self.neighbors.get(speaker, []) if s in allowed]
+        ranked = [s for s in ranked if self.message_counts.get(s, 0) > 0]
+        picked = ranked[:k]
+        extra = [s for s in allowed if s not in picked]
+        self.rng.shuffle(extra)
+        return picked + extra[:k - len(picked)]
+
+    def difficulty(self, speaker: str, scores: "pd.Series") -> str:
+        """
+        easy if the quote sounds most like its speaker, medium if nearly, else hard.
+
+        scores should come from rank_quotes() with the speakers passed, so the
+        quote isn't matched against itself.
+        """
+        if speaker not in scores.index:
+            return "medium"
+        rank = int((scores > scores[speaker]).sum())
+        return "easy" if rank == 0 else "medium" if rank <= 2 else "hard"
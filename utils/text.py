@@ -0,0 +1,23 @@
+"""
+Patterns for message text shared by the analyzers.
+
+Usage:
+    TAPBACK_RE.match(text)                # "Liked “...”" and other text-form reactions
+    LAUGHED_AT_RE.match(text)["quote"]    # the message a "Laughed at" tapback quotes
+    LAUGH_RE.search(text.lower())         # lmao, haha, lol ...
+    URL_RE.sub(" ", text)                 # drop links before tokenizing
+"""
+
+import re
+
+# Text-form tapbacks ("Liked “...”") quote another message rather than say anything
+TAPBACK_RE = re.compile(
+    r"^(?:Liked|Loved|Disliked|Laughed at|Emphasized|Questioned|Reacted .+ to) [“\"]")
+
+# "Laughed at “...”" tapbacks and the message they quote
+LAUGHED_AT_RE = re.compile(r"^Laughed at [“\"](?P<quote>.*)[”\"]$", re.DOTALL)
+
+# Laughter in a message's own words (match against lowercased text)
+LAUGH_RE = re.compile(r"lmao|lmfao|haha|lol")
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
@@ -0,0 +1,265 @@
+"""
+Prefix-sum time index for windowed message statistics.
+
+Answers "how many {messages, emojis, keyword hits} did each person send
+between two times, optionally only at certain hours or on certain weekdays"
+without re-filtering the corpus.
+
+Messages are sorted once by (key, time), where the key is the sender, or
+the sender plus the local hour of the week (weekday × 24 + hour). Each
+counter gets one cumulative-sum array over that order. The count for a key
+between two times is then ``cum[hi] - cum[lo]``, with lo and hi found by
+binary search. Keys and times are packed into one sorted int64 array, so
+every (sender, bucket) of a query is looked up in a single vectorized
+``searchsorted`` call.
+
+Times are indexed at one-second resolution. Message times without a zone
+are UTC, as the exports write them; query bounds without a zone (including
+``--since``/``--until``) are local to the chat's home zone
+(utils/timezones.py), so "2024-10-03" means local midnight. Hours and
+weekdays come from the feature store columns (utils/features.py), so they
+are local wherever those are.
+
+Usage:
+    index = TimeIndex(add_features(df))
+    index.counts(start="2024-06-01", end="2024-07-01")           # {sender: messages}
+    index.counts(hours=CHAOS_HOURS, weekdays=WEEKEND, counter="emojis")
+    index.leaderboard(counter="kw_fuck", start=trip_start, end=trip_end)
+    index.hour_histogram()                                         # 24 message counts
+
+    python -m utils.time_index output/chat_export.csv --since 2024-06-01 --counter emojis
+"""
+
+import argparse
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.lazy import lazy_import
+from utils.timezones import home_timezone
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+HOURS_PER_WEEK = 168
+
+# Counters indexed by default: name -> feature column (None counts messages)
+DEFAULT_COUNTERS = {
+    "messages": None,
+    "emojis": "emoji_count",
+    "curses": "curse_count",
+}
+
+CHAOS_HOURS = (23, 0, 1, 2, 3, 4)
+WEEKEND = (5, 6)
+WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+class _Layout:
+    """
+    Messages sorted by (key, time) with one prefix-sum array per counter.
+
+    ``packed`` holds key * span + (time - origin), which sorts exactly like
+    (key, time), so a whole batch of (key, start, end) lookups is two
+    searchsorted calls.
+    """
+
+    __slots__ = ("origin", "span", "packed", "cums")
+
+    def __init__(self, keys, seconds, values: Dict[str, "np.ndarray"], origin: int, span: int):
+        self.origin = origin
+        self.span = span
+        packed = keys.astype(np.int64) * span + (seconds - origin)
+        order = np.argsort(packed, kind="stable")
+        self.packed = packed[order]
+        self.cums = {name: np.concatenate(([0], np.cumsum(v[order], dtype=np.int64)))
+                     for name, v in values.items()}
+
+    def totals(self, keys: "np.ndarray", start: int, end: int, counter: str) -> "np.ndarray":
+        """
+        Counter sum per key over [start, end) (seconds, clipped to the index
+        span). A reversed range is empty, so it counts zero.
+        """
+        start = min(max(start, self.origin), self.origin + self.span - 1) - self.origin
+        end = max(min(max(end, self.origin), self.origin + self.span - 1) - self.origin, start)
+        base = keys.astype(np.int64) * self.span
+        lo = np.searchsorted(self.packed, base + start, side="left")
+        hi = np.searchsorted(self.packed, base + end, side="left")
+        cum = self.cums[counter]
+        return cum[hi] - cum[lo]
+
+
+def _seconds(when) -> Optional[int]:
+    """Epoch seconds of a query bound; one without a zone is in the chat's home zone."""
+    if when is None:
+        return None
+    stamp = pd.Timestamp(when)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize(home_timezone(), ambiguous=True, nonexistent="shift_forward")
+    return int(stamp.tz_convert("UTC").tz_localize(None).value // 1_000_000_000)
+
+
+class TimeIndex:
+    """
+    Per-sender prefix sums over sorted message times.
+
+    Args:
+        messages_df: Messages with a time column, 'sender', and the feature
+            columns used by the counters (plus 'hour' and 'weekday' for
+            hour/weekday queries)
+        time_col: Timestamp column
+        sender_col: Sender column
+        counters: name -> feature column to sum (None counts messages);
+            defaults to DEFAULT_COUNTERS plus every kw_* column present
+    """
+
+    def __init__(self, messages_df: "pd.DataFrame", time_col: str = "timestamp",
+                 sender_col: str = "sender", counters: Optional[Dict[str, Optional[str]]] = None):
+        times = pd.to_datetime(messages_df[time_col], errors="coerce")
+        if getattr(times.dt, "tz", None) is not None:
+            times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+        valid = (times.notna() & messages_df[sender_col].notna()).to_numpy()
+        df = messages_df[valid]
+        seconds = times[valid].to_numpy("datetime64[s]").astype(np.int64)
+
+        codes, senders = pd.factorize(df[sender_col])
+        self.senders: List[str] = list(senders)
+        self._codes = {sender: i for i, sender in enumerate(self.senders)}
+
+        if counters is None:
+            counters = dict(DEFAULT_COUNTERS)
+            counters.update({c: c for c in df.columns if c.startswith("kw_")})
+        values = {}
+        for name, column in counters.items():
+            if column is None:
+                values[name] = np.ones(len(df), dtype=np.int64)
+            elif column in df.columns:
+                values[name] = df[column].fillna(0).to_numpy().astype(np.int64)
+        self.counters = list(values)
+
+        self.origin = int(seconds.min()) if len(seconds) else 0
+        self.end = int(seconds.max()) + 1 if len(seconds) else 0
+        span = self.end - self.origin + 1
+        self._flat = _Layout(codes, seconds, values, self.origin, span)
+
+        self._buckets = None
+        if "hour" in df.columns and "weekday" in df.columns:
+            hour, weekday = df["hour"], df["weekday"]
+            known = (hour.notna() & weekday.notna()).to_numpy()
+            bucket = (weekday[known].to_numpy(np.int64) * 24 + hour[known].to_numpy(np.int64))
+            self._buckets = _Layout(codes[known] * HOURS_PER_WEEK + bucket, seconds[known],
+                                    {k: v[known] for k, v in values.items()}, self.origin, span)
+
+    def __len__(self) -> int:
+        return len(self._flat.packed)
+
+    # --------------------------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------------------------
+
+    def _matrix(self, start, end, counter: str, hours: Optional[Iterable[int]],
+                weekdays: Optional[Iterable[int]]) -> "np.ndarray":
+        """Counts shaped (senders, weekdays, hours), or (senders, 1, 1) without buckets."""
+        if counter not in self.counters:
+            raise KeyError(f"Counter '{counter}' is not indexed (have: {', '.join(self.counters)})")
+        lo = self.origin if start is None else _seconds(start)
+        hi = self.end if end is None else _seconds(end)
+        sender_keys = np.arange(len(self.senders), dtype=np.int64)
+
+        if hours is None and weekdays is None:
+            return self._flat.totals(sender_keys, lo, hi, counter).reshape(-1, 1, 1)
+        if self._buckets is None:
+            raise ValueError("Hour/weekday queries need 'hour' and 'weekday' columns")
+
+        days = np.array(sorted(set(range(7) if weekdays is None else weekdays)), dtype=np.int64)
+        hrs = np.array(sorted(set(range(24) if hours is None else hours)), dtype=np.int64)
+        buckets = (days[:, None] * 24 + hrs[None, :]).ravel()
+        keys = (sender_keys[:, None] * HOURS_PER_WEEK + buckets[None, :]).ravel()
+        totals = self._buckets.totals(keys, lo, hi, counter)
+        return totals.reshape(len(self.senders), len(days), len(hrs))
+
+    def count(self, sender: str, start=None, end=None, counter: str = "messages",
+              hours: Optional[Iterable[int]] = None, weekdays: Optional[Iterable[int]] = None) -> int:
+        """One sender's total over [start, end), optionally only at some hours/weekdays."""
+        if sender not in self._codes:
+            return 0
+        return int(self._matrix(start, end, counter, hours, weekdays)[self._codes[sender]].sum())
+
+    def counts(self, start=None, end=None, counter: str = "messages",
+               hours: Optional[Iterable[int]] = None,
+               weekdays: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """
+        Every sender's total over [start, end).
+
+        Args:
+            start, end: Anything pd.Timestamp accepts, in the home zone unless
+                it carries its own; None for open-ended
+            counter: Counter name (see self.counters)
+            hours: Local hours to include (e.g. CHAOS_HOURS)
+            weekdays: Weekdays to include, 0 = Monday (e.g. WEEKEND)
+
+        Returns:
+            {sender: total}
+        """
+        totals = self._matrix(start, end, counter, hours, weekdays).sum(axis=(1, 2))
+        return {sender: int(n) for sender, n in zip(self.senders, totals)}
+
+    def total(self, start=None, end=None, counter: str = "messages",
+              hours: Optional[Iterable[int]] = None, weekdays: Optional[Iterable[int]] = None) -> int:
+        """Everyone's total over [start, end)."""
+        return int(self._matrix(start, end, counter, hours, weekdays).sum())
+
+    def leaderboard(self, start=None, end=None, counter: str = "messages",
+                    hours: Optional[Iterable[int]] = None, weekdays: Optional[Iterable[int]] = None,
+                    top: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(sender, total) best first, senders with nothing left out."""
+        ranked = sorted(((s, n) for s, n in self.counts(start, end, counter, hours, weekdays).items()
+                         if n > 0), key=lambda item: -item[1])
+        return ranked[:top] if top else ranked
+
+    def hour_histogram(self, start=None, end=None, counter: str = "messages",
+                       senders: Optional[Sequence[str]] = None,
+                       weekdays: Optional[Iterable[int]] = None) -> List[int]:
+        """Totals for each local hour 0-23."""
+        matrix = self._matrix(start, end, counter, range(24), weekdays)
+        return [int(n) for n in self._select(matrix, senders).sum(axis=(0, 1))]
+
+    def weekday_histogram(self, start=None, end=None, counter: str = "messages",
+                          senders: Optional[Sequence[str]] = None,
+                          hours: Optional[Iterable[int]] = None) -> List[int]:
+        """Totals for each weekday, Monday first."""
+        matrix = self._matrix(start, end, counter, hours, range(7))
+        return [int(n) for n in self._select(matrix, senders).sum(axis=(0, 2))]
+
+    def _select(self, matrix: "np.ndarray", senders: Optional[Sequence[str]]) -> "np.ndarray":
+        if senders is None:
+            return matrix
+        return matrix[[self._codes[s] for s in senders if s in self._codes]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard for a time range of a chat export")
+    parser.add_argument("csv", nargs="?", default="output/chat_export.csv", help="Chat export CSV")
+    parser.add_argument("--since", help="Start of the range (inclusive, home time zone)")
+    parser.add_argument("--until", help="End of the range (exclusive, home time zone)")
+    parser.add_argument("--counter", default="messages", help="messages, emojis, curses or kw_<group>")
+    parser.add_argument("--chaos", action="store_true", help="Only chaos hours (11pm-5am)")
+    parser.add_argument("--weekend", action="store_true", help="Only Saturdays and Sundays")
+    args = parser.parse_args()
+    if args.since and args.until and _seconds(args.since) > _seconds(args.until):
+        parser.error("--since is after --until")
+
+    from utils.features import add_features, feature_path
+
+    csv_path = os.path.expanduser(args.csv)
+    index = TimeIndex(add_features(pd.read_csv(csv_path), store_path=feature_path(csv_path), home_zones=True))
+    board = index.leaderboard(args.since, args.until, counter=args.counter,
+                              hours=CHAOS_HOURS if args.chaos else None,
+                              weekdays=WEEKEND if args.weekend else None)
+    print(f"⏱️  {args.counter} from {args.since or 'the start'} to {args.until or 'now'} "
+          f"({len(index)} messages indexed)")
+    for sender, total in board:
+        print(f"  {sender:30} {total:>8}")
+
+
+if __name__ == "__main__":
+    main()
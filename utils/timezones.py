@@ -0,0 +1,73 @@
+"""
+Local time buckets for chat timestamps.
+
+``extract_messages.py`` converts Mac-epoch nanoseconds to naive datetimes,
+which are UTC. Late-night buckets ("3AM chaos") have to be taken in each
+sender's own time zone. ``local_time_parts()`` converts a whole column at
+once: it localizes to UTC and then runs one vectorized ``tz_convert`` per
+distinct zone (usually one or two), so DST transitions come out right
+without a per-row Python loop.
+
+Home zones:
+- ``SENDER_TIMEZONES`` maps display names (see utils/mapping.py) to IANA
+  zone names
+- everyone else uses ``CHAT_TIMEZONE`` from the environment, or
+  ``DEFAULT_TIMEZONE``
+
+Usage:
+    df["timezone"] = sender_zones(df["sender"])
+    parts = local_time_parts(df["timestamp"], df["timezone"])   # hour, weekday
+"""
+
+import os
+from typing import Dict, Optional
+
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# The whole group texts from the US East Coast
+DEFAULT_TIMEZONE = "America/New_York"
+
+# Display name -> IANA zone, for anyone who doesn't live in the default zone
+SENDER_TIMEZONES: Dict[str, str] = {
+    # "Jackson": "America/Chicago",
+}
+
+
+def home_timezone(sender: Optional[str] = None) -> str:
+    """IANA zone for a sender (or the chat default)."""
+    return SENDER_TIMEZONES.get(sender) or os.getenv("CHAT_TIMEZONE") or DEFAULT_TIMEZONE
+
+
+def sender_zones(senders: "pd.Series") -> "pd.Series":
+    """Home zone for each row, as a Series aligned with senders."""
+    default = home_timezone()
+    return senders.map(SENDER_TIMEZONES).fillna(default).astype(str)
+
+
+def local_time_parts(times: "pd.Series", zones: "pd.Series") -> "pd.DataFrame":
+    """
+    Local hour and weekday for UTC timestamps.
+
+    Args:
+        times: Datetimes or ISO strings; naive values are taken as UTC,
+            values with an offset are honoured
+        zones: IANA zone name per row
+
+    Returns:
+        DataFrame with 'hour' and 'weekday' (0 = Monday) as Int8, null
+        where the time couldn't be parsed
+    """
+    if pd.api.types.is_datetime64_any_dtype(times):
+        utc = times.dt.tz_localize("UTC") if times.dt.tz is None else times.dt.tz_convert("UTC")
+    else:
+        utc = pd.to_datetime(times, format="ISO8601", errors="coerce", utc=True)
+
+    hour = pd.Series(pd.NA, index=times.index, dtype="Int8")
+    weekday = pd.Series(pd.NA, index=times.index, dtype="Int8")
+    for zone, rows in zones.groupby(zones, sort=False).groups.items():
+        local = utc.loc[rows].dt.tz_convert(zone)
+        hour.loc[rows] = local.dt.hour.astype("Int8")
+        weekday.loc[rows] = local.dt.dayofweek.astype("Int8")
+    return pd.DataFrame({"hour": hour, "weekday": weekday}, index=times.index)
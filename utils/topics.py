@@ -0,0 +1,524 @@
+"""
+Unsupervised topic discovery for topic questions.
+
+The topic questions used hand-written buckets ('dogs', 'kroger', 'pool',
+...) that had to be edited every time a new running joke started.
+``TopicIndex`` finds the topics itself, on the CPU, without LLM calls:
+
+- features: TF-IDF over words, kept as sparse CSR arrays (indptr, term,
+  value); words in fewer than MIN_DF messages or in more than MAX_DF_SHARE
+  of them carry no weight, and reactions/tapbacks are ignored
+- clustering: spherical mini-batch k-means. Each batch's similarities to
+  the centroids are one gather and ``np.add.reduceat``; each centroid moves
+  towards the mean of its batch members with a 1/count learning rate
+- incremental: the store keeps the term arrays and centroids next to the
+  corpus. ``update()`` tokenizes only messages it hasn't seen, runs one
+  mini-batch pass over them and reassigns everything, so topic ids stay
+  stable as the chat grows
+- bursts: per-day counts of each term (or topic) against the count its
+  overall share predicts (Poisson z-score), with consecutive hot days merged
+
+Usage:
+    index = TopicIndex(topic_path("output/chat_export.csv"), seed=7)
+    topic = index.update(messages_df)          # topic id per row, -1 = none
+    index.topics()                             # label, messages, top sender
+    index.leaderboard(3)                       # who talks about topic 3 most
+    index.bursts("terms")                      # running jokes that flared up
+
+    python -m utils.topics output/chat_export.csv --bursts
+"""
+
+import argparse
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from utils.cache import cache_path, load_pickle, save_pickle
+from utils.features import row_keys
+from utils.lazy import lazy_import
+from utils.text import TAPBACK_RE, URL_RE
+from utils.timezones import home_timezone
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".topics.pkl"
+DIRECTORY_CACHE = "topics.pkl"
+
+NUM_TOPICS = 24
+
+# Mini-batch k-means
+BATCH_SIZE = 4096
+FIRST_EPOCHS = 5          # passes over the corpus when the model is new
+INIT_SAMPLE = 4096        # messages considered for k-means++ seeding
+CHUNK_SIZE = 20000        # messages per chunk when assigning everything
+
+# Vocabulary weighting
+MIN_DF = 3
+MAX_DF_SHARE = 0.05
+
+# A message needs this many weighted words to be clustered at all
+MIN_TERMS = 2
+
+# Cosine similarity a message needs to join its nearest topic
+MIN_SIMILARITY = 0.2
+
+# Topics smaller than this are left out of topics()
+MIN_TOPIC_SIZE = 10
+
+LABEL_TERMS = 3
+
+# Time strings the analyzers write (local time)
+CLOCK_FORMAT = "%b %d, %Y %I:%M %p"
+
+# Burst detection
+BURST_Z = 6.0
+MIN_BURST_COUNT = 5
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing don't done down during each few for
+from further get gets getting go goes going gonna got had has have having he her here hers
+him his how i i'd i'll i'm i've if in into is isn't it it's its just let me might more most
+my no nor not now of off on once one only or other our out over own really same she should
+so some still such than that that's the their them then there these they this those though
+through to too under until up us very was we we're were what when where which while who why
+will with would you you're your yours yourself
+im ive ill id dont cant wont didnt doesnt isnt thats whats youre theyre its
+yeah yes yep yea ya ok okay k lol lmao lmfao haha hahaha omg like u ur r oh ohh um uh
+gotta wanna kinda lot lots much many thing things something anything know think want need
+make made see say said tell told come came back way well good great right sure time day
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9']+")
+
+PathLike = Union[str, Path]
+
+
+def topic_path(corpus_path: PathLike) -> Path:
+    """Store location for a corpus: ``<name>.topics.pkl`` next to a file, or in a directory's cache."""
+    return cache_path(corpus_path, CACHE_SUFFIX, DIRECTORY_CACHE)
+
+
+def _gather(indptr: "np.ndarray", docs: "np.ndarray"):
+    """Entry positions of the given CSR rows, and where each row starts among them."""
+    lengths = indptr[docs + 1] - indptr[docs]
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    entries = np.repeat(indptr[docs] - starts, lengths) + np.arange(lengths.sum())
+    return entries, starts
+
+
+def _day_numbers(times: "pd.Series") -> "np.ndarray":
+    """
+    Local calendar day (days since epoch), -1 where unparseable.
+
+    ISO timestamps are UTC and are placed on the chat's home-zone day; the
+    analyzers' "Oct 03, 2024 03:45 PM" strings are already local. Clock
+    strings without a year can't be placed on a day.
+    """
+    utc = pd.to_datetime(times, format="ISO8601", errors="coerce", utc=True)
+    local = utc.dt.tz_convert(home_timezone()).dt.tz_localize(None)
+
+    missing = local.isna() & times.notna()
+    if missing.any():
+        clock = times[missing].astype(str)
+        parsed = pd.to_datetime(clock, format=CLOCK_FORMAT, errors="coerce")
+        # Other spellings with a year ("Oct 3, 2024 3:45 PM", "10/03/2024 3:45 PM")
+        rest = parsed.isna() & clock.str.contains(r"\b\d{4}\b")
+        if rest.any():
+            parsed[rest] = pd.to_datetime(clock[rest], format="mixed", errors="coerce")
+        local[missing] = parsed
+
+    days = local.to_numpy().astype("datetime64[D]").astype(np.int64)
+    return np.where(local.notna().to_numpy(), days, -1)
+
+
+def _bursts(days: "np.ndarray", ids: "np.ndarray") -> "pd.DataFrame":
+    """
+    Runs of days on which an id occurs far more often than its overall share predicts.
+
+    Args:
+        days: Day number of each occurrence (one per message and id)
+        ids: Term or topic id of each occurrence
+
+    Returns:
+        DataFrame with id, start, end (day numbers), messages and score
+        (highest daily z-score), strongest first
+    """
+    columns = ["id", "start", "end", "messages", "score"]
+    if not len(days):
+        return pd.DataFrame(columns=columns)
+    day_codes, day_values = pd.factorize(days, sort=True)
+    n_ids = int(ids.max()) + 1
+    pairs, count = np.unique(day_codes.astype(np.int64) * n_ids + ids, return_counts=True)
+    day, ident = pairs // n_ids, pairs % n_ids
+
+    per_day = np.bincount(day_codes, minlength=len(day_values))
+    per_id = np.bincount(ids, minlength=n_ids)
+    expected = per_day[day] * per_id[ident] / len(days)
+    z = (count - expected) / np.sqrt(np.maximum(expected, 1e-9))
+    hot = (z >= BURST_Z) & (count >= MIN_BURST_COUNT)
+    if not hot.any():
+        return pd.DataFrame(columns=columns)
+
+    frame = pd.DataFrame({"id": ident[hot], "day": day_values[day[hot]],
+                          "messages": count[hot], "score": z[hot]}).sort_values(["id", "day"])
+    # Consecutive hot days of the same id are one burst
+    new_run = (frame["id"].diff() != 0) | (frame["day"].diff() > 1)
+    runs = frame.groupby(new_run.cumsum().to_numpy())
+    result = pd.DataFrame({"id": runs["id"].first(), "start": runs["day"].min(),
+                           "end": runs["day"].max(), "messages": runs["messages"].sum(),
+                           "score": runs["score"].max()})
+    return result.sort_values("score", ascending=False).reset_index(drop=True)
+
+
+class TopicIndex:
+    """
+    Discovered topics for one corpus, persisted and updated incrementally.
+
+    Args:
+        path: Store file (see topic_path()); None keeps it in memory only
+        num_topics: Number of clusters
+        seed: Random seed for seeding and batch order
+    """
+
+    def __init__(self, path: Optional[PathLike] = None, num_topics: int = NUM_TOPICS,
+                 seed: Optional[int] = None):
+        self.path = Path(path) if path else None
+        self.num_topics = num_topics
+        self.rng = np.random.default_rng(seed)
+        self.stats = {"cached": 0, "computed": 0}
+
+        # Corpus: one entry per distinct message, term arrays in CSR layout
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.senders = np.zeros(0, dtype=object)
+        self.days = np.zeros(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.term = np.zeros(0, dtype=np.int64)
+        self.tf = np.zeros(0, dtype=np.int64)
+
+        # Model
+        self.centroids: Optional["np.ndarray"] = None
+        self.counts = np.zeros(num_topics)
+
+        # Derived on every update()
+        self.topic = np.zeros(0, dtype=np.int64)
+        self.similarity = np.zeros(0)
+
+        self._load()
+
+    # --------------------------------------------------------------------------
+    # Store
+    # --------------------------------------------------------------------------
+
+    _STATE = ("vocab", "terms", "keys", "senders", "days", "indptr", "term", "tf",
+              "centroids", "counts")
+
+    def _load(self):
+        data = load_pickle(self.path)
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return
+        for name in self._STATE:
+            setattr(self, name, data[name])
+        if self.centroids is not None and len(self.centroids) != self.num_topics:
+            self.centroids, self.counts = None, np.zeros(self.num_topics)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {name: getattr(self, name) for name in self._STATE}
+        data["version"] = CACHE_VERSION
+        if not save_pickle(data, self.path):
+            self.path = None
+
+    # --------------------------------------------------------------------------
+    # Corpus
+    # --------------------------------------------------------------------------
+
+    def _tokenize(self, texts: "pd.Series"):
+        """(doc, term) id per token occurrence, growing the vocabulary."""
+        lookup, terms = self.vocab.setdefault, self.terms
+        docs, ids = [], []
+        findall, strip = _TOKEN_RE.findall, URL_RE.sub
+        for doc, text in enumerate(texts):
+            if TAPBACK_RE.match(text):
+                continue
+            for token in findall(strip(" ", text.lower())):
+                if token.endswith("'s"):
+                    token = token[:-2]
+                if token in STOPWORDS or len(token) < 3:
+                    continue
+                term = lookup(token, len(terms))
+                if term == len(terms):
+                    terms.append(token)
+                docs.append(doc)
+                ids.append(term)
+        return np.asarray(docs, dtype=np.int64), np.asarray(ids, dtype=np.int64)
+
+    def _sync(self, rows: "pd.DataFrame", keys: "np.ndarray", text_col: str, sender_col: str,
+              time_col: Optional[str]) -> int:
+        """Trim the stored corpus to keys and append the rows it hasn't seen; returns the first new doc."""
+        keep = np.flatnonzero(pd.Index(self.keys).isin(keys))
+        if len(keep) < len(self.keys):
+            entries, _ = _gather(self.indptr, keep)
+            lengths = self.indptr[keep + 1] - self.indptr[keep]
+            self.term, self.tf = self.term[entries], self.tf[entries]
+            self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+            self.keys, self.senders, self.days = self.keys[keep], self.senders[keep], self.days[keep]
+
+        fresh = rows[~pd.Index(keys).isin(self.keys)]
+        first = len(self.keys)
+        if fresh.empty:
+            return first
+
+        docs, ids = self._tokenize(fresh[text_col].fillna("").astype(str))
+        vocab_size = max(len(self.terms), 1)
+        pairs, tf = np.unique(docs * vocab_size + ids, return_counts=True)
+        doc = pairs // vocab_size
+        lengths = np.bincount(doc, minlength=len(fresh))
+
+        self.term = np.concatenate((self.term, pairs % vocab_size))
+        self.tf = np.concatenate((self.tf, tf))
+        self.indptr = np.concatenate((self.indptr, self.indptr[-1] + np.cumsum(lengths)))
+        self.keys = np.concatenate((self.keys, fresh.index.to_numpy(dtype=np.uint64)))
+        self.senders = np.concatenate((self.senders, fresh[sender_col].astype(str).to_numpy(dtype=object)))
+        days = (_day_numbers(fresh[time_col]) if time_col and time_col in fresh.columns
+                else np.full(len(fresh), -1, dtype=np.int64))
+        self.days = np.concatenate((self.days, days))
+        return first
+
+    def _weights(self):
+        """
+        Unit-length TF-IDF value per entry, and the docs with at least MIN_TERMS weighted terms.
+
+        Returns:
+            (value aligned with self.term, positions of the clusterable docs)
+        """
+        vocab_size = len(self.terms)
+        df = np.bincount(self.term, minlength=vocab_size)
+        doc_lengths = np.diff(self.indptr)
+        n_docs = max(int((doc_lengths > 0).sum()), 1)
+        max_df = max(MAX_DF_SHARE * n_docs, 2 * MIN_DF)
+        idf = np.where((df >= MIN_DF) & (df <= max_df), np.log((1 + n_docs) / (1 + df)) + 1, 0.0)
+
+        value = (1 + np.log(self.tf)) * idf[self.term]
+        doc = np.repeat(np.arange(len(doc_lengths)), doc_lengths)
+        norms = np.sqrt(np.bincount(doc, weights=value ** 2, minlength=len(doc_lengths)))
+        weighted = np.bincount(doc, weights=value > 0, minlength=len(doc_lengths))
+        value = value / np.where(norms > 0, norms, 1.0)[doc]
+        return value, np.flatnonzero(weighted >= MIN_TERMS)
+
+    # --------------------------------------------------------------------------
+    # Clustering
+    # --------------------------------------------------------------------------
+
+    def _similarities(self, value: "np.ndarray", docs: "np.ndarray") -> "np.ndarray":
+        """Cosine similarity of docs to every centroid, shape (docs, topics)."""
+        entries, starts = _gather(self.indptr, docs)
+        gathered = self.centroids[:, self.term[entries]] * value[entries]
+        return np.add.reduceat(gathered, starts, axis=1).T
+
+    def _seed(self, value: "np.ndarray", docs: "np.ndarray"):
+        """k-means++ seeding on a sample of docs."""
+        sample = self.rng.choice(docs, size=min(INIT_SAMPLE, len(docs)), replace=False)
+        entries, starts = _gather(self.indptr, sample)
+        term, weight = self.term[entries], value[entries]
+        row = np.repeat(np.arange(len(sample)), np.diff(np.append(starts, len(entries))))
+
+        centroids = np.zeros((self.num_topics, len(self.terms)))
+        best = np.zeros(len(sample))
+        pick = int(self.rng.integers(len(sample)))
+        for k in range(self.num_topics):
+            mine = row == pick
+            centroids[k, term[mine]] = weight[mine]
+            best = np.maximum(best, np.add.reduceat(centroids[k, term] * weight, starts))
+            distance = np.maximum(1.0 - best, 0.0) ** 2
+            if distance.sum() <= 0:
+                break
+            pick = int(self.rng.choice(len(sample), p=distance / distance.sum()))
+        self.centroids = centroids
+        self.counts = np.zeros(self.num_topics)
+
+    def _fit(self, value: "np.ndarray", docs: "np.ndarray", epochs: int):
+        """Mini-batch passes over docs."""
+        vocab_size = len(self.terms)
+        for _ in range(epochs):
+            order = self.rng.permutation(docs)
+            for start in range(0, len(order), BATCH_SIZE):
+                batch = np.sort(order[start:start + BATCH_SIZE])
+                nearest = self._similarities(value, batch).argmax(axis=1)
+                entries, starts = _gather(self.indptr, batch)
+                row = np.repeat(np.arange(len(batch)), np.diff(np.append(starts, len(entries))))
+                sums = np.bincount(nearest[row] * vocab_size + self.term[entries],
+                                   weights=value[entries], minlength=self.num_topics * vocab_size)
+                members = np.bincount(nearest, minlength=self.num_topics)
+                self.counts += members
+                rate = (members / np.maximum(self.counts, 1))[:, None]
+                means = sums.reshape(self.num_topics, vocab_size) / np.maximum(members, 1)[:, None]
+                self.centroids += rate * (means - self.centroids)
+                norms = np.linalg.norm(self.centroids, axis=1, keepdims=True)
+                self.centroids /= np.where(norms > 0, norms, 1.0)
+
+    def update(self, messages_df: "pd.DataFrame", text_col: str = "text", sender_col: str = "sender",
+               time_col: Optional[str] = "timestamp") -> "pd.Series":
+        """
+        Bring the index up to date with messages_df and assign every message a topic.
+
+        Only messages the store hasn't seen are tokenized and fed to the
+        clustering; the store is trimmed to the rows of messages_df.
+
+        Returns:
+            Topic id per row of messages_df, -1 for messages too short or too
+            far from every topic
+        """
+        keys = row_keys(messages_df, [sender_col, text_col] + ([time_col] if time_col else []))
+        rows = messages_df.set_axis(keys.to_numpy())
+        rows = rows[~rows.index.duplicated()]
+        unique = rows.index.to_numpy(dtype=np.uint64)
+
+        first = self._sync(rows, unique, text_col, sender_col, time_col)
+        self.stats = {"cached": first, "computed": len(self.keys) - first}
+        value, docs = self._weights()
+
+        if self.centroids is None:
+            if len(docs) >= self.num_topics:
+                self._seed(value, docs)
+                self._fit(value, docs, FIRST_EPOCHS)
+        else:
+            # New words start with zero weight in every centroid
+            grown = len(self.terms) - self.centroids.shape[1]
+            if grown > 0:
+                self.centroids = np.pad(self.centroids, ((0, 0), (0, grown)))
+            self._fit(value, docs[docs >= first], 1)
+
+        self.topic = np.full(len(self.keys), -1, dtype=np.int64)
+        self.similarity = np.zeros(len(self.keys))
+        if self.centroids is not None and len(docs):
+            for start in range(0, len(docs), CHUNK_SIZE):
+                chunk = docs[start:start + CHUNK_SIZE]
+                sims = self._similarities(value, chunk)
+                self.topic[chunk] = sims.argmax(axis=1)
+                self.similarity[chunk] = sims.max(axis=1)
+            self.topic[self.similarity < MIN_SIMILARITY] = -1
+
+        if self.stats["computed"] or first != len(self.keys):
+            self.save()
+        position = pd.Series(np.arange(len(self.keys)), index=self.keys)
+        return pd.Series(self.topic[position.reindex(keys.to_numpy()).to_numpy()],
+                         index=messages_df.index)
+
+    # --------------------------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------------------------
+
+    def label(self, topic: int, n: int = LABEL_TERMS) -> str:
+        """The topic's top centroid terms, e.g. 'kroger / parking / cart'."""
+        weights = self.centroids[topic]
+        top = np.argsort(weights)[::-1][:n]
+        return " / ".join(self.terms[t] for t in top if weights[t] > 0)
+
+    def counts_by_sender(self) -> "pd.DataFrame":
+        """Messages per topic (rows) and sender (columns)."""
+        assigned = self.topic >= 0
+        return pd.crosstab(self.topic[assigned], self.senders[assigned]).rename_axis(
+            index="topic", columns="sender")
+
+    def leaderboard(self, topic: int, share: bool = False) -> "pd.Series":
+        """
+        Who talks about a topic most.
+
+        Args:
+            topic: Topic id
+            share: Rank by the share of each sender's own messages instead
+                of raw counts
+
+        Returns:
+            Series indexed by sender, highest first
+        """
+        mine = pd.Series(self.senders[self.topic == topic]).value_counts()
+        if share:
+            mine = (mine / pd.Series(self.senders).value_counts().reindex(mine.index)).sort_values(
+                ascending=False)
+        return mine
+
+    def topics(self, min_size: int = MIN_TOPIC_SIZE) -> "pd.DataFrame":
+        """
+        Discovered topics, largest first.
+
+        Returns:
+            DataFrame indexed by topic id with label, messages, top_sender,
+            top_count and top_share (the leader's share of the topic)
+        """
+        columns = ["label", "messages", "top_sender", "top_count", "top_share"]
+        counts = self.counts_by_sender()
+        if counts.empty:
+            return pd.DataFrame(columns=columns)
+        sizes = counts.sum(axis=1)
+        table = pd.DataFrame({
+            "label": [self.label(t) for t in counts.index],
+            "messages": sizes,
+            "top_sender": counts.idxmax(axis=1),
+            "top_count": counts.max(axis=1),
+        }, index=counts.index)
+        table["top_share"] = table["top_count"] / sizes
+        return table[table["messages"] >= min_size].sort_values("messages", ascending=False)[columns]
+
+    def bursts(self, kind: str = "terms") -> "pd.DataFrame":
+        """
+        Terms or topics that flared up on particular days.
+
+        Args:
+            kind: 'terms' or 'topics'
+
+        Returns:
+            DataFrame with the term or topic label, start and end dates,
+            messages in the burst and score, strongest first
+        """
+        dated = self.days >= 0
+        if kind == "topics":
+            mine = dated & (self.topic >= 0)
+            found = _bursts(self.days[mine], self.topic[mine])
+            names = [self.label(t) for t in found["id"]]
+        else:
+            value, _ = self._weights()
+            doc = np.repeat(np.arange(len(self.keys)), np.diff(self.indptr))
+            mine = (value > 0) & dated[doc]
+            found = _bursts(self.days[doc[mine]], self.term[mine])
+            names = [self.terms[t] for t in found["id"]]
+        found.insert(0, kind[:-1], names)
+        for col in ("start", "end"):
+            found[col] = pd.to_datetime(found[col].astype(np.int64), unit="D").dt.date
+        return found.drop(columns="id")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover topics in a chat export")
+    parser.add_argument("csv", nargs="?", default="output/chat_export.csv", help="Chat export CSV")
+    parser.add_argument("--topics", type=int, default=NUM_TOPICS, help="Number of topics")
+    parser.add_argument("--bursts", action="store_true", help="Also list term bursts")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    csv_path = os.path.expanduser(args.csv)
+    df = pd.read_csv(csv_path)
+    index = TopicIndex(topic_path(csv_path), num_topics=args.topics, seed=args.seed)
+    index.update(df)
+    print(f"🧵 {len(index.keys)} messages ({index.stats['computed']} new)")
+
+    for topic, row in index.topics().iterrows():
+        leaders = ", ".join(f"{s} {c}" for s, c in index.leaderboard(topic).head(3).items())
+        print(f"  [{topic:2}] {row['label']:40} {row['messages']:6}  {leaders}")
+
+    if args.bursts:
+        print("\n🔥 Term bursts:")
+        for _, row in index.bursts("terms").head(20).iterrows():
+            print(f"  {row['term']:20} {row['start']} → {row['end']}  "
+                  f"{row['messages']:4} msgs  z={row['score']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
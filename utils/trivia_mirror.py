@@ -0,0 +1,304 @@
+"""
+Local mirror of general trivia questions.
+
+Every general question we fetch (Open Trivia DB) or generate (OpenAI pop
+culture) is kept in one indexed SQLite file, so pack building can query it
+directly and game night works offline. Only gaps are refilled from the
+network (see utils/opentdb.py).
+
+Usage:
+    mirror = TriviaMirror()
+    mirror.import_csv("output/general_trivia_questions.csv", source="csv")
+    rows = mirror.sample(40, difficulties=["easy", "medium"])   # CSV-format dicts
+
+    python -m utils.trivia_mirror --summary
+    python -m utils.trivia_mirror --import output/general_trivia_questions.csv
+"""
+
+import argparse
+import csv
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from utils.question_bank import question_hash
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_MIRROR = PROJECT_ROOT / "data" / "trivia_mirror.db"
+
+LETTERS = ["A", "B", "C", "D"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS general_questions (
+    id TEXT PRIMARY KEY,               -- question bank fingerprint (type + normalized text)
+    question TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    incorrect_answers TEXT NOT NULL,   -- JSON array of 3 strings
+    explanation TEXT,
+    category TEXT,
+    category_id INTEGER,               -- OpenTDB category id, if known
+    difficulty TEXT,
+    source TEXT NOT NULL,              -- 'opentdb', 'openai' or 'csv'
+    fetched_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_general_category ON general_questions(category_id, difficulty);
+CREATE INDEX IF NOT EXISTS idx_general_category_name ON general_questions(category);
+CREATE INDEX IF NOT EXISTS idx_general_difficulty ON general_questions(difficulty);
+CREATE INDEX IF NOT EXISTS idx_general_source ON general_questions(source);
+CREATE INDEX IF NOT EXISTS idx_general_fetched ON general_questions(fetched_at);
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO general_questions (id, question, correct_answer, incorrect_answers, explanation,
+                                   category, category_id, difficulty, source, fetched_at, updated_at)
+    VALUES (:id, :question, :correct_answer, :incorrect_answers, :explanation,
+            :category, :category_id, :difficulty, :source, :fetched_at, :updated_at)
+    ON CONFLICT(id) DO NOTHING
+"""
+
+
+def category_id_for(category: str) -> Optional[int]:
+    """OpenTDB category id for names like 'Film' or 'Entertainment: Film'."""
+    from utils.opentdb import CATEGORIES
+
+    name = (category or "").split(":")[-1].strip().lower()
+    for category_id, known in CATEGORIES.items():
+        if known.lower() == name:
+            return category_id
+    return None
+
+
+def record_from_csv_row(row: Dict, source: str) -> Optional[Dict]:
+    """Convert a pack-format CSV row (option_A..D, correct_answer letter) to a record."""
+    letter = str(row.get("correct_answer", "")).strip().upper()
+    options = [row.get(f"option_{l}", "") for l in LETTERS]
+    if letter not in LETTERS or not row.get("question") or not all(options):
+        return None
+
+    correct = options[LETTERS.index(letter)]
+    return {
+        "id": question_hash({"type": "trivia", "text": row["question"]}),
+        "question": row["question"],
+        "correct_answer": correct,
+        "incorrect_answers": [o for i, o in enumerate(options) if LETTERS[i] != letter],
+        "explanation": row.get("explanation") or None,
+        "category": row.get("category", ""),
+        "category_id": category_id_for(row.get("category", "")),
+        "difficulty": (row.get("difficulty") or "medium").lower(),
+        "source": source,
+    }
+
+
+def record_to_csv_row(record: Dict, rng: Optional[random.Random] = None) -> Dict:
+    """Shuffle a record's answers into a pack-format CSV row."""
+    rng = rng or random
+    answers = list(record["incorrect_answers"]) + [record["correct_answer"]]
+    rng.shuffle(answers)
+    row = {
+        "question": record["question"],
+        "correct_answer": LETTERS[answers.index(record["correct_answer"])],
+        "explanation": record.get("explanation") or f"Category: {record['category']}",
+        "difficulty": record["difficulty"],
+        "category": record["category"],
+    }
+    for letter, answer in zip(LETTERS, answers):
+        row[f"option_{letter}"] = answer
+    return row
+
+
+class TriviaMirror:
+    """
+    Indexed on-disk store of general trivia questions.
+
+    Also serves as the OpenTDB fetcher's cache (add/count/select/len/in).
+
+    Args:
+        path: SQLite file (created if missing)
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_MIRROR):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM general_questions").fetchone()[0]
+
+    def __contains__(self, question_id: str) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM general_questions WHERE id = ?",
+                                     (question_id,)).fetchone() is not None
+
+    # --------------------------------------------------------------------------
+    # Writes
+    # --------------------------------------------------------------------------
+
+    def add(self, records: Iterable[Dict]) -> int:
+        """
+        Store records in one transaction; returns how many were new.
+
+        Questions already mirrored keep their original fetch timestamp.
+
+        Args:
+            records: Dicts with id, question, correct_answer, incorrect_answers,
+                category, difficulty, source (category_id, explanation and
+                fetched_at optional)
+        """
+        now = int(time.time())
+        rows = []
+        for record in records:
+            row = dict(record)
+            row.setdefault("explanation", None)
+            row.setdefault("category_id", None)
+            row.setdefault("fetched_at", now)
+            row["updated_at"] = now
+            row["incorrect_answers"] = json.dumps(list(record["incorrect_answers"]),
+                                                  ensure_ascii=False)
+            rows.append(row)
+        if not rows:
+            return 0
+
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(_UPSERT_SQL, rows)
+            return self.conn.total_changes - before
+
+    def add_csv_rows(self, rows: Iterable[Dict], source: str) -> int:
+        """Store pack-format CSV rows (e.g. generated pop culture questions)."""
+        return self.add(r for r in (record_from_csv_row(row, source) for row in rows) if r)
+
+    def import_csv(self, path: Union[str, Path], source: str = "csv") -> int:
+        """Import a pack-format CSV file; returns how many questions were new."""
+        with open(path, "r", encoding="utf-8") as f:
+            return self.add_csv_rows(csv.DictReader(f), source)
+
+    # --------------------------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        record["incorrect_answers"] = json.loads(record["incorrect_answers"])
+        return record
+
+    def _where(self, category_ids=None, difficulties=None, sources=None, categories=None):
+        clauses, params = [], []
+        for column, values in (("category_id", category_ids), ("difficulty", difficulties),
+                               ("source", sources), ("category", categories)):
+            if values is not None:
+                values = list(values)
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, category_id: Optional[int] = None, difficulty: Optional[str] = None) -> int:
+        """Questions mirrored for a category and/or difficulty."""
+        where, params = self._where(
+            category_ids=[category_id] if category_id is not None else None,
+            difficulties=[difficulty] if difficulty is not None else None)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM general_questions{where}",
+                                     params).fetchone()[0]
+
+    def select(self, category_ids: Optional[Iterable[int]] = None,
+               difficulties: Optional[Iterable[str]] = None,
+               sources: Optional[Iterable[str]] = None) -> List[Dict]:
+        """All records matching the filters."""
+        where, params = self._where(category_ids, difficulties, sources)
+        with self._lock:
+            rows = self.conn.execute(f"SELECT * FROM general_questions{where}", params).fetchall()
+        return [self._record(r) for r in rows]
+
+    def sample(self, n: int, category_ids: Optional[Iterable[int]] = None,
+               difficulties: Optional[Iterable[str]] = None,
+               sources: Optional[Iterable[str]] = None,
+               categories: Optional[Iterable[str]] = None,
+               seed: Optional[int] = None) -> List[Dict]:
+        """
+        Up to `n` random questions as pack-format CSV rows.
+
+        Args:
+            n: Questions wanted
+            category_ids: OpenTDB category ids to draw from
+            difficulties: 'easy', 'medium', 'hard'
+            sources: 'opentdb', 'openai', 'csv'
+            categories: Category names as stored
+            seed: Seed for selection and answer order
+        """
+        where, params = self._where(category_ids, difficulties, sources, categories)
+        rng = random.Random(seed)
+        with self._lock:
+            ids = [r[0] for r in self.conn.execute(f"SELECT id FROM general_questions{where}", params)]
+            picked = rng.sample(ids, min(n, len(ids)))
+            rows = []
+            for start in range(0, len(picked), 500):
+                chunk = picked[start:start + 500]
+                rows.extend(self.conn.execute(
+                    f"SELECT * FROM general_questions WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk))
+        order = {question_id: i for i, question_id in enumerate(picked)}
+        records = sorted((self._record(r) for r in rows), key=lambda r: order[r["id"]])
+        return [record_to_csv_row(r, rng) for r in records]
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Question counts by source, difficulty and category."""
+        result = {}
+        with self._lock:
+            for column in ("source", "difficulty", "category"):
+                result[column] = dict(self.conn.execute(
+                    f"SELECT {column}, COUNT(*) FROM general_questions "
+                    f"GROUP BY {column} ORDER BY COUNT(*) DESC").fetchall())
+            oldest, newest = self.conn.execute(
+                "SELECT MIN(fetched_at), MAX(fetched_at) FROM general_questions").fetchone()
+        result["fetched"] = {"oldest": oldest or 0, "newest": newest or 0}
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or load the local general trivia mirror")
+    parser.add_argument("--db", default=str(DEFAULT_MIRROR), help="Mirror database path")
+    parser.add_argument("--import", dest="import_paths", nargs="*", default=[],
+                        help="Pack-format CSV files to import")
+    parser.add_argument("--source", default="csv", help="Source label for imported rows")
+    parser.add_argument("--summary", action="store_true", help="Show counts")
+    args = parser.parse_args()
+
+    with TriviaMirror(args.db) as mirror:
+        for path in args.import_paths:
+            print(f"📥 {path}: {mirror.import_csv(path, source=args.source)} new questions")
+
+        summary = mirror.summary()
+        print(f"\n📚 {len(mirror)} questions in {mirror.path}")
+        for column in ("source", "difficulty", "category"):
+            print(f"\nBy {column}:")
+            for value, count in summary[column].items():
+                print(f"  {value}: {count}")
+        if summary["fetched"]["newest"]:
+            oldest = time.strftime("%Y-%m-%d", time.localtime(summary["fetched"]["oldest"]))
+            newest = time.strftime("%Y-%m-%d", time.localtime(summary["fetched"]["newest"]))
+            print(f"\nFetched between {oldest} and {newest}")
+
+
+if __name__ == "__main__":
+    main()
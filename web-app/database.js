@@ -43,9 +43,12 @@ class HenzeTriviaDB {
         avg_answer_time_ms INTEGER,
         correct_rate REAL, -- 0.0 to 1.0
         laugh_score REAL DEFAULT 0.0, -- Avg laughs per use
-        last_used_at INTEGER
+        last_used_at INTEGER,
+        question_hash TEXT, -- sha1 of type + normalized text (utils/question_bank.py)
+        options_hash TEXT -- sha1 of normalized, sorted options
       );
     `);
+    this.migrateQuestionFingerprints();
 
     // Games table
     this.db.exec(`
@@ -108,6 +111,43 @@ class HenzeTriviaDB {
     console.log("✅ Database initialized:", DB_PATH);
   }
 
+  /**
+   * Add the fingerprint columns to older databases and key questions on question_hash.
+   *
+   * The Python question bank (utils/question_bank.py) fills the hashes in and
+   * upserts on question_hash, so re-running a generator never adds a second
+   * row for the same question. Rows inserted here stay unhashed until then.
+   */
+  migrateQuestionFingerprints() {
+    const columns = this.db
+      .prepare("PRAGMA table_info(questions)")
+      .all()
+      .map((column) => column.name);
+
+    const hashIndex = this.db
+      .prepare("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_questions_hash'")
+      .get();
+
+    this.db.transaction(() => {
+      for (const column of ["question_hash", "options_hash"]) {
+        if (!columns.includes(column)) {
+          this.db.exec(`ALTER TABLE questions ADD COLUMN ${column} TEXT`);
+        }
+      }
+      if (!hashIndex) {
+        // Before the index exists a question may have been hashed twice; keep
+        // the oldest row's hash, so the bank can retire the others
+        this.db.exec(`
+          UPDATE questions SET question_hash = NULL, options_hash = NULL
+          WHERE question_hash IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM questions WHERE question_hash IS NOT NULL GROUP BY question_hash
+          );
+          CREATE UNIQUE INDEX idx_questions_hash ON questions(question_hash);
+        `);
+      }
+    })();
+  }
+
   // ============================================================================
   // QUESTION CRUD
   // ============================================================================
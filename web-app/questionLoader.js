@@ -1,14 +1,111 @@
 /**
  * Question Loader - Loads all trivia questions from generated files
  * Supports multiple question types: trivia, who-said-it, chaos, roast
+ *
+ * Prefers the pre-validated `.pack.jsonl` artifact the Python pack writer
+ * (utils/pack_writer.py) writes next to each CSV; falls back to parsing
+ * the CSV when there is no artifact, it fails its checksum, or the CSV has
+ * changed since the artifact was written (edited by hand, or rewritten by a
+ * tool that doesn't write artifacts).
  */
 
 const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
 const csv = require('csv-parser');
 
 const OUTPUT_DIR = path.join(__dirname, '..', 'output');
 
+const PACK_FORMAT = 'henze-trivia-pack';
+const PACK_VERSION = 2;
+const PACK_SUFFIX = '.pack.jsonl';
+
+/**
+ * SHA-256 of a file's bytes
+ * @param {string} filePath - Path to the file
+ * @returns {string} - Hex digest
+ */
+function fileSha256(filePath) {
+  return crypto.createHash('sha256').update(fs.readFileSync(filePath)).digest('hex');
+}
+
+/**
+ * Load a `.pack.jsonl` artifact: a header line, then one game-format question per line
+ * @param {string} filePath - Path to the artifact
+ * @param {string} [csvPath] - The artifact's CSV (defaults to the same name with `.csv`)
+ * @returns {{header: Object, questions: Array}|null} - null if missing, stale or corrupt
+ */
+function loadPack(filePath, csvPath) {
+  if (csvPath === undefined && filePath.endsWith(PACK_SUFFIX)) {
+    csvPath = filePath.slice(0, -PACK_SUFFIX.length) + '.csv';
+  }
+  if (!fs.existsSync(filePath)) {
+    return null;
+  }
+
+  const buffer = fs.readFileSync(filePath);
+  const newline = buffer.indexOf(10);
+  if (newline < 0) {
+    return null;
+  }
+
+  try {
+    const header = JSON.parse(buffer.subarray(0, newline).toString('utf8'));
+    if (header.format !== PACK_FORMAT || header.version !== PACK_VERSION) {
+      console.log(`⚠️  Unsupported pack format in ${path.basename(filePath)}`);
+      return null;
+    }
+
+    const body = buffer.subarray(newline + 1);
+    const checksum = crypto.createHash('sha256').update(body).digest('hex');
+    if (checksum !== header.sha256) {
+      console.log(`⚠️  Checksum mismatch in ${path.basename(filePath)}`);
+      return null;
+    }
+
+    // The CSV is the source of truth; an artifact written for another version of it is stale
+    if (csvPath && fs.existsSync(csvPath) && fileSha256(csvPath) !== header.source_sha256) {
+      console.log(`⚠️  ${path.basename(csvPath)} changed since ${path.basename(filePath)} was written`);
+      return null;
+    }
+
+    const questions = body.toString('utf8').split('\n').filter(Boolean).map((line) => JSON.parse(line));
+    console.log(`✅ Loaded ${questions.length} questions from ${path.basename(filePath)}`);
+    return { header, questions };
+  } catch (e) {
+    console.error(`Error reading pack ${path.basename(filePath)}:`, e.message);
+    return null;
+  }
+}
+
+/**
+ * Questions from a pack in one of its pre-shuffled orders
+ * @param {{header: Object, questions: Array}} pack - Pack from loadPack()
+ * @param {number} count - Number of questions to return
+ * @returns {Array} - Questions, no shuffling needed
+ */
+function getPackQuestions(pack, count = pack.questions.length) {
+  const orders = pack.header.orders || [];
+  if (orders.length === 0) {
+    return getRandomQuestions(count, pack.questions);
+  }
+  const order = orders[Math.floor(Math.random() * orders.length)];
+  return order.slice(0, count).map((i) => pack.questions[i]);
+}
+
+/**
+ * Load questions for a CSV file, from its artifact when there is one
+ * @param {string} csvPath - Path to the CSV file
+ * @returns {Promise<Array>} - Array of question objects
+ */
+async function loadQuestions(csvPath) {
+  const pack = loadPack(csvPath.replace(/\.csv$/, PACK_SUFFIX), csvPath);
+  if (pack) {
+    return pack.questions;
+  }
+  return parseCSV(csvPath);
+}
+
 /**
  * Parse a CSV file of questions
  * @param {string} filePath - Path to CSV file
@@ -72,6 +169,7 @@ async function loadAllQuestions() {
     { path: path.join(OUTPUT_DIR, 'chaos_questions.csv'), type: 'chaos' },
     { path: path.join(OUTPUT_DIR, 'roast_mode_questions.csv'), type: 'roast' },
     { path: path.join(OUTPUT_DIR, 'savage_pack.csv'), type: 'savage' },
+    { path: path.join(OUTPUT_DIR, 'stats_questions.csv'), type: 'trivia' },
     { path: path.join(OUTPUT_DIR, 'general_trivia.csv'), type: 'trivia' }
   ];
 
@@ -79,7 +177,7 @@ async function loadAllQuestions() {
 
   for (const file of questionFiles) {
     try {
-      const questions = await parseCSV(file.path);
+      const questions = await loadQuestions(file.path);
       // Add type metadata
       questions.forEach(q => q.type = file.type);
       allQuestions.push(...questions);
@@ -130,6 +228,8 @@ function getRandomQuestions(count, questionPool = []) {
 
 module.exports = {
   loadAllQuestions,
+  loadPack,
+  getPackQuestions,
   getRandomQuestions,
   shuffle
 };
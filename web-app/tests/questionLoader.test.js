@@ -0,0 +1,113 @@
+/**
+ * Question Loader Tests
+ * Tests loading `.pack.jsonl` artifacts and falling back to the CSV
+ */
+
+const { loadPack } = require("../questionLoader");
+const crypto = require("crypto");
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+
+const sha256 = (data) => crypto.createHash("sha256").update(data).digest("hex");
+
+const CSV = [
+  "question,correct_answer,explanation,difficulty,category,option_A,option_B,option_C,option_D",
+  "What is 2+2?,C,Basic math,easy,Math,2,3,4,5",
+  "",
+].join("\n");
+
+const QUESTION = {
+  question: "What is 2+2?",
+  options: ["2", "3", "4", "5"],
+  correct: 2,
+  explanation: "Basic math",
+  category: "Math",
+  difficulty: "easy",
+  type: "trivia",
+};
+
+/** Write a pack the way utils/pack_writer.py does */
+function writePack(packPath, csvText, overrides = {}) {
+  const body = JSON.stringify(QUESTION) + "\n";
+  const header = {
+    format: "henze-trivia-pack",
+    version: 2,
+    name: "test",
+    count: 1,
+    skipped: 0,
+    sha256: sha256(body),
+    source_sha256: sha256(csvText),
+    index: {},
+    orders: [[0]],
+    ...overrides,
+  };
+  fs.writeFileSync(packPath, JSON.stringify(header) + "\n" + body);
+}
+
+describe("loadPack", () => {
+  let dir;
+  let csvPath;
+  let packPath;
+
+  beforeEach(() => {
+    dir = fs.mkdtempSync(path.join(os.tmpdir(), "henze-pack-"));
+    csvPath = path.join(dir, "questions.csv");
+    packPath = path.join(dir, "questions.pack.jsonl");
+    jest.spyOn(console, "log").mockImplementation(() => {});
+    jest.spyOn(console, "error").mockImplementation(() => {});
+  });
+
+  afterEach(() => {
+    fs.rmSync(dir, { recursive: true, force: true });
+    jest.restoreAllMocks();
+  });
+
+  test("loads a pack whose CSV is unchanged", () => {
+    fs.writeFileSync(csvPath, CSV);
+    writePack(packPath, CSV);
+
+    const pack = loadPack(packPath);
+    expect(pack).not.toBeNull();
+    expect(pack.questions).toEqual([QUESTION]);
+  });
+
+  test("returns null when the artifact is missing", () => {
+    fs.writeFileSync(csvPath, CSV);
+
+    expect(loadPack(packPath)).toBeNull();
+  });
+
+  test("returns null when the body fails its checksum", () => {
+    fs.writeFileSync(csvPath, CSV);
+    writePack(packPath, CSV, { sha256: sha256("something else") });
+
+    expect(loadPack(packPath)).toBeNull();
+  });
+
+  test("returns null when the header is not JSON", () => {
+    fs.writeFileSync(packPath, "not json\n" + JSON.stringify(QUESTION) + "\n");
+
+    expect(loadPack(packPath)).toBeNull();
+  });
+
+  test("returns null when the CSV changed after the artifact was written", () => {
+    writePack(packPath, CSV);
+    fs.writeFileSync(csvPath, CSV + "What is 3+3?,D,More math,easy,Math,3,4,5,6\n");
+
+    expect(loadPack(packPath)).toBeNull();
+  });
+
+  test("returns null for artifacts that don't record their CSV", () => {
+    fs.writeFileSync(csvPath, CSV);
+    writePack(packPath, CSV, { version: 1, source_sha256: undefined });
+
+    expect(loadPack(packPath)).toBeNull();
+  });
+
+  test("uses a standalone artifact when there is no CSV", () => {
+    writePack(packPath, CSV);
+
+    expect(loadPack(packPath).questions).toHaveLength(1);
+  });
+});